@@ -754,8 +754,10 @@ def _detect_mime_type(url: str, default: str = "video/mp2t") -> str:
         if url.startswith("http"):
             import urllib.request
 
+            from http_client import urlopen
+
             req = urllib.request.Request(url, method="HEAD")
-            with urllib.request.urlopen(req, timeout=3) as resp:
+            with urlopen(req, timeout=3, retries=0) as resp:
                 ctype = resp.headers.get("Content-Type", "")
                 if ctype:
                     ctype = ctype.split(";")[0].strip().lower()
@@ -0,0 +1,181 @@
+"""Reverse indexes from EPG channel references to playlist channels.
+
+EPG rows and "What's on Now" entries name a channel by tvg-id and display
+name. Matching them used to scan every playlist channel and run
+``canonicalize_name`` on each one per lookup. ``ChannelLookup`` computes
+those keys once per playlist load (tvg-id, lowercase name/tvg-name,
+canonical name, noise-stripped canonical name, base name without quality
+tags) and maps each to the rows that carry it, so the common cases are dict
+lookups. Canonical forms are memoised by raw name and handed to the next
+build, so a refresh only canonicalises names it has not seen before.
+"""
+
+from array import array
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from options import canonicalize_name
+from playlist import strip_noise_words
+
+
+# Quality suffixes dropped for the "base name" comparison.
+_BASE_PATTERNS = ("hd", "sd", "fhd", "uhd", "4k", "hevc", "h264", "h.264")
+
+# Minimum score for What's on Now to accept a match.
+MIN_MATCH_SCORE = 30
+
+
+def base_name(lower_name: str) -> str:
+    """``lower_name`` without HD/SD-style suffixes, as What's on Now compares them."""
+    for pat in _BASE_PATTERNS:
+        lower_name = lower_name.replace(f" {pat}", "").replace(f"({pat})", "").replace(f"[{pat}]", "")
+    return lower_name.strip()
+
+
+def _add(index: Dict[str, array], key: str, row: int) -> None:
+    if not key:
+        return
+    rows = index.get(key)
+    if rows is None:
+        index[key] = rows = array("I")
+    if not rows or rows[-1] != row:
+        rows.append(row)
+
+
+class ChannelLookup:
+    """Reverse indexes over ``records`` (a table's record sequence)."""
+
+    def __init__(self, records: Sequence, previous: Optional["ChannelLookup"] = None):
+        self.records = records
+        # raw name -> (canonical, noise-stripped canonical)
+        memo: Dict[str, Tuple[str, str]] = {}
+        old_memo = previous._memo if previous is not None else {}
+        self.reused = 0
+
+        def names_for(raw: str) -> Tuple[str, str]:
+            keys = memo.get(raw)
+            if keys is None:
+                keys = old_memo.get(raw)
+                if keys is None:
+                    keys = (canonicalize_name(raw), canonicalize_name(strip_noise_words(raw)))
+                else:
+                    self.reused += 1
+                memo[raw] = keys
+            return keys
+
+        by_tvg_id: Dict[str, array] = {}
+        by_name: Dict[str, array] = {}
+        by_canonical: Dict[str, array] = {}
+        by_norm: Dict[str, array] = {}
+        by_base: Dict[str, array] = {}
+        by_word: Dict[str, array] = {}
+        word_counts = array("H")
+        for row, ch in enumerate(records):
+            name = ch.get("name", "") or ""
+            tvg_name = ch.get("tvg-name", "") or ""
+            lower = name.lower()
+            _add(by_tvg_id, (ch.get("tvg-id", "") or "").lower(), row)
+            _add(by_name, lower, row)
+            _add(by_name, tvg_name.lower(), row)
+            canonical, norm = names_for(name)
+            _add(by_canonical, canonical, row)
+            _add(by_norm, norm, row)
+            if tvg_name:
+                _add(by_norm, names_for(tvg_name)[1], row)
+            _add(by_base, base_name(lower), row)
+            words = set(norm.split())
+            word_counts.append(min(len(words), 0xFFFF))
+            for word in words:
+                _add(by_word, word, row)
+        self._memo = memo
+        self._by_tvg_id = by_tvg_id
+        self._by_name = by_name
+        self._by_canonical = by_canonical
+        self._by_norm = by_norm
+        self._by_base = by_base
+        self._by_word = by_word
+        self._word_counts = word_counts
+
+    def __len__(self) -> int:
+        return len(self._word_counts)
+
+    def find_by_canonical_name(self, name: str) -> Optional[Mapping]:
+        """First channel whose canonical name equals that of ``name``."""
+        if not name:
+            return None
+        rows = self._by_canonical.get(canonicalize_name(name))
+        return self.records[rows[0]] if rows else None
+
+    def best_match(self, channel_name: str, channel_id: str = "") -> Tuple[Optional[Mapping], int]:
+        """Best playlist channel for an EPG (name, id) pair and its score.
+
+        Scores follow What's on Now's ladder: tvg-id equal 100, name or
+        tvg-name equal 90, tvg-id containment 80, normalised name 70, base
+        name 60, name containment 40, word overlap up to 30. Ties go to the
+        earliest channel in the playlist.
+        """
+        name_l = (channel_name or "").lower()
+        id_l = (channel_id or "").lower()
+        tiers: List[Tuple[int, Iterable[int]]] = []
+        if id_l:
+            tiers.append((100, self._by_tvg_id.get(id_l, ())))
+        if name_l:
+            tiers.append((90, self._by_name.get(name_l, ())))
+            norm = canonicalize_name(strip_noise_words(channel_name))
+            if norm:
+                tiers.append((70, self._by_norm.get(norm, ())))
+            base = base_name(name_l)
+            if base:
+                tiers.append((60, self._by_base.get(base, ())))
+        score, row = self._best(tiers)
+        if score < 80 and id_l:
+            row80 = self._first_containing(self._by_tvg_id, id_l, exclude_equal=True)
+            if row80 is not None:
+                score, row = 80, row80
+        if score < 60 and name_l:
+            row40 = self._first_containing(self._by_name, name_l)
+            if row40 is not None:
+                score, row = 40, row40
+            else:
+                score, row = self._best_overlap(norm)
+        if row is None:
+            return None, 0
+        return self.records[row], score
+
+    def _best(self, tiers: Iterable[Tuple[int, Iterable[int]]]) -> Tuple[int, Optional[int]]:
+        best_score, best_row = 0, None
+        for score, rows in tiers:
+            if not rows or score < best_score:
+                continue
+            first = rows[0]
+            if score > best_score or first < best_row:
+                best_score, best_row = score, first
+        return best_score, best_row
+
+    @staticmethod
+    def _first_containing(index: Dict[str, array], needle: str, exclude_equal: bool = False) -> Optional[int]:
+        best = None
+        for key, rows in index.items():
+            if exclude_equal and key == needle:
+                continue
+            if needle in key or key in needle:
+                if best is None or rows[0] < best:
+                    best = rows[0]
+        return best
+
+    def _best_overlap(self, norm: str) -> Tuple[int, Optional[int]]:
+        words = set(norm.split()) if norm else set()
+        if not words:
+            return 0, None
+        hits: Counter = Counter()
+        for word in words:
+            hits.update(self._by_word.get(word, ()))
+        best_score, best_row = 0, None
+        counts = self._word_counts
+        for row, overlap in hits.items():
+            score = int(30 * overlap / max(len(words), counts[row]))
+            if score > best_score or (score == best_score and best_row is not None and row < best_row):
+                best_score, best_row = score, row
+        return best_score, best_row
+
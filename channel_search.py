@@ -0,0 +1,313 @@
+"""Prebuilt, ranked channel name search.
+
+The filter box used to match ``query in name.lower()``. Scanning and
+lowercasing 100k names per keystroke is too slow for the UI thread, so
+``ChannelSearchIndex`` builds, once per playlist load:
+
+* the folded names (lowercased, accents stripped: "España" -> "espana"),
+* a token -> posting-list map (``\\w+`` runs), which answers queries shorter
+  than an n-gram exactly: a short all-word-character query can only occur
+  inside a single token,
+* a trigram -> posting-list map; candidates for longer queries come from the
+  query's rarest trigram and are then verified with ``in``.
+
+On top of that substring layer sits a fuzzy layer over the names'
+``canonicalize_name`` form: tokens split at letter/digit boundaries, number
+words mapped to digits ("BBC One" and "bbc1" both become ``bbc 1``), and a
+one-deletion neighbourhood per token so a single typo still matches.
+
+Substring hits rank first (name prefix, then word prefix, then anywhere),
+followed by fuzzy-only hits by score. Posting lists are sorted
+``array('I')`` row numbers. When the new query extends the previous one,
+only the previous substring hits are re-checked.
+"""
+
+import bisect
+import re
+import threading
+import unicodedata
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from options import canonicalize_name
+
+
+NGRAM = 3
+# How often long loops poll the cancel callback.
+_CANCEL_CHECK_EVERY = 4096
+# Fuzzy matching kicks in from this folded query length, and tokens this
+# long or longer may differ by one edit.
+FUZZY_MIN_QUERY = 3
+FUZZY_MIN_TYPO_TOKEN = 4
+
+_TOKEN_RE = re.compile(r"\w+")
+_KEY_TOKEN_RE = re.compile(r"[^\W\d_]+|\d+")
+
+# Letters NFKD does not decompose into base + accent.
+_FOLD_EXTRA = str.maketrans({
+    "ø": "o", "æ": "ae", "œ": "oe", "ł": "l", "đ": "d", "ð": "d", "þ": "th", "ı": "i",
+})
+
+_NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+}
+
+
+class SearchCancelled(Exception):
+    """Raised when the ``cancel`` callback reports the search is stale."""
+
+
+def fold_text(text: str) -> str:
+    """Lowercase ``text`` and strip accents, for accent-insensitive matching."""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.translate(_FOLD_EXTRA)
+
+
+def key_tokens(text: str) -> List[str]:
+    """Split folded text into fuzzy-match tokens: letter runs, digit runs, number words as digits."""
+    return [_NUMBER_WORDS.get(tok, tok) for tok in _KEY_TOKEN_RE.findall(text)]
+
+
+def _grams(text: str) -> Iterable[str]:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _deletes(token: str) -> Set[str]:
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if ``a`` and ``b`` differ by at most one insert, delete, substitution or swap."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    i = 0
+    while i < la and i < lb and a[i] == b[i]:
+        i += 1
+    if la > lb:
+        return a[i + 1:] == b[i:]
+    if lb > la:
+        return a[i:] == b[i + 1:]
+    if a[i + 1:] == b[i + 1:]:
+        return True
+    return i + 1 < la and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+
+
+class _FuzzyKeys:
+    """Token postings over canonicalised names plus a one-deletion neighbourhood."""
+
+    def __init__(self, records: Sequence):
+        postings: Dict[str, array] = {}
+        for row, rec in enumerate(records):
+            name = canonicalize_name(fold_text(rec.get("name") or ""))
+            for tok in set(key_tokens(name)):
+                posting = postings.get(tok)
+                if posting is None:
+                    postings[tok] = posting = array("I")
+                posting.append(row)
+        neighbours: Dict[str, List[str]] = {}
+        for tok in postings:
+            if len(tok) < FUZZY_MIN_TYPO_TOKEN or tok.isdigit():
+                continue
+            for variant in _deletes(tok):
+                neighbours.setdefault(variant, []).append(tok)
+        self.postings = postings
+        self.neighbours = neighbours
+        self.vocab = sorted(postings)
+
+    def match(self, token: str) -> Tuple[Set[int], Set[int], Set[int]]:
+        """Rows whose tokens equal, start with, or are one typo away from ``token``."""
+        postings = self.postings
+        exact = set(postings.get(token, ()))
+        prefix: Set[int] = set()
+        typo: Set[int] = set()
+        if token.isdigit():
+            return exact, prefix, typo
+        # ``vocab`` is sorted, so prefix matches are one contiguous run.
+        vocab = self.vocab
+        for i in range(bisect.bisect_right(vocab, token), len(vocab)):
+            if not vocab[i].startswith(token):
+                break
+            prefix.update(postings[vocab[i]])
+        if len(token) >= FUZZY_MIN_TYPO_TOKEN:
+            seen = {token}
+            for key in _deletes(token) | {token}:
+                # Vocabulary tokens one character shorter than the query.
+                if key in postings and key not in seen:
+                    seen.add(key)
+                    typo.update(postings[key])
+                for tok in self.neighbours.get(key, ()):
+                    if tok not in seen and _within_one_edit(token, tok):
+                        seen.add(tok)
+                        typo.update(postings[tok])
+        return exact, prefix, typo
+
+
+class ChannelSearchIndex:
+    """Search index over the names of ``records`` (a table's record sequence).
+
+    ``fuzzy=False`` defers the slower fuzzy keys to ``build_fuzzy()``; until
+    it has run, searches return substring hits only.
+    """
+
+    def __init__(self, records: Sequence, fuzzy: bool = True):
+        self.records = records
+        self.names: List[str] = []
+        self.groups: List[str] = []
+        tokens: Dict[str, array] = {}
+        grams: Dict[str, array] = {}
+        for row, rec in enumerate(records):
+            name = fold_text(rec.get("name") or "")
+            self.names.append(name)
+            # Same key ChannelTable files the record under.
+            self.groups.append(rec.get("group") or "Uncategorized")
+            for tok in set(_TOKEN_RE.findall(name)):
+                posting = tokens.get(tok)
+                if posting is None:
+                    tokens[tok] = posting = array("I")
+                posting.append(row)
+            for gram in _grams(name):
+                posting = grams.get(gram)
+                if posting is None:
+                    grams[gram] = posting = array("I")
+                posting.append(row)
+        self._tokens = tokens
+        self._grams = grams
+        self._last: Optional[Tuple[str, Optional[str], List[int]]] = None
+        self._fuzzy: Optional[_FuzzyKeys] = None
+        self._fuzzy_lock = threading.Lock()
+        if fuzzy:
+            self.build_fuzzy()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def has_fuzzy(self) -> bool:
+        return self._fuzzy is not None
+
+    def build_fuzzy(self) -> None:
+        with self._fuzzy_lock:
+            if self._fuzzy is None:
+                self._fuzzy = _FuzzyKeys(self.records)
+
+    def search(
+        self,
+        query: str,
+        group: Optional[str] = None,
+        cancel: Optional[Callable[[], bool]] = None,
+    ) -> List[int]:
+        """Rows matching ``query``, best first.
+
+        ``group`` restricts results to one group. ``cancel`` is polled during
+        long loops; when it returns True the search raises ``SearchCancelled``.
+        """
+        query = fold_text(query.strip())
+        hits = self._substring_hits(query, group, cancel)
+        ranked = self._rank_substring(query, hits)
+        fuzzy = self._fuzzy
+        if fuzzy is not None and len(query) >= FUZZY_MIN_QUERY:
+            ranked.extend(self._fuzzy_hits(fuzzy, query, group, set(hits), cancel))
+        return ranked
+
+    def _substring_hits(self, query: str, group: Optional[str], cancel) -> List[int]:
+        last = self._last
+        if last is not None and last[1] == group and last[0] and last[0] in query:
+            # Narrowing: anything matching the longer query matched the shorter one.
+            candidates: Iterable[int] = last[2]
+        else:
+            candidates = self._candidates(query)
+        names = self.names
+        groups = self.groups
+        out: List[int] = []
+        for n, row in enumerate(candidates):
+            if cancel is not None and not n % _CANCEL_CHECK_EVERY and n and cancel():
+                raise SearchCancelled()
+            if query in names[row] and (group is None or groups[row] == group):
+                out.append(row)
+        self._last = (query, group, out)
+        return out
+
+    def _rank_substring(self, query: str, rows: List[int]) -> List[int]:
+        if not query:
+            return list(rows)
+        names = self.names
+        starts: List[int] = []
+        words: List[int] = []
+        inner: List[int] = []
+        for row in rows:
+            name = names[row]
+            pos = name.find(query)
+            if pos == 0:
+                starts.append(row)
+            elif not name[pos - 1].isalnum():
+                words.append(row)
+            else:
+                inner.append(row)
+        return starts + words + inner
+
+    def _fuzzy_hits(self, fuzzy: _FuzzyKeys, query: str, group: Optional[str],
+                    exclude: Set[int], cancel) -> List[int]:
+        tokens = list(dict.fromkeys(key_tokens(canonicalize_name(query) or query)))
+        if not tokens:
+            return []
+        matches = []
+        for tok in tokens:
+            if cancel is not None and cancel():
+                raise SearchCancelled()
+            matches.append(fuzzy.match(tok))
+        # Every query token has to match; intersect starting from the rarest.
+        per_token = sorted((exact | prefix | typo for exact, prefix, typo in matches), key=len)
+        rows = per_token[0]
+        for other in per_token[1:]:
+            rows = rows & other
+            if not rows:
+                return []
+        rows = rows - exclude
+        names = self.names
+        groups = self.groups
+        scored = []
+        for n, row in enumerate(rows):
+            if cancel is not None and not n % _CANCEL_CHECK_EVERY and n and cancel():
+                raise SearchCancelled()
+            if group is not None and groups[row] != group:
+                continue
+            score = 0
+            for exact, prefix, _typo in matches:
+                score += 3 if row in exact else 2 if row in prefix else 1
+            scored.append((-score, len(names[row]), row))
+        scored.sort()
+        return [row for _score, _length, row in scored]
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        if not query:
+            return range(len(self.names))
+        if len(query) >= NGRAM:
+            smallest: Optional[array] = None
+            for gram in _grams(query):
+                posting = self._grams.get(gram)
+                if posting is None:
+                    return ()
+                if smallest is None or len(posting) < len(smallest):
+                    smallest = posting
+            return smallest if smallest is not None else ()
+        if _TOKEN_RE.fullmatch(query):
+            postings = [p for tok, p in self._tokens.items() if query in tok]
+            if len(postings) == 1:
+                return postings[0]
+            rows = set()
+            for posting in postings:
+                rows.update(posting)
+            return sorted(rows)
+        return range(len(self.names))
+
+    def records_for(self, rows: Iterable[int]) -> List[Mapping]:
+        records = self.records
+        return [records[row] for row in rows]
@@ -0,0 +1,430 @@
+"""Compact in-memory channel storage.
+
+Playlists routinely hold 100k+ entries, and a plain dict per channel costs
+several hundred bytes before any values are counted. ``ChannelRecord`` keeps
+the fields most channels have in ``__slots__`` and packs the rarer extras
+(catch-up settings, HTTP headers) into a small tuple, while still
+behaving like the old dict for ``channel.get("url")``-style call sites.
+``ChannelTable`` de-duplicates records and indexes them by group.
+"""
+
+import bisect
+import sys
+from collections.abc import Mapping, MutableMapping, Sequence
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Keys stored in slots. Iteration reports them in this order, with the
+# extras between ``tvg-logo`` and ``stream-id`` (the parser's key order).
+CORE_KEYS = (
+    "name", "group", "url", "tvg-id", "tvg-name", "provider-id", "provider-type",
+    "tvg-logo", "stream-id",
+)
+_SLOT_FOR_KEY = {
+    "name": "name",
+    "group": "group",
+    "url": "url",
+    "tvg-id": "tvg_id",
+    "tvg-name": "tvg_name",
+    "provider-id": "provider_id",
+    "provider-type": "provider_type",
+    "tvg-logo": "tvg_logo",
+    "stream-id": "stream_id",
+}
+# Core keys that are always present (possibly empty); the others are only
+# reported when set.
+_ALWAYS_KEYS = frozenset(("name", "group", "url", "tvg-id", "tvg-name"))
+
+# Extra values that repeat across many channels and are worth interning.
+_INTERNED_EXTRAS = frozenset((
+    "catchup", "catchup-type", "catchup-days", "catchup-offset", "timeshift",
+    "tvg-rec", "http-user-agent", "http-referrer", "http-origin",
+))
+
+_intern = sys.intern
+
+
+def _intern_str(value):
+    return _intern(value) if type(value) is str else value
+
+
+class ChannelRecord(MutableMapping):
+    """A single playlist entry with a dict-compatible interface."""
+
+    __slots__ = (
+        "name", "group", "url", "tvg_id", "tvg_name", "provider_id", "provider_type",
+        "tvg_logo", "stream_id", "_extra",
+    )
+
+    def __init__(
+        self,
+        name: str = "",
+        group: str = "",
+        url: str = "",
+        tvg_id: str = "",
+        tvg_name: str = "",
+        provider_id: Optional[str] = None,
+        provider_type: Optional[str] = None,
+        tvg_logo: Optional[str] = None,
+        stream_id: Optional[str] = None,
+        extra: Optional[Dict[str, object]] = None,
+    ):
+        self.name = name
+        self.group = _intern_str(group)
+        self.url = url
+        self.tvg_id = tvg_id
+        self.tvg_name = tvg_name
+        self.provider_id = _intern_str(provider_id)
+        self.provider_type = _intern_str(provider_type)
+        self.tvg_logo = tvg_logo
+        self.stream_id = stream_id
+        # Rare keys live in a flat (key, value, key, value, ...) tuple, which
+        # is far smaller than a dict for the two or three entries typical here.
+        self._extra = None
+        if extra:
+            flat = []
+            for key, value in extra.items():
+                flat.append(_intern(key))
+                flat.append(_intern_str(value) if key in _INTERNED_EXTRAS else value)
+            self._extra = tuple(flat)
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> "ChannelRecord":
+        """Build a record from a channel dict (or return an existing record)."""
+        if isinstance(data, cls):
+            return data
+        extra = {key: value for key, value in data.items() if key not in _SLOT_FOR_KEY}
+        return cls(
+            name=data.get("name", "") or "",
+            group=data.get("group", "") or "",
+            url=data.get("url", "") or "",
+            tvg_id=data.get("tvg-id", "") or "",
+            tvg_name=data.get("tvg-name", "") or "",
+            provider_id=data.get("provider-id"),
+            provider_type=data.get("provider-type"),
+            tvg_logo=data.get("tvg-logo"),
+            stream_id=data.get("stream-id"),
+            extra=extra,
+        )
+
+    # ---------- mapping protocol ----------
+    def _extra_index(self, key) -> int:
+        extra = self._extra
+        if extra is not None:
+            for i in range(0, len(extra), 2):
+                if extra[i] == key:
+                    return i
+        return -1
+
+    def __getitem__(self, key):
+        slot = _SLOT_FOR_KEY.get(key)
+        if slot is not None:
+            value = getattr(self, slot)
+            if value is None:
+                raise KeyError(key)
+            return value
+        idx = self._extra_index(key)
+        if idx < 0:
+            raise KeyError(key)
+        return self._extra[idx + 1]
+
+    def get(self, key, default=None):
+        slot = _SLOT_FOR_KEY.get(key)
+        if slot is not None:
+            value = getattr(self, slot)
+            return default if value is None else value
+        idx = self._extra_index(key)
+        return default if idx < 0 else self._extra[idx + 1]
+
+    def __contains__(self, key) -> bool:
+        slot = _SLOT_FOR_KEY.get(key)
+        if slot is not None:
+            return getattr(self, slot) is not None
+        return self._extra_index(key) >= 0
+
+    def __setitem__(self, key, value) -> None:
+        slot = _SLOT_FOR_KEY.get(key)
+        if slot is not None:
+            if key in ("group", "provider-id", "provider-type"):
+                value = _intern_str(value)
+            setattr(self, slot, value)
+            return
+        if key in _INTERNED_EXTRAS:
+            value = _intern_str(value)
+        idx = self._extra_index(key)
+        if idx >= 0:
+            extra = list(self._extra)
+            extra[idx + 1] = value
+            self._extra = tuple(extra)
+        else:
+            self._extra = (self._extra or ()) + (_intern(key), value)
+
+    def __delitem__(self, key) -> None:
+        slot = _SLOT_FOR_KEY.get(key)
+        if slot is not None:
+            if getattr(self, slot) is None:
+                raise KeyError(key)
+            setattr(self, slot, "" if key in _ALWAYS_KEYS else None)
+            return
+        idx = self._extra_index(key)
+        if idx < 0:
+            raise KeyError(key)
+        extra = self._extra[:idx] + self._extra[idx + 2:]
+        self._extra = extra or None
+
+    def __iter__(self) -> Iterator[str]:
+        yield "name"
+        yield "group"
+        yield "url"
+        yield "tvg-id"
+        yield "tvg-name"
+        if self.provider_id is not None:
+            yield "provider-id"
+        if self.provider_type is not None:
+            yield "provider-type"
+        if self.tvg_logo is not None:
+            yield "tvg-logo"
+        extra = self._extra
+        if extra:
+            yield from extra[::2]
+        if self.stream_id is not None:
+            yield "stream-id"
+
+    def __len__(self) -> int:
+        count = 5
+        for value in (self.provider_id, self.provider_type, self.tvg_logo, self.stream_id):
+            if value is not None:
+                count += 1
+        if self._extra:
+            count += len(self._extra) // 2
+        return count
+
+    def __repr__(self) -> str:
+        return f"ChannelRecord({dict(self)!r})"
+
+    def _state(self) -> tuple:
+        return (self.name, self.group, self.url, self.tvg_id, self.tvg_name, self.provider_id,
+                self.provider_type, self.tvg_logo, self.stream_id, self._extra)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ChannelRecord):
+            if self._state() == other._state():
+                return True
+            # Same keys stored in a different order still compare equal.
+            if self._extra is None or other._extra is None:
+                return False
+        return MutableMapping.__eq__(self, other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def copy(self) -> Dict[str, object]:
+        """Return a plain dict snapshot, mirroring ``dict.copy()``."""
+        return dict(self)
+
+    def extra_items(self) -> List[Tuple[str, object]]:
+        """(key, value) pairs for the keys not held in slots."""
+        extra = self._extra
+        if not extra:
+            return []
+        return list(zip(extra[::2], extra[1::2]))
+
+    def dedupe_key(self) -> Tuple[str, str, str]:
+        return (self.name, self.url, self.provider_id or "")
+
+
+class ChainedView(Sequence):
+    """Read-only concatenation of record sequences."""
+
+    __slots__ = ("_parts", "_ends")
+
+    def __init__(self, parts: List[Sequence]):
+        self._parts = [part for part in parts if len(part)]
+        self._ends = []
+        total = 0
+        for part in self._parts:
+            total += len(part)
+            self._ends.append(total)
+
+    def __len__(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        part = bisect.bisect_right(self._ends, index)
+        start = self._ends[part - 1] if part else 0
+        return self._parts[part][index - start]
+
+    def __iter__(self):
+        for part in self._parts:
+            yield from part
+
+
+class ChannelTable:
+    """De-duplicated channel records with a per-group index.
+
+    ``records`` and ``by_group`` share the same record objects, so grouping
+    costs one list slot per channel rather than a second copy of its data.
+    A table built by ``from_views`` wraps lazily decoded sequences (such as a
+    binary playlist cache) and only turns them into lists when modified.
+    """
+
+    __slots__ = ("records", "by_group", "_seen")
+
+    def __init__(self, channels: Optional[Iterable[Mapping]] = None):
+        self.records: List[ChannelRecord] = []
+        self.by_group: Dict[str, List[ChannelRecord]] = {}
+        self._seen = set()
+        if channels:
+            self.extend(channels)
+
+    @classmethod
+    def from_views(cls, views: List[Tuple[Sequence, Dict[str, Sequence]]]) -> "ChannelTable":
+        """Wrap ``(records, by_group)`` sequence pairs without decoding them.
+
+        Entries are not de-duplicated across views until the table is
+        modified; this is meant for the read-only startup prefill.
+        """
+        table = cls()
+        if len(views) == 1:
+            table.records, table.by_group = views[0][0], dict(views[0][1])
+        else:
+            table.records = ChainedView([records for records, _groups in views])
+            parts: Dict[str, List[Sequence]] = {}
+            for _records, groups in views:
+                for grp, seq in groups.items():
+                    parts.setdefault(grp, []).append(seq)
+            table.by_group = {
+                grp: seqs[0] if len(seqs) == 1 else ChainedView(seqs)
+                for grp, seqs in parts.items()
+            }
+        table._seen = None
+        return table
+
+    @property
+    def is_lazy(self) -> bool:
+        return self._seen is None
+
+    def _materialize(self) -> None:
+        if self._seen is not None:
+            return
+        views = self.records
+        self.records, self.by_group, self._seen = [], {}, set()
+        self.extend(views)
+
+    def add(self, channel: Mapping) -> Optional[ChannelRecord]:
+        """Append ``channel`` unless an identical entry exists; returns the record added."""
+        if self._seen is None:
+            self._materialize()
+        record = ChannelRecord.from_mapping(channel)
+        key = record.dedupe_key()
+        if key in self._seen:
+            return None
+        self._seen.add(key)
+        grp = record.group or "Uncategorized"
+        bucket = self.by_group.get(grp)
+        if bucket is None:
+            bucket = self.by_group[_intern(grp)] = []
+        bucket.append(record)
+        self.records.append(record)
+        return record
+
+    def extend(self, channels: Iterable[Mapping]) -> List[ChannelRecord]:
+        add = self.add
+        added = []
+        for channel in channels:
+            record = add(channel)
+            if record is not None:
+                added.append(record)
+        return added
+
+    def copy(self) -> "ChannelTable":
+        """Shallow copy: new indexes over the same records."""
+        self._materialize()
+        clone = ChannelTable()
+        clone.records = list(self.records)
+        clone.by_group = {grp: lst.copy() for grp, lst in self.by_group.items()}
+        clone._seen = set(self._seen)
+        return clone
+
+    def __contains__(self, channel: Mapping) -> bool:
+        self._materialize()
+        return (channel.get("name", ""), channel.get("url", ""), channel.get("provider-id", "") or "") in self._seen
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[ChannelRecord]:
+        return iter(self.records)
+
+    def group(self, name: str) -> Sequence:
+        return self.by_group.get(name, [])
+
+
+def channel_key(channel: Mapping) -> Tuple[str, str, str]:
+    """The (name, url, provider-id) identity used for de-duplication and diffs."""
+    if isinstance(channel, ChannelRecord):
+        return channel.dedupe_key()
+    return (channel.get("name", ""), channel.get("url", ""), channel.get("provider-id", "") or "")
+
+
+class TableDiff:
+    """Keyed difference between two channel tables.
+
+    ``base`` is the table the diff was computed against; callers check it is
+    still current before applying the diff incrementally.
+    """
+
+    __slots__ = ("base", "added", "removed", "changed", "unchanged")
+
+    def __init__(self, base: "ChannelTable"):
+        self.base = base
+        self.added: List[ChannelRecord] = []
+        self.removed: List[ChannelRecord] = []
+        self.changed: List[Tuple[ChannelRecord, ChannelRecord]] = []
+        self.unchanged = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def __repr__(self) -> str:
+        return (f"TableDiff(+{len(self.added)} -{len(self.removed)} "
+                f"~{len(self.changed)} ={self.unchanged})")
+
+
+def diff_tables(old: ChannelTable, new: ChannelTable) -> TableDiff:
+    """Diff ``new`` against ``old`` by channel key.
+
+    Records in ``new`` that equal their counterpart in ``old`` are replaced by
+    the old object, so anything holding a reference (the visible list, the
+    EPG caches) keeps pointing at a live record after the swap.
+    """
+    diff = TableDiff(old)
+    new._materialize()
+    previous: Dict[Tuple[str, str, str], ChannelRecord] = {}
+    for rec in old.records:
+        previous.setdefault(rec.dedupe_key(), rec)
+    adopted: Dict[int, ChannelRecord] = {}
+    for rec in new.records:
+        key = rec.dedupe_key()
+        old_rec = previous.pop(key, None)
+        if old_rec is None:
+            diff.added.append(rec)
+        elif old_rec is rec:
+            diff.unchanged += 1
+        elif old_rec == rec:
+            adopted[id(rec)] = old_rec
+            diff.unchanged += 1
+        else:
+            diff.changed.append((old_rec, rec))
+    diff.removed = list(previous.values())
+    if adopted:
+        new.records = [adopted.get(id(rec), rec) for rec in new.records]
+        for grp, lst in new.by_group.items():
+            new.by_group[grp] = [adopted.get(id(rec), rec) for rec in lst]
+    return diff
@@ -0,0 +1,107 @@
+"""Programme-boundary scheduling for the now/next EPG display."""
+
+import datetime
+import heapq
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+def _boundary_epoch(now_show: Optional[dict], next_show: Optional[dict]) -> Optional[float]:
+    """Return the epoch time at which a cached (now, next) pair goes stale."""
+    candidates = []
+    if now_show:
+        candidates.append(now_show.get("end"))
+    if next_show:
+        candidates.append(next_show.get("start"))
+    best = None
+    for value in candidates:
+        if not isinstance(value, datetime.datetime):
+            continue
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        ts = value.timestamp()
+        if best is None or ts < best:
+            best = ts
+    return best
+
+
+class ProgrammeBoundaryScheduler:
+    """Track the next programme boundary for each cached channel.
+
+    Each key maps to the earliest moment its cached now/next pair changes
+    (the current show ending or the next one starting). Callers arm a single
+    one-shot timer at ``next_deadline()`` and collect the keys that crossed
+    their boundary with ``pop_due()``, so nothing wakes up in between.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time, lead_secs: float = 1.0):
+        self._clock = clock
+        self._lead = max(0.0, float(lead_secs))
+        self._deadlines: Dict[Hashable, float] = {}
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def update(self, key: Hashable, now_show: Optional[dict], next_show: Optional[dict]) -> Optional[float]:
+        """Record the boundary for ``key``; returns the deadline or None."""
+        boundary = _boundary_epoch(now_show, next_show)
+        with self._lock:
+            if boundary is None:
+                self._deadlines.pop(key, None)
+                return None
+            # Fire a touch after the boundary so the DB already reports the new show.
+            deadline = boundary + self._lead
+            if self._deadlines.get(key) == deadline:
+                return deadline
+            self._deadlines[key] = deadline
+            self._seq += 1
+            heapq.heappush(self._heap, (deadline, self._seq, key))
+            return deadline
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._deadlines.clear()
+            self._heap = []
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._deadlines)
+
+    def _prune_locked(self) -> None:
+        # Drop heap entries superseded by a later update() or discard().
+        while self._heap:
+            deadline, _seq, key = self._heap[0]
+            if self._deadlines.get(key) == deadline:
+                return
+            heapq.heappop(self._heap)
+
+    def next_deadline(self) -> Optional[float]:
+        """Epoch seconds of the earliest pending boundary, or None if idle."""
+        with self._lock:
+            self._prune_locked()
+            return self._heap[0][0] if self._heap else None
+
+    def seconds_until_next(self) -> Optional[float]:
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+        return max(0.0, deadline - self._clock())
+
+    def pop_due(self, now: Optional[float] = None) -> List[Hashable]:
+        """Remove and return every key whose boundary has passed."""
+        now = self._clock() if now is None else now
+        due: List[Hashable] = []
+        with self._lock:
+            while True:
+                self._prune_locked()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _deadline, _seq, key = heapq.heappop(self._heap)
+                self._deadlines.pop(key, None)
+                due.append(key)
+        return due
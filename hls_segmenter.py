@@ -0,0 +1,292 @@
+"""In-memory HLS segmenting of an MPEG-TS stream.
+
+The cast proxy used to have ffmpeg write ``seg_%d.ts`` files and a playlist
+into a temp dir, and polled the file system until they appeared. ffmpeg
+now writes plain MPEG-TS to a pipe; ``TSSegmenter`` cuts that stream into
+segments itself and ``SegmentStore`` keeps the last few in memory and
+renders the playlist from its index.
+
+Segments start at a video keyframe (the packet's random access indicator)
+once ``target`` seconds of PTS have passed since the previous cut. For
+audio-only streams every PES start is a candidate. A cut is forced
+after ``max_duration`` so a stream without keyframe flags still produces
+segments. Every segment starts with the latest PAT and PMT, so each one
+decodes on its own.
+"""
+
+import asyncio
+import collections
+from typing import Deque, Dict, List, Optional, Set
+
+TS_PACKET_SIZE = 188
+_SYNC = 0x47
+_PTS_WRAP = 1 << 33
+_PTS_HZ = 90000.0
+
+SEGMENT_TARGET = 2.0
+# Segments listed in the playlist, and kept in memory (a little longer, for
+# players that fetch a playlist just before the window moves on).
+PLAYLIST_WINDOW = 5
+SEGMENTS_KEPT = 7
+
+_VIDEO_STREAM_TYPES = frozenset((0x01, 0x02, 0x10, 0x1B, 0x24, 0x42, 0xEA))
+_AUDIO_STREAM_TYPES = frozenset((0x03, 0x04, 0x0F, 0x11, 0x81, 0x87))
+
+
+class HLSSegment:
+    __slots__ = ("sequence", "duration", "data")
+
+    def __init__(self, sequence: int, duration: float, data: bytes):
+        self.sequence = sequence
+        self.duration = duration
+        self.data = data
+
+
+class SegmentStore:
+    """Rolling window of finished segments; waiters wake as segments arrive.
+
+    Sequence numbers start at ``first_sequence``. The proxy's bootstrap
+    playlist is sequence 0, so the first real segment carries a
+    discontinuity.
+    """
+
+    def __init__(self, window: int = PLAYLIST_WINDOW, keep: int = SEGMENTS_KEPT, first_sequence: int = 1):
+        self.window = window
+        self.keep = max(keep, window)
+        self.first_sequence = first_sequence
+        self.next_sequence = first_sequence
+        self.segments: Deque[HLSSegment] = collections.deque()
+        self.target_duration = int(SEGMENT_TARGET)
+        self.ended = False
+        # Replaced on every change, so one set() wakes every waiter.
+        self._changed = asyncio.Event()
+
+    def _signal(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def add(self, data: bytes, duration: float) -> HLSSegment:
+        segment = HLSSegment(self.next_sequence, duration, data)
+        self.next_sequence += 1
+        self.segments.append(segment)
+        while len(self.segments) > self.keep:
+            self.segments.popleft()
+        # EXTINF values rounded to the nearest second may not exceed the target duration.
+        self.target_duration = max(self.target_duration, int(duration + 0.5))
+        self._signal()
+        return segment
+
+    def end(self) -> None:
+        """No more segments will come (ffmpeg exited or the session stopped)."""
+        if not self.ended:
+            self.ended = True
+            self._signal()
+
+    def get(self, sequence: int) -> Optional[HLSSegment]:
+        for segment in reversed(self.segments):
+            if segment.sequence == sequence:
+                return segment
+        return None
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Wait until the first segment exists; False on timeout or if the stream ended without one."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self.segments and not self.ended:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return bool(self.segments)
+
+    def playlist(self, base_url: str) -> str:
+        """Live playlist of the newest ``window`` segments; segment URIs are ``base_url`` + ``seg_<n>.ts``."""
+        listed: List[HLSSegment] = list(self.segments)[-self.window:]
+        first = listed[0].sequence if listed else self.next_sequence
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{self.target_duration}",
+            f"#EXT-X-MEDIA-SEQUENCE:{first}",
+        ]
+        if first > self.first_sequence:
+            lines.append("#EXT-X-DISCONTINUITY-SEQUENCE:1")
+        for segment in listed:
+            if segment.sequence == self.first_sequence:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines.append(f"#EXTINF:{segment.duration:.6f},")
+            lines.append(f"{base_url}seg_{segment.sequence}.ts")
+        if self.ended:
+            lines.append("#EXT-X-ENDLIST")
+        return "\n".join(lines) + "\n"
+
+
+def _payload_offset(packet) -> int:
+    """Offset of the payload in a TS packet (``TS_PACKET_SIZE`` when there is none)."""
+    control = (packet[3] >> 4) & 0x3
+    if not control & 0x1:
+        return TS_PACKET_SIZE
+    if control & 0x2:
+        return 5 + packet[4]
+    return 4
+
+
+def _section(packet) -> Optional[bytes]:
+    """PSI section starting in this packet (PAT/PMT fit in one packet in practice)."""
+    start = _payload_offset(packet)
+    if start >= TS_PACKET_SIZE:
+        return None
+    start += 1 + packet[start]  # pointer_field
+    if start + 3 > TS_PACKET_SIZE:
+        return None
+    length = ((packet[start + 1] & 0x0F) << 8) | packet[start + 2]
+    return bytes(packet[start:start + 3 + length])
+
+
+def _pes_pts(packet) -> Optional[int]:
+    start = _payload_offset(packet)
+    if start + 14 > TS_PACKET_SIZE or packet[start:start + 3] != b"\x00\x00\x01":
+        return None
+    if not packet[start + 7] & 0x80:
+        return None
+    p = packet[start + 9:start + 14]
+    return (((p[0] >> 1) & 0x07) << 30) | (p[1] << 22) | ((p[2] >> 1) << 15) | (p[3] << 7) | (p[4] >> 1)
+
+
+def _pts_delta(pts: int, base: int) -> int:
+    """``pts - base`` in ticks across the 33-bit wrap; negative when ``pts`` is earlier.
+
+    B-frames of an open GOP carry PTS below the keyframe before them in
+    stream order, so a plain modulo would read them as a near-full wrap.
+    """
+    delta = (pts - base) % _PTS_WRAP
+    return delta - _PTS_WRAP if delta > _PTS_WRAP // 2 else delta
+
+
+def _random_access(packet) -> bool:
+    return bool(packet[3] & 0x20) and packet[4] > 0 and bool(packet[5] & 0x40)
+
+
+class TSSegmenter:
+    """Feeds an MPEG-TS byte stream into a ``SegmentStore``, one segment per cut."""
+
+    def __init__(self, store: SegmentStore, target: float = SEGMENT_TARGET, max_duration: Optional[float] = None):
+        self.store = store
+        self.target = target
+        self.max_duration = max_duration if max_duration is not None else target * 5
+        self._carry = b""
+        self._current: Optional[bytearray] = None
+        self._pat: Optional[bytes] = None
+        self._pmts: Dict[int, bytes] = {}
+        self._pmt_pids: Set[int] = set()
+        self._video_pid: Optional[int] = None
+        self._timing_pid: Optional[int] = None
+        self._start_pts: Optional[int] = None
+        # Highest PTS seen; frames arrive in decode order, not presentation order.
+        self._max_pts: Optional[int] = None
+
+    def feed(self, data: bytes) -> None:
+        buf = self._carry + data if self._carry else data
+        view = memoryview(buf)
+        end = len(buf)
+        i = 0
+        pending = 0  # start of the bytes not yet added to the current segment
+        while i + TS_PACKET_SIZE <= end:
+            if buf[i] != _SYNC:
+                # Lost sync: drop bytes up to the next sync byte.
+                self._append(view, pending, i)
+                i = buf.find(b"\x47", i + 1)
+                if i < 0:
+                    i = end
+                pending = i
+                continue
+            flags = buf[i + 1]
+            if flags & 0x40:
+                pid = ((flags & 0x1F) << 8) | buf[i + 2]
+                if pid == 0 or pid in self._pmt_pids or pid == self._timing_pid:
+                    self._append(view, pending, i)
+                    pending = i
+                    self._unit_start(pid, buf[i:i + TS_PACKET_SIZE])
+            i += TS_PACKET_SIZE
+        self._append(view, pending, i)
+        self._carry = bytes(view[i:])
+
+    def flush(self) -> None:
+        """Emit the segment in progress (at the end of the stream)."""
+        if self._current is not None and self._start_pts is not None:
+            last = self._max_pts if self._max_pts is not None else self._start_pts
+            duration = max(0, _pts_delta(last, self._start_pts)) / _PTS_HZ
+            self.store.add(bytes(self._current), duration or self.target)
+        self._current = None
+
+    def _append(self, view: memoryview, start: int, end: int) -> None:
+        if self._current is not None and end > start:
+            self._current += view[start:end]
+
+    def _unit_start(self, pid: int, packet) -> None:
+        if pid == 0:
+            self._read_pat(packet)
+        elif pid in self._pmt_pids:
+            self._read_pmt(pid, packet)
+        if pid != self._timing_pid:
+            return
+        pts = _pes_pts(packet)
+        if pts is None:
+            return
+        if self._max_pts is None or _pts_delta(pts, self._max_pts) > 0:
+            self._max_pts = pts
+        if self._pat is None or not self._pmts:
+            return
+        keyframe = self._video_pid is None or _random_access(packet)
+        if self._start_pts is None:
+            if keyframe:
+                self._cut(pts)
+            return
+        elapsed = _pts_delta(pts, self._start_pts) / _PTS_HZ
+        if elapsed <= 0:
+            return
+        if (keyframe and elapsed >= self.target) or elapsed >= self.max_duration:
+            self.store.add(bytes(self._current), elapsed)
+            self._cut(pts)
+
+    def _cut(self, pts: int) -> None:
+        self._current = bytearray(self._pat)
+        for pmt in self._pmts.values():
+            self._current += pmt
+        self._start_pts = pts
+
+    def _read_pat(self, packet) -> None:
+        section = _section(packet)
+        if not section or section[0] != 0x00:
+            return
+        pids = set()
+        # Program loop between the 8-byte header and the CRC.
+        for pos in range(8, len(section) - 4, 4):
+            program = (section[pos] << 8) | section[pos + 1]
+            if program:
+                pids.add(((section[pos + 2] & 0x1F) << 8) | section[pos + 3])
+        self._pat = bytes(packet)
+        self._pmt_pids = pids
+        for stale in set(self._pmts) - pids:
+            del self._pmts[stale]
+
+    def _read_pmt(self, pid: int, packet) -> None:
+        section = _section(packet)
+        if not section or section[0] != 0x02 or len(section) < 16:
+            return
+        video = audio = None
+        pos = 12 + (((section[10] & 0x0F) << 8) | section[11])
+        while pos + 5 <= len(section) - 4:
+            stream_type = section[pos]
+            es_pid = ((section[pos + 1] & 0x1F) << 8) | section[pos + 2]
+            if video is None and stream_type in _VIDEO_STREAM_TYPES:
+                video = es_pid
+            elif audio is None and stream_type in _AUDIO_STREAM_TYPES:
+                audio = es_pid
+            pos += 5 + (((section[pos + 3] & 0x0F) << 8) | section[pos + 4])
+        self._pmts[pid] = bytes(packet)
+        self._video_pid = video
+        self._timing_pid = video if video is not None else audio
@@ -0,0 +1,565 @@
+"""HTTP client shared by playlist, provider, EPG, player and proxy requests.
+
+``urlopen`` is a drop-in for ``urllib.request.urlopen`` (same ``Request``
+objects, same ``HTTPError`` for non-2xx responses) backed by ``HTTPClient``,
+which keeps idle keep-alive connections per host, caches DNS lookups, and
+retries idempotent requests on stale connections and gateway errors.
+Provider calls otherwise paid a fresh TCP + TLS handshake every time.
+
+Requests that go through an environment/system proxy are handed to urllib
+unchanged.
+"""
+
+import http.client
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+from typing import Dict, List, Optional, Tuple, Union
+
+
+ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_TIMEOUT = 30
+# Idle connections kept per (scheme, host, port), and how long they stay usable.
+MAX_IDLE_PER_HOST = 4
+IDLE_TTL_SECS = 60.0
+DNS_TTL_SECS = 300.0
+MAX_REDIRECTS = 5
+# Gateway errors worth one more try on an idempotent request.
+RETRY_STATUSES = frozenset((502, 503, 504))
+RETRY_BACKOFF_SECS = 0.5
+_MAX_RETRY_AFTER_SECS = 5.0
+_REDIRECT_STATUSES = frozenset((301, 302, 303, 307, 308))
+_IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+# Dropped when a redirect leaves the original host.
+_CREDENTIAL_HEADERS = frozenset(("cookie", "authorization"))
+# Unread bodies up to this size are drained on close so the connection can be reused.
+_DRAIN_LIMIT = 64 * 1024
+
+
+class DecodedBody:
+    """File-like reader that undoes gzip/deflate content encoding on the fly.
+
+    ``read(size)`` returns decompressed bytes, so callers that stream a
+    response in chunks (the M3U parser, the cache writer) see the same data
+    they would for an uncompressed body.
+    """
+
+    def __init__(self, raw, encoding: str):
+        self._raw = raw
+        self._encoding = encoding
+        if encoding == "gzip":
+            self._decomp = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            self._decomp = zlib.decompressobj(zlib.MAX_WBITS)
+        self._sniffed = encoding == "gzip"
+        self._pending = b""
+        self._eof = False
+
+    def _decompress(self, data: bytes) -> bytes:
+        if self._sniffed:
+            return self._decomp.decompress(data)
+        self._sniffed = True
+        try:
+            return self._decomp.decompress(data)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header.
+            self._decomp = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decomp.decompress(data)
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = [self._pending] if self._pending else []
+        have = len(self._pending)
+        self._pending = b""
+        while not self._eof and (size is None or size < 0 or have < size):
+            data = self._raw.read(size if size and size > 0 else 64 * 1024)
+            if not data:
+                self._eof = True
+                tail = self._decomp.flush()
+                if tail:
+                    chunks.append(tail)
+                    have += len(tail)
+                break
+            out = self._decompress(data)
+            if out:
+                chunks.append(out)
+                have += len(out)
+        buf = b"".join(chunks)
+        if size is not None and size >= 0 and len(buf) > size:
+            self._pending = buf[size:]
+            buf = buf[:size]
+        return buf
+
+    def close(self) -> None:
+        try:
+            self._raw.close()
+        except Exception:
+            pass
+
+    def __getattr__(self, name):
+        # status, headers, geturl() etc. still describe the response.
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def decoded_body(resp):
+    """Wrap ``resp`` so reads return the decoded body for gzip/deflate responses."""
+    encoding = _content_encoding(resp)
+    if encoding in ("gzip", "x-gzip"):
+        return DecodedBody(resp, "gzip")
+    if encoding == "deflate":
+        return DecodedBody(resp, "deflate")
+    return resp
+
+
+def _content_encoding(resp) -> Optional[str]:
+    headers = getattr(resp, "headers", None)
+    if headers is None:
+        return None
+    value = headers.get("Content-Encoding") or ""
+    return value.strip().lower() or None
+
+
+class DNSCache:
+    """Thread-safe ``getaddrinfo`` cache with a fixed TTL."""
+
+    def __init__(self, ttl: float = DNS_TTL_SECS):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, int], Tuple[float, list]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> list:
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, infos)
+        return infos
+
+    def forget(self, host: str, port: int) -> None:
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def create_connection(self, address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+        """``socket.create_connection`` using cached addresses."""
+        host, port = address
+        err: Optional[OSError] = None
+        for family, socktype, proto, _canon, sockaddr in self.resolve(host, port):
+            sock = None
+            try:
+                sock = socket.socket(family, socktype, proto)
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as exc:
+                err = exc
+                if sock is not None:
+                    sock.close()
+        # Every cached address failed; the host may have moved.
+        self.forget(host, port)
+        raise err or OSError(f"getaddrinfo returned no addresses for {host}")
+
+
+class RequestTimings:
+    """Phase timings of one request, filled in by ``HTTPClient.open(timings=...)``.
+
+    Durations are seconds (None when the phase did not happen, e.g. no
+    connect on a reused connection). ``ttfb`` runs from sending the request
+    to the response headers; ``transfer`` from the headers to the end of the
+    body. ``bytes`` counts body bytes as received (before decompression).
+    Redirects and retries start the phases over, so they describe the hop
+    that was returned; ``total`` still runs from the first attempt.
+    """
+
+    __slots__ = ("started", "dns", "connect", "ttfb", "transfer", "bytes", "status", "reused",
+                 "_headers_at", "_ended")
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.dns: Optional[float] = None
+        self.connect: Optional[float] = None
+        self.ttfb: Optional[float] = None
+        self.transfer: Optional[float] = None
+        self.bytes = 0
+        self.status: Optional[int] = None
+        self.reused = False
+        self._headers_at: Optional[float] = None
+        self._ended: Optional[float] = None
+
+    def _got_headers(self, status: int) -> None:
+        self._headers_at = time.monotonic()
+        self._ended = None
+        self.transfer = None
+        self.bytes = 0
+        self.status = status
+
+    def _body_done(self) -> None:
+        if self._headers_at is not None and self._ended is None:
+            self._ended = time.monotonic()
+            self.transfer = self._ended - self._headers_at
+
+    @property
+    def total(self) -> float:
+        """Seconds from the start of the request to the end of the body (or now)."""
+        return (self._ended or time.monotonic()) - self.started
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "dns": self.dns, "connect": self.connect, "ttfb": self.ttfb, "transfer": self.transfer,
+            "total": self.total, "bytes": self.bytes, "status": self.status, "reused": self.reused,
+        }
+
+
+class HTTPResponse:
+    """A response whose connection goes back to the pool once the body is consumed.
+
+    Mirrors the parts of urllib's response object the app uses: ``read``,
+    ``peek``, ``status``/``code``, ``headers``/``info()``, ``geturl()`` and
+    context management.
+    """
+
+    def __init__(self, client: "HTTPClient", key, conn, resp: http.client.HTTPResponse, url: str,
+                 timings: Optional[RequestTimings] = None):
+        self._client = client
+        self._timings = timings
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self.url = url
+        self.status = resp.status
+        self.code = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+        self.msg = resp.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self._resp.read() if amt is None or amt < 0 else self._resp.read(amt)
+        self._count(len(data))
+        return data
+
+    def read1(self, amt: int = -1) -> bytes:
+        data = self._resp.read1(amt)
+        self._count(len(data))
+        return data
+
+    def peek(self, n: int = 0) -> bytes:
+        return self._resp.peek(n)
+
+    def readinto(self, buf) -> int:
+        n = self._resp.readinto(buf)
+        self._count(n)
+        return n
+
+    def _count(self, n: int) -> None:
+        timings = self._timings
+        if timings is not None:
+            timings.bytes += n
+        if self._resp.isclosed():
+            if timings is not None:
+                timings._body_done()
+            self._release()
+
+    def readable(self) -> bool:
+        return True
+
+    def info(self):
+        return self.headers
+
+    def geturl(self) -> str:
+        return self.url
+
+    def getcode(self) -> int:
+        return self.status
+
+    def getheader(self, name: str, default=None):
+        return self._resp.getheader(name, default)
+
+    def _release(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self._resp.isclosed() and not self._resp.will_close:
+            self._client._put_idle(self._key, conn)
+        else:
+            conn.close()
+
+    def close(self) -> None:
+        if self._timings is not None:
+            self._timings._body_done()
+        if self._conn is None:
+            return
+        resp = self._resp
+        if not resp.isclosed() and not resp.chunked and resp.length is not None and resp.length <= _DRAIN_LIMIT:
+            # Small or empty remainder (HEAD, 304, short errors): finish it and keep the connection.
+            try:
+                resp.read()
+            except Exception:
+                pass
+        if not resp.isclosed():
+            # Unread body: the connection cannot be reused.
+            self._conn.close()
+            self._conn = None
+            try:
+                self._resp.close()
+            except Exception:
+                pass
+            return
+        self._release()
+
+    @property
+    def closed(self) -> bool:
+        return self._conn is None and self._resp.isclosed()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class HTTPClient:
+    """Keep-alive HTTP/HTTPS client with per-host pooling and DNS caching."""
+
+    def __init__(
+        self,
+        max_idle_per_host: int = MAX_IDLE_PER_HOST,
+        idle_ttl: float = IDLE_TTL_SECS,
+        retries: int = 1,
+        dns_cache: Optional[DNSCache] = None,
+    ):
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_ttl = idle_ttl
+        self.retries = retries
+        self.dns = dns_cache or DNSCache()
+        self._idle: Dict[tuple, List[Tuple[float, http.client.HTTPConnection]]] = {}
+        self._lock = threading.Lock()
+        try:
+            self._proxies = urllib.request.getproxies()
+        except Exception:
+            self._proxies = {}
+
+    # -- pool -------------------------------------------------------------
+
+    def _get_conn(self, key, timeout: float):
+        scheme, host, port = key
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                stamp, conn = idle.pop()
+                if now - stamp <= self.idle_ttl and conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                    conn.timeout = timeout
+                    return conn, True
+                conn.close()
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        conn._create_connection = self.dns.create_connection
+        return conn, False
+
+    def _put_idle(self, key, conn) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((time.monotonic(), conn))
+                return
+        conn.close()
+
+    def close_idle(self) -> None:
+        """Close every pooled connection."""
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for _stamp, conn in idle:
+                conn.close()
+
+    def _uses_proxy(self, scheme: str, host: str) -> bool:
+        if scheme not in self._proxies:
+            return False
+        try:
+            return not urllib.request.proxy_bypass(host)
+        except Exception:
+            return True
+
+    # -- requests -----------------------------------------------------------
+
+    def open(
+        self,
+        req: Union[str, urllib.request.Request],
+        data: Optional[bytes] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        *,
+        decode: bool = False,
+        follow_redirects: bool = True,
+        retries: Optional[int] = None,
+        cookiejar=None,
+        timings: Optional[RequestTimings] = None,
+    ):
+        """Open ``req`` like ``urllib.request.urlopen``.
+
+        ``decode`` asks for gzip/deflate and returns a body that reads
+        decompressed bytes. Non-2xx responses (and 3xx when
+        ``follow_redirects`` is off) raise ``urllib.error.HTTPError``.
+        ``cookiejar`` sends and stores cookies like urllib's
+        ``HTTPCookieProcessor``. ``timings`` (a ``RequestTimings``) receives
+        the DNS/connect/TTFB/transfer split of the final hop.
+        """
+        if not isinstance(req, urllib.request.Request):
+            req = urllib.request.Request(req)
+        if data is not None:
+            req.data = data
+        if decode and not req.has_header("Accept-encoding"):
+            req.add_header("Accept-Encoding", ACCEPT_ENCODING)
+        retries = self.retries if retries is None else retries
+
+        method = req.get_method()
+        body = req.data
+        headers = dict(req.header_items())
+        url = req.full_url
+        for _hop in range(MAX_REDIRECTS + 1):
+            parts = urllib.parse.urlsplit(url)
+            scheme = parts.scheme.lower()
+            if scheme not in ("http", "https") or self._uses_proxy(scheme, parts.hostname or ""):
+                hop_req = urllib.request.Request(url, data=body, headers=headers, method=method)
+                sent = time.monotonic()
+                resp = urllib.request.urlopen(hop_req, timeout=timeout)
+                if timings is not None:
+                    # Proxied: only the time to headers is known.
+                    timings.ttfb = time.monotonic() - sent
+                    timings._got_headers(resp.status)
+                return decoded_body(resp) if decode else resp
+            hop_headers = headers
+            if cookiejar is not None:
+                # Per hop, like urllib's unredirected Cookie header: each host
+                # gets its own cookies, never the previous hop's.
+                hop_req = urllib.request.Request(url, headers=headers, method=method)
+                cookiejar.add_cookie_header(hop_req)
+                hop_headers = dict(hop_req.header_items())
+            resp = self._send(method, url, parts, hop_headers, body, timeout, retries, timings)
+            if cookiejar is not None:
+                cookiejar.extract_cookies(resp, urllib.request.Request(url, method=method))
+            if resp.status in _REDIRECT_STATUSES and follow_redirects:
+                location = resp.headers.get("Location")
+                if location:
+                    resp.close()
+                    url = urllib.parse.urljoin(url, location)
+                    if _origin(urllib.parse.urlsplit(url)) != _origin(parts):
+                        headers = {k: v for k, v in headers.items()
+                                   if k.lower() not in _CREDENTIAL_HEADERS}
+                    if resp.status == 303 or (resp.status in (301, 302) and method == "POST"):
+                        method, body = ("HEAD" if method == "HEAD" else "GET"), None
+                        headers = {k: v for k, v in headers.items()
+                                   if k.lower() not in ("content-length", "content-type")}
+                    continue
+            if not 200 <= resp.status < 300:
+                raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, resp)
+            return decoded_body(resp) if decode else resp
+        raise urllib.error.HTTPError(url, resp.status, "Too many redirects", resp.headers, resp)
+
+    def _send(self, method, url, parts, headers, body, timeout, retries, timings=None) -> HTTPResponse:
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        send_headers = {k: v for k, v in headers.items() if k.lower() not in ("host", "connection")}
+        idempotent = method in _IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            conn, reused = self._get_conn(key, timeout)
+            try:
+                if timings is not None:
+                    timings.reused = reused
+                    timings.dns = timings.connect = None
+                    if not reused:
+                        # Connect explicitly so the DNS and connect phases can be timed apart.
+                        t0 = time.monotonic()
+                        self.dns.resolve(parts.hostname, port)
+                        t1 = time.monotonic()
+                        conn.connect()
+                        timings.dns, timings.connect = t1 - t0, time.monotonic() - t1
+                    sent = time.monotonic()
+                conn.request(method, path, body=body, headers=send_headers)
+                raw = conn.getresponse()
+                if timings is not None:
+                    timings.ttfb = time.monotonic() - sent
+                    timings._got_headers(raw.status)
+            except OSError as exc:
+                conn.close()
+                if reused and idempotent:
+                    # The server dropped an idle keep-alive connection; not a real failure.
+                    continue
+                if isinstance(exc, socket.timeout) or not idempotent or attempt >= retries:
+                    raise urllib.error.URLError(exc) from exc
+                attempt += 1
+                time.sleep(RETRY_BACKOFF_SECS * attempt)
+                continue
+            except http.client.HTTPException as exc:
+                conn.close()
+                if reused and idempotent:
+                    continue
+                if not idempotent or attempt >= retries:
+                    raise urllib.error.URLError(exc) from exc
+                attempt += 1
+                time.sleep(RETRY_BACKOFF_SECS * attempt)
+                continue
+            resp = HTTPResponse(self, key, conn, raw, url, timings)
+            if raw.status in RETRY_STATUSES and idempotent and attempt < retries:
+                attempt += 1
+                delay = _retry_after(raw.headers.get("Retry-After"), RETRY_BACKOFF_SECS * attempt)
+                resp.close()
+                time.sleep(delay)
+                continue
+            return resp
+
+
+def _origin(parts) -> Tuple[str, str, Optional[int]]:
+    scheme = parts.scheme.lower()
+    return scheme, (parts.hostname or "").lower(), parts.port or (443 if scheme == "https" else 80)
+
+
+def _retry_after(value: Optional[str], default: float) -> float:
+    try:
+        return min(max(float(value), 0.0), _MAX_RETRY_AFTER_SECS) if value else default
+    except ValueError:
+        return default
+
+
+_default_client: Optional[HTTPClient] = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> HTTPClient:
+    """The process-wide client all modules share."""
+    global _default_client
+    if _default_client is None:
+        with _default_lock:
+            if _default_client is None:
+                _default_client = HTTPClient()
+    return _default_client
+
+
+def urlopen(req, data=None, timeout: float = DEFAULT_TIMEOUT, **kwargs):
+    """``urllib.request.urlopen`` over the shared pooled client; see ``HTTPClient.open``."""
+    return get_client().open(req, data, timeout, **kwargs)
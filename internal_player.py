@@ -12,6 +12,8 @@ from typing import Callable, Deque, Dict, List, Optional, Tuple
 
 import wx
 
+from http_client import urlopen
+
 def _prime_vlc_search_path() -> None:
     """Make sure libvlc.dll is discoverable before importing python-vlc."""
     candidates = [
@@ -774,7 +776,7 @@ class InternalPlayerFrame(wx.Frame):
     def _fetch_hls_manifest(self, url: str, headers: Optional[Dict[str, object]] = None) -> Optional[str]:
         req = urllib.request.Request(url, headers=self._request_headers(headers))
         try:
-            with urllib.request.urlopen(req, timeout=2) as response:
+            with urlopen(req, timeout=2, decode=True) as response:
                 data = response.read(512_000)
         except Exception as err:
             LOG.debug("Failed to fetch HLS manifest %s: %s", url, err)
@@ -976,17 +978,11 @@ class InternalPlayerFrame(wx.Frame):
         req_headers = self._request_headers(headers, include_accept=True)
         req = urllib.request.Request(url, headers=req_headers, method="GET")
         
-        # Don't follow redirects - just check the initial response
-        # VLC handles redirects internally and may handle auth tokens differently
-        class NoRedirectHandler(urllib.request.HTTPRedirectHandler):
-            def redirect_request(self, req, fp, code, msg, headers, newurl):
-                return None  # Don't follow redirects
-        
-        opener = urllib.request.build_opener(NoRedirectHandler)
-        
         try:
-            # Very short timeout for fast startup - just verify basic connectivity
-            resp = opener.open(req, timeout=2)
+            # Very short timeout for fast startup - just verify basic connectivity.
+            # Don't follow redirects - just check the initial response
+            # VLC handles redirects internally and may handle auth tokens differently
+            resp = urlopen(req, timeout=2, follow_redirects=False, retries=0)
             status = resp.status
             resp.close()
             if status >= 400:
@@ -0,0 +1,385 @@
+"""Incremental M3U/M3U Plus parsing.
+
+The parser is fed raw byte chunks as they arrive from the network (or a file)
+and emits channel records as soon as each entry's URL line completes, so callers
+can hash, cache and display a playlist in the same pass as the download.
+"""
+
+import hashlib
+import os
+import re
+import urllib.parse
+from typing import Callable, Dict, List, Optional, Tuple
+
+from channel_table import ChannelRecord
+from options import extract_group
+
+
+M3U_ATTR_RE = re.compile(r'([A-Za-z0-9_\-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^",\s]+))')
+
+STREAM_CHUNK_SIZE = 256 * 1024
+ENTRY_DIGEST_SIZE = 8
+
+# Optional per-channel keys, in the order they are emitted after the core fields.
+_OPTIONAL_KEYS = (
+    "tvg-logo", "tvg-rec", "timeshift", "catchup", "catchup-type", "catchup-days",
+    "catchup-source", "catchup-offset", "http-user-agent", "http-referrer",
+    "http-origin", "http-cookie", "http-authorization", "http-accept",
+)
+
+# #EXTINF attribute -> channel key (first alias present wins).
+_EXTINF_ATTRS = (
+    ("tvg-logo", ("tvg-logo", "logo")),
+    ("tvg-rec", ("tvg-rec",)),
+    ("timeshift", ("timeshift",)),
+    ("catchup", ("catchup",)),
+    ("catchup-type", ("catchup-type",)),
+    ("catchup-days", ("catchup-days",)),
+    ("catchup-source", ("catchup-source",)),
+    ("catchup-offset", ("catchup-offset",)),
+    ("http-user-agent", ("http-user-agent",)),
+    ("http-referrer", ("http-referrer", "http-referer")),
+    ("http-origin", ("http-origin",)),
+    ("http-cookie", ("http-cookie",)),
+    ("http-authorization", ("http-authorization",)),
+    ("http-accept", ("http-accept",)),
+)
+
+# Header-ish option names shared by #EXTVLCOPT and #KODIPROP.
+_HEADER_OPTS = {
+    "http-referrer": "http-referrer", "http-referer": "http-referrer",
+    "referer": "http-referrer", "referrer": "http-referrer",
+    "http-origin": "http-origin", "origin": "http-origin",
+    "http-cookie": "http-cookie", "cookie": "http-cookie",
+    "http-authorization": "http-authorization", "authorization": "http-authorization",
+    "auth": "http-authorization",
+    "http-accept": "http-accept", "accept": "http-accept",
+}
+
+_VLCOPT_KEYS = dict(_HEADER_OPTS)
+_VLCOPT_KEYS.update({
+    "catchup-source": "catchup-source", "catchup_url": "catchup-source",
+    "catchup-days": "catchup-days",
+    "catchup-type": "catchup-type",
+    "http-user-agent": "http-user-agent",
+})
+
+
+def extract_stream_id(url: str) -> str:
+    """Return the numeric stream id from an Xtream-style URL path, if any."""
+    try:
+        path = urllib.parse.urlparse(url).path
+    except Exception:
+        path = ""
+    if not path:
+        return ""
+    parts = [p for p in path.split("/") if p]
+    if not parts:
+        return ""
+    m = re.match(r"(\d+)", parts[-1])
+    if m:
+        return m.group(1)
+    if len(parts) >= 2:
+        m = re.match(r"(\d+)", parts[-2])
+        if m:
+            return m.group(1)
+    return ""
+
+
+def _split_option(line: str) -> Optional[Tuple[str, str]]:
+    colon_idx = line.find(':')
+    if colon_idx == -1:
+        return None
+    data = line[colon_idx + 1:]
+    eq_idx = data.find('=')
+    if eq_idx == -1:
+        return None
+    return data[:eq_idx].strip().lower(), data[eq_idx + 1:].strip()
+
+
+def _decode_lines(data: bytes) -> str:
+    """Decode as UTF-8, falling back to Latin-1 only for the lines that are not valid UTF-8."""
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+    out = []
+    for line in data.splitlines(keepends=True):
+        try:
+            out.append(line.decode("utf-8"))
+        except UnicodeDecodeError:
+            out.append(line.decode("latin-1"))
+    return "".join(out)
+
+
+class M3UStreamParser:
+    """Line-oriented M3U parser that accepts arbitrary byte or text chunks.
+
+    Bytes are decoded a line at a time: UTF-8, or Latin-1 for a line that is
+    not valid UTF-8, so one stray byte does not garble the rest of the file.
+
+    Each entry (its #EXTINF and option lines plus the URL) is digested. When
+    ``previous`` is given it maps a digest from an earlier parse to that
+    parse's record, and unchanged entries are reused instead of re-parsed.
+    """
+
+    def __init__(
+        self,
+        provider_info: Optional[Dict[str, str]] = None,
+        previous: Optional[Callable[[bytes], Optional[ChannelRecord]]] = None,
+    ):
+        provider_info = provider_info or {}
+        self.provider_id = provider_info.get("provider-id")
+        self.provider_type = provider_info.get("provider-type")
+        self._pending_bytes = b""
+        self._pending = ""
+        self._entry_lines: List[str] = []
+        self._reset_entry()
+        self._previous = previous
+        self.channel_count = 0
+        self.reused_count = 0
+        # ENTRY_DIGEST_SIZE bytes per emitted channel, in order.
+        self.digests = bytearray()
+
+    def _reset_entry(self):
+        self._name = ""
+        self._group = ""
+        self._tvg_id = ""
+        self._tvg_name = ""
+        self._extra: Dict[str, str] = {}
+        self._headers: List[str] = []
+
+    # ---------- feeding ----------
+    def feed(self, chunk: bytes) -> List[ChannelRecord]:
+        """Consume raw bytes; return channels whose entries completed."""
+        if not chunk:
+            return []
+        buf = self._pending_bytes + chunk if self._pending_bytes else chunk
+        # Decode complete lines only; a partial line waits for its terminator.
+        end = max(buf.rfind(b"\n"), buf.rfind(b"\r")) + 1
+        self._pending_bytes = buf[end:]
+        if not end:
+            return []
+        return self.feed_text(_decode_lines(buf[:end]))
+
+    def feed_text(self, text: str) -> List[ChannelRecord]:
+        if not text:
+            return []
+        buf = self._pending + text
+        lines = buf.splitlines()
+        # Keep a trailing partial line (no terminator yet) for the next chunk.
+        if buf and buf[-1] not in "\r\n" and lines:
+            self._pending = lines.pop()
+        else:
+            self._pending = ""
+        out: List[ChannelRecord] = []
+        for line in lines:
+            channel = self._parse_line(line)
+            if channel is not None:
+                out.append(channel)
+        return out
+
+    def close(self) -> List[ChannelRecord]:
+        """Flush any buffered partial line at end of stream."""
+        tail = _decode_lines(self._pending_bytes)
+        self._pending_bytes = b""
+        buf = self._pending + tail
+        self._pending = ""
+        out: List[ChannelRecord] = []
+        for line in buf.splitlines():
+            channel = self._parse_line(line)
+            if channel is not None:
+                out.append(channel)
+        return out
+
+    # ---------- line handling ----------
+    def _parse_line(self, raw_line: str) -> Optional[ChannelRecord]:
+        s = raw_line.strip()
+        if not s:
+            return None
+        if s[0] == '#':
+            # Directives are applied once the entry's URL arrives; #EXTINF
+            # resets the entry, so anything before it can be dropped.
+            if s[:7].upper() == "#EXTINF":
+                self._entry_lines = [s]
+            else:
+                self._entry_lines.append(s)
+            return None
+        return self._finish_entry(s)
+
+    def _finish_entry(self, url: str) -> ChannelRecord:
+        lines = self._entry_lines
+        self._entry_lines = []
+        lines.append(url)
+        digest = hashlib.blake2b(
+            "\n".join(lines).encode("utf-8", "surrogatepass"), digest_size=ENTRY_DIGEST_SIZE
+        ).digest()
+        self.digests += digest
+        if self._previous is not None:
+            record = self._previous(digest)
+            if record is not None:
+                self.reused_count += 1
+                self.channel_count += 1
+                return record
+        self._reset_entry()
+        for line in lines[:-1]:
+            self._apply_directive(line)
+        channel = self._emit(url)
+        self._reset_entry()
+        return channel
+
+    def _apply_directive(self, s: str) -> None:
+        upper_prefix = s[:10].upper()
+        if upper_prefix.startswith("#EXTINF"):
+            self._parse_extinf(s)
+        elif upper_prefix.startswith("#EXTVLCOPT"):
+            opt = _split_option(s)
+            if opt:
+                key, value = opt
+                target = _VLCOPT_KEYS.get(key)
+                if target:
+                    self._extra[target] = value
+                elif key.startswith("http-header") and value:
+                    self._headers.append(value)
+        elif upper_prefix.startswith("#KODIPROP"):
+            opt = _split_option(s)
+            if opt:
+                key, value = opt
+                if key.endswith("catchup_days"):
+                    self._extra["catchup-days"] = value
+                elif key.endswith("catchup_source"):
+                    self._extra["catchup-source"] = value
+                elif key in _HEADER_OPTS:
+                    self._extra[_HEADER_OPTS[key]] = value
+        # Other comment/directive lines are ignored
+
+    def _parse_extinf(self, s: str):
+        self._reset_entry()
+        comma_idx = s.find(',')
+        info_part = s if comma_idx == -1 else s[:comma_idx]
+        if comma_idx != -1:
+            self._name = s[comma_idx + 1:].strip()
+        colon_idx = info_part.find(':')
+        attr_segment = info_part[colon_idx + 1:] if colon_idx != -1 else ""
+        if not attr_segment:
+            return
+        attrs: Dict[str, str] = {}
+        for match in M3U_ATTR_RE.finditer(attr_segment):
+            key = match.group(1).lower()
+            if key not in attrs:
+                value = match.group(2) or match.group(3) or match.group(4) or ""
+                attrs[key] = value.strip()
+        if not attrs:
+            return
+        self._group = attrs.get("group-title", "")
+        self._tvg_id = attrs.get("tvg-id", "")
+        self._tvg_name = attrs.get("tvg-name", "")
+        extra = self._extra
+        for target, aliases in _EXTINF_ATTRS:
+            for alias in aliases:
+                value = attrs.get(alias)
+                if value:
+                    extra[target] = value
+                    break
+
+    def _emit(self, url: str) -> ChannelRecord:
+        fields: Dict[str, object] = {}
+        extra = self._extra
+        if extra:
+            for key in _OPTIONAL_KEYS:
+                value = extra.get(key)
+                if value:
+                    fields[key] = value
+        if self._headers:
+            # Preserve header order but drop duplicates case-insensitively.
+            seen_headers = set()
+            unique_headers: List[str] = []
+            for hdr in self._headers:
+                key_lower = hdr.split(":", 1)[0].strip().lower() if ":" in hdr else hdr.lower()
+                if key_lower in seen_headers:
+                    continue
+                seen_headers.add(key_lower)
+                unique_headers.append(hdr)
+            fields["http-headers"] = unique_headers
+        if self.provider_type == "xtream" or extra.get("catchup-source"):
+            stream_id = extract_stream_id(url)
+            if stream_id:
+                fields["stream-id"] = stream_id
+        self.channel_count += 1
+        return ChannelRecord(
+            name=self._name,
+            group=self._group or extract_group(self._name),
+            url=url,
+            tvg_id=self._tvg_id,
+            tvg_name=self._tvg_name,
+            provider_id=self.provider_id or None,
+            provider_type=self.provider_type or None,
+            tvg_logo=fields.pop("tvg-logo", None),
+            stream_id=fields.pop("stream-id", None),
+            extra=fields,
+        )
+
+
+def parse_m3u_text(text: str, provider_info: Optional[Dict[str, str]] = None) -> List[ChannelRecord]:
+    """Parse a complete playlist held in memory."""
+    parser = M3UStreamParser(provider_info)
+    out = parser.feed_text(text)
+    out.extend(parser.close())
+    return out
+
+
+def stream_m3u(
+    fileobj,
+    provider_info: Optional[Dict[str, str]] = None,
+    cache_path: Optional[str] = None,
+    on_channels: Optional[Callable[[List[ChannelRecord]], None]] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    parser: Optional[M3UStreamParser] = None,
+) -> Tuple[List[ChannelRecord], str]:
+    """Parse a playlist from a binary file-like object in one pass.
+
+    Each chunk is hashed (SHA-1 of the raw bytes), optionally written to
+    ``cache_path`` (atomically, via a ``.tmp`` sibling) and parsed; newly
+    completed channels are passed to ``on_channels`` as they appear.
+    Returns ``(channels, sha1_hexdigest)``; pass ``parser`` to reuse
+    previous records or to read its entry digests afterwards.
+    """
+    if parser is None:
+        parser = M3UStreamParser(provider_info)
+    digest = hashlib.sha1()
+    channels: List[ChannelRecord] = []
+    tmp_path = cache_path + ".tmp" if cache_path else None
+    out_f = open(tmp_path, "wb") if tmp_path else None
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            if out_f is not None:
+                out_f.write(chunk)
+            batch = parser.feed(chunk)
+            if batch:
+                channels.extend(batch)
+                if on_channels:
+                    on_channels(batch)
+        batch = parser.close()
+        if batch:
+            channels.extend(batch)
+            if on_channels:
+                on_channels(batch)
+        if out_f is not None:
+            out_f.close()
+            out_f = None
+            os.replace(tmp_path, cache_path)
+    finally:
+        if out_f is not None:
+            try:
+                out_f.close()
+            except Exception:
+                pass
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+    return channels, digest.hexdigest()
@@ -3,15 +3,15 @@ import sys
 import shutil
 import json
 import tempfile
+import urllib.error
 import urllib.request
 import urllib.parse
 import sqlite3
 import threading
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Set
 import wx
 import datetime
-import re
 import platform
 import time
 import subprocess
@@ -24,14 +24,15 @@ import wx.adv
 
 from options import (
     load_config, save_config, get_cache_path_for_url, get_cache_dir,
-    get_db_path, canonicalize_name, extract_group, utc_to_local,
+    load_cache_validators, save_cache_validators,
+    get_db_path, canonicalize_name, utc_to_local,
     CustomPlayerDialog, resolve_internal_player_settings, get_app_dir
 )
 import app_meta
 import updater
 from playlist import (
-    EPGDatabase, EPGManagerDialog, PlaylistManagerDialog,
-    strip_noise_words
+    EPGDatabase, EPGManagerDialog, PlaylistManagerDialog, ProgrammeRow,
+    run_epg_maintenance
 )
 from providers import (
     XtreamCodesClient, XtreamCodesConfig,
@@ -42,6 +43,17 @@ from casting import CastingManager, CastDevice
 from http_headers import channel_http_headers
 from external_player import ExternalPlayerLauncher
 from stream_proxy import get_ffmpeg_path
+from epg_scheduler import ProgrammeBoundaryScheduler
+from playlist_sources import (
+    SourceRefreshTimers, merge_source_parts, playlist_source_key, playlist_source_label
+)
+from channel_lookup import MIN_MATCH_SCORE, ChannelLookup
+from channel_search import ChannelSearchIndex, SearchCancelled
+from channel_table import ChannelRecord, ChannelTable, TableDiff, channel_key, diff_tables
+from http_client import ACCEPT_ENCODING, RequestTimings, decoded_body, urlopen
+from provider_metrics import RequestSample, get_metrics
+from m3u_parser import M3UStreamParser, extract_stream_id, parse_m3u_text, stream_m3u
+from playlist_cache import PlaylistCache, write_playlist_cache
 
 try:
     from internal_player import (
@@ -57,8 +69,6 @@ except Exception as _internal_player_import_error:  # pragma: no cover - import
         """Fallback error when internal player cannot load."""
 
 
-_M3U_ATTR_RE = re.compile(r'([A-Za-z0-9_\-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^",\s]+))')
-
 def set_linux_env():
     if platform.system() != "Linux":
         return
@@ -308,9 +318,16 @@ class IPTVClient(wx.Frame):
         self.config = load_config()
         self.playlist_sources = self.config.get("playlists", [])
         self.epg_sources = self.config.get("epgs", [])
-        self.channels_by_group: Dict[str, List[Dict[str, str]]] = {}
-        self.all_channels: List[Dict[str, str]] = []
-        self.displayed: List[Dict[str, str]] = []
+        self.channel_table = ChannelTable()
+        self.channels_by_group: Dict[str, List[ChannelRecord]] = self.channel_table.by_group
+        self.all_channels: List[ChannelRecord] = self.channel_table.records
+        self.displayed: Sequence[Dict[str, object]] = []
+        self._search_index: Optional[ChannelSearchIndex] = None
+        self._search_index_lock = threading.Lock()
+        self._channel_lookup: Optional[ChannelLookup] = None
+        self._channel_lookup_lock = threading.Lock()
+        self._search_token = 0
+        self._filter_debounce = None
         self.current_group = "All Channels"
         self.default_player = self.config.get("media_player", "Built-in Player")
         self.custom_player_path = self.config.get("custom_player_path", "")
@@ -319,7 +336,14 @@ class IPTVClient(wx.Frame):
         self.epg_importing = False
         self.epg_cache = {}
         self.epg_cache_lock = threading.Lock()
-        self.refresh_timer = None
+        # Per-source playlist state; see _do_playlist_refresh.
+        self._source_parts: Dict[str, Sequence] = {}
+        self._source_epgs: Dict[str, List[str]] = {}
+        self._source_lock = threading.Lock()
+        self._published_table: Optional[ChannelTable] = None
+        self._source_refresh_timers = SourceRefreshTimers(
+            wx.CallLater, lambda: self.config.get("playlists", []), self.on_timer_refresh
+        )
         self.minimize_to_tray = bool(self.config.get("minimize_to_tray", False))
         self.tray_icon = None
         self._tray_allow_restore = False
@@ -343,8 +367,15 @@ class IPTVClient(wx.Frame):
         # batch-population state to avoid UI hangs
         self._populate_token = 0
 
-        # Timer for polling DB during EPG import so UI shows incoming data.
-        self._epg_poll_timer: Optional[wx.Timer] = None
+        # One-shot timer armed at the next programme boundary of any cached channel;
+        # import commits refresh the highlighted channel instead of polling.
+        self._epg_boundaries = ProgrammeBoundaryScheduler()
+        self._epg_boundary_timer: Optional[wx.CallLater] = None
+        self._epg_boundary_deadline: Optional[float] = None
+        # Idle-time epg.db maintenance (optimize, incremental vacuum, checkpoint).
+        self._epg_maint_timer: Optional[wx.CallLater] = None
+        self._epg_maint_running = False
+        self._last_user_activity = time.time()
         # Track in-flight EPG fetches to avoid hammering get_now_next while importer is busy
         self._epg_fetch_inflight = set()
         self._epg_inflight_lock = threading.Lock()
@@ -390,9 +421,13 @@ class IPTVClient(wx.Frame):
     def start_playlist_load(self):
         """Kicks off ONLY the playlist loading thread."""
         self._playlist_load_token += 1
-        self._pending_epg_autostart = True
+        # Armed again once every source has loaded, so the import sees all provider EPGs.
+        self._pending_epg_autostart = False
         self._pending_epg_autostart_token = self._playlist_load_token
         self._cancel_epg_autostart_timer()
+        with self._source_lock:
+            # The table on screen; the worker diffs its first merge against this.
+            self._published_table = self.channel_table
         threading.Thread(
             target=self._do_playlist_refresh,
             args=(self._playlist_load_token,),
@@ -413,6 +448,8 @@ class IPTVClient(wx.Frame):
             cur.execute("PRAGMA mmap_size=268435456;")
             cur.execute("PRAGMA cache_size=-65536;")
             cur.execute("PRAGMA wal_autocheckpoint=0;")
+            # Readers open the DB read-only and cannot add tables themselves.
+            cur.execute("CREATE TABLE IF NOT EXISTS programme_details (programme_id INTEGER PRIMARY KEY, data BLOB);")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_programmes_channel_end ON programmes(channel_id, end);")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_programmes_channel_start ON programmes(channel_id, start);")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_programmes_channel_start_end ON programmes(channel_id, start, end);")
@@ -460,20 +497,27 @@ class IPTVClient(wx.Frame):
         event.Skip()
 
     def start_refresh_timer(self):
-        if self.refresh_timer:
-            self.refresh_timer.Stop()
-        self.refresh_timer = wx.Timer(self)
-        self.Bind(wx.EVT_TIMER, self.on_timer_refresh, self.refresh_timer)
-        self.refresh_timer.Start(3 * 60 * 60 * 1000, wx.TIMER_CONTINUOUS)
+        """Arm one refresh timer per playlist source, each on its own interval."""
+        self._source_refresh_timers.reset()
+
+    def on_timer_refresh(self, key: str):
+        """Refresh a single source whose interval elapsed."""
+        threading.Thread(
+            target=self._do_playlist_refresh,
+            args=(self._playlist_load_token,),
+            kwargs={"only": {key}},
+            daemon=True,
+        ).start()
 
-    def on_timer_refresh(self, event):
-        # This full cycle can be triggered by the timer.
-        self.start_playlist_load()
+    _STREAM_PREFILL_INTERVAL_SECS = 2.0
 
-    def _do_playlist_refresh(self, refresh_token: int):
+    def _do_playlist_refresh(self, refresh_token: int, only: Optional[Set[str]] = None):
         """
         Loads playlists from cache for a fast UI update, then refreshes from the network.
-        Crucially, it only starts the EPG import *after* playlists are loaded.
+        Each source is merged and shown as soon as it finishes, independently of
+        the others. ``only`` limits the refresh to those source keys (a scheduled
+        per-source refresh); otherwise this is a full load, and it only starts
+        the EPG import *after* every playlist is loaded.
         """
         import concurrent.futures
 
@@ -488,248 +532,356 @@ class IPTVClient(wx.Frame):
             self.config["playlists"] = playlist_sources
             save_config(self.config)
 
-        channels_by_group: Dict[str, List[Dict[str, str]]] = {}
-        all_channels: List[Dict[str, str]] = []
+        keys = [playlist_source_key(src) for src in playlist_sources]
+        order = [key for key in dict.fromkeys(keys) if key is not None]
+        full_load = only is None
+        targets = [
+            (key, src) for key, src in zip(keys, playlist_sources)
+            if key is not None and (full_load or key in only)
+        ]
         valid_caches = set()
-        seen_channel_keys = set()
-
-        # Fast prefill from parsed caches (no network) so UI shows something immediately.
-        prefilled_by_group: Dict[str, List[Dict[str, str]]] = {}
-        prefilled_all: List[Dict[str, str]] = []
-        prefill_seen = set()
-
-        def _prefill_from_cache(src) -> None:
-            parsed_cache = None
-            provider_meta = None
-            if isinstance(src, dict):
-                stype = (src.get("type") or "").lower()
-                provider_id = src.get("id") or src.get("provider_id")
-                if stype in ("xtream", "stalker"):
-                    cache_key = provider_id or f"{stype}:{src.get('base_url') or src.get('url') or ''}:{src.get('username', '')}"
-                    parsed_cache = self._parsed_cache_path_for_key(f"provider:{cache_key}")
-                    provider_meta = {"provider-type": stype, "provider-id": provider_id}
-            elif isinstance(src, str) and src.startswith(("http://", "https://")):
-                parsed_cache = self._parsed_cache_path_for_key(src)
-            elif isinstance(src, str) and os.path.exists(src):
-                parsed_cache = self._parsed_cache_path_for_key(f"file:{os.path.abspath(src)}")
-            if not parsed_cache or not os.path.exists(parsed_cache):
-                return
-            cached = self._load_cached_playlist(parsed_cache, text_hash=None, provider_meta=provider_meta, skip_hash=True)
-            if not cached:
+        published = [False]
+        # Keys still downloading, with the channels streamed in so far.
+        partial: Dict[str, ChannelTable] = {}
+        stream_lock = threading.Lock()
+
+        def publish(streaming: bool = False) -> None:
+            """Merge every source's current channels and hand the result to the UI."""
+            with self._source_lock:
+                if refresh_token != self._playlist_load_token:
+                    return
+                with stream_lock:
+                    snapshot = {key: list(part.records) for key, part in partial.items()} if streaming else {}
+                merged = merge_source_parts(order, self._source_parts, snapshot)
+                # Seeded on the UI thread by start_playlist_load; never read channel_table here.
+                diff = diff_tables(self._published_table, merged) if self._published_table is not None else None
+                self._published_table = merged
+                published[0] = True
+            wx.CallAfter(apply_update, merged, diff)
+
+        def apply_update(new_table, diff):
+            if refresh_token != self._playlist_load_token:
                 return
-            for ch in cached:
-                key = (ch.get("name", ""), ch.get("url", ""), ch.get("provider-id", ""))
-                if key in prefill_seen:
+            self._apply_channel_table_update(new_table, diff)
+
+        if full_load:
+            with self._source_lock:
+                self._source_parts = {}
+            # Fast prefill from parsed caches (no network) so UI shows something
+            # immediately. The binary caches are mapped, not decoded: the group
+            # list comes straight from their index and rows decode on display.
+            prefill_views = []
+            cached_parts: Dict[str, Sequence] = {}
+            for key, src in targets:
+                cache = self._open_source_cache(src)
+                if cache is None:
                     continue
-                prefill_seen.add(key)
-                grp = ch.get("group") or "Uncategorized"
-                prefilled_by_group.setdefault(grp, []).append(ch)
-                prefilled_all.append(ch)
-
-        for _src in playlist_sources:
-            _prefill_from_cache(_src)
-
-        if prefilled_all:
-            seen_channel_keys.update(prefill_seen)
-            channels_by_group = {grp: lst.copy() for grp, lst in prefilled_by_group.items()}
-            all_channels = list(prefilled_all)
-
-            def apply_prefill(pref_by_group, pref_all):
-                self.channels_by_group = pref_by_group
-                self.all_channels = pref_all
-                self._refresh_group_ui()
-
-            wx.CallAfter(apply_prefill, prefilled_by_group, prefilled_all)
-
-        # We will collect these from the workers
-        provider_clients_local: Dict[str, object] = {}
-        provider_epg_sources: List[str] = []
-
-        def fetch_and_process_playlist(src):
-            result = {
-                "channels": [],
-                "clients": {},
-                "epg_sources": [],
-                "valid_cache": None,
-                "error": None
-            }
-            try:
-                if isinstance(src, dict):
-                    stype = (src.get("type") or "").lower()
-                    provider_id = src.get("id") or src.get("provider_id")
-                    if stype == "xtream":
-                        cfg = XtreamCodesConfig(
-                            base_url=src.get("base_url") or src.get("url") or "",
-                            username=src.get("username", ""),
-                            password=src.get("password", ""),
-                            stream_type=src.get("stream_type", "m3u_plus"),
-                            output=src.get("output", "ts"),
-                            name=src.get("name"),
-                            auto_epg=bool(src.get("auto_epg", True)),
-                            provider_id=provider_id
-                        )
-                        client = XtreamCodesClient(cfg)
-                        text = client.fetch_playlist()
-                        text_hash = self._playlist_text_hash(text)
-                        cache_key = provider_id or f"xtream:{cfg.base_url}:{cfg.username}"
-                        parsed_cache = self._parsed_cache_path_for_key(f"provider:{cache_key}")
-                        provider_meta = {"provider-type": "xtream", "provider-id": provider_id}
-                        
-                        channels = None
-                        if parsed_cache and text_hash:
-                            channels = self._load_cached_playlist(parsed_cache, text_hash, provider_meta)
-                        if channels is None:
-                            channels = self._parse_m3u_return(text, provider_info=provider_meta)
-                            if parsed_cache and text_hash:
-                                self._store_cached_playlist(parsed_cache, text_hash, channels, provider_meta)
-                        
-                        result["channels"] = channels or []
-                        result["clients"][provider_id] = client
-                        if cfg.auto_epg:
-                            for epg in client.epg_urls():
-                                if epg: result["epg_sources"].append(epg)
-
-                    elif stype == "stalker":
-                        cfg = StalkerPortalConfig(
-                            base_url=src.get("base_url") or src.get("url") or "",
-                            username=src.get("username", ""),
-                            password=src.get("password", ""),
-                            mac=src.get("mac", ""),
-                            name=src.get("name"),
-                            auto_epg=bool(src.get("auto_epg", True)),
-                            provider_id=provider_id
-                        )
-                        client = StalkerPortalClient(cfg)
-                        channels, epgs = client.fetch_channels()
-                        for ch in channels:
-                            ch.setdefault("provider-id", provider_id)
-                            ch.setdefault("provider-type", "stalker")
-                        
-                        result["channels"] = channels
-                        result["clients"][provider_id] = client
-                        for epg in epgs:
-                            if epg: result["epg_sources"].append(epg)
-                    else:
-                        pass # Unknown dict source
-                    return result
-
-                # Plain playlist path or URL
-                if isinstance(src, str) and src.startswith(("http://", "https://")):
-                    cache_path = get_cache_path_for_url(src)
-                    parsed_cache = self._parsed_cache_path_for_key(src)
-                    result["valid_cache"] = cache_path
-                    
-                    download = True
-                    if os.path.exists(cache_path):
-                        age = (datetime.datetime.now() - datetime.datetime.fromtimestamp(os.path.getmtime(cache_path))).total_seconds()
-                        if age < 15 * 60:
-                            download = False
-
-                    text = ""
-                    if download:
-                        with urllib.request.urlopen(
-                            urllib.request.Request(src, headers={"User-Agent": "Mozilla/5.0"}), timeout=60
-                        ) as resp:
-                            raw = resp.read()
-                            try:
-                                text = raw.decode("utf-8")
-                            except UnicodeDecodeError:
-                                text = raw.decode("latin-1", "ignore")
-                        with open(cache_path, "w", encoding="utf-8") as f:
-                            f.write(text)
-                    else:
-                        with open(cache_path, "r", encoding="utf-8", errors="ignore") as f:
-                            text = f.read()
-                            
-                    text_hash = self._playlist_text_hash(text)
-                    
-                    channels = None
-                    if parsed_cache and text_hash:
-                        channels = self._load_cached_playlist(parsed_cache, text_hash, provider_meta=None)
-                    if channels is None:
-                        channels = self._parse_m3u_return(text, provider_info=None)
-                        if parsed_cache and text_hash:
-                            self._store_cached_playlist(parsed_cache, text_hash, channels, provider_meta=None)
-                    
-                    result["channels"] = channels or []
+                # A source that fails to refresh keeps showing this copy.
+                cached_parts[key] = cache.records
+                prefill_views.append((cache.records, cache.groups()))
+            with self._source_lock:
+                self._source_parts = cached_parts
+
+            if prefill_views:
+                prefilled = ChannelTable.from_views(prefill_views)
+                with self._source_lock:
+                    self._published_table = prefilled
+                published[0] = True
+
+                def apply_prefill(pref_table):
+                    if refresh_token != self._playlist_load_token:
+                        return
+                    self._set_channel_table(pref_table)
+                    self._refresh_group_ui()
+
+                wx.CallAfter(apply_prefill, prefilled)
+
+        last_stream_push = [time.monotonic()]
+
+        def channels_streamer(key):
+            # Without a cache, show channels as they stream in so the first
+            # groups appear long before a large playlist has finished downloading.
+            # Returns (on_channels, discard); discard drops what was streamed
+            # so far, for a source that starts over with another method.
+            if key in self._source_parts:
+                return None, None
+
+            def on_channels(batch) -> None:
+                with stream_lock:
+                    partial.setdefault(key, ChannelTable()).extend(batch)
+                    now = time.monotonic()
+                    if now - last_stream_push[0] < self._STREAM_PREFILL_INTERVAL_SECS:
+                        return
+                    last_stream_push[0] = now
+                publish(streaming=True)
 
-                elif isinstance(src, str) and os.path.exists(src):
-                    with open(src, "r", encoding="utf-8", errors="ignore") as f:
-                        text = f.read()
-                    text_hash = self._playlist_text_hash(text)
-                    cache_key = f"file:{os.path.abspath(src)}"
-                    parsed_cache = self._parsed_cache_path_for_key(cache_key)
-                    
-                    channels = None
-                    if parsed_cache and text_hash:
-                        channels = self._load_cached_playlist(parsed_cache, text_hash, provider_meta=None)
-                    if channels is None:
-                        channels = self._parse_m3u_return(text, provider_info=None)
-                        if parsed_cache and text_hash:
-                            self._store_cached_playlist(parsed_cache, text_hash, channels, provider_meta=None)
-                            
-                    result["channels"] = channels or []
-                else:
-                    pass # Invalid source
-            except Exception as e:
-                result["error"] = str(e)
-                # LOG.error(f"Error fetching playlist {src}: {e}")
-            
-            return result
+            def discard() -> None:
+                with stream_lock:
+                    partial.pop(key, None)
+                publish(streaming=True)
+
+            return on_channels, discard
+
+        labels = {key: playlist_source_label(src) for key, src in targets}
+        done: List[str] = []
+        failed: List[str] = []
 
-        # Execute in parallel (fetching AND parsing) with a CPU-friendly cap.
-        source_count = len(playlist_sources)
-        cpu_count = os.cpu_count() or 2
-        worker_cap = max(2, cpu_count // 2)
-        max_workers = min(source_count if source_count else 1, worker_cap, 4)
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(fetch_and_process_playlist, src) for src in playlist_sources]
+        def report(key: str, res: Dict[str, object]) -> None:
+            if res["error"]:
+                failed.append(labels[key])
+                LOG.warning("Playlist source %s failed: %s", labels[key], res["error"])
+                status = f"{labels[key]} failed"
+            else:
+                status = f"{labels[key]}: {len(res['channels'])} channels"
+            done.append(key)
+            text = f"Playlists {len(done)}/{len(targets)} — {status}"
+            if len(done) == len(targets):
+                text = f"Playlists refreshed ({len(targets)} sources"
+                text += f", {len(failed)} failed: {', '.join(failed)})" if failed else ")"
+            wx.CallAfter(self._set_refresh_status, text)
+
+        # Network-bound, so one worker per source (within reason): a slow
+        # provider no longer holds back the others.
+        if targets:
+            wx.CallAfter(self._set_refresh_status, f"Refreshing {len(targets)} playlist source(s)…")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(len(targets), 8))) as executor:
+            futures = {
+                executor.submit(self._fetch_playlist_source, src, *channels_streamer(key)): key
+                for key, src in targets
+            }
             for future in concurrent.futures.as_completed(futures):
+                key = futures[future]
                 res = future.result()
+                with stream_lock:
+                    partial.pop(key, None)
+                report(key, res)
                 if res["error"]:
                     continue
-                
                 if res["valid_cache"]:
                     valid_caches.add(res["valid_cache"])
-                
-                provider_clients_local.update(res["clients"])
-                for epg in res["epg_sources"]:
-                    if epg not in provider_epg_sources:
-                        provider_epg_sources.append(epg)
-                
-                for ch in res["channels"]:
-                    key = (ch.get("name", ""), ch.get("url", ""), ch.get("provider-id", ""))
-                    if key in seen_channel_keys:
+                with self._source_lock:
+                    if refresh_token != self._playlist_load_token:
                         continue
-                    seen_channel_keys.add(key)
-                    grp = ch.get("group") or "Uncategorized"
-                    channels_by_group.setdefault(grp, []).append(ch)
-                    all_channels.append(ch)
+                    self._source_parts[key] = res["channels"]
+                    self._source_epgs[key] = list(res["epg_sources"])
+                    clients = dict(self.provider_clients)
+                    for provider_id, client in res["clients"].items():
+                        old = clients.get(provider_id)
+                        if old is not None and old is not client and hasattr(old, "close"):
+                            old.close()
+                        clients[provider_id] = client
+                    # Swapped whole so readers never see a half-updated mapping.
+                    self.provider_clients = clients
+                publish()
+
+        if refresh_token != self._playlist_load_token:
+            return
 
-        # Replace provider mappings atomically after successful refresh
-        self.provider_clients = provider_clients_local
-        self.provider_epg_sources = provider_epg_sources
+        with self._source_lock:
+            if full_load:
+                # Forget sources that are no longer configured.
+                live_ids = {src.get("id") for src in playlist_sources if isinstance(src, dict)}
+                clients = {}
+                for provider_id, client in self.provider_clients.items():
+                    if provider_id in live_ids:
+                        clients[provider_id] = client
+                    elif hasattr(client, "close"):
+                        client.close()
+                self.provider_clients = clients
+                self._source_epgs = {key: epgs for key, epgs in self._source_epgs.items() if key in order}
+            provider_epg_sources: List[str] = []
+            for key in order:
+                for epg in self._source_epgs.get(key, ()):
+                    if epg not in provider_epg_sources:
+                        provider_epg_sources.append(epg)
+            epgs_changed = provider_epg_sources != self.provider_epg_sources
+            self.provider_epg_sources = provider_epg_sources
+        if full_load and not published[0]:
+            # Nothing cached and nothing fetched: still show the empty state.
+            publish()
+
+        if not full_load:
+            if epgs_changed:
+                wx.CallAfter(self.reload_epg_sources)
+            return
 
         def finish_playlist_load_and_start_background_tasks():
-            self.channels_by_group = channels_by_group
-            self.all_channels = all_channels
+            if refresh_token != self._playlist_load_token:
+                return
             self.reload_epg_sources()
             self._pending_epg_autostart = True
             self._pending_epg_autostart_token = refresh_token
-            self._refresh_group_ui()
+            self._maybe_autostart_epg_import()
+            # Build the filter and EPG lookup indexes now rather than on first use.
+            threading.Thread(target=self._prebuild_channel_indexes, daemon=True).start()
             self._cleanup_cache_and_channels(valid_caches)
             # Now that playlists are loaded, start the other processes.
             self.start_refresh_timer()
+            if not self._epg_maint_timer:
+                self._schedule_epg_maintenance(self._EPG_MAINT_STARTUP_DELAY_MS)
 
         wx.CallAfter(finish_playlist_load_and_start_background_tasks)
 
+    def _open_source_cache(self, src) -> Optional[PlaylistCache]:
+        """The parsed cache of a configured source, if one exists."""
+        parsed_cache = None
+        provider_meta = None
+        if isinstance(src, dict):
+            stype = (src.get("type") or "").lower()
+            provider_id = src.get("id") or src.get("provider_id")
+            if stype in ("xtream", "stalker"):
+                cache_key = provider_id or f"{stype}:{src.get('base_url') or src.get('url') or ''}:{src.get('username', '')}"
+                parsed_cache = self._parsed_cache_path_for_key(f"provider:{cache_key}")
+                provider_meta = {"provider-type": stype, "provider-id": provider_id}
+        elif isinstance(src, str) and src.startswith(("http://", "https://")):
+            parsed_cache = self._parsed_cache_path_for_key(src)
+        elif isinstance(src, str) and os.path.exists(src):
+            parsed_cache = self._parsed_cache_path_for_key(f"file:{os.path.abspath(src)}")
+        if not parsed_cache or not os.path.exists(parsed_cache):
+            return None
+        cache = PlaylistCache.open(parsed_cache, provider_meta)
+        if cache is None or not cache.row_count:
+            return None
+        return cache
+
+    def _set_refresh_status(self, text: str) -> None:
+        try:
+            self.SetStatusText(text)
+        except Exception:
+            pass
+
+    def _fetch_playlist_source(self, src, on_channels=None, on_discard=None) -> Dict[str, object]:
+        """Fetch and parse one configured playlist source (run on a worker thread).
+
+        ``on_channels`` receives records as they stream in; ``on_discard`` is
+        called when those records are abandoned before a fallback load.
+        """
+        result = {
+            "channels": [],
+            "clients": {},
+            "epg_sources": [],
+            "valid_cache": None,
+            "error": None
+        }
+        started = time.monotonic()
+        # Name the load is recorded under in the provider metrics (network sources only).
+        metrics_name = None
+        try:
+            if isinstance(src, dict):
+                stype = (src.get("type") or "").lower()
+                provider_id = src.get("id") or src.get("provider_id")
+                if stype == "xtream":
+                    cfg = XtreamCodesConfig(
+                        base_url=src.get("base_url") or src.get("url") or "",
+                        username=src.get("username", ""),
+                        password=src.get("password", ""),
+                        stream_type=src.get("stream_type", "m3u_plus"),
+                        output=src.get("output", "ts"),
+                        name=src.get("name"),
+                        auto_epg=bool(src.get("auto_epg", True)),
+                        provider_id=provider_id,
+                        use_api=bool(src.get("use_api", True)),
+                    )
+                    client = XtreamCodesClient(cfg)
+                    metrics_name = client.describe()
+                    cache_key = provider_id or f"xtream:{cfg.base_url}:{cfg.username}"
+                    parsed_cache = self._parsed_cache_path_for_key(f"provider:{cache_key}")
+                    provider_meta = {"provider-type": "xtream", "provider-id": provider_id}
+                    channels = None
+                    if cfg.use_api:
+                        channels = self._fetch_xtream_api_channels(
+                            client, parsed_cache, on_channels=on_channels
+                        )
+                        if channels is None and on_discard is not None:
+                            # The m3u_plus listing streams the same channels again.
+                            on_discard()
+                    if channels is None:
+                        with get_metrics().measure(metrics_name, "playlist", client.host) as timings:
+                            with client.open_playlist(timings=timings) as resp:
+                                channels, _text_hash = self._stream_parse_playlist(
+                                    resp, parsed_cache, provider_meta, on_channels=on_channels
+                                )
+
+                    result["channels"] = channels or []
+                    result["clients"][provider_id] = client
+                    if cfg.auto_epg:
+                        for epg in client.epg_urls():
+                            if epg: result["epg_sources"].append(epg)
+
+                elif stype == "stalker":
+                    cfg = StalkerPortalConfig(
+                        base_url=src.get("base_url") or src.get("url") or "",
+                        username=src.get("username", ""),
+                        password=src.get("password", ""),
+                        mac=src.get("mac", ""),
+                        name=src.get("name"),
+                        auto_epg=bool(src.get("auto_epg", True)),
+                        provider_id=provider_id
+                    )
+                    client = StalkerPortalClient(cfg)
+                    metrics_name = client.describe()
+                    channels, epgs = client.fetch_channels()
+                    for ch in channels:
+                        ch.setdefault("provider-id", provider_id)
+                        ch.setdefault("provider-type", "stalker")
+
+                    result["channels"] = channels
+                    result["clients"][provider_id] = client
+                    for epg in epgs:
+                        if epg: result["epg_sources"].append(epg)
+                else:
+                    pass # Unknown dict source
+                return result
+
+            # Plain playlist path or URL
+            if isinstance(src, str) and src.startswith(("http://", "https://")):
+                cache_path = get_cache_path_for_url(src)
+                parsed_cache = self._parsed_cache_path_for_key(src)
+                result["valid_cache"] = cache_path
+                metrics_name = self._url_metrics_name(src)
+                channels = self._fetch_url_playlist(
+                    src, cache_path, parsed_cache, on_channels=on_channels
+                )
+                result["channels"] = channels or []
+
+            elif isinstance(src, str) and os.path.exists(src):
+                cache_key = f"file:{os.path.abspath(src)}"
+                parsed_cache = self._parsed_cache_path_for_key(cache_key)
+                channels = self._load_or_parse_playlist_file(src, parsed_cache, None)
+                result["channels"] = channels or []
+            else:
+                pass # Invalid source
+        except Exception as e:
+            result["error"] = str(e)
+            if metrics_name:
+                get_metrics().record_load(metrics_name, time.monotonic() - started, error=e)
+            return result
+
+        if metrics_name:
+            get_metrics().record_load(metrics_name, time.monotonic() - started, len(result["channels"]))
+        return result
+
+    def _set_channel_table(self, table: ChannelTable) -> None:
+        self.channel_table = table
+        self.channels_by_group = table.by_group
+        self.all_channels = table.records
 
     def _cleanup_cache_and_channels(self, valid_caches):
         cache_dir = get_cache_dir()
         try:
-            files = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.endswith(".m3u")]
+            names = os.listdir(cache_dir)
         except Exception:
             return
+        files = [os.path.join(cache_dir, f) for f in names if f.endswith(".m3u")]
+        files.extend(
+            os.path.join(cache_dir, f) for f in names
+            if f.endswith(".m3u.meta") and os.path.join(cache_dir, f[:-len(".meta")]) not in valid_caches
+        )
+        # Parsed caches from before the binary format are never read again.
+        files.extend(
+            os.path.join(cache_dir, f) for f in names
+            if f.startswith("parsed_") and f.endswith(".json")
+        )
         for f in files:
             if f not in valid_caches:
                 try:
@@ -739,6 +891,8 @@ class IPTVClient(wx.Frame):
 
     def _build_ui(self):
         p = wx.Panel(self)
+        # Shows per-source playlist refresh progress.
+        self.CreateStatusBar()
         hs = wx.BoxSizer(wx.HORIZONTAL)
         vs_l = wx.BoxSizer(wx.VERTICAL)
         vs_r = wx.BoxSizer(wx.VERTICAL)
@@ -746,14 +900,14 @@ class IPTVClient(wx.Frame):
         self.group_list.Bind(wx.EVT_CHAR_HOOK, self.on_group_key)
         vs_l.Add(self.group_list, 1, wx.EXPAND | wx.ALL, 5)
         self.filter_box = wx.TextCtrl(p, style=wx.TE_PROCESS_ENTER)
-        self.channel_list = wx.ListBox(p, style=wx.LB_SINGLE)
+        self.channel_list = _VirtualChannelList(p, self)
+        self.channel_list.SetName("Channels")
         # Key bindings (original + added robust handlers)
         self.channel_list.Bind(wx.EVT_CHAR_HOOK, self.on_channel_key)  # original
         self.channel_list.Bind(wx.EVT_KEY_DOWN, self._on_channel_key_down)  # reliable Enter on all platforms
-        # Mouse activation (original + added wx generic left double click)
-        self.channel_list.Bind(wx.EVT_LISTBOX, lambda _: self.on_highlight())
-        self.channel_list.Bind(wx.EVT_LISTBOX_DCLICK, lambda _: self.play_selected())  # original
-        self.channel_list.Bind(wx.EVT_LEFT_DCLICK, self._on_lb_activate)  # GTK/mac fallback
+        # Mouse activation; ITEM_ACTIVATED covers double click on every port
+        self.channel_list.Bind(wx.EVT_LIST_ITEM_SELECTED, self._on_channel_selected)
+        self.channel_list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, lambda _: self.play_selected())
         self.channel_list.Bind(wx.EVT_CONTEXT_MENU, self._on_channel_context_menu)
 
         self.epg_display = wx.TextCtrl(p, style=wx.TE_READONLY | wx.TE_MULTILINE)
@@ -821,6 +975,10 @@ class IPTVClient(wx.Frame):
                 # Casting Menu Item (Linux)
                 menu.Append(1005, "Cast To...")
                 self.Bind(wx.EVT_MENU, self.show_cast_dialog, id=1005)
+                menu.Append(1007, "Provider Health...")
+                self.Bind(wx.EVT_MENU, self.show_provider_health, id=1007)
+                menu.Append(1008, "Compact EPG Database")
+                self.Bind(wx.EVT_MENU, self.compact_epg_database, id=1008)
                 
                 menu.Append(1004, "Exit\tCtrl+Q")
                 self.Bind(wx.EVT_MENU, self.show_manager, id=1001)
@@ -841,6 +999,8 @@ class IPTVClient(wx.Frame):
             m_epg = fm.Append(wx.ID_ANY, "EPG Manager\tCtrl+E")
             m_imp = fm.Append(wx.ID_ANY, "Import EPG to DB\tCtrl+I")
             m_now = fm.Append(wx.ID_ANY, "What's on Now\tCtrl+W")
+            m_health = fm.Append(wx.ID_ANY, "Provider Health...")
+            m_compact = fm.Append(wx.ID_ANY, "Compact EPG Database")
             fm.AppendSeparator()
             # Casting Menu Item (Windows/Mac)
             m_cast = fm.Append(wx.ID_ANY, "Cast To...")
@@ -877,6 +1037,8 @@ class IPTVClient(wx.Frame):
             self.Bind(wx.EVT_MENU, self.show_epg_manager, m_epg)
             self.Bind(wx.EVT_MENU, self.import_epg, m_imp)
             self.Bind(wx.EVT_MENU, self.show_whats_on_now, m_now)
+            self.Bind(wx.EVT_MENU, self.show_provider_health, m_health)
+            self.Bind(wx.EVT_MENU, self.compact_epg_database, m_compact)
             self.Bind(wx.EVT_MENU, self.show_cast_dialog, m_cast)
             self.Bind(wx.EVT_MENU, lambda _: self.Close(), m_exit)
             self.Bind(wx.EVT_MENU, self._menu_show_player, pm_show)
@@ -899,6 +1061,7 @@ class IPTVClient(wx.Frame):
 
         self.group_list.Bind(wx.EVT_LISTBOX, lambda _: self.on_group_select())
         self.filter_box.Bind(wx.EVT_TEXT_ENTER, lambda _: self.apply_filter())
+        self.filter_box.Bind(wx.EVT_TEXT, self._on_filter_text)
 
         entries = [
             (wx.ACCEL_CTRL, ord('M'), 4001),
@@ -927,10 +1090,22 @@ class IPTVClient(wx.Frame):
         self.Bind(wx.EVT_MENU, lambda _: self._adjust_internal_volume(+2), id=4015)
         self.Bind(wx.EVT_MENU, lambda _: self._adjust_internal_volume(-2), id=4016)
 
-    def _on_lb_activate(self, event):
-        # Called on generic left double click to ensure activation on GTK/mac too
-        self.play_selected()
-        # Intentionally do not event.Skip() to avoid duplicate handling.
+    def _on_channel_selected(self, event):
+        # Programmatic SetSelection() mirrors wx.ListBox and stays silent.
+        if not self.channel_list.is_selecting:
+            self.on_highlight()
+        event.Skip()
+
+    def _channel_row_text(self, idx: int) -> str:
+        """Text for row ``idx`` of the virtual channel list (also what screen readers speak)."""
+        if not 0 <= idx < len(self.displayed):
+            return ""
+        item = self.displayed[idx]
+        data = item.get("data") or {}
+        if item.get("type") == "epg":
+            return (f"{data.get('channel_name', '')} - {data.get('show_title', '')} "
+                    f"({self._fmt_time(data.get('start'))}–{self._fmt_time(data.get('end'))})")
+        return data.get("name", "") or "Unnamed channel"
 
     def _on_channel_key_down(self, event):
         key = event.GetKeyCode()
@@ -984,17 +1159,76 @@ class IPTVClient(wx.Frame):
         finally:
             menu.Destroy()
 
+    def _resolve_epg_channel_id(self, db: EPGDatabase, channel: Dict[str, str]) -> Optional[str]:
+        """Resolve a playlist channel to its DB id once; misses are cached as ""."""
+        key = canonicalize_name(channel.get("name", ""))
+        cached_id = self._epg_match_cache.get(key)
+        if cached_id is None:
+            cached_id = db.resolve_best_channel_id(channel) or ""
+            self._epg_match_cache[key] = cached_id
+        return cached_id or None
+
+    def iter_guide_grid(self, channels: List[Dict[str, str]], start_dt: datetime.datetime, end_dt: datetime.datetime):
+        """Yield ``(channel, rows)`` for playlist channels over [start, end).
+
+        Blocking generator backed by one grid query; run it off the UI thread
+        (see ``stream_guide_grid``). Channels sharing a DB id share the rows.
+        """
+        db = EPGDatabase(get_db_path(), readonly=True)
+        try:
+            by_id: Dict[str, List[Dict[str, str]]] = {}
+            for ch in channels:
+                if self._channel_is_epg_exempt(ch):
+                    continue
+                ch_id = self._resolve_epg_channel_id(db, ch)
+                if ch_id:
+                    by_id.setdefault(ch_id, []).append(ch)
+            for ch_id, rows in db.iter_guide_grid(list(by_id), start_dt, end_dt):
+                for ch in by_id.get(ch_id, ()):
+                    yield ch, rows
+        finally:
+            db.close()
+
+    def stream_guide_grid(self, channels, start_dt, end_dt, on_batch, on_done=None, batch_channels: int = 25):
+        """Feed ``iter_guide_grid`` results to ``on_batch`` on the UI thread in small batches.
+
+        Returns a callable that cancels delivery; ``on_done`` runs once unless cancelled.
+        """
+        cancelled = threading.Event()
+
+        def _work():
+            batch = []
+            try:
+                for item in self.iter_guide_grid(channels, start_dt, end_dt):
+                    if cancelled.is_set():
+                        return
+                    batch.append(item)
+                    if len(batch) >= batch_channels:
+                        wx.CallAfter(on_batch, batch)
+                        batch = []
+                if batch and not cancelled.is_set():
+                    wx.CallAfter(on_batch, batch)
+            except Exception as e:
+                LOG.debug("Guide grid query failed: %s", e)
+            finally:
+                if on_done and not cancelled.is_set():
+                    wx.CallAfter(on_done)
+
+        self._epg_executor.submit(_work)
+        return cancelled.set
+
     def _view_channel_epg(self, channel: Dict[str, str]):
         def fetch_and_show():
             try:
                 db = EPGDatabase(get_db_path(), readonly=True)
-                now = datetime.datetime.now(datetime.timezone.utc)
-                start_dt = now - datetime.timedelta(hours=4)
-                end_dt = now + datetime.timedelta(hours=24)
-                programmes = db.get_schedule(channel, start_dt, end_dt)
-                db.close()
-                
-                wx.CallAfter(lambda: self._show_epg_dialog(channel.get("name", ""), programmes))
+                ch_id = self._resolve_epg_channel_id(db, channel)
+                if not ch_id:
+                    db.close()
+                    wx.CallAfter(self._show_epg_dialog, channel.get("name", ""), None)
+                    return
+                # The dialog owns the cursor (and its connection) and pages on demand.
+                cursor = db.schedule_cursor(ch_id, page_size=ChannelEPGDialog.PAGE_SIZE)
+                wx.CallAfter(self._show_epg_dialog, channel.get("name", ""), cursor)
             except Exception as e:
                 wx.CallAfter(lambda err=e: wx.MessageBox(f"Error fetching EPG: {err}", "Error", wx.OK | wx.ICON_ERROR))
 
@@ -1017,13 +1251,19 @@ class IPTVClient(wx.Frame):
         
         wx.adv.AboutBox(info)
 
-    def _show_epg_dialog(self, channel_name, programmes):
-        if not programmes:
-            wx.MessageBox("No upcoming schedule found for this channel.", "EPG", wx.OK | wx.ICON_INFORMATION)
-            return
-        dlg = ChannelEPGDialog(self, channel_name, programmes)
-        dlg.ShowModal()
-        dlg.Destroy()
+    def _show_epg_dialog(self, channel_name, cursor):
+        try:
+            dlg = ChannelEPGDialog(self, channel_name, cursor) if cursor else None
+            if dlg is None or not dlg.rows:
+                if dlg is not None:
+                    dlg.Destroy()
+                wx.MessageBox("No upcoming schedule found for this channel.", "EPG", wx.OK | wx.ICON_INFORMATION)
+                return
+            dlg.ShowModal()
+            dlg.Destroy()
+        finally:
+            if cursor:
+                cursor.close()
 
     def on_toggle_min_to_tray(self, event):
         if platform.system() == "Linux":
@@ -1461,15 +1701,20 @@ class IPTVClient(wx.Frame):
             wx.CallAfter(self.show_tray_icon)
             event.Veto()
         else:
-            # Ensure poll timer stopped on exit
+            # Ensure boundary timer stopped on exit
             try:
-                self._stop_epg_poll_timer()
+                self._cancel_epg_boundary_timer()
             except Exception:
                 pass
             try:
                 self._cancel_epg_autostart_timer()
             except Exception:
                 pass
+            try:
+                self._cancel_epg_maintenance_timer()
+            except Exception:
+                pass
+            self._source_refresh_timers.stop_all()
             if hasattr(self, "_epg_executor"):
                 self._epg_executor.shutdown(wait=False)
             if self.caster:
@@ -1527,106 +1772,162 @@ class IPTVClient(wx.Frame):
             event.Skip()
 
     def apply_filter(self):
+        self._last_user_activity = time.time()
+        if self._filter_debounce is not None:
+            self._filter_debounce.Stop()
+            self._filter_debounce = None
         txt = self.filter_box.GetValue().strip().lower()
         self._populate_token += 1
-        self.displayed = []
-        self.channel_list.Freeze()
-        try:
-            self.channel_list.Clear()
-            source = (self.all_channels if self.current_group == "All Channels"
-                      else self.channels_by_group.get(self.current_group, []))
-            if not txt:
-                # Rebuild current group quickly without blocking the UI
-                self.channel_list.Thaw()
-                self.on_group_select()
-                return
+        self._search_token += 1
+        my_token = self._search_token
+        if not txt:
+            # Showing a whole group is a count change on the virtual list
+            self.on_group_select()
+            return
+        group = None if self.current_group == "All Channels" else self.current_group
 
-            items = []
-            for ch in source:
-                name = (ch.get("name") or "")
-                if txt and txt not in name.lower():
-                    continue
-                self.displayed.append({"type": "channel", "data": ch})
-                items.append(name)
+        def is_stale():
+            return self._search_token != my_token
 
-            if items:
-                self.channel_list.AppendItems(items)
+        def channel_search():
+            try:
+                index = self._get_search_index()
+                fuzzy = index.has_fuzzy
+                rows = index.search(txt, group=group, cancel=is_stale)
+                displayed = [{"type": "channel", "data": ch} for ch in index.records_for(rows)]
+                wx.CallAfter(show_channels, displayed, True)
+                if not fuzzy:
+                    # Show exact hits now; add typo-tolerant ones once the keys exist.
+                    index.build_fuzzy()
+                    if is_stale():
+                        return
+                    rows = index.search(txt, group=group, cancel=is_stale)
+                    displayed = [{"type": "channel", "data": ch} for ch in index.records_for(rows)]
+                    wx.CallAfter(show_channels, displayed, False)
+            except SearchCancelled:
+                return
+            except Exception:
+                LOG.exception("Channel search failed")
 
+        def show_channels(displayed, first):
+            if is_stale():
+                return
+            if not first:
+                # Fuzzy hits rank after the exact ones already shown, so rows
+                # (and the selection) only move down; EPG hits stay last.
+                epg_rows = [item for item in self.displayed if item.get("type") == "epg"]
+                self.displayed = displayed + epg_rows
+                self.channel_list.sync()
+                return
+            self.displayed = displayed
+            self.channel_list.sync(reset=True)
             # Kick off EPG search in background and append results later
-            if not hasattr(self, "_search_token"):
-                self._search_token = 0
-            self._search_token += 1
-            my_token = self._search_token
+            threading.Thread(target=lambda: epg_search(my_token), daemon=True).start()
 
-            def epg_search(token):
+        def epg_search(token):
+            try:
+                db = EPGDatabase(get_db_path(), readonly=True)
                 try:
-                    db = EPGDatabase(get_db_path(), readonly=True)
-                    try:
-                        if hasattr(db, "conn"):
-                            db.conn.execute("PRAGMA busy_timeout=2000;")
-                            db.conn.execute("PRAGMA read_uncommitted=1;")
-                    except Exception:
-                        pass
-                    results = db.get_channels_with_show(txt)
-                    try:
-                        if hasattr(db, "close"):
-                            db.close()
-                        elif hasattr(db, "conn"):
-                            db.conn.close()
-                    except Exception:
-                        pass
+                    if hasattr(db, "conn"):
+                        db.conn.execute("PRAGMA busy_timeout=2000;")
+                        db.conn.execute("PRAGMA read_uncommitted=1;")
                 except Exception:
-                    results = []
-                def update_ui():
-                    if getattr(self, "_search_token", 0) != token:
-                        return
-                    if txt != self.filter_box.GetValue().strip().lower():
-                        return
-                    # Preserve current selection to avoid scroll jumps while appending
-                    try:
-                        cur_sel = self.channel_list.GetSelection()
-                        cur_count = self.channel_list.GetCount()
-                    except Exception:
-                        cur_sel, cur_count = wx.NOT_FOUND, 0
-                    if results:
-                        add_items = []
-                        for r in results:
-                            chan_name = r.get('channel_name') or ""
-                            show_name = r.get('show_title') or ""
-                            chan_lower = chan_name.lower()
-                            show_lower = show_name.lower()
-                            if txt and txt not in chan_lower and txt not in show_lower:
-                                continue
-                            label = f"{r['channel_name']} - {r['show_title']} ({self._fmt_time(r['start'])}–{self._fmt_time(r['end'])})"
-                            self.displayed.append({"type": "epg", "data": r})
-                            add_items.append(label)
-                        if add_items:
-                            self.channel_list.AppendItems(add_items)
-                    # Only auto-select the first item if the list was previously empty
-                    # and nothing is selected. Do NOT steal focus or jump the list.
-                    try:
-                        if cur_count == 0 and cur_sel in (-1, wx.NOT_FOUND) and self.channel_list.GetCount() > 0:
-                            # Leave selection empty to avoid scroll jump; user can choose.
-                            # If desired later, we can make this opt-in via a setting.
-                            pass
-                        elif cur_sel not in (-1, wx.NOT_FOUND) and cur_sel < self.channel_list.GetCount():
-                            # Reinstate prior selection to keep view position stable.
-                            self.channel_list.SetSelection(cur_sel)
-                    except Exception:
-                        pass
-                wx.CallAfter(update_ui)
-            threading.Thread(target=lambda: epg_search(my_token), daemon=True).start()
-        finally:
-            try:
-                self.channel_list.Thaw()
+                    pass
+                results = db.get_channels_with_show(txt)
+                try:
+                    if hasattr(db, "close"):
+                        db.close()
+                    elif hasattr(db, "conn"):
+                        db.conn.close()
+                except Exception:
+                    pass
             except Exception:
-                pass
+                results = []
+            def update_ui():
+                if self._search_token != token:
+                    return
+                if txt != self.filter_box.GetValue().strip().lower():
+                    return
+                # Preserve current selection to avoid scroll jumps while appending
+                try:
+                    cur_sel = self.channel_list.GetSelection()
+                    cur_count = self.channel_list.GetCount()
+                except Exception:
+                    cur_sel, cur_count = wx.NOT_FOUND, 0
+                if results:
+                    added = False
+                    for r in results:
+                        chan_name = r.get('channel_name') or ""
+                        show_name = r.get('show_title') or ""
+                        chan_lower = chan_name.lower()
+                        show_lower = show_name.lower()
+                        if txt and txt not in chan_lower and txt not in show_lower:
+                            continue
+                        self.displayed.append({"type": "epg", "data": r})
+                        added = True
+                    if added:
+                        self.channel_list.sync()
+                # Only auto-select the first item if the list was previously empty
+                # and nothing is selected. Do NOT steal focus or jump the list.
+                try:
+                    if cur_count == 0 and cur_sel in (-1, wx.NOT_FOUND) and self.channel_list.GetCount() > 0:
+                        # Leave selection empty to avoid scroll jump; user can choose.
+                        # If desired later, we can make this opt-in via a setting.
+                        pass
+                    elif cur_sel not in (-1, wx.NOT_FOUND) and cur_sel < self.channel_list.GetCount():
+                        # Reinstate prior selection to keep view position stable.
+                        self.channel_list.SetSelection(cur_sel)
+                except Exception:
+                    pass
+            wx.CallAfter(update_ui)
+        threading.Thread(target=channel_search, daemon=True).start()
+
+    _FILTER_DEBOUNCE_MS = 150
+
+    def _on_filter_text(self, event):
+        event.Skip()
+        if self._filter_debounce is not None:
+            self._filter_debounce.Stop()
+        self._filter_debounce = wx.CallLater(self._FILTER_DEBOUNCE_MS, self.apply_filter)
+
+    def _prebuild_channel_indexes(self) -> None:
+        try:
+            self._get_channel_lookup()
+            self._get_search_index().build_fuzzy()
+        except Exception:
+            LOG.exception("Could not build channel indexes")
+
+    def _get_channel_lookup(self) -> ChannelLookup:
+        """Return the EPG -> channel lookup for the current table, rebuilding it after a refresh."""
+        with self._channel_lookup_lock:
+            records = self.all_channels
+            lookup = self._channel_lookup
+            if lookup is None or lookup.records is not records:
+                started = time.monotonic()
+                lookup = ChannelLookup(records, previous=lookup)
+                LOG.debug("Built channel lookup for %d channels (%d names reused) in %.2fs",
+                          len(lookup), lookup.reused, time.monotonic() - started)
+                self._channel_lookup = lookup
+            return lookup
+
+    def _get_search_index(self) -> ChannelSearchIndex:
+        """Return the name index for the current table, building it on first use."""
+        with self._search_index_lock:
+            records = self.all_channels
+            index = self._search_index
+            if index is None or index.records is not records:
+                started = time.monotonic()
+                index = ChannelSearchIndex(records, fuzzy=False)
+                LOG.debug("Built search index for %d channels in %.2fs", len(index), time.monotonic() - started)
+                self._search_index = index
+            return index
 
     def _refresh_group_ui(self):
         self.group_list.Freeze()
         try:
             self.group_list.Clear()
-            self.channel_list.Clear()
+            self.displayed = []
+            self.channel_list.sync(reset=True)
 
             if not self.all_channels:
                 self.group_list.Append("No channels found.")
@@ -1655,6 +1956,87 @@ class IPTVClient(wx.Frame):
         
         self.on_group_select()
 
+    def _apply_channel_table_update(self, table: ChannelTable, diff: Optional[TableDiff]) -> None:
+        """Swap in a refreshed channel table, touching only what changed on screen."""
+        if (
+            diff is None
+            or diff.base is not self.channel_table
+            or not self.all_channels
+            or not table.records
+            or self.filter_box.GetValue().strip()
+        ):
+            self._set_channel_table(table)
+            self._refresh_group_ui()
+            return
+
+        grp = self.current_group
+        old_source = self.all_channels if grp == "All Channels" else self.channels_by_group.get(grp, [])
+        self._set_channel_table(table)
+        if grp != "All Channels" and grp not in table.by_group:
+            # The group being viewed disappeared; fall back to a full rebuild.
+            self._refresh_group_ui()
+            return
+        self._update_group_labels()
+        new_source = self.all_channels if grp == "All Channels" else self.channels_by_group.get(grp, [])
+        if not self._patch_channel_list(old_source, new_source):
+            self.on_group_select()
+            return
+        self._maybe_autostart_epg_import()
+
+    def _update_group_labels(self) -> None:
+        """Refresh group counts in place, rebuilding the (short) group list only if groups changed."""
+        labels = [f"All Channels ({len(self.all_channels)})"]
+        labels.extend(f"{grp} ({len(self.channels_by_group[grp])})" for grp in sorted(self.channels_by_group))
+        current = list(self.group_list.GetStrings())
+        if len(current) == len(labels) and all(
+            a.rsplit(" (", 1)[0] == b.rsplit(" (", 1)[0] for a, b in zip(current, labels)
+        ):
+            for idx, (old_label, new_label) in enumerate(zip(current, labels)):
+                if old_label != new_label:
+                    self.group_list.SetString(idx, new_label)
+            return
+        sel_label = labels[0]
+        if self.current_group != "All Channels":
+            sel_label = f"{self.current_group} ({len(self.channels_by_group.get(self.current_group, []))})"
+        self.group_list.Freeze()
+        try:
+            self.group_list.Set(labels)
+            idx = self.group_list.FindString(sel_label)
+            self.group_list.SetSelection(idx if idx != wx.NOT_FOUND else 0)
+        finally:
+            try:
+                self.group_list.Thaw()
+            except Exception:
+                pass
+
+    def _patch_channel_list(self, old_source, new_source) -> bool:
+        """Point the visible channel list at ``new_source``, keeping the selection.
+
+        Returns False when the list is not currently showing ``old_source``
+        (e.g. search results); the caller then repopulates.
+        """
+        displayed = self.displayed
+        if not isinstance(displayed, _ChannelRows) or displayed.source is not old_source:
+            return False
+
+        sel = self.channel_list.GetSelection()
+        sel_data = displayed[sel]["data"] if 0 <= sel < len(displayed) else None
+
+        self._populate_token += 1
+        self.displayed = _ChannelRows(new_source)
+        self.channel_list.sync()
+        if sel_data is None:
+            return True
+        sel_key = channel_key(sel_data)
+        new_sel = next((idx for idx, rec in enumerate(new_source) if channel_key(rec) == sel_key), None)
+        if new_sel is None and len(new_source):
+            new_sel = min(sel, len(new_source) - 1)
+        if new_sel is not None:
+            self.channel_list.SetSelection(new_sel)
+            if new_source[new_sel] is not sel_data:
+                self.on_highlight()
+        return True
+
     def reload_epg_sources(self):
         base = list(self.config.get("epgs", []))
         for epg in getattr(self, "provider_epg_sources", []):
@@ -1739,16 +2121,16 @@ class IPTVClient(wx.Frame):
             return
         self.epg_importing = True
 
-        # Start a short poll timer so UI can show EPG as it arrives for the selected channel.
-        wx.CallAfter(self._start_epg_poll_timer)
-
         def do_import():
             success = False
             try:
                 db = EPGDatabase(get_db_path(), for_threading=True)
-                # Pass a coarse progress callback (per-source). The DB importer writes as it streams,
-                # so readers can pick up newly inserted rows during import.
-                db.import_epg_xml(sources)
+                # The importer signals each committed source so the highlighted
+                # channel can pick up newly inserted rows during import.
+                db.import_epg_xml(
+                    sources,
+                    commit_callback=lambda _done, _total: wx.CallAfter(self._on_epg_import_committed),
+                )
                 success = True
                 try:
                     if hasattr(db, "close"):
@@ -1765,10 +2147,9 @@ class IPTVClient(wx.Frame):
 
     def finish_import_background(self, success: bool = False):
         self.epg_importing = False
-        # Stop import-specific polling and restart steady refresh timer
-        self._stop_epg_poll_timer()
         with self.epg_cache_lock:
             self.epg_cache.clear()
+        self._epg_boundaries.clear()
         # Clear match cache as IDs/channels may have changed in the DB
         self._epg_match_cache.clear()
         if success:
@@ -1779,7 +2160,79 @@ class IPTVClient(wx.Frame):
             except Exception:
                 pass
         self.on_highlight()
-        self._start_epg_poll_timer()
+        self._arm_epg_boundary_timer()
+        # Reclaim space from pruned rows once the user has been idle for a while.
+        self._schedule_epg_maintenance(self._EPG_MAINT_AFTER_IMPORT_MS)
+
+    # Maintenance cadence; passes only run once the user has been idle this long.
+    _EPG_MAINT_IDLE_SECS = 60
+    _EPG_MAINT_STARTUP_DELAY_MS = 10 * 60 * 1000
+    _EPG_MAINT_AFTER_IMPORT_MS = 2 * 60 * 1000
+    _EPG_MAINT_STEP_DELAY_MS = 5000
+    _EPG_MAINT_INTERVAL_MS = 6 * 60 * 60 * 1000
+
+    def _schedule_epg_maintenance(self, delay_ms: int):
+        self._cancel_epg_maintenance_timer()
+        self._epg_maint_timer = wx.CallLater(max(1, int(delay_ms)), self._on_epg_maintenance_timer)
+
+    def _cancel_epg_maintenance_timer(self):
+        if self._epg_maint_timer:
+            try:
+                self._epg_maint_timer.Stop()
+            except Exception:
+                pass
+            self._epg_maint_timer = None
+
+    def _on_epg_maintenance_timer(self):
+        self._epg_maint_timer = None
+        if self._epg_maint_running:
+            return
+        idle_for = time.time() - self._last_user_activity
+        if self.epg_importing or idle_for < self._EPG_MAINT_IDLE_SECS:
+            wait_ms = int((self._EPG_MAINT_IDLE_SECS - idle_for) * 1000)
+            self._schedule_epg_maintenance(max(self._EPG_MAINT_STEP_DELAY_MS, wait_ms))
+            return
+        self._epg_maint_running = True
+
+        def _work():
+            more = False
+            try:
+                more = run_epg_maintenance(get_db_path())
+            finally:
+                wx.CallAfter(self._finish_epg_maintenance_step, more)
+
+        threading.Thread(target=_work, daemon=True).start()
+
+    def compact_epg_database(self, _):
+        """Full VACUUM on request: converts older databases to incremental auto-vacuum."""
+        if self.epg_importing or self._epg_maint_running:
+            wx.MessageBox("EPG maintenance or an import is running; try again shortly.",
+                          "Compact EPG Database", wx.OK | wx.ICON_INFORMATION)
+            return
+        self._cancel_epg_maintenance_timer()
+        self._epg_maint_running = True
+        self._set_refresh_status("Compacting EPG database…")
+
+        def _work():
+            more = False
+            try:
+                more = run_epg_maintenance(get_db_path(), budget_secs=5, allow_vacuum=True)
+                wx.CallAfter(self._set_refresh_status, "EPG database compacted")
+            except Exception:
+                wx.CallAfter(self._set_refresh_status, "EPG database not compacted")
+                wx.CallAfter(wx.MessageBox,
+                             "Could not compact the EPG database because it is in use; try again shortly.",
+                             "Compact EPG Database", wx.OK | wx.ICON_INFORMATION)
+            finally:
+                wx.CallAfter(self._finish_epg_maintenance_step, more)
+
+        threading.Thread(target=_work, daemon=True).start()
+
+    def _finish_epg_maintenance_step(self, more: bool):
+        self._epg_maint_running = False
+        if self._epg_maint_timer:
+            return
+        self._schedule_epg_maintenance(self._EPG_MAINT_STEP_DELAY_MS if more else self._EPG_MAINT_INTERVAL_MS)
 
     def show_manager(self, _):
         dlg = PlaylistManagerDialog(self, self.playlist_sources)
@@ -1812,6 +2265,12 @@ class IPTVClient(wx.Frame):
         wx.MessageBox("EPG import will start in the background.", "Import Started", wx.OK | wx.ICON_INFORMATION)
         self.start_epg_import_background(force=True)
 
+    def show_provider_health(self, _):
+        """Show request timings, errors and channel counts recorded per provider."""
+        dlg = ProviderHealthDialog(self, get_metrics())
+        dlg.ShowModal()
+        dlg.Destroy()
+
     def show_whats_on_now(self, _):
         """Show dialog with all currently airing programs."""
         if not self.config.get("epg_enabled", True):
@@ -1847,77 +2306,9 @@ class IPTVClient(wx.Frame):
             return
         
         # Try to find the channel in our playlist
-        matching_channel = None
-        best_score = 0
-        channel_name_lower = channel_name.lower() if channel_name else ""
-        channel_name_norm = canonicalize_name(strip_noise_words(channel_name)) if channel_name else ""
-        
-        # Extract base name without HD/SD suffixes for fuzzy matching
-        base_patterns = ["hd", "sd", "fhd", "uhd", "4k", "hevc", "h264", "h.264"]
-        channel_base = channel_name_lower
-        for pat in base_patterns:
-            channel_base = channel_base.replace(f" {pat}", "").replace(f"({pat})", "").replace(f"[{pat}]", "")
-        channel_base = channel_base.strip()
-        
-        for ch in self.all_channels:
-            ch_name = ch.get("name", "")
-            ch_tvg_name = ch.get("tvg-name", "")
-            ch_tvg_id = ch.get("tvg-id", "")
-            ch_name_lower = ch_name.lower()
-            
-            score = 0
-            
-            # Exact match on tvg-id (most reliable) - 100 points
-            if channel_id and ch_tvg_id:
-                if channel_id.lower() == ch_tvg_id.lower():
-                    score = 100
-                elif channel_id.lower() in ch_tvg_id.lower() or ch_tvg_id.lower() in channel_id.lower():
-                    score = max(score, 80)
-            
-            # Exact match on name - 90 points
-            if ch_name_lower == channel_name_lower:
-                score = max(score, 90)
-            
-            # Exact match on tvg-name - 90 points
-            if ch_tvg_name and ch_tvg_name.lower() == channel_name_lower:
-                score = max(score, 90)
-            
-            # Normalized match - 70 points
-            ch_name_norm = canonicalize_name(strip_noise_words(ch_name))
-            ch_tvg_norm = canonicalize_name(strip_noise_words(ch_tvg_name)) if ch_tvg_name else ""
-            if channel_name_norm and (ch_name_norm == channel_name_norm or ch_tvg_norm == channel_name_norm):
-                score = max(score, 70)
-            
-            # Base name match (without HD/SD etc) - 60 points
-            ch_base = ch_name_lower
-            for pat in base_patterns:
-                ch_base = ch_base.replace(f" {pat}", "").replace(f"({pat})", "").replace(f"[{pat}]", "")
-            ch_base = ch_base.strip()
-            if channel_base and ch_base and channel_base == ch_base:
-                score = max(score, 60)
-            
-            # Partial/contains match - 40 points
-            if channel_name_lower in ch_name_lower or ch_name_lower in channel_name_lower:
-                score = max(score, 40)
-            if ch_tvg_name and (channel_name_lower in ch_tvg_name.lower() or ch_tvg_name.lower() in channel_name_lower):
-                score = max(score, 40)
-            
-            # Word overlap score - up to 30 points
-            if channel_name_norm and ch_name_norm:
-                words_epg = set(channel_name_norm.split())
-                words_ch = set(ch_name_norm.split())
-                if words_epg and words_ch:
-                    overlap = len(words_epg & words_ch)
-                    total = max(len(words_epg), len(words_ch))
-                    if overlap > 0:
-                        word_score = int(30 * overlap / total)
-                        score = max(score, word_score)
-            
-            if score > best_score:
-                best_score = score
-                matching_channel = ch
-        
-        if not matching_channel or best_score < 30:
+        matching_channel, best_score = self._get_channel_lookup().best_match(channel_name, channel_id)
+
+        if not matching_channel or best_score < MIN_MATCH_SCORE:
             wx.MessageBox(f"Could not find channel '{channel_name}' in your playlist.", "Channel Not Found", wx.OK | wx.ICON_WARNING)
             return
         
@@ -1947,259 +2338,192 @@ class IPTVClient(wx.Frame):
                     return
 
     def finish_import(self):
-        # legacy-sounding API; ensure poll timer is stopped here too.
+        # legacy-sounding API; reset boundary tracking here too.
         self.epg_importing = False
-        self._stop_epg_poll_timer()
         with self.epg_cache_lock:
             self.epg_cache.clear()
+        self._epg_boundaries.clear()
         self.on_highlight()
-        self._start_epg_poll_timer()
+        self._arm_epg_boundary_timer()
 
     def _parse_m3u_return(self, text, provider_info=None):
-        provider_info = provider_info or {}
-        provider_id = provider_info.get("provider-id")
-        provider_type = provider_info.get("provider-type")
-
-        out: List[Dict[str, str]] = []
-        append = out.append
-        extract_group_local = extract_group
-        stream_id_for = self._extract_stream_id
-        attr_iter = _M3U_ATTR_RE.finditer
-
-        # Per-channel metadata, reset after each URL
-        name = ""
-        group = ""
-        tvg_id = ""
-        tvg_name = ""
-        tvg_logo = ""
-        tvg_rec = ""
-        timeshift = ""
-        catchup = ""
-        catchup_type = ""
-        catchup_days = ""
-        catchup_source = ""
-        catchup_offset = ""
-        http_user_agent = ""
-        http_referrer = ""
-        http_origin = ""
-        http_cookie = ""
-        http_headers: List[str] = []
-        http_auth = ""
-        http_accept = ""
-
-        for raw_line in text.splitlines():
-            s = raw_line.strip()
-            if not s:
-                continue
+        return parse_m3u_text(text, provider_info=provider_info)
 
-            if s[0] == '#':
-                upper_prefix = s[:10].upper()
-                if upper_prefix.startswith("#EXTINF"):
-                    name = ""
-                    group = ""
-                    tvg_id = ""
-                    tvg_name = ""
-                    tvg_logo = ""
-                    tvg_rec = ""
-                    timeshift = ""
-                    catchup = ""
-                    catchup_type = ""
-                    catchup_days = ""
-                    catchup_source = ""
-                    catchup_offset = ""
-                    http_user_agent = ""
-                    http_referrer = ""
-                    http_origin = ""
-                    http_cookie = ""
-                    http_headers = []
-                    http_auth = ""
-                    http_accept = ""
-
-                    comma_idx = s.find(',')
-                    info_part = s if comma_idx == -1 else s[:comma_idx]
-                    if comma_idx != -1:
-                        name = s[comma_idx + 1:].strip()
-
-                    colon_idx = info_part.find(':')
-                    attr_segment = info_part[colon_idx + 1:] if colon_idx != -1 else ""
-                    if attr_segment:
-                        attrs: Dict[str, str] = {}
-                        for match in attr_iter(attr_segment):
-                            key = match.group(1).lower()
-                            value = match.group(2) or match.group(3) or match.group(4) or ""
-                            if key not in attrs:
-                                attrs[key] = value.strip()
-                        if attrs:
-                            group = attrs.get("group-title", "")
-                            tvg_id = attrs.get("tvg-id", "")
-                            tvg_name = attrs.get("tvg-name", "")
-                            tvg_logo = attrs.get("tvg-logo") or attrs.get("logo") or ""
-                            tvg_rec = attrs.get("tvg-rec", "")
-                            timeshift = attrs.get("timeshift", "")
-                            catchup = attrs.get("catchup", "")
-                            catchup_type = attrs.get("catchup-type", "")
-                            catchup_days = attrs.get("catchup-days", "")
-                            catchup_source = attrs.get("catchup-source", "")
-                            catchup_offset = attrs.get("catchup-offset", "")
-                            http_user_agent = attrs.get("http-user-agent", "")
-                            http_referrer = attrs.get("http-referrer") or attrs.get("http-referer", http_referrer)
-                            http_origin = attrs.get("http-origin", http_origin)
-                            http_cookie = attrs.get("http-cookie", http_cookie)
-                            http_auth = attrs.get("http-authorization", http_auth)
-                            http_accept = attrs.get("http-accept", http_accept)
-                    continue
+    # URL playlists whose server sends no ETag/Last-Modified are re-used for
+    # this long instead of being downloaded on every refresh.
+    _PLAYLIST_UNVALIDATED_MAX_AGE_SECS = 15 * 60
 
-                if upper_prefix.startswith("#EXTVLCOPT"):
-                    colon_idx = s.find(':')
-                    if colon_idx != -1:
-                        data = s[colon_idx + 1:]
-                        eq_idx = data.find('=')
-                        if eq_idx != -1:
-                            key = data[:eq_idx].strip().lower()
-                            value = data[eq_idx + 1:].strip()
-                            if key in {"catchup-source", "catchup_url"}:
-                                catchup_source = value
-                            elif key == "catchup-days":
-                                catchup_days = value
-                            elif key == "catchup-type":
-                                catchup_type = value
-                            elif key == "http-user-agent":
-                                http_user_agent = value
-                            elif key in {"http-referrer", "http-referer", "referer", "referrer"}:
-                                http_referrer = value
-                            elif key in {"http-origin", "origin"}:
-                                http_origin = value
-                            elif key in {"http-cookie", "cookie"}:
-                                http_cookie = value
-                            elif key in {"http-authorization", "authorization", "auth"}:
-                                http_auth = value
-                            elif key in {"http-accept", "accept"}:
-                                http_accept = value
-                            elif key.startswith("http-header"):
-                                if value:
-                                    http_headers.append(value)
-                    continue
+    def _fetch_url_playlist(
+        self,
+        url: str,
+        cache_path: str,
+        parsed_cache: Optional[str],
+        on_channels=None,
+    ) -> Sequence:
+        """Download a URL playlist with a conditional GET, reusing the cached copy on 304."""
+        have_cache = os.path.exists(cache_path)
+        validators = load_cache_validators(cache_path) if have_cache else {}
+        if have_cache and not (validators.get("etag") or validators.get("last_modified")):
+            try:
+                age = time.time() - os.path.getmtime(cache_path)
+            except OSError:
+                age = None
+            if age is not None and age < self._PLAYLIST_UNVALIDATED_MAX_AGE_SECS:
+                return self._load_or_parse_playlist_file(
+                    cache_path, parsed_cache, None, known_hash=validators.get("hash")
+                )
 
-                if upper_prefix.startswith("#KODIPROP"):
-                    colon_idx = s.find(':')
-                    if colon_idx != -1:
-                        data = s[colon_idx + 1:]
-                        eq_idx = data.find('=')
-                        if eq_idx != -1:
-                            key = data[:eq_idx].strip().lower()
-                            value = data[eq_idx + 1:].strip()
-                            if key.endswith("catchup_days"):
-                                catchup_days = value
-                            elif key.endswith("catchup_source"):
-                                catchup_source = value
-                            elif key in {"http-referrer", "http-referer", "referer", "referrer"}:
-                                http_referrer = value
-                            elif key in {"http-origin", "origin"}:
-                                http_origin = value
-                            elif key in {"http-cookie", "cookie"}:
-                                http_cookie = value
-                            elif key in {"http-authorization", "authorization", "auth"}:
-                                http_auth = value
-                            elif key in {"http-accept", "accept"}:
-                                http_accept = value
-                    continue
+        headers = {"User-Agent": "Mozilla/5.0", "Accept-Encoding": ACCEPT_ENCODING}
+        if have_cache:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        metrics_name = self._url_metrics_name(url)
+        host = urllib.parse.urlparse(url).netloc
+        timings = RequestTimings()
+        try:
+            resp = urlopen(urllib.request.Request(url, headers=headers), timeout=60, timings=timings)
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or not have_cache:
+                get_metrics().record(RequestSample(metrics_name, "playlist", host, timings, error=e))
+                raise
+            get_metrics().record(RequestSample(metrics_name, "playlist:not-modified", host, timings))
+            e.close()
+            LOG.info("Playlist not modified: %s", url)
+            try:
+                os.utime(cache_path, None)
+            except OSError:
+                pass
+            return self._load_or_parse_playlist_file(
+                cache_path, parsed_cache, None, known_hash=validators.get("hash")
+            )
 
-                # Other comment/directive lines are ignored
-                continue
+        except Exception as e:
+            get_metrics().record(RequestSample(metrics_name, "playlist", host, timings, error=e))
+            raise
 
-            url = s
-            grp_value = group or extract_group_local(name)
-            channel = {
-                "name": name,
-                "group": grp_value,
-                "url": url,
-                "tvg-id": tvg_id,
-                "tvg-name": tvg_name,
-            }
-            if provider_id:
-                channel["provider-id"] = provider_id
-            if provider_type:
-                channel["provider-type"] = provider_type
-            if tvg_logo:
-                channel["tvg-logo"] = tvg_logo
-            if tvg_rec:
-                channel["tvg-rec"] = tvg_rec
-            if timeshift:
-                channel["timeshift"] = timeshift
-            if catchup:
-                channel["catchup"] = catchup
-            if catchup_type:
-                channel["catchup-type"] = catchup_type
-            if catchup_days:
-                channel["catchup-days"] = catchup_days
-            if catchup_source:
-                channel["catchup-source"] = catchup_source
-            if catchup_offset:
-                channel["catchup-offset"] = catchup_offset
-            if http_user_agent:
-                channel["http-user-agent"] = http_user_agent
-            if http_referrer:
-                channel["http-referrer"] = http_referrer
-            if http_origin:
-                channel["http-origin"] = http_origin
-            if http_cookie:
-                channel["http-cookie"] = http_cookie
-            if http_auth:
-                channel["http-authorization"] = http_auth
-            if http_accept:
-                channel["http-accept"] = http_accept
-            if http_headers:
-                # Preserve header order but drop duplicates case-insensitively.
-                seen_headers = set()
-                unique_headers: List[str] = []
-                for hdr in http_headers:
-                    key_lower = hdr.split(":", 1)[0].strip().lower() if ":" in hdr else hdr.lower()
-                    if key_lower in seen_headers:
-                        continue
-                    seen_headers.add(key_lower)
-                    unique_headers.append(hdr)
-                channel["http-headers"] = unique_headers
-
-            if provider_type == "xtream" or catchup_source:
-                stream_id = stream_id_for(url)
-                if stream_id:
-                    channel["stream-id"] = stream_id
-
-            append(channel)
-
-            # Clear state after emitting the channel entry
-            name = ""
-            group = ""
-            tvg_id = ""
-            tvg_name = ""
-            tvg_logo = ""
-            tvg_rec = ""
-            timeshift = ""
-            catchup = ""
-            catchup_type = ""
-            catchup_days = ""
-            catchup_source = ""
-            catchup_offset = ""
-            http_user_agent = ""
-            http_referrer = ""
-            http_origin = ""
-            http_cookie = ""
-            http_headers = []
-            http_auth = ""
-            http_accept = ""
-
-        return out
-
-    def _playlist_text_hash(self, text: str) -> str:
-        if not text:
+        with resp:
+            # Parse, hash and write the raw cache in one pass over the download.
+            try:
+                with decoded_body(resp) as body:
+                    channels, text_hash = self._stream_parse_playlist(
+                        body, parsed_cache, None, raw_cache_path=cache_path, on_channels=on_channels,
+                    )
+            except Exception as e:
+                get_metrics().record(RequestSample(metrics_name, "playlist", host, timings, error=e))
+                raise
+            get_metrics().record(RequestSample(metrics_name, "playlist", host, timings))
+            save_cache_validators(
+                cache_path,
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+                body_hash=text_hash,
+            )
+        return channels
+
+    @staticmethod
+    def _url_metrics_name(url: str) -> str:
+        return f"Playlist URL ({urllib.parse.urlparse(url).netloc or url})"
+
+    def _previous_playlist_cache(
+        self, parsed_cache: Optional[str], provider_meta: Optional[Dict[str, str]]
+    ) -> Optional[PlaylistCache]:
+        if not parsed_cache or not os.path.exists(parsed_cache):
+            return None
+        return PlaylistCache.open(parsed_cache, provider_meta)
+
+    def _log_playlist_delta(self, parser: M3UStreamParser, previous: Optional[PlaylistCache]) -> None:
+        if previous is None:
+            return
+        reused = parser.reused_count
+        LOG.info(
+            "Playlist delta: %d unchanged, %d new or changed, %d removed",
+            reused, parser.channel_count - reused, max(0, previous.row_count - reused),
+        )
+
+    def _stream_parse_playlist(
+        self,
+        fileobj,
+        parsed_cache: Optional[str],
+        provider_meta: Optional[Dict[str, str]],
+        raw_cache_path: Optional[str] = None,
+        on_channels=None,
+    ):
+        """Parse a playlist while it is read, refreshing the parsed cache afterwards.
+
+        Entries unchanged since the last parse are taken from the previous
+        parsed cache rather than parsed again. Returns ``(channels, hash)``.
+        """
+        previous = self._previous_playlist_cache(parsed_cache, provider_meta)
+        parser = M3UStreamParser(
+            provider_meta, previous=previous.record_for_digest if previous is not None else None
+        )
+        channels, text_hash = stream_m3u(
+            fileobj,
+            cache_path=raw_cache_path,
+            on_channels=on_channels,
+            parser=parser,
+        )
+        self._log_playlist_delta(parser, previous)
+        if parsed_cache and text_hash and (previous is None or previous.text_hash != text_hash):
+            self._store_cached_playlist(parsed_cache, text_hash, channels, provider_meta, parser.digests)
+        return channels, text_hash
+
+    def _fetch_xtream_api_channels(self, client, parsed_cache: Optional[str], on_channels=None):
+        """Channels from the panel's player_api.php, or None to fall back to m3u_plus."""
+        try:
+            channels, text_hash = client.fetch_channels_api(on_channels=on_channels)
+        except Exception as e:
+            LOG.info("%s: player_api listing failed, using m3u_plus: %s", client.describe(), e)
+            return None
+        if not channels:
+            LOG.info("%s: player_api returned no live streams, using m3u_plus", client.describe())
+            return None
+        if parsed_cache and PlaylistCache.read_hash(parsed_cache) != text_hash:
+            self._store_cached_playlist(parsed_cache, text_hash, channels)
+        return channels
+
+    def _load_or_parse_playlist_file(
+        self,
+        path: str,
+        parsed_cache: Optional[str],
+        provider_meta: Optional[Dict[str, str]],
+        known_hash: Optional[str] = None,
+    ) -> Sequence:
+        if known_hash and parsed_cache:
+            # The raw file is unchanged since it was parsed; skip reading it.
+            channels = self._load_cached_playlist(parsed_cache, known_hash, provider_meta)
+            if channels is not None:
+                return channels
+        with open(path, "rb") as f:
+            raw = f.read()
+        text_hash = self._playlist_bytes_hash(raw)
+        channels = None
+        if parsed_cache and text_hash:
+            channels = self._load_cached_playlist(parsed_cache, text_hash, provider_meta)
+        if channels is None:
+            previous = self._previous_playlist_cache(parsed_cache, provider_meta)
+            parser = M3UStreamParser(
+                provider_meta, previous=previous.record_for_digest if previous is not None else None
+            )
+            channels = parser.feed(raw)
+            channels.extend(parser.close())
+            self._log_playlist_delta(parser, previous)
+            if parsed_cache and text_hash:
+                self._store_cached_playlist(parsed_cache, text_hash, channels, provider_meta, parser.digests)
+        return channels
+
+    def _playlist_bytes_hash(self, raw: bytes) -> str:
+        if not raw:
             return ""
-        return hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+        return hashlib.sha1(raw).hexdigest()
 
     def _parsed_cache_path_for_key(self, key: str) -> str:
         digest = hashlib.sha1(key.encode("utf-8", "surrogatepass")).hexdigest()
         cache_dir = get_cache_dir()
         os.makedirs(cache_dir, exist_ok=True)
-        return os.path.join(cache_dir, f"parsed_{digest}.json")
+        return os.path.join(cache_dir, f"parsed_{digest}.plc")
 
     def _load_cached_playlist(
         self,
@@ -2207,69 +2531,29 @@ class IPTVClient(wx.Frame):
         text_hash: Optional[str],
         provider_meta: Optional[Dict[str, str]] = None,
         skip_hash: bool = False,
-    ) -> Optional[List[Dict[str, str]]]:
-        try:
-            with open(cache_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if not skip_hash and text_hash is not None and data.get("hash") != text_hash:
-                return None
-            channels = data.get("channels")
-            if not isinstance(channels, list):
-                return None
-            if provider_meta:
-                pid = provider_meta.get("provider-id")
-                ptype = provider_meta.get("provider-type")
-                if pid or ptype:
-                    for ch in channels:
-                        if pid:
-                            ch["provider-id"] = pid
-                        if ptype:
-                            ch["provider-type"] = ptype
-            return channels
-        except Exception:
+    ) -> Optional[Sequence]:
+        if not skip_hash and text_hash is not None and PlaylistCache.read_hash(cache_path) != text_hash:
+            return None
+        cache = PlaylistCache.open(cache_path, provider_meta)
+        if cache is None:
             return None
+        return cache.records
 
     def _store_cached_playlist(
         self,
         cache_path: str,
         text_hash: str,
-        channels: List[Dict[str, str]],
+        channels: Sequence,
         provider_meta: Optional[Dict[str, str]] = None,
+        digests: Optional[bytes] = None,
     ) -> None:
-        payload = {"hash": text_hash, "channels": channels}
-        if provider_meta:
-            payload["provider"] = provider_meta
-        tmp_path = cache_path + ".tmp"
         try:
-            with open(tmp_path, "w", encoding="utf-8") as f:
-                json.dump(payload, f, separators=(",", ":"))
-            os.replace(tmp_path, cache_path)
-        except Exception:
-            try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-            except Exception:
-                pass
+            write_playlist_cache(cache_path, text_hash, channels, digests)
+        except Exception as e:
+            LOG.debug("Could not write playlist cache %s: %s", cache_path, e)
 
     def _extract_stream_id(self, url: str) -> str:
-        try:
-            path = urllib.parse.urlparse(url).path
-        except Exception:
-            path = ""
-        if not path:
-            return ""
-        parts = [p for p in path.split("/") if p]
-        if not parts:
-            return ""
-        last = parts[-1]
-        m = re.match(r"(\d+)", last)
-        if m:
-            return m.group(1)
-        if len(parts) >= 2:
-            m = re.match(r"(\d+)", parts[-2])
-            if m:
-                return m.group(1)
-        return ""
+        return extract_stream_id(url)
 
     def on_group_select(self):
         sel = self.group_list.GetSelection()
@@ -2281,108 +2565,26 @@ class IPTVClient(wx.Frame):
         self.current_group = grp
 
         source = self.all_channels if grp == "All Channels" else self.channels_by_group.get(grp, [])
-        self._populate_channel_list_chunked(source)
+        self._populate_channel_list(source)
 
-    def _populate_channel_list_chunked(self, source: List[Dict[str, str]]):
+    def _populate_channel_list(self, source: Sequence) -> None:
         self._populate_token += 1
-        token = self._populate_token
+        # The virtual list reads rows straight from ``source``; nothing is copied.
+        self.displayed = _ChannelRows(source)
+        self.channel_list.sync(reset=True)
 
-        self.displayed = []
-        self.channel_list.Freeze()
-        try:
-            self.channel_list.Clear()
-        finally:
-            try:
-                self.channel_list.Thaw()
-            except Exception:
-                pass
-
-        total = len(source)
-        if total == 0:
+        if not len(source):
             self.epg_display.SetValue("")
             self.url_display.SetValue("")
             self._maybe_autostart_epg_import()
             return
 
-        # For small lists, append in one shot for speed
-        if total <= 1500:
-            names = []
-            for ch in source:
-                self.displayed.append({"type": "channel", "data": ch})
-                names.append(ch.get("name", ""))
-            self.channel_list.Freeze()
-            try:
-                if names:
-                    self.channel_list.AppendItems(names)
-            finally:
-                try:
-                    self.channel_list.Thaw()
-                except Exception:
-                    pass
-            self.channel_list.SetSelection(0)
-            # Only set focus if window is visible (avoid stealing focus from tray)
-            if self.IsShown() and not self.IsIconized():
-                self.channel_list.SetFocus()
-            self.on_highlight()
-            self._maybe_autostart_epg_import()
-            return
-
-        # For large lists, add in batches to keep UI responsive
-        batch = 800 if total > 8000 else 500
-        idx = 0
-
-        # Provide a minimal immediate preview
-        preview_end = min(200, total)
-        preview_names = []
-        for ch in source[:preview_end]:
-            self.displayed.append({"type": "channel", "data": ch})
-            preview_names.append(ch.get("name", ""))
-        self.channel_list.Freeze()
-        try:
-            if preview_names:
-                self.channel_list.AppendItems(preview_names)
-        finally:
-            try:
-                self.channel_list.Thaw()
-            except Exception:
-                pass
         self.channel_list.SetSelection(0)
         # Only set focus if window is visible (avoid stealing focus from tray)
         if self.IsShown() and not self.IsIconized():
             self.channel_list.SetFocus()
         self.on_highlight()
-        idx = preview_end
-        self.epg_display.SetValue(f"Loading channels… {idx}/{total}")
-
-        def add_next_chunk():
-            nonlocal idx
-            if token != self._populate_token:
-                return  # canceled due to group/filter change
-            end = min(idx + batch, total)
-            names = []
-            for ch in source[idx:end]:
-                self.displayed.append({"type": "channel", "data": ch})
-                names.append(ch.get("name", ""))
-            if names:
-                self.channel_list.Freeze()
-                try:
-                    self.channel_list.AppendItems(names)
-                finally:
-                    try:
-                        self.channel_list.Thaw()
-                    except Exception:
-                        pass
-            idx = end
-            if idx >= total or token != self._populate_token:
-                if token == self._populate_token:
-                    self.epg_display.SetValue("")
-                    self._maybe_autostart_epg_import()
-                return
-            # update progress and schedule next chunk
-            self.epg_display.SetValue(f"Loading channels… {idx}/{total}")
-            wx.CallLater(30, add_next_chunk)  # 30ms between chunks keeps UI smooth
-
-        wx.CallLater(30, add_next_chunk)
+        self._maybe_autostart_epg_import()
 
     def _fmt_time(self, s):
         # s: "YYYYMMDDHHMMSS" (UTC)
@@ -2443,6 +2645,7 @@ class IPTVClient(wx.Frame):
         return False
 
     def on_highlight(self):
+        self._last_user_activity = time.time()
         # Allow viewing cached or currently available EPG even while an import is running.
         i = self.channel_list.GetSelection()
         if i < 0 or i >= len(self.displayed):
@@ -2453,13 +2656,13 @@ class IPTVClient(wx.Frame):
             ch = item["data"]
             self.url_display.SetValue(ch.get("url", ""))
             cname = ch.get("name", "")
+            if ch.get("provider-type") == "stalker":
+                self._prefetch_stalker_links(i)
 
             if not self.config.get("epg_enabled", True):
                 self.epg_display.SetValue("EPG is disabled in configuration.")
                 return
 
-            self._start_epg_poll_timer()
-
             # If this channel is exempt (likely has no EPG), show a clear message and do not fetch.
             if self._channel_is_epg_exempt(ch):
                 self.epg_display.SetValue("No EPG data for this channel.")
@@ -2496,11 +2699,8 @@ class IPTVClient(wx.Frame):
         elif item["type"] == "epg":
             self.url_display.SetValue("")
             r = item["data"]
-            url = ""
-            for ch in self.all_channels:
-                if canonicalize_name(ch["name"]) == canonicalize_name(r["channel_name"]):
-                    url = ch.get("url", "")
-                    break
+            ch = self._find_channel_for_epg(r)
+            url = ch.get("url", "") if ch else ""
             msg = (
                 f"Show: {r['show_title']} | Channel: {r['channel_name']} | "
                 f"Start: {self._fmt_time(r['start'])} | End: {self._fmt_time(r['end'])}"
@@ -2539,15 +2739,8 @@ class IPTVClient(wx.Frame):
                 
                 db = EPGDatabase(get_db_path(), readonly=True)
                 try:
-                    # Check match cache first
-                    cached_id = self._epg_match_cache.get(key)
-                    if cached_id is None:
-                        # Resolve and cache
-                        cached_id = db.resolve_best_channel_id(channel)
-                        # Cache even if None to avoid repeated expensive misses
-                        self._epg_match_cache[key] = cached_id or ""
-                    
-                    # If we have a valid ID (and it's not the empty string marker for 'no match')
+                    # Cached per canonical name, misses included, to avoid repeated expensive matching
+                    cached_id = self._resolve_epg_channel_id(db, channel)
                     if cached_id:
                         return db.get_now_next_by_id(cached_id)
                     return None
@@ -2561,12 +2754,34 @@ class IPTVClient(wx.Frame):
                 now_next = future.result()
             except Exception:
                 now_next = None
-            
+
+            if not now_next:
+                # Nothing imported for this channel yet: ask the panel directly.
+                provider_future = self._queue_provider_now_next(channel)
+                if provider_future is not None:
+                    provider_future.add_done_callback(_finish)
+                    return
+            _finish(now_next)
+
+        def _finish(now_next):
+            cancelled = False
+            if isinstance(now_next, concurrent.futures.Future):
+                if now_next.cancelled():
+                    # Dropped from the provider queue (scrolled past): nothing was fetched.
+                    cancelled = True
+                else:
+                    try:
+                        now_next = now_next.result()
+                    except Exception:
+                        now_next = None
+
             with self._epg_inflight_lock:
                 try:
                     self._epg_fetch_inflight.discard(key)
                 except Exception:
                     pass
+            if cancelled:
+                return
 
             if not now_next:
                 now_show, next_show = None, None
@@ -2575,12 +2790,24 @@ class IPTVClient(wx.Frame):
 
             with self.epg_cache_lock:
                 self.epg_cache[key] = (now_show, next_show, self._utc_now())
-            
+            self._epg_boundaries.update(key, now_show, next_show)
+
+            wx.CallAfter(self._arm_epg_boundary_timer)
             wx.CallAfter(self._update_epg_display_if_selected, channel, now_show, next_show)
 
         # Submit to executor instead of spawning raw thread
         self._epg_executor.submit(_do_work).add_done_callback(_on_done)
 
+    def _queue_provider_now_next(self, channel):
+        """Queue a provider-side now/next lookup for ``channel``, if its provider has one."""
+        if channel.get("provider-type") != "xtream":
+            return None
+        client = self.provider_clients.get(channel.get("provider-id"))
+        stream_id = channel.get("stream-id") or self._extract_stream_id(channel.get("url", ""))
+        if client is None or not stream_id or not hasattr(client, "queue_now_next"):
+            return None
+        return client.queue_now_next(stream_id)
+
     def _update_epg_display_if_selected(self, channel, now_show, next_show):
         i = self.channel_list.GetSelection()
         if 0 <= i < len(self.displayed):
@@ -2594,70 +2821,85 @@ class IPTVClient(wx.Frame):
                     msg = msg + "\n\nNote: EPG import in progress — newer program data may still arrive."
                 self.epg_display.SetValue(msg)
 
-    def _start_epg_poll_timer(self):
+    # Upper bound for a single boundary wait; re-arming hourly keeps the timer
+    # honest across clock changes and suspend/resume at negligible cost.
+    _EPG_BOUNDARY_MAX_WAIT_SECS = 60 * 60
+
+    def _arm_epg_boundary_timer(self):
+        """(Re)arm the one-shot timer for the earliest pending programme boundary."""
+        deadline = self._epg_boundaries.next_deadline()
+        if deadline is None:
+            self._cancel_epg_boundary_timer()
+            return
+        if self._epg_boundary_timer and self._epg_boundary_deadline is not None \
+                and self._epg_boundary_deadline <= deadline:
+            return
+        self._cancel_epg_boundary_timer()
+        wait = min(max(0.0, deadline - time.time()), self._EPG_BOUNDARY_MAX_WAIT_SECS)
         try:
-            if self._epg_poll_timer:
-                return
-            self._epg_poll_timer = wx.Timer(self)
-            # Bind with timer as source so we can unbind cleanly later
-            self.Bind(wx.EVT_TIMER, self._on_epg_poll_timer, self._epg_poll_timer)
-            # Poll less aggressively to avoid repeated expensive matching while importer churns.
-            self._epg_poll_timer.Start(8000, wx.TIMER_CONTINUOUS)  # 8s
+            self._epg_boundary_deadline = time.time() + wait
+            self._epg_boundary_timer = wx.CallLater(max(1, int(wait * 1000)), self._on_epg_boundary)
         except Exception:
-            self._epg_poll_timer = None
+            self._epg_boundary_timer = None
+            self._epg_boundary_deadline = None
 
-    def _stop_epg_poll_timer(self):
+    def _cancel_epg_boundary_timer(self):
+        if self._epg_boundary_timer:
+            try:
+                self._epg_boundary_timer.Stop()
+            except Exception:
+                pass
+        self._epg_boundary_timer = None
+        self._epg_boundary_deadline = None
+
+    def _highlighted_epg_channel(self) -> Optional[Dict[str, str]]:
+        """Return the highlighted channel if it is eligible for EPG lookups."""
+        if not self.config.get("epg_enabled", True):
+            return None
+        i = self.channel_list.GetSelection()
+        if i < 0 or i >= len(self.displayed):
+            return None
+        item = self.displayed[i]
+        if item["type"] != "channel":
+            return None
+        ch = item["data"]
+        # Skip channels that likely have no EPG to avoid repeated DB probes/log spam.
+        if self._channel_is_epg_exempt(ch):
+            return None
+        return ch
+
+    def _refresh_highlighted_epg(self, only_keys=None):
+        ch = self._highlighted_epg_channel()
+        if ch is None:
+            return
+        cname = ch.get("name", "")
+        if only_keys is not None and canonicalize_name(cname) not in only_keys:
+            return
+        # _fetch_and_cache_epg dedupes against in-flight lookups itself.
+        self._fetch_and_cache_epg(ch, cname)
+
+    def _on_epg_boundary(self):
+        self._epg_boundary_timer = None
+        self._epg_boundary_deadline = None
         try:
-            if self._epg_poll_timer:
-                try:
-                    self._epg_poll_timer.Stop()
-                except Exception:
-                    pass
-                # Unbind the specific handler for this timer source to avoid removing other EVT_TIMER bindings.
-                try:
-                    # Unbind signature: Unbind(event, source=timer, handler=callable)
-                    self.Unbind(wx.EVT_TIMER, handler=self._on_epg_poll_timer, source=self._epg_poll_timer)
-                except Exception:
-                    # Fallback: attempt to unbind by event only (best-effort)
-                    try:
-                        self.Unbind(wx.EVT_TIMER, handler=self._on_epg_poll_timer)
-                    except Exception:
-                        pass
-                self._epg_poll_timer = None
+            due = set(self._epg_boundaries.pop_due())
+            # Other cached channels are re-read lazily when highlighted, since
+            # _epg_cache_needs_refresh already treats a passed boundary as stale.
+            if due:
+                self._refresh_highlighted_epg(only_keys=due)
         except Exception:
-            self._epg_poll_timer = None
+            pass
+        self._arm_epg_boundary_timer()
 
-    def _on_epg_poll_timer(self, event):
-        # Only refresh the currently highlighted channel (cheap, targeted).
+    def _on_epg_import_committed(self):
+        """An importer source committed: retry misses and refresh the highlighted channel."""
         try:
-            # Skip background polling when the window is hidden/minimised to avoid idle CPU use.
-            if not self.IsShownOnScreen() or self.IsIconized():
-                return
-            i = self.channel_list.GetSelection()
-            if i < 0 or i >= len(self.displayed):
-                return
-            item = self.displayed[i]
-            if item["type"] != "channel":
-                return
-            ch = item["data"]
-            # Skip channels that likely have no EPG to avoid repeated DB probes/log spam.
-            if self._channel_is_epg_exempt(ch):
-                return
-            cname = ch.get("name", "")
-            key = canonicalize_name(cname)
             with self.epg_cache_lock:
-                cached = self.epg_cache.get(key)
-            if cached:
-                now_show, next_show, ts = cached
-                if not self._epg_cache_needs_refresh(now_show, next_show, ts):
-                    return
-            else:
-                now_show = next_show = ts = None
-            # Only spawn a refresh if one isn't already running for this channel.
-            with self._epg_inflight_lock:
-                already = key in self._epg_fetch_inflight
-            if not already:
-                threading.Thread(target=self._fetch_and_cache_epg, args=(ch, cname), daemon=True).start()
+                for key in [k for k, v in self.epg_cache.items() if not (v[0] or v[1])]:
+                    self.epg_cache.pop(key, None)
+            for key in [k for k, v in list(self._epg_match_cache.items()) if not v]:
+                self._epg_match_cache.pop(key, None)
+            self._refresh_highlighted_epg()
         except Exception:
             pass
 
@@ -2665,11 +2907,7 @@ class IPTVClient(wx.Frame):
         cname = show.get("channel_name", "")
         if not cname:
             return None
-        canonical = canonicalize_name(cname)
-        for ch in self.all_channels:
-            if canonicalize_name(ch.get("name", "")) == canonical:
-                return ch
-        return None
+        return self._get_channel_lookup().find_by_canonical_name(cname)
 
     def _channel_has_catchup(self, channel: Dict[str, str]) -> bool:
         if channel.get("catchup-source") or channel.get("catchup"):
@@ -2715,6 +2953,28 @@ class IPTVClient(wx.Frame):
         now = datetime.datetime.now(datetime.timezone.utc)
         return start_dt >= now - datetime.timedelta(days=span)
 
+    # Rows either side of the highlighted one whose portal links are pre-resolved.
+    _STALKER_PREFETCH_NEIGHBOURS = 2
+
+    def _prefetch_stalker_links(self, index: int) -> None:
+        """Resolve portal links for the highlighted row and its neighbours in the background."""
+        span = self._STALKER_PREFETCH_NEIGHBOURS
+        by_client: Dict[str, List[Dict]] = {}
+        # Farthest rows first: the client resolves the last ones submitted first.
+        for offset in sorted(range(-span, span + 1), key=abs, reverse=True):
+            row = index + offset
+            if not (0 <= row < len(self.displayed)):
+                continue
+            item = self.displayed[row]
+            if item["type"] != "channel" or item["data"].get("provider-type") != "stalker":
+                continue
+            ch = item["data"]
+            by_client.setdefault(ch.get("provider-id"), []).append(ch.get("provider-data") or {})
+        for provider_id, pdatas in by_client.items():
+            client = self.provider_clients.get(provider_id)
+            if client is not None and hasattr(client, "prefetch_links"):
+                client.prefetch_links(pdatas)
+
     def _resolve_live_url(self, channel: Dict[str, str]) -> str:
         url = channel.get("url", "")
         provider_type = channel.get("provider-type")
@@ -3043,12 +3303,16 @@ class IPTVClient(wx.Frame):
         self._launch_stream(url, title, stream_kind=stream_kind, channel=channel, show_internal_player=False)
 
     def _open_catchup_dialog(self, channel: Dict[str, str]):
-        programmes = self._get_catchup_programmes(channel)
-        if not programmes:
+        cursor = self._get_catchup_cursor(channel)
+        dlg = CatchupDialog(self, channel.get("name", ""), cursor) if cursor else None
+        if dlg is None or not dlg.programmes:
+            if dlg is not None:
+                dlg.Destroy()
+            if cursor:
+                cursor.close()
             wx.MessageBox("No catch-up programmes are available for this channel.",
                           "Catch-up", wx.OK | wx.ICON_INFORMATION)
             return
-        dlg = CatchupDialog(self, channel.get("name", ""), programmes)
         try:
             if dlg.ShowModal() == wx.ID_OK:
                 selected = dlg.get_selection()
@@ -3073,6 +3337,7 @@ class IPTVClient(wx.Frame):
                 self._launch_stream(url, display, stream_kind="catchup", channel=channel)
         finally:
             dlg.Destroy()
+            cursor.close()
 
     def show_cast_dialog(self, _):
         if self.caster.is_connected():
@@ -3100,16 +3365,27 @@ class IPTVClient(wx.Frame):
         dlg.Destroy()
 
 
-    def _get_catchup_programmes(self, channel: Dict[str, str]) -> List[Dict[str, str]]:
+    def _get_catchup_cursor(self, channel: Dict[str, str]):
+        """Open a backward schedule cursor bounded by the channel's catch-up window."""
+        db = None
         try:
             db = EPGDatabase(get_db_path(), readonly=True)
-            try:
-                programmes = db.get_recent_programmes(channel, hours=72, limit=80)
-            finally:
+            ch_id = self._resolve_epg_channel_id(db, channel)
+            if not ch_id:
                 db.close()
+                return None
+            try:
+                days = float(channel.get("catchup-days") or 0)
+            except (TypeError, ValueError):
+                days = 0
+            window = datetime.timedelta(days=days) if days > 0 else datetime.timedelta(hours=72)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            return db.schedule_cursor(ch_id, anchor=now, page_size=CatchupDialog.PAGE_SIZE,
+                                      not_before=now - window)
         except Exception:
-            programmes = []
-        return programmes
+            if db is not None:
+                db.close()
+            return None
 
 
 class CastDiscoveryDialog(wx.Dialog):
@@ -3280,19 +3556,39 @@ class CastDiscoveryDialog(wx.Dialog):
         return None
 
 
+def _format_programme_details(details) -> str:
+    """Screen-reader friendly text for a ProgrammeDetails row (or a placeholder)."""
+    if not details:
+        return "No further details for this programme."
+    lines = []
+    heading = " – ".join(part for part in (details.episode, details.sub_title) if part)
+    if heading:
+        lines.append(heading)
+    if details.categories:
+        lines.append("Category: " + ", ".join(details.categories))
+    if details.description:
+        lines.append(details.description)
+    return "\n".join(lines)
+
+
 class CatchupDialog(wx.Dialog):
-    def __init__(self, parent, channel_name: str, programmes: List[Dict[str, str]]):
+    PAGE_SIZE = 40
+
+    def __init__(self, parent, channel_name: str, cursor):
         title = channel_name or "Catch-up"
         super().__init__(parent, title=f"Catch-up: {title}", size=(520, 360))
-        self.programmes = programmes
+        self.cursor = cursor
+        self.programmes: List[ProgrammeRow] = []
         panel = wx.Panel(self)
         sizer = wx.BoxSizer(wx.VERTICAL)
         intro = wx.StaticText(panel, label="Select a programme to play from catch-up:")
         self.listbox = wx.ListBox(panel, style=wx.LB_SINGLE)
-        for prog in programmes:
-            self.listbox.Append(self._format_programme(prog))
-        if programmes:
+        self.details = wx.TextCtrl(panel, style=wx.TE_MULTILINE | wx.TE_READONLY, size=(-1, 80))
+        self.details.SetName("Programme details")
+        self._load_older()
+        if self.programmes:
             self.listbox.SetSelection(0)
+            self._show_details(0)
         btn_sizer = wx.BoxSizer(wx.HORIZONTAL)
         ok_btn = wx.Button(panel, id=wx.ID_OK, label="Play")
         cancel_btn = wx.Button(panel, id=wx.ID_CANCEL)
@@ -3300,26 +3596,58 @@ class CatchupDialog(wx.Dialog):
         btn_sizer.Add(cancel_btn, 0, wx.ALL, 5)
         sizer.Add(intro, 0, wx.ALL, 10)
         sizer.Add(self.listbox, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(self.details, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
         sizer.Add(btn_sizer, 0, wx.ALIGN_RIGHT | wx.ALL, 10)
         panel.SetSizer(sizer)
+        self.listbox.Bind(wx.EVT_LISTBOX, self._on_listbox_select)
         self.listbox.Bind(wx.EVT_LISTBOX_DCLICK, self._on_listbox_activate)
         ok_btn.Bind(wx.EVT_BUTTON, self._on_ok)
         self.SetMinSize((420, 320))
         self.Layout()
         self.CenterOnParent()
 
-    def _format_programme(self, prog: Dict[str, str]) -> str:
+    def _load_older(self):
+        """Append the next page of older programmes (list is newest first)."""
+        now_str = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d%H%M%S")
+        while not self.cursor.at_start:
+            page = [row for row in reversed(self.cursor.prev_page()) if row.end <= now_str]
+            if not page:
+                continue
+            self.programmes.extend(page)
+            self.listbox.AppendItems([self._format_programme(row) for row in page])
+            return
+
+    def _format_programme(self, prog: ProgrammeRow) -> str:
         try:
-            start = datetime.datetime.strptime(prog.get("start", ""), "%Y%m%d%H%M%S").replace(tzinfo=datetime.timezone.utc)
-            end = datetime.datetime.strptime(prog.get("end", ""), "%Y%m%d%H%M%S").replace(tzinfo=datetime.timezone.utc)
+            start = datetime.datetime.strptime(prog.start, "%Y%m%d%H%M%S").replace(tzinfo=datetime.timezone.utc)
+            end = datetime.datetime.strptime(prog.end, "%Y%m%d%H%M%S").replace(tzinfo=datetime.timezone.utc)
             start_local = utc_to_local(start)
             end_local = utc_to_local(end)
             window = f"{start_local.strftime('%Y-%m-%d %H:%M')} – {end_local.strftime('%H:%M')}"
         except Exception:
-            window = prog.get("start", "")
-        title = prog.get("title", "") or "(No title)"
+            window = prog.start
+        title = prog.title or "(No title)"
         return f"{window}  |  {title}"
 
+    def _show_details(self, idx: int):
+        if not (0 <= idx < len(self.programmes)):
+            self.details.SetValue("")
+            return
+        row = self.programmes[idx]
+        try:
+            details = self.cursor.db.get_programme_details(self.cursor.channel_id, row.start, row.end)
+        except Exception:
+            details = None
+        self.details.SetValue(_format_programme_details(details))
+
+    def _on_listbox_select(self, event):
+        idx = event.GetSelection()
+        self._show_details(idx)
+        # Reaching the oldest loaded row pulls in the next page.
+        if idx >= len(self.programmes) - 1:
+            self._load_older()
+        event.Skip()
+
     def _on_listbox_activate(self, _):
         if self.programmes:
             self.EndModal(wx.ID_OK)
@@ -3335,7 +3663,118 @@ class CatchupDialog(wx.Dialog):
         idx = self.listbox.GetSelection()
         if idx == wx.NOT_FOUND or idx >= len(self.programmes):
             return None
-        return self.programmes[idx]
+        row = self.programmes[idx]
+        return {
+            "channel_id": self.cursor.channel_id,
+            "title": row.title,
+            "start": row.start,
+            "end": row.end,
+        }
+
+
+class ProviderHealthDialog(wx.Dialog):
+    """Per-provider latency, error and channel-count summary with JSON export."""
+
+    COLUMNS = (
+        ("Provider", 200), ("Requests", 70), ("Errors", 60), ("Median", 70), ("95th", 70),
+        ("TTFB", 70), ("Connect", 70), ("DNS", 60), ("Data", 80), ("Channels", 70),
+        ("Last load", 80), ("Last error", 160),
+    )
+
+    def __init__(self, parent, metrics):
+        super().__init__(parent, title="Provider Health", size=(900, 420),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.metrics = metrics
+        panel = wx.Panel(self)
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        intro = wx.StaticText(panel, label="Recent provider requests (times in seconds):")
+        self.list = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        self.list.SetName("Provider health")
+        for col, (label, width) in enumerate(self.COLUMNS):
+            self.list.InsertColumn(col, label, width=width)
+        btn_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        refresh_btn = wx.Button(panel, label="&Refresh")
+        export_btn = wx.Button(panel, label="&Export JSON...")
+        clear_btn = wx.Button(panel, label="C&lear")
+        close_btn = wx.Button(panel, id=wx.ID_CLOSE)
+        for btn in (refresh_btn, export_btn, clear_btn, close_btn):
+            btn_sizer.Add(btn, 0, wx.ALL, 5)
+        sizer.Add(intro, 0, wx.ALL, 10)
+        sizer.Add(self.list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(btn_sizer, 0, wx.ALIGN_RIGHT | wx.ALL, 5)
+        panel.SetSizer(sizer)
+        refresh_btn.Bind(wx.EVT_BUTTON, lambda _: self._populate())
+        export_btn.Bind(wx.EVT_BUTTON, self._on_export)
+        clear_btn.Bind(wx.EVT_BUTTON, self._on_clear)
+        close_btn.Bind(wx.EVT_BUTTON, lambda _: self.EndModal(wx.ID_CLOSE))
+        self.SetEscapeId(wx.ID_CLOSE)
+        self._populate()
+        self.Layout()
+        self.CenterOnParent()
+        self.list.SetFocus()
+
+    @staticmethod
+    def _secs(value) -> str:
+        return "–" if value is None else f"{value:.2f}"
+
+    @staticmethod
+    def _size(num: int) -> str:
+        for unit in ("B", "KB", "MB"):
+            if num < 1024:
+                return f"{num:.0f} {unit}"
+            num /= 1024.0
+        return f"{num:.1f} GB"
+
+    def _populate(self) -> None:
+        self.list.DeleteAllItems()
+        providers = self.metrics.providers()
+        if not providers:
+            self.list.InsertItem(0, "No provider requests recorded yet.")
+            return
+        for row, name in enumerate(providers):
+            info = self.metrics.summary(name)
+            if info["last_load_ok"] is None:
+                last_load = "–"
+            elif info["last_load_ok"]:
+                last_load = self._secs(info["load_seconds"])
+            else:
+                last_load = "failed"
+            values = (
+                name,
+                str(info["requests"]),
+                str(info["errors"]),
+                self._secs(info["total_p50"]),
+                self._secs(info["total_p95"]),
+                self._secs(info["ttfb_avg"]),
+                self._secs(info["connect_avg"]),
+                self._secs(info["dns_avg"]),
+                self._size(info["bytes"]),
+                "–" if info["channels"] is None else str(info["channels"]),
+                last_load,
+                info["last_error"] or "",
+            )
+            self.list.InsertItem(row, values[0])
+            for col, value in enumerate(values[1:], start=1):
+                self.list.SetItem(row, col, value)
+        self.list.Select(0)
+        self.list.Focus(0)
+
+    def _on_export(self, _):
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        with wx.FileDialog(self, "Export provider metrics", defaultFile=f"provider-health-{stamp}.json",
+                           wildcard="JSON files (*.json)|*.json",
+                           style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            path = dlg.GetPath()
+        try:
+            self.metrics.export_json(path)
+        except OSError as e:
+            wx.MessageBox(f"Could not export metrics:\n{e}", "Export Failed", wx.OK | wx.ICON_ERROR)
+
+    def _on_clear(self, _):
+        self.metrics.clear()
+        self._populate()
 
 
 class WhatsOnNowDialog(wx.Dialog):
@@ -3510,6 +3949,81 @@ class WhatsOnNowDialog(wx.Dialog):
         return self.filtered_programs[idx]
 
 
+class _ChannelRows(Sequence):
+    """``self.displayed`` rows for a plain group view, built on access."""
+
+    __slots__ = ("source",)
+
+    def __init__(self, source: Sequence):
+        self.source = source
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [{"type": "channel", "data": ch} for ch in self.source[idx]]
+        return {"type": "channel", "data": self.source[idx]}
+
+
+class _VirtualChannelList(wx.ListCtrl):
+    """Virtual list control for the main channel list.
+
+    Row text comes from ``frame.displayed`` on demand, so showing a group is
+    a single ``SetItemCount`` whatever its size.  A ListBox-style
+    ``GetSelection``/``SetSelection``/``GetCount`` keeps the frame's call
+    sites unchanged.
+    """
+
+    def __init__(self, parent, frame):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_NO_HEADER | wx.LC_SINGLE_SEL | wx.LC_VIRTUAL)
+        self.frame = frame
+        self.is_selecting = False
+        self.InsertColumn(0, "Channel")
+        self.Bind(wx.EVT_SIZE, self._on_size)
+
+    def _on_size(self, event):
+        event.Skip()
+        width = self.GetClientSize().width
+        if width > 0:
+            self.SetColumnWidth(0, width)
+
+    def OnGetItemText(self, item, column):
+        return self.frame._channel_row_text(item)
+
+    def sync(self, reset: bool = False) -> None:
+        """Match the row count to ``frame.displayed``; ``reset`` also drops the selection."""
+        if reset:
+            sel = self.GetFirstSelected()
+            if sel != -1:
+                self.Select(sel, False)
+        count = len(self.frame.displayed)
+        if self.GetItemCount() != count:
+            self.SetItemCount(count)
+        if count:
+            self.RefreshItems(0, count - 1)
+
+    def GetCount(self) -> int:
+        return self.GetItemCount()
+
+    def GetSelection(self) -> int:
+        idx = self.GetFirstSelected()
+        return idx if idx != -1 else wx.NOT_FOUND
+
+    def SetSelection(self, idx: int) -> None:
+        if not 0 <= idx < self.GetItemCount():
+            return
+        self.is_selecting = True
+        try:
+            cur = self.GetFirstSelected()
+            if cur not in (-1, idx):
+                self.Select(cur, False)
+            self.Select(idx)
+            self.Focus(idx)
+        finally:
+            self.is_selecting = False
+
+
 class _VirtualWhatsOnList(wx.ListCtrl):
     """Virtual list control for fast loading of What's on Now."""
     
@@ -3526,22 +4040,53 @@ class _VirtualWhatsOnList(wx.ListCtrl):
         return ""
 
 
+class _VirtualScheduleList(wx.ListCtrl):
+    """Virtual list control for the paged channel schedule."""
+
+    def __init__(self, parent, dialog):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_SINGLE_SEL | wx.LC_VIRTUAL)
+        self.dialog = dialog
+        self._now_attr = wx.ItemAttr()
+        font = self.GetFont()
+        font.SetWeight(wx.FONTWEIGHT_BOLD)
+        self._now_attr.SetFont(font)
+
+    def OnGetItemText(self, item, column):
+        if 0 <= item < len(self.dialog.rows):
+            return self.dialog.cell_text(self.dialog.rows[item], column)
+        return ""
+
+    def OnGetItemAttr(self, item):
+        if 0 <= item < len(self.dialog.rows) and self.dialog.is_airing(self.dialog.rows[item]):
+            return self._now_attr
+        return None
+
+
 class ChannelEPGDialog(wx.Dialog):
-    def __init__(self, parent, channel_name: str, programmes: List[Dict[str, str]]):
+    PAGE_SIZE = 50
+
+    def __init__(self, parent, channel_name: str, cursor):
         super().__init__(parent, title=f"EPG: {channel_name}", size=(600, 450))
+        self.cursor = cursor
+        self.rows: List[ProgrammeRow] = []
         
         panel = wx.Panel(self)
         sizer = wx.BoxSizer(wx.VERTICAL)
         
-        self.list_ctrl = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        self.list_ctrl = _VirtualScheduleList(panel, self)
         self.list_ctrl.InsertColumn(0, "Time", width=140)
         self.list_ctrl.InsertColumn(1, "Title", width=400)
         
-        self._populate_list(programmes)
+        self.details = wx.TextCtrl(panel, style=wx.TE_MULTILINE | wx.TE_READONLY, size=(-1, 90))
+        self.details.SetName("Programme details")
+        
+        self._load_initial()
+        self.list_ctrl.Bind(wx.EVT_LIST_ITEM_FOCUSED, self._on_item_focused)
         
         close_btn = wx.Button(panel, id=wx.ID_CANCEL, label="Close")
         
         sizer.Add(self.list_ctrl, 1, wx.EXPAND | wx.ALL, 10)
+        sizer.Add(self.details, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
         sizer.Add(close_btn, 0, wx.ALIGN_RIGHT | wx.ALL, 10)
         
         panel.SetSizer(sizer)
@@ -3549,30 +4094,70 @@ class ChannelEPGDialog(wx.Dialog):
         self.Layout()
         self.CenterOnParent()
 
-    def _populate_list(self, programmes):
-        for prog in programmes:
-            try:
-                start = datetime.datetime.strptime(prog.get("start", ""), "%Y%m%d%H%M%S").replace(tzinfo=datetime.timezone.utc)
-                end = datetime.datetime.strptime(prog.get("end", ""), "%Y%m%d%H%M%S").replace(tzinfo=datetime.timezone.utc)
-                start_local = utc_to_local(start)
-                end_local = utc_to_local(end)
-                time_str = f"{start_local.strftime('%H:%M')} - {end_local.strftime('%H:%M')}"
-                
-                # Check if this program is currently airing
-                now = datetime.datetime.now(datetime.timezone.utc)
-                is_now = start <= now <= end
-                
-                idx = self.list_ctrl.InsertItem(self.list_ctrl.GetItemCount(), time_str)
-                self.list_ctrl.SetItem(idx, 1, prog.get("title", ""))
-                
-                if is_now:
-                    # Highlight current program (bold font)
-                    font = self.list_ctrl.GetItemFont(idx)
-                    font.SetWeight(wx.FONTWEIGHT_BOLD)
-                    self.list_ctrl.SetItemFont(idx, font)
-                    self.list_ctrl.EnsureVisible(idx)
-            except Exception:
-                pass
+    def _load_initial(self):
+        earlier = self.cursor.prev_page()
+        later = self.cursor.next_page()
+        self.rows = earlier + later
+        self.list_ctrl.SetItemCount(len(self.rows))
+        if self.rows:
+            # Start on the programme airing now (first row of the forward page).
+            idx = min(len(earlier), len(self.rows) - 1)
+            self._focus_row(idx)
+            self._show_details(idx)
+
+    def _focus_row(self, idx: int):
+        self.list_ctrl.Select(idx)
+        self.list_ctrl.Focus(idx)
+        self.list_ctrl.EnsureVisible(idx)
+
+    def _show_details(self, idx: int):
+        if not (0 <= idx < len(self.rows)):
+            self.details.SetValue("")
+            return
+        row = self.rows[idx]
+        try:
+            details = self.cursor.db.get_programme_details(self.cursor.channel_id, row.start, row.end)
+        except Exception:
+            details = None
+        self.details.SetValue(_format_programme_details(details))
+
+    def _on_item_focused(self, event):
+        idx = event.GetIndex()
+        event.Skip()
+        self._show_details(idx)
+        if idx >= len(self.rows) - 1 and not self.cursor.at_end:
+            later = self.cursor.next_page()
+            if later:
+                self.rows.extend(later)
+                self.list_ctrl.SetItemCount(len(self.rows))
+        elif idx <= 0 and not self.cursor.at_start:
+            earlier = self.cursor.prev_page()
+            if earlier:
+                self.rows[:0] = earlier
+                self.list_ctrl.SetItemCount(len(self.rows))
+                # Keep the same programme under focus after prepending.
+                wx.CallAfter(self._focus_row, len(earlier))
+
+    def _parse_row_times(self, row: ProgrammeRow):
+        start = datetime.datetime.strptime(row.start, "%Y%m%d%H%M%S").replace(tzinfo=datetime.timezone.utc)
+        end = datetime.datetime.strptime(row.end, "%Y%m%d%H%M%S").replace(tzinfo=datetime.timezone.utc)
+        return start, end
+
+    def cell_text(self, row: ProgrammeRow, column: int) -> str:
+        if column == 1:
+            return row.title
+        try:
+            start, end = self._parse_row_times(row)
+            start_local = utc_to_local(start)
+            end_local = utc_to_local(end)
+            # Paging spans days, so the date prefix keeps rows unambiguous.
+            return f"{start_local.strftime('%a %H:%M')} - {end_local.strftime('%H:%M')}"
+        except Exception:
+            return row.start
+
+    def is_airing(self, row: ProgrammeRow) -> bool:
+        now_str = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d%H%M%S")
+        return row.start <= now_str < row.end
 
 if __name__ == "__main__":
     set_linux_env()
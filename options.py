@@ -344,6 +344,36 @@ def get_cache_path_for_url(url):
     h = hashlib.sha1(url.encode("utf-8")).hexdigest()
     return os.path.join(get_cache_dir(), f"{h}.m3u")
 
+def get_cache_validators_path(cache_path):
+    return cache_path + ".meta"
+
+def load_cache_validators(cache_path) -> Dict[str, str]:
+    """Return the stored ETag/Last-Modified (and body hash) for a cached download."""
+    try:
+        with open(get_cache_validators_path(cache_path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {k: str(v) for k, v in data.items() if k in ("etag", "last_modified", "hash") and v}
+
+def save_cache_validators(cache_path, etag=None, last_modified=None, body_hash=None):
+    data = {"etag": etag, "last_modified": last_modified, "hash": body_hash}
+    data = {k: v for k, v in data.items() if v}
+    path = get_cache_validators_path(cache_path)
+    try:
+        if not data:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        pass
+
 def get_db_path():
     return os.path.join(tempfile.gettempdir(), "epg.db")
 
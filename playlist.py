@@ -14,10 +14,13 @@ import logging.handlers
 import tempfile
 import random
 import hashlib
+import json
 import threading
+import zlib
 from http.client import IncompleteRead
+from http_client import urlopen
 from providers import generate_provider_id
-from typing import Dict, List, Optional, Tuple, Set
+from typing import Dict, List, NamedTuple, Optional, Tuple, Set
 
 import sys
 
@@ -824,11 +827,117 @@ def _calc_end_from_length_or_duration(start_utc: Optional[str], elem: ET.Element
     except Exception:
         return None
 
+# =========================
+# Programme details (desc/category/episode), stored compressed
+# =========================
+
+class ProgrammeDetails(NamedTuple):
+    description: str
+    sub_title: str
+    categories: Tuple[str, ...]
+    episode: str
+
+
+# Blob layout: one format byte, then compact JSON (raw or zlib'd with a preset
+# dictionary of the keys and common category words so short rows still shrink).
+_DETAILS_RAW = b"j"
+_DETAILS_ZLIB = b"z"
+_DETAILS_ZDICT = (
+    b'{"d":"","s":"","c":[],"e":""} News Sport Movie Film Series Drama Comedy Documentary '
+    b'Entertainment Kids Children Music Talk Reality Lifestyle Season Episode the and of in to with '
+)
+
+
+def _xmltv_episode_text(elem: ET.Element) -> str:
+    """Prefer the provider's on-screen label; otherwise render xmltv_ns as "S1 E5"."""
+    xmltv_ns = ""
+    for ep in elem.findall("./episode-num"):
+        text = (ep.text or "").strip()
+        if not text:
+            continue
+        system = (ep.get("system") or "").strip().lower()
+        if system == "onscreen":
+            return text
+        if system == "xmltv_ns" and not xmltv_ns:
+            xmltv_ns = text
+    if not xmltv_ns:
+        return ""
+    parts = [p.split("/")[0].strip() for p in xmltv_ns.split(".")]
+    label = []
+    for prefix, idx in (("S", 0), ("E", 1)):
+        if len(parts) > idx and parts[idx].isdigit():
+            label.append(f"{prefix}{int(parts[idx]) + 1}")
+    return " ".join(label)
+
+
+def _programme_details_from_elem(elem: ET.Element) -> Optional[ProgrammeDetails]:
+    def _first_text(tag: str) -> str:
+        node = elem.find(tag)
+        return node.text.strip() if node is not None and node.text else ""
+
+    categories = []
+    for cat in elem.findall("./category"):
+        text = (cat.text or "").strip()
+        if text and text not in categories:
+            categories.append(text)
+    details = ProgrammeDetails(
+        description=_first_text("./desc"),
+        sub_title=_first_text("./sub-title"),
+        categories=tuple(categories),
+        episode=_xmltv_episode_text(elem),
+    )
+    if not (details.description or details.sub_title or details.categories or details.episode):
+        return None
+    return details
+
+
+def _encode_programme_details(details: ProgrammeDetails) -> bytes:
+    payload = {}
+    if details.description:
+        payload["d"] = details.description
+    if details.sub_title:
+        payload["s"] = details.sub_title
+    if details.categories:
+        payload["c"] = list(details.categories)
+    if details.episode:
+        payload["e"] = details.episode
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    comp = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=_DETAILS_ZDICT)
+    packed = comp.compress(raw) + comp.flush()
+    if len(packed) < len(raw):
+        return _DETAILS_ZLIB + packed
+    return _DETAILS_RAW + raw
+
+
+def _decode_programme_details(blob: bytes) -> Optional[ProgrammeDetails]:
+    if not blob:
+        return None
+    blob = bytes(blob)
+    kind, body = blob[:1], blob[1:]
+    try:
+        if kind == _DETAILS_ZLIB:
+            decomp = zlib.decompressobj(-15, zdict=_DETAILS_ZDICT)
+            body = decomp.decompress(body) + decomp.flush()
+        elif kind != _DETAILS_RAW:
+            return None
+        payload = json.loads(body.decode("utf-8"))
+    except Exception:
+        return None
+    return ProgrammeDetails(
+        description=payload.get("d", ""),
+        sub_title=payload.get("s", ""),
+        categories=tuple(payload.get("c") or ()),
+        episode=payload.get("e", ""),
+    )
+
 # =========================
 # DB PRAGMAs
 # =========================
 
 PRAGMA_IMPORT = [
+    # Must precede journal_mode so brand-new databases are created incremental;
+    # existing ones are converted by EPGDatabase.run_maintenance(allow_vacuum=True).
+    "PRAGMA auto_vacuum=INCREMENTAL;",
     "PRAGMA journal_mode=WAL;",
     "PRAGMA synchronous=NORMAL;",
     "PRAGMA temp_store=MEMORY;",
@@ -847,6 +956,13 @@ PRAGMA_READONLY = [
 # EPG Database
 # =========================
 
+class ProgrammeRow(NamedTuple):
+    """Compact schedule row; times are UTC ``YYYYMMDDHHMMSS`` strings."""
+    start: str
+    end: str
+    title: str
+
+
 class EPGDatabase:
     def __init__(self, db_path: str, readonly: bool = False, for_threading: bool = False):
         self.db_path = db_path
@@ -877,7 +993,9 @@ class EPGDatabase:
                     self.conn.execute(p)
                 except Exception:
                     pass
-        self._create_tables()
+        if not self.readonly:
+            # Read-only connections cannot run DDL; the writer owns the schema.
+            self._create_tables()
         # Opportunistic repair: if we can write, reconcile any region mismatches
         # caused by ambiguous display names (e.g., "CA" for California vs Canada).
         if not self.readonly:
@@ -913,6 +1031,13 @@ class EPGDatabase:
         c.execute("CREATE INDEX IF NOT EXISTS idx_programmes_channel_end ON programmes (channel_id, end)")
         c.execute("CREATE INDEX IF NOT EXISTS idx_programmes_channel_start_end ON programmes (channel_id, start, end)")
         c.execute("CREATE INDEX IF NOT EXISTS idx_programmes_title ON programmes (title)")
+        # Optional per-programme metadata lives apart from the hot now/next table.
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS programme_details (
+                programme_id INTEGER PRIMARY KEY,
+                data BLOB
+            )
+        """)
         c.execute("CREATE INDEX IF NOT EXISTS idx_channels_norm ON channels (norm_name)")
         self.conn.commit()
 
@@ -997,21 +1122,164 @@ class EPGDatabase:
         except Exception as e:
             _logger.debug("Norm-name repair failed: %s", e)
 
-    def insert_programme(self, channel_id: str, title: str, start_utc: str, end_utc: str):
+    def insert_programme(self, channel_id: str, title: str, start_utc: str, end_utc: str,
+                         details: Optional[ProgrammeDetails] = None):
         c = self.conn.cursor()
         c.execute("INSERT OR IGNORE INTO programmes (channel_id, title, start, end) VALUES (?, ?, ?, ?)",
                   (channel_id, title, start_utc, end_utc))
+        if details is None:
+            return
+        if c.rowcount == 1:
+            programme_id = c.lastrowid
+        else:
+            # Re-import of an existing slot: refresh its details in place.
+            row = c.execute(
+                "SELECT id FROM programmes WHERE channel_id = ? AND start = ? AND end = ?",
+                (channel_id, start_utc, end_utc)
+            ).fetchone()
+            programme_id = row[0] if row else None
+        if programme_id is not None:
+            c.execute(
+                "INSERT OR REPLACE INTO programme_details (programme_id, data) VALUES (?, ?)",
+                (programme_id, _encode_programme_details(details))
+            )
 
     def prune_old_programmes(self, days: int = 7):
         utcnow = self._utcnow()
         cutoff = (utcnow - datetime.timedelta(days=days)).strftime("%Y%m%d%H%M%S")
         c = self.conn.cursor()
+        c.execute(
+            "DELETE FROM programme_details WHERE programme_id IN (SELECT id FROM programmes WHERE end < ?)",
+            (cutoff,)
+        )
         c.execute("DELETE FROM programmes WHERE end < ?", (cutoff,))
         self.conn.commit()
 
+    def get_programme_details_by_id(self, programme_id: int) -> Optional[ProgrammeDetails]:
+        try:
+            row = self.conn.execute(
+                "SELECT data FROM programme_details WHERE programme_id = ?", (programme_id,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # Database written before programme details existed: nothing to show.
+            return None
+        return _decode_programme_details(row[0]) if row else None
+
+    def get_programme_details(self, channel_id: str, start_utc: str, end_utc: str) -> Optional[ProgrammeDetails]:
+        """Lazily fetch description/category/episode for one schedule row."""
+        if not channel_id:
+            return None
+        try:
+            row = self.conn.execute(
+                """
+                SELECT d.data FROM programmes p
+                JOIN programme_details d ON d.programme_id = p.id
+                WHERE p.channel_id = ? AND p.start = ? AND p.end = ?
+                """,
+                (channel_id, start_utc, end_utc)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return _decode_programme_details(row[0]) if row else None
+
     def commit(self):
         self.conn.commit()
 
+    # ---------- Storage maintenance (time-boxed, run when idle) ----------
+    MAINT_VACUUM_STEP_PAGES = 256
+
+    def storage_stats(self) -> Dict[str, int]:
+        """Return DB/WAL sizes and page counts for logging."""
+        c = self.conn.cursor()
+        page_size = int(c.execute("PRAGMA page_size").fetchone()[0])
+        page_count = int(c.execute("PRAGMA page_count").fetchone()[0])
+        freelist = int(c.execute("PRAGMA freelist_count").fetchone()[0])
+        auto_vacuum = int(c.execute("PRAGMA auto_vacuum").fetchone()[0])
+        try:
+            wal_bytes = os.path.getsize(self.db_path + "-wal")
+        except OSError:
+            wal_bytes = 0
+        return {
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_pages": freelist,
+            "db_bytes": page_size * page_count,
+            "wal_bytes": wal_bytes,
+            "auto_vacuum": auto_vacuum,
+        }
+
+    def _log_storage_stats(self, label: str, stats: Dict[str, int]):
+        _logger.info(
+            "EPG MAINT %s db=%.1fMB freelist=%d pages (%.1fMB) wal=%.1fMB auto_vacuum=%d",
+            label, stats["db_bytes"] / 1048576.0, stats["freelist_pages"],
+            stats["freelist_pages"] * stats["page_size"] / 1048576.0,
+            stats["wal_bytes"] / 1048576.0, stats["auto_vacuum"],
+        )
+
+    def run_maintenance(self, budget_secs: float = 0.5, allow_vacuum: bool = False) -> bool:
+        """One time-boxed maintenance pass; returns True while work remains.
+
+        Order: refresh planner stats (``PRAGMA optimize`` with a bounded
+        ``analysis_limit``), reclaim free pages in small
+        ``incremental_vacuum`` steps, then checkpoint the WAL. Each step is a
+        short write so readers never wait long; the caller repeats the pass
+        while it reports more work.
+
+        A database created before auto_vacuum=INCREMENTAL needs one full
+        ``VACUUM`` to convert, which is not time-boxed; it only runs with
+        ``allow_vacuum`` (the user's "Compact EPG Database" action), and a
+        conversion that cannot run raises ``sqlite3.OperationalError``.
+        """
+        if self.readonly:
+            return False
+        deadline = time.monotonic() + max(0.05, float(budget_secs))
+        c = self.conn.cursor()
+        before = self.storage_stats()
+        self._log_storage_stats("before", before)
+        try:
+            c.execute("PRAGMA analysis_limit=400;")
+            c.execute("PRAGMA optimize;")
+        except sqlite3.OperationalError as e:
+            _logger.debug("EPG MAINT optimize skipped: %s", e)
+
+        if before["auto_vacuum"] != 2 and allow_vacuum:
+            try:
+                self.conn.commit()
+                c.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+                c.execute("VACUUM;")
+                _logger.info("EPG MAINT converted to auto_vacuum=INCREMENTAL")
+            except sqlite3.OperationalError as e:
+                _logger.info("EPG MAINT auto_vacuum conversion failed: %s", e)
+                raise
+
+        more = False
+        if self.storage_stats()["auto_vacuum"] == 2:
+            while time.monotonic() < deadline:
+                free = int(c.execute("PRAGMA freelist_count").fetchone()[0])
+                if free <= 0:
+                    break
+                try:
+                    c.execute(f"PRAGMA incremental_vacuum({int(self.MAINT_VACUUM_STEP_PAGES)});").fetchall()
+                    self.conn.commit()
+                except sqlite3.OperationalError as e:
+                    _logger.debug("EPG MAINT incremental_vacuum busy: %s", e)
+                    more = True
+                    break
+            else:
+                more = int(c.execute("PRAGMA freelist_count").fetchone()[0]) > 0
+
+        try:
+            busy = c.execute("PRAGMA wal_checkpoint(TRUNCATE);").fetchone()
+            if busy and busy[0]:
+                # Readers pinned the WAL; settle for a passive copy and retry next pass.
+                c.execute("PRAGMA wal_checkpoint(PASSIVE);").fetchall()
+                more = True
+        except sqlite3.OperationalError as e:
+            _logger.debug("EPG MAINT checkpoint skipped: %s", e)
+
+        self._log_storage_stats("after", self.storage_stats())
+        return more
+
     # ---------- Candidate selection (fast; no full table scan) ----------
     def _candidate_rows(self, c, name: str, tvg_name: str, region: str) -> List[Tuple[str, str, str]]:
         """
@@ -1572,6 +1840,10 @@ class EPGDatabase:
         return results[:limit]
 
     def get_schedule(self, channel: Dict[str, str], start_dt: datetime.datetime, end_dt: datetime.datetime) -> List[Dict[str, str]]:
+        """Legacy wrapper: resolves best ID then loads the whole window.
+
+        Prefer ``schedule_cursor`` with an already-resolved id for paging UIs.
+        """
         # Use the smart resolution logic (prefer data availability)
         ch_id = self.resolve_best_channel_id(channel)
         if not ch_id:
@@ -1597,10 +1869,123 @@ class EPGDatabase:
             })
         return results
 
+    # ---------- Windowed schedule paging (resolved channel ids only) ----------
+    def get_schedule_page(
+        self,
+        channel_id: str,
+        *,
+        after: Optional[Tuple[str, str]] = None,
+        before: Optional[Tuple[str, str]] = None,
+        limit: int = 50,
+    ) -> List[ProgrammeRow]:
+        """Keyset page of a channel's schedule in chronological order.
+
+        ``after``/``before`` are exclusive ``(start, end)`` keys, so passing the
+        last/first row of a page continues exactly where it stopped. Both walk
+        ``idx_programmes_channel_start_end`` without sorting or OFFSET scans.
+        """
+        if not channel_id or limit <= 0:
+            return []
+        c = self.conn.cursor()
+        if before is not None:
+            rows = c.execute(
+                """
+                SELECT start, end, title FROM programmes
+                WHERE channel_id = ? AND (start, end) < (?, ?)
+                ORDER BY start DESC, end DESC
+                LIMIT ?
+                """,
+                (channel_id, before[0], before[1], int(limit))
+            ).fetchall()
+            rows.reverse()
+        else:
+            after = after or ("", "")
+            rows = c.execute(
+                """
+                SELECT start, end, title FROM programmes
+                WHERE channel_id = ? AND (start, end) > (?, ?)
+                ORDER BY start ASC, end ASC
+                LIMIT ?
+                """,
+                (channel_id, after[0], after[1], int(limit))
+            ).fetchall()
+        return [ProgrammeRow(st, en, title or "") for st, en, title in rows]
+
+    def schedule_anchor_key(self, channel_id: str, anchor_utc: str) -> Tuple[str, str]:
+        """Cursor key just before the programme airing (or next) at ``anchor_utc``."""
+        c = self.conn.cursor()
+        row = c.execute(
+            "SELECT start FROM programmes WHERE channel_id = ? AND end > ? ORDER BY end ASC LIMIT 1",
+            (channel_id, anchor_utc)
+        ).fetchone()
+        start = row[0] if row and row[0] and row[0] <= anchor_utc else anchor_utc
+        return (start, "")
+
+    def schedule_cursor(
+        self,
+        channel_id: str,
+        anchor: Optional[datetime.datetime] = None,
+        page_size: int = 50,
+        not_before: Optional[datetime.datetime] = None,
+    ) -> "ScheduleCursor":
+        anchor_str = (anchor or self._utcnow()).strftime("%Y%m%d%H%M%S")
+        floor = not_before.strftime("%Y%m%d%H%M%S") if not_before else None
+        return ScheduleCursor(self, channel_id, anchor_str, page_size=page_size, not_before=floor)
+
+    # ---------- Multi-channel guide grid ----------
+    # Programmes longer than this that started before the window are not returned;
+    # bounding the look-back keeps the grid query on a tight index range.
+    GRID_MAX_PROGRAMME_SECS = 12 * 60 * 60
+
+    def iter_guide_grid(
+        self,
+        channel_ids: List[str],
+        start_dt: datetime.datetime,
+        end_dt: datetime.datetime,
+        batch_rows: int = 2000,
+    ):
+        """Yield ``(channel_id, [ProgrammeRow, ...])`` for programmes overlapping [start, end).
+
+        A single query covers every channel: ids are bound as one JSON array and
+        rows are streamed in ``(channel_id, start)`` index order with
+        ``fetchmany``, so each channel's group is yielded as soon as its last
+        row is read. Channels without programmes in the window are omitted.
+        """
+        ids = sorted({cid for cid in channel_ids if cid})
+        if not ids:
+            return
+        from_str = start_dt.strftime("%Y%m%d%H%M%S")
+        to_str = end_dt.strftime("%Y%m%d%H%M%S")
+        lookback = (start_dt - datetime.timedelta(seconds=self.GRID_MAX_PROGRAMME_SECS)).strftime("%Y%m%d%H%M%S")
+        c = self.conn.cursor()
+        c.execute(
+            """
+            SELECT channel_id, start, end, title FROM programmes
+            WHERE channel_id IN (SELECT value FROM json_each(?))
+              AND start >= ? AND start < ? AND end > ?
+            ORDER BY channel_id, start, end
+            """,
+            (json.dumps(ids), lookback, to_str, from_str)
+        )
+        current_id: Optional[str] = None
+        group: List[ProgrammeRow] = []
+        while True:
+            batch = c.fetchmany(max(1, int(batch_rows)))
+            if not batch:
+                break
+            for ch_id, st, en, title in batch:
+                if ch_id != current_id:
+                    if group:
+                        yield current_id, group
+                    current_id, group = ch_id, []
+                group.append(ProgrammeRow(st, en, title or ""))
+        if group:
+            yield current_id, group
+
     # =========================
     # Streaming importer with detailed debug
     # =========================
-    def import_epg_xml(self, xml_sources: List[str], progress_callback=None):
+    def import_epg_xml(self, xml_sources: List[str], progress_callback=None, commit_callback=None):
         # Block until we can import; avoid user-facing warnings.
         _wait_for_import_lock(self.db_path)
         trace_mem = DEBUG or os.getenv("EPG_TRACE_MEM", "0").strip().lower() in {"1", "true", "yes"}
@@ -1625,9 +2010,11 @@ class EPGDatabase:
                     try:
                         req = urllib.request.Request(src, headers={
                             "User-Agent": "Mozilla/5.0",
-                            "Accept": "application/xml, text/xml, application/gzip, */*"
+                            "Accept": "application/xml, text/xml, application/gzip, */*",
+                            # Content-Encoding: gzip is unwrapped below like a .gz body.
+                            "Accept-Encoding": "gzip",
                         })
-                        resp = urllib.request.urlopen(req, timeout=300)
+                        resp = urlopen(req, timeout=300, retries=0)
                         status = getattr(resp, "status", None)
                         ctype = resp.info().get('Content-Type', '').lower()
                         _logger.debug("HTTP GET %s | status=%s ctype=%s mem=%sMB", _sanitize_url(src), status, ctype, _mem_mb())
@@ -1758,7 +2145,7 @@ class EPGDatabase:
                                 headers['Range'] = f'bytes={existing}-'
                             req = urllib.request.Request(url, headers=headers)
                             try:
-                                resp = urllib.request.urlopen(req, timeout=300)
+                                resp = urlopen(req, timeout=300, retries=0)
                             except urllib.error.HTTPError as he:
                                 if he.code == 416 and use_range:
                                     _logger.debug("EPG HTTP 416 for %s, retrying without Range", _sanitize_url(url))
@@ -1935,7 +2322,8 @@ class EPGDatabase:
                                 if st_utc and en_utc and ch_id:
                                     if DEBUG and sample_ok < 8:
                                         _logger.debug("EPG SAMPLE OK src=%s ...", _sanitize_url(src)); sample_ok += 1
-                                    self.insert_programme(ch_id, title_txt, st_utc, en_utc)
+                                    self.insert_programme(ch_id, title_txt, st_utc, en_utc,
+                                                          _programme_details_from_elem(elem))
                                     prog_count += 1
                                     inserted_since_commit += 1
                                     if inserted_since_commit >= BATCH:
@@ -1960,6 +2348,10 @@ class EPGDatabase:
                         pass
                     _logger.debug("EPG DONE src=%s channels=%d progs=%d elapsed=%.1fs mem=%sMB",
                                   _sanitize_url(src), chan_count, prog_count, time.time() - t0, _mem_mb())
+                    # Let readers know a source's rows are now visible.
+                    if commit_callback:
+                        try: commit_callback(idx + 1, total)
+                        except Exception: pass
 
                     # success; exit retry loop for this source
                     break
@@ -2066,6 +2458,82 @@ class EPGDatabase:
             pass
 
 
+def run_epg_maintenance(db_path: str, budget_secs: float = 0.5, allow_vacuum: bool = False) -> bool:
+    """Run one maintenance pass unless an import holds the DB; True if more remains.
+
+    With ``allow_vacuum`` the caller asked for the full compaction, so a held
+    import lock or a failed pass raises instead of being deferred quietly.
+    """
+    if not os.path.exists(db_path):
+        return False
+    if not _try_acquire_import_lock(db_path, max_wait_sec=0):
+        if allow_vacuum:
+            raise sqlite3.OperationalError("database is locked (EPG import running)")
+        return True
+    db = None
+    try:
+        db = EPGDatabase(db_path, for_threading=True)
+        return db.run_maintenance(budget_secs=budget_secs, allow_vacuum=allow_vacuum)
+    except Exception as e:
+        _logger.debug("EPG maintenance failed: %s", e)
+        if allow_vacuum:
+            raise
+        return False
+    finally:
+        if db is not None:
+            db.close()
+        _release_import_lock(db_path)
+
+
+class ScheduleCursor:
+    """Bidirectional pager over one channel's schedule around an anchor time.
+
+    ``next_page`` walks forward from the programme airing at the anchor and
+    ``prev_page`` walks backward from just before it, so a dialog can load
+    the current page first and extend either edge as the user scrolls.
+    """
+
+    def __init__(self, db: EPGDatabase, channel_id: str, anchor_utc: str, page_size: int = 50,
+                 not_before: Optional[str] = None):
+        self.db = db
+        self.channel_id = channel_id
+        self.page_size = max(1, int(page_size))
+        self.not_before = not_before
+        anchor_key = db.schedule_anchor_key(channel_id, anchor_utc)
+        self._head: Tuple[str, str] = anchor_key
+        self._tail: Tuple[str, str] = anchor_key
+        self.at_start = False
+        self.at_end = False
+
+    def next_page(self) -> List[ProgrammeRow]:
+        if self.at_end:
+            return []
+        rows = self.db.get_schedule_page(self.channel_id, after=self._tail, limit=self.page_size)
+        if rows:
+            self._tail = (rows[-1].start, rows[-1].end)
+        if len(rows) < self.page_size:
+            self.at_end = True
+        return rows
+
+    def prev_page(self) -> List[ProgrammeRow]:
+        if self.at_start:
+            return []
+        rows = self.db.get_schedule_page(self.channel_id, before=self._head, limit=self.page_size)
+        if rows:
+            self._head = (rows[0].start, rows[0].end)
+        if len(rows) < self.page_size:
+            self.at_start = True
+        if self.not_before:
+            kept = [r for r in rows if r.end >= self.not_before]
+            if len(kept) < len(rows):
+                self.at_start = True
+            rows = kept
+        return rows
+
+    def close(self):
+        self.db.close()
+
+
 # =========================
 # EPG Import/Manager UI
 # =========================
@@ -0,0 +1,365 @@
+"""Binary parsed-playlist cache.
+
+Layout (all integers little-endian ``uint32``)::
+
+    header     magic "IPLC", version, row count, string count, group count,
+               hash length, string blob length, field count
+    hash       ASCII hex digest of the source playlist (padded to 4 bytes)
+    offsets    string count + 1 offsets into the string blob
+    blob       UTF-8 strings, back to back (string 0 is always ""),
+               padded to 4 bytes so the arrays below stay aligned
+    rows       row count x field count string indices (NONE = absent)
+    groups     group count x (name index, first slot, row count)
+    members    row count row ids, ordered by group
+    digests    row count x 8-byte entry digests from the M3U parser
+               (all zero when the source was not an M3U playlist)
+
+Rows are fixed width, so a reader can decode any single channel straight
+from the mapped file. ``PlaylistCache`` exposes the group list and counts
+without decoding rows at all; records are only built when indexed.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from channel_table import CORE_KEYS, ChannelRecord
+from m3u_parser import ENTRY_DIGEST_SIZE
+
+
+MAGIC = b"IPLC"
+VERSION = 2
+NONE = 0xFFFFFFFF
+
+# Slotted keys followed by one JSON-encoded string holding any extra keys.
+FIELDS = CORE_KEYS + ("_extra",)
+_FIELD_COUNT = len(FIELDS)
+_EXTRA_FIELD = _FIELD_COUNT - 1
+
+_HEADER = struct.Struct("<4s7I")
+_ROW = struct.Struct(f"<{_FIELD_COUNT}I")
+_GROUP = struct.Struct("<3I")
+
+
+def _pad(size: int) -> int:
+    return (-size) % 4
+
+
+def _encode_str(value: str) -> bytes:
+    return value.encode("utf-8", "surrogatepass")
+
+
+def write_playlist_cache(
+    path: str,
+    text_hash: str,
+    channels: Iterable[Mapping],
+    digests: Optional[bytes] = None,
+) -> None:
+    """Write ``channels`` to ``path`` atomically (via a ``.tmp`` sibling).
+
+    ``digests`` holds the parser's per-entry digests, in channel order.
+    """
+    strings: Dict[str, int] = {"": 0}
+    blobs: List[bytes] = [b""]
+
+    def sid(value) -> int:
+        if value is None:
+            return NONE
+        if not isinstance(value, str):
+            value = str(value)
+        idx = strings.get(value)
+        if idx is None:
+            idx = strings[value] = len(blobs)
+            blobs.append(_encode_str(value))
+        return idx
+
+    rows = bytearray()
+    groups: Dict[str, List[int]] = {}
+    row_count = 0
+    known = strings.get
+    for ch in channels:
+        if isinstance(ch, ChannelRecord):
+            raw = (ch.name, ch.group, ch.url, ch.tvg_id, ch.tvg_name,
+                   ch.provider_id, ch.provider_type, ch.tvg_logo, ch.stream_id)
+            extra = ch.extra_items()
+        else:
+            raw = tuple(ch.get(key) for key in CORE_KEYS)
+            extra = [(key, value) for key, value in ch.items() if key not in CORE_KEYS]
+        values = []
+        for value in raw:
+            idx = known(value) if value is not None else NONE
+            values.append(sid(value) if idx is None else idx)
+        # The always-present core fields must never read back as absent.
+        for i in range(5):
+            if values[i] == NONE:
+                values[i] = 0
+        values.append(sid(json.dumps(dict(extra), separators=(",", ":"))) if extra else NONE)
+        rows += _ROW.pack(*values)
+        groups.setdefault(ch.get("group") or "Uncategorized", []).append(row_count)
+        row_count += 1
+
+    group_entries = bytearray()
+    members = bytearray()
+    slot = 0
+    for name, row_ids in groups.items():
+        group_entries += _GROUP.pack(sid(name), slot, len(row_ids))
+        members += struct.pack(f"<{len(row_ids)}I", *row_ids)
+        slot += len(row_ids)
+
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    hash_bytes = (text_hash or "").encode("ascii", "ignore")
+    header = _HEADER.pack(
+        MAGIC, VERSION, row_count, len(blobs), len(groups),
+        len(hash_bytes), offsets[-1], _FIELD_COUNT,
+    )
+
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(hash_bytes)
+            f.write(b"\0" * _pad(len(hash_bytes)))
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            for blob in blobs:
+                f.write(blob)
+            f.write(b"\0" * _pad(offsets[-1]))
+            f.write(rows)
+            f.write(group_entries)
+            f.write(members)
+            size = row_count * ENTRY_DIGEST_SIZE
+            if digests is not None and len(digests) == size:
+                f.write(digests)
+            else:
+                f.write(bytes(size))
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except Exception:
+            pass
+        raise
+
+
+_NATIVE_U32 = sys.byteorder == "little" and struct.calcsize("I") == 4
+
+
+def _u32_array(buf, start: int, count: int):
+    """Index-able view of ``count`` little-endian uint32 values at ``start``."""
+    if _NATIVE_U32:
+        # Zero-copy: offsets are 4-byte aligned by the writer's padding.
+        return memoryview(buf)[start:start + 4 * count].cast("I")
+    return struct.unpack_from(f"<{count}I", buf, start)
+
+
+def _map_file(path: str):
+    with open(path, "rb") as f:
+        # Windows cannot replace a file that is mapped, and the refresh
+        # rewrites this cache while the prefill may still be on screen.
+        if os.name == "nt":
+            return f.read()
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            return f.read()
+
+
+class _RowView(Sequence):
+    """Read-only sequence of lazily decoded records."""
+
+    __slots__ = ("_cache", "_row_ids")
+
+    def __init__(self, cache: "PlaylistCache", row_ids: Optional[Sequence] = None):
+        self._cache = cache
+        self._row_ids = row_ids
+
+    def __len__(self) -> int:
+        if self._row_ids is None:
+            return self._cache.row_count
+        return len(self._row_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if self._row_ids is None:
+            return self._cache.record(index)
+        return self._cache.record(self._row_ids[index])
+
+    def __iter__(self):
+        record = self._cache.record
+        if self._row_ids is None:
+            for i in range(self._cache.row_count):
+                yield record(i)
+        else:
+            for row_id in self._row_ids:
+                yield record(row_id)
+
+
+class PlaylistCache:
+    """A parsed playlist read lazily from a binary cache file.
+
+    Decoded records are kept, so each row is built at most once and repeated
+    lookups return the same object.
+    """
+
+    def __init__(self, buf, provider_meta: Optional[Dict[str, str]] = None):
+        self._buf = buf
+        (magic, version, self.row_count, string_count, group_count,
+         hash_len, blob_len, field_count) = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION or field_count != _FIELD_COUNT:
+            raise ValueError("unsupported playlist cache")
+        pos = _HEADER.size
+        self.text_hash = bytes(buf[pos:pos + hash_len]).decode("ascii")
+        pos += hash_len + _pad(hash_len)
+        self._offsets_start = pos
+        pos += 4 * (string_count + 1)
+        self._blob_start = pos
+        pos += blob_len + _pad(blob_len)
+        self._rows_start = pos
+        pos += self.row_count * _ROW.size
+        self._groups_start = pos
+        pos += group_count * _GROUP.size
+        self._members_start = pos
+        pos += 4 * self.row_count
+        self._digests_start = pos
+        pos += ENTRY_DIGEST_SIZE * self.row_count
+        if pos > len(buf):
+            raise ValueError("truncated playlist cache")
+        self._group_count = group_count
+        self._offsets = _u32_array(buf, self._offsets_start, string_count + 1)
+        self._cells = _u32_array(buf, self._rows_start, self.row_count * _FIELD_COUNT)
+        self._records: List[Optional[ChannelRecord]] = [None] * self.row_count
+        self._string_memo: Dict[int, str] = {}
+        self._digest_rows: Optional[Dict[bytes, int]] = None
+        meta = provider_meta or {}
+        self._provider_id = meta.get("provider-id") or None
+        self._provider_type = meta.get("provider-type") or None
+
+    @classmethod
+    def open(cls, path: str, provider_meta: Optional[Dict[str, str]] = None) -> Optional["PlaylistCache"]:
+        """Return the cache at ``path``, or None if it is missing or unreadable."""
+        try:
+            return cls(_map_file(path), provider_meta)
+        except Exception:
+            return None
+
+    @staticmethod
+    def read_hash(path: str) -> Optional[str]:
+        """Read only the stored playlist hash."""
+        try:
+            with open(path, "rb") as f:
+                head = f.read(_HEADER.size)
+                magic, version, *_rest = _HEADER.unpack(head)
+                if magic != MAGIC or version != VERSION:
+                    return None
+                return f.read(_rest[3]).decode("ascii")
+        except Exception:
+            return None
+
+    def close(self) -> None:
+        buf = self._buf
+        for view in (self._offsets, self._cells):
+            if isinstance(view, memoryview):
+                view.release()
+        if isinstance(buf, mmap.mmap):
+            try:
+                buf.close()
+            except BufferError:
+                # Still referenced by a live view; the GC closes it later.
+                pass
+
+    # ---------- decoding ----------
+    def _string(self, idx: int) -> Optional[str]:
+        if idx == NONE:
+            return None
+        offsets = self._offsets
+        base = self._blob_start
+        start = offsets[idx]
+        end = offsets[idx + 1]
+        return self._buf[base + start:base + end].decode("utf-8", "surrogatepass")
+
+    def _memo_string(self, idx: int) -> Optional[str]:
+        # Group and provider strings repeat on every row; decode them once.
+        value = self._string_memo.get(idx)
+        if value is None and idx != NONE:
+            value = self._string_memo[idx] = self._string(idx)
+        return value
+
+    def record(self, row: int) -> ChannelRecord:
+        rec = self._records[row]
+        if rec is not None:
+            return rec
+        first = row * _FIELD_COUNT
+        buf = self._buf
+        offsets = self._offsets
+        base = self._blob_start
+        values = [
+            None if idx == NONE
+            else buf[base + offsets[idx]:base + offsets[idx + 1]].decode("utf-8", "surrogatepass")
+            for idx in self._cells[first:first + _FIELD_COUNT]
+        ]
+        extra_raw = values[_EXTRA_FIELD]
+        rec = ChannelRecord(
+            name=values[0],
+            group=values[1],
+            url=values[2],
+            tvg_id=values[3],
+            tvg_name=values[4],
+            provider_id=self._provider_id or values[5],
+            provider_type=self._provider_type or values[6],
+            tvg_logo=values[7],
+            stream_id=values[8],
+            extra=json.loads(extra_raw) if extra_raw else None,
+        )
+        self._records[row] = rec
+        return rec
+
+    def dedupe_key(self, row: int) -> Tuple[str, str, str]:
+        """(name, url, provider-id) for ``row`` without building the record."""
+        rec = self._records[row]
+        if rec is not None:
+            return rec.dedupe_key()
+        first = row * _FIELD_COUNT
+        ids = self._cells[first:first + _FIELD_COUNT]
+        pid = self._provider_id or self._memo_string(ids[5])
+        return (self._string(ids[0]), self._string(ids[2]), pid or "")
+
+    def record_for_digest(self, digest: bytes) -> Optional[ChannelRecord]:
+        """Record whose source entry had ``digest``, for re-parse avoidance."""
+        rows = self._digest_rows
+        if rows is None:
+            rows = {}
+            size = ENTRY_DIGEST_SIZE
+            start = self._digests_start
+            blob = bytes(self._buf[start:start + size * self.row_count])
+            empty = bytes(size)
+            for row in range(self.row_count):
+                key = blob[row * size:(row + 1) * size]
+                if key != empty:
+                    rows.setdefault(key, row)
+            self._digest_rows = rows
+        row = rows.get(digest)
+        return None if row is None else self.record(row)
+
+    # ---------- views ----------
+    @property
+    def records(self) -> _RowView:
+        return _RowView(self)
+
+    def groups(self) -> Dict[str, _RowView]:
+        """Group name -> lazy row view, in first-appearance order."""
+        out: Dict[str, _RowView] = {}
+        members = _u32_array(self._buf, self._members_start, self.row_count)
+        for g in range(self._group_count):
+            name_idx, first, count = _GROUP.unpack_from(self._buf, self._groups_start + g * _GROUP.size)
+            out[self._memo_string(name_idx)] = _RowView(self, members[first:first + count])
+        return out
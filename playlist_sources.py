@@ -0,0 +1,132 @@
+"""Per-source bookkeeping for playlist refreshes.
+
+Every configured playlist source (an Xtream or Stalker provider entry, a
+playlist URL or a local file) has a stable key, a human label and its own
+refresh interval. ``SourceRefreshTimers`` keeps one timer per key, so a
+provider refreshed hourly does not drag a daily URL playlist along with it.
+``merge_source_parts`` builds the table the UI shows from each source's
+latest channels, always in configuration order.
+"""
+
+import os
+import urllib.parse
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from channel_table import ChannelTable
+
+
+# How often each kind of source is refreshed on its own schedule, in hours;
+# a source entry's "refresh_hours" overrides this.
+SOURCE_REFRESH_HOURS = {"xtream": 1.0, "stalker": 1.0, "url": 24.0, "file": 24.0}
+DEFAULT_REFRESH_HOURS = 24.0
+# Floor for a source's timer, whatever its configured interval.
+MIN_REFRESH_DELAY_MS = 60_000
+
+
+def playlist_source_key(src) -> Optional[str]:
+    """Stable identity of a configured playlist source (None if it has none)."""
+    if isinstance(src, dict):
+        provider_id = src.get("id") or src.get("provider_id")
+        return f"provider:{provider_id}" if provider_id else None
+    if isinstance(src, str) and src.startswith(("http://", "https://")):
+        return src
+    if isinstance(src, str) and src:
+        return f"file:{os.path.abspath(src)}"
+    return None
+
+
+def playlist_source_label(src) -> str:
+    """Short name for status messages."""
+    if isinstance(src, dict):
+        return src.get("name") or src.get("base_url") or src.get("url") or (src.get("type") or "provider")
+    if isinstance(src, str) and src.startswith(("http://", "https://")):
+        return urllib.parse.urlparse(src).netloc or src
+    return os.path.basename(str(src)) or str(src)
+
+
+def source_refresh_hours(src) -> float:
+    """Refresh interval of ``src``: its own "refresh_hours", else its kind's default."""
+    if isinstance(src, dict):
+        try:
+            hours = float(src.get("refresh_hours") or 0)
+        except (TypeError, ValueError):
+            hours = 0
+        if hours > 0:
+            return hours
+        kind = (src.get("type") or "").lower()
+    elif isinstance(src, str) and src.startswith(("http://", "https://")):
+        kind = "url"
+    else:
+        kind = "file"
+    return SOURCE_REFRESH_HOURS.get(kind, DEFAULT_REFRESH_HOURS)
+
+
+def merge_source_parts(
+    order: Iterable[str],
+    parts: Mapping[str, Sequence],
+    streaming: Optional[Mapping[str, Sequence]] = None,
+) -> ChannelTable:
+    """One table of every source's channels, in ``order``.
+
+    ``parts`` holds each source's last good load (a failed refresh leaves
+    the previous entry in place); ``streaming`` holds channels of sources
+    still downloading, which take precedence while non-empty.
+    """
+    merged = ChannelTable()
+    streaming = streaming or {}
+    for key in order:
+        merged.extend(streaming.get(key) or parts.get(key, ()))
+    return merged
+
+
+class SourceRefreshTimers:
+    """One refresh timer per source key.
+
+    ``call_later(delay_ms, callback, key)`` creates a timer with ``Stop()``
+    (``wx.CallLater`` in the app); ``sources()`` returns the configured
+    sources; ``on_due(key)`` runs when a source's interval elapses. A timer
+    that fires re-arms itself from the current configuration before the
+    refresh, so a changed interval applies from the next run on, and a
+    source removed from the configuration just lets its timer lapse. Must
+    be used from one thread (the UI thread).
+    """
+
+    def __init__(self, call_later: Callable, sources: Callable[[], Sequence], on_due: Callable[[str], None]):
+        self._call_later = call_later
+        self._sources = sources
+        self._on_due = on_due
+        self._timers: Dict[str, object] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._timers
+
+    def keys(self) -> List[str]:
+        return list(self._timers)
+
+    def reset(self) -> None:
+        """Stop every timer and arm one per configured source."""
+        self.stop_all()
+        for src in self._sources():
+            key = playlist_source_key(src)
+            if key is not None:
+                self.schedule(key, source_refresh_hours(src))
+
+    def schedule(self, key: str, hours: float) -> None:
+        old = self._timers.pop(key, None)
+        if old is not None:
+            old.Stop()
+        delay_ms = max(MIN_REFRESH_DELAY_MS, int(hours * 60 * 60 * 1000))
+        self._timers[key] = self._call_later(delay_ms, self._fire, key)
+
+    def stop_all(self) -> None:
+        for timer in self._timers.values():
+            timer.Stop()
+        self._timers = {}
+
+    def _fire(self, key: str) -> None:
+        src = next((s for s in self._sources() if playlist_source_key(s) == key), None)
+        if src is None:
+            self._timers.pop(key, None)
+            return
+        self.schedule(key, source_refresh_hours(src))
+        self._on_due(key)
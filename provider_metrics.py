@@ -0,0 +1,202 @@
+"""Rolling per-provider request telemetry.
+
+Provider requests (Xtream API and playlist downloads, Stalker portal calls,
+plain playlist URLs) record one ``RequestSample`` each: phase timings from
+``http_client.RequestTimings``, byte counts, the error class if the request
+failed and, for whole-source loads, the channel count. ``ProviderMetrics``
+keeps the most recent samples per provider and summarises them for the
+provider health dialog and the JSON export.
+"""
+
+import contextlib
+import datetime
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Iterator, List, Optional
+
+from http_client import RequestTimings
+
+
+# Samples kept per provider.
+MAX_SAMPLES = 200
+
+
+class RequestSample:
+    """One provider request (or whole-source load, ``action == "load"``)."""
+
+    __slots__ = (
+        "provider", "action", "host", "when", "dns", "connect", "ttfb", "transfer",
+        "total", "bytes", "status", "reused", "error", "channels",
+    )
+
+    def __init__(
+        self,
+        provider: str,
+        action: str,
+        host: str = "",
+        timings: Optional[RequestTimings] = None,
+        error: Optional[BaseException] = None,
+        channels: Optional[int] = None,
+        total: Optional[float] = None,
+    ):
+        self.provider = provider
+        self.action = action
+        self.host = host
+        self.when = time.time()
+        self.dns = timings.dns if timings is not None else None
+        self.connect = timings.connect if timings is not None else None
+        self.ttfb = timings.ttfb if timings is not None else None
+        self.transfer = timings.transfer if timings is not None else None
+        self.total = total if total is not None else (timings.total if timings is not None else None)
+        self.bytes = timings.bytes if timings is not None else 0
+        self.status = timings.status if timings is not None else None
+        self.reused = timings.reused if timings is not None else False
+        self.error = error_class(error) if error is not None else None
+        self.channels = channels
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def error_class(error: BaseException) -> str:
+    """Short, groupable name for a request failure ("HTTPError 503", "timeout", ...)."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return f"{type(error).__name__} {code}"
+    reason = getattr(error, "reason", None)
+    if isinstance(reason, BaseException):
+        return error_class(reason)
+    if isinstance(error, TimeoutError) or type(error).__name__ == "timeout":
+        return "timeout"
+    return type(error).__name__
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[idx]
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+class ProviderMetrics:
+    """Thread-safe store of the last ``max_samples`` samples per provider."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._samples: Dict[str, Deque[RequestSample]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, sample: RequestSample) -> None:
+        with self._lock:
+            samples = self._samples.get(sample.provider)
+            if samples is None:
+                samples = self._samples[sample.provider] = deque(maxlen=self.max_samples)
+            samples.append(sample)
+
+    @contextlib.contextmanager
+    def measure(self, provider: str, action: str, host: str = "") -> Iterator[RequestTimings]:
+        """Time one request: pass the yielded ``RequestTimings`` to ``urlopen(timings=...)``.
+
+        The sample is recorded when the block exits, with the error class if
+        it raised (the exception still propagates).
+        """
+        timings = RequestTimings()
+        try:
+            yield timings
+        except BaseException as e:
+            self.record(RequestSample(provider, action, host, timings, error=e))
+            raise
+        self.record(RequestSample(provider, action, host, timings))
+
+    def record_load(self, provider: str, seconds: float, channels: Optional[int] = None,
+                    error: Optional[BaseException] = None) -> None:
+        """Record a whole-source refresh: how long it took and how many channels it gave."""
+        self.record(RequestSample(provider, "load", error=error, channels=channels, total=seconds))
+
+    def providers(self) -> List[str]:
+        with self._lock:
+            return sorted(self._samples)
+
+    def samples(self, provider: Optional[str] = None) -> List[RequestSample]:
+        with self._lock:
+            if provider is not None:
+                return list(self._samples.get(provider, ()))
+            return [s for samples in self._samples.values() for s in samples]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self, provider: str) -> Dict[str, object]:
+        """Aggregates over one provider's samples.
+
+        Latencies are over requests only; channel counts and load times come
+        from whole-source loads.
+        """
+        samples = self.samples(provider)
+        requests = [s for s in samples if s.action != "load"]
+        loads = [s for s in samples if s.action == "load"]
+        ok = [s for s in requests if s.ok]
+        totals = [s.total for s in ok if s.total is not None]
+        errors = Counter(s.error for s in samples if s.error)
+        last_load = loads[-1] if loads else None
+        last_good_load = next((s for s in reversed(loads) if s.ok), None)
+        return {
+            "provider": provider,
+            "requests": len(requests),
+            "errors": sum(1 for s in requests if not s.ok),
+            "error_rate": (sum(1 for s in requests if not s.ok) / len(requests)) if requests else None,
+            "error_classes": dict(errors),
+            "total_p50": _percentile(totals, 50),
+            "total_p95": _percentile(totals, 95),
+            "dns_avg": _mean([s.dns for s in ok if s.dns is not None]),
+            "connect_avg": _mean([s.connect for s in ok if s.connect is not None]),
+            "ttfb_avg": _mean([s.ttfb for s in ok if s.ttfb is not None]),
+            "ttfb_p95": _percentile([s.ttfb for s in ok if s.ttfb is not None], 95),
+            "transfer_avg": _mean([s.transfer for s in ok if s.transfer is not None]),
+            "bytes": sum(s.bytes for s in requests),
+            "hosts": sorted({s.host for s in requests if s.host}),
+            "loads": len(loads),
+            "load_seconds": last_good_load.total if last_good_load is not None else None,
+            "channels": last_good_load.channels if last_good_load is not None else None,
+            "last_load_ok": last_load.ok if last_load is not None else None,
+            "last_error": next((s.error for s in reversed(samples) if s.error), None),
+        }
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "generated": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "providers": {
+                name: {
+                    "summary": self.summary(name),
+                    "samples": [s.as_dict() for s in self.samples(name)],
+                }
+                for name in self.providers()
+            },
+        }
+
+    def export_json(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+
+
+_metrics = ProviderMetrics()
+
+
+def get_metrics() -> ProviderMetrics:
+    """The process-wide store provider requests record into."""
+    return _metrics
@@ -1,11 +1,26 @@
+import base64
+import concurrent.futures
+import datetime
+import hashlib
+import http.cookiejar
 import json
+import logging
+import threading
 import time
 import uuid
+import urllib.error
 import urllib.parse
 import urllib.request
+import weakref
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
+from channel_table import ChannelRecord
+from http_client import urlopen
+from provider_metrics import get_metrics
+
+
+LOG = logging.getLogger(__name__)
 
 DEFAULT_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
 
@@ -14,6 +29,10 @@ class ProviderError(RuntimeError):
     """Raised when a provider fails to return a playlist."""
 
 
+class PortalAuthError(ProviderError):
+    """Raised when a Stalker portal rejects the session token."""
+
+
 def _normalize_base_url(url: str) -> str:
     url = url.strip()
     if not url:
@@ -42,6 +61,99 @@ def _normalize_base_url(url: str) -> str:
     return rebuilt.rstrip('/')
 
 
+class RateLimitedQueue:
+    """Runs submitted calls one at a time, at most one per ``min_interval`` seconds.
+
+    Newest submissions run first, since a user scrolling through channels
+    cares about the one under the cursor, and a call already queued under the
+    same key is not queued again. Beyond ``max_pending`` the oldest waiting
+    calls are cancelled. ``submit`` returns a ``concurrent.futures.Future``.
+    """
+
+    def __init__(self, min_interval: float = 0.5, max_pending: int = 16, name: str = "ProviderQueue"):
+        self.min_interval = min_interval
+        self.max_pending = max_pending
+        self._name = name
+        self._cond = threading.Condition()
+        self._pending: Dict[object, Tuple[Callable[[], object], concurrent.futures.Future]] = {}
+        self._next_start = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, key, fn: Callable[[], object]) -> concurrent.futures.Future:
+        with self._cond:
+            entry = self._pending.pop(key, None)
+            if entry is not None:
+                # Re-insert so the repeated request counts as the newest.
+                self._pending[key] = entry
+                return entry[1]
+            future: concurrent.futures.Future = concurrent.futures.Future()
+            self._pending[key] = (fn, future)
+            while len(self._pending) > self.max_pending:
+                oldest = next(iter(self._pending))
+                self._pending.pop(oldest)[1].cancel()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return future
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                delay = self._next_start - time.monotonic()
+                if delay > 0:
+                    # Wait out the interval; newer requests may arrive meanwhile.
+                    self._cond.wait(delay)
+                    continue
+                key = next(reversed(self._pending))
+                fn, future = self._pending.pop(key)
+                self._next_start = time.monotonic() + self.min_interval
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+_request_queues: Dict[str, RateLimitedQueue] = {}
+_request_queues_lock = threading.Lock()
+
+
+def provider_request_queue(base_url: str, min_interval: float = 0.5) -> RateLimitedQueue:
+    """The shared on-demand request queue for one provider host."""
+    host = urllib.parse.urlparse(base_url).netloc or base_url
+    with _request_queues_lock:
+        queue = _request_queues.get(host)
+        if queue is None:
+            queue = _request_queues[host] = RateLimitedQueue(min_interval, name=f"ProviderQueue-{host}")
+        return queue
+
+
+def _decode_b64_text(value) -> str:
+    """Decode the base64 text fields Xtream EPG listings use, passing plain text through."""
+    text = str(value or "")
+    try:
+        return base64.b64decode(text, validate=True).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        return text
+
+
+def _epoch_to_utc(value) -> Optional[datetime.datetime]:
+    try:
+        return datetime.datetime.fromtimestamp(int(value), tz=datetime.timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
 @dataclass
 class XtreamCodesConfig:
     base_url: str
@@ -53,6 +165,8 @@ class XtreamCodesConfig:
     auto_epg: bool = True
     provider_id: Optional[str] = None
     user_agent: str = DEFAULT_UA
+    # Build the channel list from player_api.php JSON, falling back to get.php.
+    use_api: bool = True
 
 
 class XtreamCodesClient:
@@ -74,21 +188,236 @@ class XtreamCodesClient:
             return []
         return [f"{self._base}/xmltv.php?username={urllib.parse.quote(self.cfg.username)}&password={urllib.parse.quote(self.cfg.password)}"]
 
-    def fetch_playlist(self, timeout: int = 60) -> str:
+    def open_playlist(self, timeout: int = 60, timings=None):
+        """Open the playlist URL and return the (decoded) body for streamed reading."""
         url = self.playlist_url()
         req = urllib.request.Request(url, headers={"User-Agent": self.cfg.user_agent})
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return urlopen(req, timeout=timeout, decode=True, timings=timings)
+
+    def fetch_playlist(self, timeout: int = 60) -> str:
+        with self.open_playlist(timeout=timeout) as resp:
             raw = resp.read()
         try:
             return raw.decode("utf-8")
         except UnicodeDecodeError:
             return raw.decode("latin-1", "ignore")
 
+    def api_url(self, action: str, **params) -> str:
+        query = {"username": self.cfg.username, "password": self.cfg.password, "action": action}
+        query.update({k: v for k, v in params.items() if v is not None})
+        return f"{self._base}/player_api.php?{urllib.parse.urlencode(query)}"
+
+    @property
+    def host(self) -> str:
+        return urllib.parse.urlparse(self._base).netloc
+
+    def _api_get(self, action: str, timeout: int = 30, **params) -> bytes:
+        req = urllib.request.Request(self.api_url(action, **params), headers={"User-Agent": self.cfg.user_agent})
+        with get_metrics().measure(self.describe(), f"api:{action}", self.host) as timings:
+            with urlopen(req, timeout=timeout, decode=True, timings=timings) as resp:
+                return resp.read()
+
+    @staticmethod
+    def _api_list(raw: bytes, action: str) -> List[Dict]:
+        try:
+            payload = json.loads(raw.decode("utf-8", "replace") or "null")
+        except ValueError as e:
+            raise ProviderError(f"Xtream {action}: invalid JSON ({e})")
+        if isinstance(payload, dict):
+            # Bad credentials come back as {"user_info": {"auth": 0}}.
+            if "user_info" in payload:
+                if not (payload.get("user_info") or {}).get("auth"):
+                    raise ProviderError("Xtream login failed: check username and password.")
+                raise ProviderError(f"Xtream {action}: not supported by this panel")
+            # Some panels send {"<id>": {...}} instead of a list.
+            payload = list(payload.values()) if payload and all(isinstance(v, dict) for v in payload.values()) else None
+        if not isinstance(payload, list):
+            raise ProviderError(f"Xtream {action}: unexpected response")
+        return [row for row in payload if isinstance(row, dict)]
+
+    def fetch_live_categories(self, timeout: int = 30) -> List[Dict]:
+        return self._api_list(self._api_get("get_live_categories", timeout), "get_live_categories")
+
+    def fetch_live_streams(self, category_id: Optional[str] = None, timeout: int = 60) -> List[Dict]:
+        raw = self._api_get("get_live_streams", timeout, category_id=category_id)
+        return self._api_list(raw, "get_live_streams")
+
+    def fetch_short_epg(self, stream_id, limit: int = 4, timeout: int = 10) -> List[Dict]:
+        """Upcoming programmes for one stream from ``get_short_epg``.
+
+        Rows use the shape ``EPGDatabase`` returns: ``title``, ``start`` and
+        ``end`` (aware UTC datetimes), ``channel_id``.
+        """
+        raw = self._api_get("get_short_epg", timeout, stream_id=str(stream_id), limit=str(limit))
+        try:
+            payload = json.loads(raw.decode("utf-8", "replace") or "null")
+        except ValueError as e:
+            raise ProviderError(f"Xtream get_short_epg: invalid JSON ({e})")
+        listings = payload.get("epg_listings") if isinstance(payload, dict) else None
+        shows: List[Dict] = []
+        for row in listings or ():
+            if not isinstance(row, dict):
+                continue
+            start = _epoch_to_utc(row.get("start_timestamp"))
+            end = _epoch_to_utc(row.get("stop_timestamp") or row.get("end_timestamp"))
+            if start is None or end is None or end <= start:
+                continue
+            shows.append({
+                "channel_id": str(row.get("epg_id") or row.get("channel_id") or ""),
+                "title": _decode_b64_text(row.get("title")),
+                "start": start,
+                "end": end,
+            })
+        shows.sort(key=lambda show: show["start"])
+        return shows
+
+    def fetch_now_next(self, stream_id, now: Optional[datetime.datetime] = None) -> Optional[Tuple]:
+        """``(now, next)`` for a stream from ``get_short_epg``, or None when it has nothing."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        current = upcoming = None
+        for show in self.fetch_short_epg(stream_id):
+            if show["end"] <= now:
+                continue
+            if show["start"] <= now:
+                current = current or show
+            elif upcoming is None:
+                upcoming = show
+        if current is None and upcoming is None:
+            return None
+        return current, upcoming
+
+    def queue_now_next(self, stream_id) -> concurrent.futures.Future:
+        """``fetch_now_next`` through the host's rate-limited request queue."""
+        queue = provider_request_queue(self._base)
+        return queue.submit(("short_epg", self._base, str(stream_id)), lambda: self.fetch_now_next(stream_id))
+
+    def stream_url(self, stream_id) -> str:
+        ext = self.cfg.output or "ts"
+        if ext == "hls":
+            ext = "m3u8"
+        user = urllib.parse.quote(self.cfg.username, safe="")
+        password = urllib.parse.quote(self.cfg.password, safe="")
+        return f"{self._base}/live/{user}/{password}/{stream_id}.{ext}"
+
+    def channel_from_stream(self, row: Dict, group: str) -> Optional[ChannelRecord]:
+        """Map one ``get_live_streams`` row to the record the m3u_plus parser would build."""
+        stream_id = row.get("stream_id")
+        name = str(row.get("name") or "").strip()
+        if stream_id in (None, "") or not name:
+            return None
+        stream_id = str(stream_id)
+        extra: Dict[str, object] = {}
+        if str(row.get("tv_archive") or "0") not in ("0", ""):
+            extra["tv-archive"] = "1"
+            if row.get("tv_archive_duration"):
+                extra["catchup-days"] = str(row.get("tv_archive_duration"))
+        return ChannelRecord(
+            name=name,
+            group=group,
+            url=self.stream_url(stream_id),
+            tvg_id=str(row.get("epg_channel_id") or ""),
+            tvg_name=name,
+            provider_id=self.cfg.provider_id or None,
+            provider_type="xtream",
+            tvg_logo=row.get("stream_icon") or None,
+            stream_id=stream_id,
+            extra=extra,
+        )
+
+    def fetch_channels_api(
+        self,
+        on_categories: Optional[Callable[[List[str]], None]] = None,
+        on_channels: Optional[Callable[[List[ChannelRecord]], None]] = None,
+        max_workers: int = 4,
+        timeout: int = 60,
+    ) -> Tuple[List[ChannelRecord], str]:
+        """Build the live channel list from ``player_api.php``.
+
+        Without ``on_channels`` all streams come from one unfiltered
+        ``get_live_streams`` call, ordered by the panel's category order with
+        streams outside every listed category (null or unknown
+        ``category_id``, filed under "Uncategorized") last. With
+        ``on_channels``, streams are fetched per category on a small pool so
+        each category's records can be shown as they arrive; per-category
+        requests cannot reach uncategorised streams, so that listing can miss
+        some that m3u_plus would include. ``on_categories`` receives the
+        category names up front. Returns ``(channels, hash)``, the hash
+        covering the raw JSON. Raises ``ProviderError`` if the panel has no
+        usable API.
+        """
+        categories = self.fetch_live_categories(timeout=timeout)
+        names: Dict[str, str] = {}
+        for cat in categories:
+            cid = str(cat.get("category_id") or "")
+            if cid:
+                names[cid] = str(cat.get("category_name") or "").strip() or "Uncategorized"
+        if on_categories is not None:
+            on_categories(list(names.values()))
+
+        def build(rows: List[Dict], fallback_group: str = "Uncategorized") -> List[ChannelRecord]:
+            out = []
+            for row in rows:
+                group = names.get(str(row.get("category_id") or ""), fallback_group)
+                rec = self.channel_from_stream(row, group)
+                if rec is not None:
+                    out.append(rec)
+            return out
+
+        digest = hashlib.sha1()
+        if not names or on_channels is None:
+            raw = self._api_get("get_live_streams", timeout)
+            rank = {cid: i for i, cid in enumerate(names)}
+            rows = sorted(
+                self._api_list(raw, "get_live_streams"),
+                key=lambda row: rank.get(str(row.get("category_id") or ""), len(rank)),
+            )
+            channels = build(rows)
+            if on_channels is not None and channels:
+                on_channels(channels)
+            digest.update(raw)
+            return channels, digest.hexdigest()
+
+        def fetch(cid: str) -> Tuple[bytes, List[ChannelRecord]]:
+            raw = self._api_get("get_live_streams", timeout, category_id=cid)
+            return raw, build(self._api_list(raw, "get_live_streams"), names[cid])
+
+        results: Dict[str, Tuple[bytes, List[ChannelRecord]]] = {}
+        workers = max(1, min(max_workers, len(names)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(fetch, cid): cid for cid in names}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    raw, records = future.result()
+                except Exception:
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+                results[futures[future]] = (raw, records)
+                if on_channels is not None and records:
+                    on_channels(records)
+        channels: List[ChannelRecord] = []
+        for cid in names:
+            raw, records = results[cid]
+            digest.update(raw)
+            channels.extend(records)
+        return channels, digest.hexdigest()
+
     def describe(self) -> str:
         label = self.cfg.name or urllib.parse.urlparse(self._base).netloc
         return f"Xtream Codes ({label})"
 
 
+def _refresh_portal_token(client_ref, token: str) -> None:
+    client = client_ref()
+    if client is None or client._closed:
+        return
+    try:
+        client._ensure_token(force=True, stale_token=token)
+    except Exception as e:
+        # The current token is still good for a while; the next call retries.
+        LOG.info("%s: background token refresh failed: %s", client.describe(), e)
+
+
 @dataclass
 class StalkerPortalConfig:
     base_url: str
@@ -109,13 +438,27 @@ class StalkerPortalClient:
     and exposes channel metadata for live/archived playback.
     """
 
+    # Session tokens are renewed after TOKEN_LIFETIME - TOKEN_REFRESH_MARGIN
+    # seconds in the background, and on first use once TOKEN_LIFETIME passes.
+    TOKEN_LIFETIME = 25 * 60
+    TOKEN_REFRESH_MARGIN = 5 * 60
+    # Portals issue short-lived links; reuse a resolved one for this long.
+    LINK_TTL = 60.0
+    LINK_CACHE_MAX = 64
+
     def __init__(self, cfg: StalkerPortalConfig):
         self.cfg = cfg
         self._base = _normalize_base_url(cfg.base_url)
         self._portal_endpoint = self._derive_portal_endpoint()
         self._token: Optional[str] = None
         self._token_issued: float = 0.0
-        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor())
+        self._token_lock = threading.Lock()
+        self._refresh_timer: Optional[threading.Timer] = None
+        self._closed = False
+        self._cookies = http.cookiejar.CookieJar()
+        # cmd -> (link, monotonic expiry) for links resolved ahead of playback.
+        self._link_cache: Dict[str, Tuple[str, float]] = {}
+        self._link_lock = threading.Lock()
 
     def _derive_portal_endpoint(self) -> str:
         # Support either /portal.php or /server/load.php style deployments.
@@ -127,7 +470,7 @@ class StalkerPortalClient:
         base = _normalize_base_url(self.cfg.base_url)
         return f"{base}/portal.php"
 
-    def _headers(self, include_token: bool = True) -> Dict[str, str]:
+    def _headers(self, include_token: bool = True, token: Optional[str] = None) -> Dict[str, str]:
         headers = {
             "User-Agent": self.cfg.user_agent,
             "Accept": "application/json",
@@ -136,28 +479,67 @@ class StalkerPortalClient:
             "Referer": f"{self._base}/c/",
             "Cookie": f"stb_lang=en; timezone={self.cfg.timezone}; mac={self.cfg.mac}"
         }
-        if include_token and self._token:
-            headers["Authorization"] = f"Bearer {self._token}"
+        token = token or self._token
+        if include_token and token:
+            headers["Authorization"] = f"Bearer {token}"
         return headers
 
-    def _portal_call(self, params: Dict[str, str], include_token: bool = True, timeout: int = 30) -> Dict:
+    def _portal_request(self, params: Dict[str, str], include_token: bool = True, timeout: int = 30,
+                        token: Optional[str] = None) -> Dict:
         query = urllib.parse.urlencode(params)
         url = f"{self._portal_endpoint}?{query}"
-        req = urllib.request.Request(url, headers=self._headers(include_token=include_token))
-        with self._opener.open(req, timeout=timeout) as resp:
-            raw = resp.read()
+        req = urllib.request.Request(url, headers=self._headers(include_token=include_token, token=token))
+        host = urllib.parse.urlparse(self._portal_endpoint).netloc
+        try:
+            with get_metrics().measure(self.describe(), f"portal:{params.get('action', '')}", host) as timings:
+                with urlopen(req, timeout=timeout, decode=True, cookiejar=self._cookies, timings=timings) as resp:
+                    raw = resp.read()
+        except urllib.error.HTTPError as e:
+            if e.code in (401, 403):
+                raise PortalAuthError(f"Portal rejected the session (HTTP {e.code})")
+            raise
         text = raw.decode("utf-8", "ignore")
         try:
             return json.loads(text)
         except json.JSONDecodeError:
+            if "authoriz" in text.lower():
+                raise PortalAuthError(f"Portal rejected the session: {text.strip()!r}")
             raise ProviderError(f"Invalid response from portal: {text!r}")
 
-    def _ensure_token(self):
-        now = time.time()
-        if self._token and (now - self._token_issued) < 60 * 25:
+    def _portal_call(self, params: Dict[str, str], include_token: bool = True, timeout: int = 30) -> Dict:
+        """Portal request that renews the session and retries once if it was rejected."""
+        token = self._token
+        try:
+            return self._portal_request(params, include_token=include_token, timeout=timeout)
+        except PortalAuthError:
+            if not include_token:
+                raise
+            self._ensure_token(force=True, stale_token=token)
+            return self._portal_request(params, include_token=include_token, timeout=timeout)
+
+    def _token_valid(self) -> bool:
+        return bool(self._token) and (time.time() - self._token_issued) < self.TOKEN_LIFETIME
+
+    def _ensure_token(self, force: bool = False, stale_token: Optional[str] = None):
+        """Make sure a session token is held, running at most one handshake at a time.
+
+        ``force`` renews even a valid token, unless ``stale_token`` is given
+        and another caller has already replaced it.
+        """
+        if not force and self._token_valid():
             return
+        with self._token_lock:
+            if self._token_valid():
+                if not force:
+                    return
+                if stale_token is not None and self._token != stale_token:
+                    return
+            self._handshake()
+
+    def _handshake(self):
+        now = time.time()
         # Step 1: handshake to get temporary token
-        data = self._portal_call({
+        data = self._portal_request({
             "type": "stb",
             "action": "handshake",
             "token": "",
@@ -167,62 +549,152 @@ class StalkerPortalClient:
         token = data.get("token") or data.get("js", {}).get("token")
         if not token:
             raise ProviderError("Portal handshake failed: no token returned")
-        self._token = token
-        self._token_issued = now
         # Step 2: authenticate with credentials to obtain session token
-        auth = self._portal_call({
+        auth = self._portal_request({
             "type": "stb",
             "action": "login",
             "login": self.cfg.username,
             "password": self.cfg.password,
             "JsHttpRequest": "1-xml"
-        })
-        new_token = auth.get("token") or auth.get("js", {}).get("token")
+        }, token=token)
+        new_token = auth.get("token") or auth.get("js", {}).get("token") if isinstance(auth, dict) else None
         if new_token:
-            self._token = new_token
-            self._token_issued = time.time()
+            token, now = new_token, time.time()
+        self._token = token
+        self._token_issued = now
+        self._schedule_token_refresh(token)
 
-    def fetch_channels(self) -> Tuple[List[Dict], List[str]]:
-        self._ensure_token()
+    def _schedule_token_refresh(self, token: str) -> None:
+        """Renew ``token`` in the background shortly before it expires."""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        if self._closed:
+            return
+        delay = max(1.0, self.TOKEN_LIFETIME - self.TOKEN_REFRESH_MARGIN)
+        # The timer holds only a weak reference, so a replaced client is not kept alive.
+        timer = threading.Timer(delay, _refresh_portal_token, args=(weakref.ref(self), token))
+        timer.daemon = True
+        self._refresh_timer = timer
+        timer.start()
+
+    def close(self) -> None:
+        """Stop background token renewal."""
+        self._closed = True
+        timer, self._refresh_timer = self._refresh_timer, None
+        if timer is not None:
+            timer.cancel()
+
+    def _channel_from_row(self, row: Dict, genres: Dict[str, str]) -> Optional[Dict]:
+        name = row.get("name") or row.get("tv_genre_title") or ""
+        cmd = row.get("cmd") or ""
+        if not name or not cmd:
+            return None
+        genre_id = str(row.get("tv_genre_id") or "")
+        group = row.get("tv_genre_title") or genres.get(genre_id) or genre_id or "Stalker"
+        channel = {
+            "name": name,
+            "group": group,
+            "url": "",  # resolved on demand
+            "tvg-id": row.get("epg_id", ""),
+            "tvg-name": row.get("display_name", name),
+            "tvg-logo": row.get("logo", ""),
+            "provider-type": "stalker",
+            "provider-data": {
+                "cmd": cmd,
+                "use_http_tmp_link": row.get("use_http_tmp_link", 0),
+                "id": row.get("id"),
+                "number": row.get("number"),
+                "allow_timeshift": row.get("allow_timeshift", 0),
+                "archive": row.get("archive", 0)
+            }
+        }
+        if self.cfg.provider_id:
+            channel["provider-id"] = self.cfg.provider_id
+        if row.get("tv_archive_duration"):
+            channel["catchup-days"] = row.get("tv_archive_duration")
+        if row.get("allow_timeshift") or row.get("archive"):
+            channel["catchup"] = "stalker"
+        return channel
+
+    def fetch_genres(self) -> Dict[str, str]:
+        payload = self._portal_call({"type": "itv", "action": "get_genres", "JsHttpRequest": "1-xml"})
+        rows = payload.get("js") if isinstance(payload, dict) else None
+        if not isinstance(rows, list):
+            return {}
+        return {str(g.get("id")): g.get("title") or "" for g in rows if isinstance(g, dict) and g.get("id") is not None}
+
+    def _ordered_list_page(self, page: int) -> Dict:
         payload = self._portal_call({
             "type": "itv",
-            "action": "get_all_channels",
-            "include": "genres",
-            "force_ch_link_check": "1",
+            "action": "get_ordered_list",
+            "genre": "*",
+            "force_ch_link_check": "",
+            "fav": "0",
+            "sortby": "number",
+            "p": str(page),
             "JsHttpRequest": "1-xml"
         })
-        data = payload.get("js", {}).get("data") or []
+        js = payload.get("js") if isinstance(payload, dict) else None
+        if not isinstance(js, dict):
+            raise ProviderError(f"Portal returned no channel page {page}")
+        return js
+
+    def _fetch_ordered_rows(self, max_workers: int) -> List[Dict]:
+        """All channel rows via ``get_ordered_list``, pages after the first fetched in parallel."""
+        first = self._ordered_list_page(1)
+        rows = list(first.get("data") or [])
+        try:
+            total = int(first.get("total_items") or 0)
+            per_page = int(first.get("max_page_items") or len(rows))
+        except (TypeError, ValueError):
+            total, per_page = 0, 0
+        if not rows or per_page <= 0 or total <= len(rows):
+            return rows
+        pages = range(2, (total + per_page - 1) // per_page + 1)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pages)))) as pool:
+            for page_rows in pool.map(lambda p: self._ordered_list_page(p).get("data") or [], pages):
+                rows.extend(page_rows)
+        return rows
+
+    def fetch_channels(self, max_workers: int = 4) -> Tuple[List[Dict], List[str]]:
+        """Channel list and EPG URLs.
+
+        Uses paged ``get_ordered_list`` (pages fetched ``max_workers`` at a
+        time) and falls back to the single ``get_all_channels`` call for
+        portals without it.
+        """
+        self._ensure_token()
+        try:
+            genres = self.fetch_genres()
+        except (ProviderError, OSError):
+            genres = {}
+        try:
+            data = self._fetch_ordered_rows(max_workers)
+        except (ProviderError, OSError):
+            data = []
+        if not data:
+            payload = self._portal_call({
+                "type": "itv",
+                "action": "get_all_channels",
+                "include": "genres",
+                "force_ch_link_check": "1",
+                "JsHttpRequest": "1-xml"
+            })
+            data = payload.get("js", {}).get("data") or []
         channels: List[Dict] = []
+        seen_ids = set()
         for row in data:
-            name = row.get("name") or row.get("tv_genre_title") or ""
-            cmd = row.get("cmd") or ""
-            if not name or not cmd:
+            if not isinstance(row, dict):
                 continue
-            group = row.get("tv_genre_title") or row.get("tv_genre_id") or "Stalker"
-            channel = {
-                "name": name,
-                "group": group,
-                "url": "",  # resolved on demand
-                "tvg-id": row.get("epg_id", ""),
-                "tvg-name": row.get("display_name", name),
-                "tvg-logo": row.get("logo", ""),
-                "provider-type": "stalker",
-                "provider-data": {
-                    "cmd": cmd,
-                    "use_http_tmp_link": row.get("use_http_tmp_link", 0),
-                    "id": row.get("id"),
-                    "number": row.get("number"),
-                    "allow_timeshift": row.get("allow_timeshift", 0),
-                    "archive": row.get("archive", 0)
-                }
-            }
-            if self.cfg.provider_id:
-                channel["provider-id"] = self.cfg.provider_id
-            if row.get("tv_archive_duration"):
-                channel["catchup-days"] = row.get("tv_archive_duration")
-            if row.get("allow_timeshift") or row.get("archive"):
-                channel["catchup"] = "stalker"
-            channels.append(channel)
+            row_id = row.get("id")
+            if row_id is not None:
+                # Pages can overlap when the portal's list shifts mid-fetch.
+                if row_id in seen_ids:
+                    continue
+                seen_ids.add(row_id)
+            channel = self._channel_from_row(row, genres)
+            if channel is not None:
+                channels.append(channel)
         epg_urls: List[str] = []
         if self.cfg.auto_epg:
             # Stalker portals expose XMLTV at /portal.php?type=itv&action=get_epg_info&period=...,
@@ -230,11 +702,15 @@ class StalkerPortalClient:
             epg_urls.append(f"{self._base}/xmltv.php")
         return channels, epg_urls
 
-    def resolve_stream(self, provider_data: Dict, timeout: int = 30) -> str:
-        self._ensure_token()
+    def resolve_stream(self, provider_data: Dict, timeout: int = 30, use_cache: bool = True) -> str:
         cmd = provider_data.get("cmd")
         if not cmd:
             raise ProviderError("Channel missing command reference")
+        if use_cache:
+            link = self._cached_link(cmd, consume=bool(provider_data.get("use_http_tmp_link")))
+            if link:
+                return link
+        self._ensure_token()
         params = {
             "type": "itv",
             "action": "create_link",
@@ -251,6 +727,46 @@ class StalkerPortalClient:
                 link = link[len(prefix):]
         return link
 
+    def _cached_link(self, cmd: str, consume: bool = False) -> Optional[str]:
+        with self._link_lock:
+            entry = self._link_cache.get(cmd)
+            if entry is None:
+                return None
+            link, expires = entry
+            fresh = expires > time.monotonic()
+            if consume or not fresh:
+                # Temporary links are single use: hand each one out once.
+                del self._link_cache[cmd]
+            return link if fresh else None
+
+    def prefetch_links(self, provider_datas: List[Dict]) -> None:
+        """Resolve links for ``provider_datas`` in the background, ready for ``resolve_stream``.
+
+        Later entries are resolved first, so pass the most likely pick last.
+        """
+        queue = provider_request_queue(self._base)
+        for pdata in provider_datas:
+            cmd = (pdata or {}).get("cmd")
+            if not cmd:
+                continue
+            with self._link_lock:
+                entry = self._link_cache.get(cmd)
+                if entry is not None and entry[1] > time.monotonic() + self.LINK_TTL / 2:
+                    continue
+            queue.submit(("create_link", self._base, cmd), lambda pdata=pdata, cmd=cmd: self._prefetch_link(pdata, cmd))
+
+    def _prefetch_link(self, provider_data: Dict, cmd: str) -> str:
+        link = self.resolve_stream(provider_data, use_cache=False)
+        with self._link_lock:
+            self._link_cache[cmd] = (link, time.monotonic() + self.LINK_TTL)
+            if len(self._link_cache) > self.LINK_CACHE_MAX:
+                now = time.monotonic()
+                for key in [k for k, (_l, exp) in self._link_cache.items() if exp <= now]:
+                    del self._link_cache[key]
+                while len(self._link_cache) > self.LINK_CACHE_MAX:
+                    del self._link_cache[next(iter(self._link_cache))]
+        return link
+
     def resolve_catchup(self, provider_data: Dict, start: str, duration: int) -> str:
         self._ensure_token()
         cmd = provider_data.get("cmd")
@@ -1,25 +1,65 @@
+"""Local HTTP proxy that cast targets and players pull streams from.
 
-import http.server
-import socketserver
-import threading
-import urllib.request
-import urllib.parse
-import socket
-import logging
-import json
+Every client connection, upstream fetch and ffmpeg pipe is an asyncio task
+on one event loop running in a single background thread, so the number of
+threads no longer grows with clients, radio streams or HLS sessions.
+Upstream bodies are read without blocking the loop (``open_upstream``);
+client writes wait on the transport's write buffer (``drain``), which
+pushes back through the stream buffer onto the upstream read.
+
+Audio clients asking for the same (url, headers, mode) share one
+``SharedStream``: a single upstream fetch and ffmpeg encode broadcast into
+a ``StreamBuffer`` each client reads with its own cursor, so a second cast
+target does not cost a second provider connection. Client
+connections are HTTP/1.1 keep-alive for everything with a known length
+(playlists, segments, errors, redirects); open-ended streams end with the
+connection.
+
+HLS sessions keep their segments in memory: ffmpeg writes MPEG-TS to a
+pipe and ``hls_segmenter`` cuts it at keyframes, so playlists and segments
+are served from a ``SegmentStore`` instead of a temp dir.
+"""
+
+import asyncio
 import base64
-import subprocess
-import tempfile
-import shutil
+import functools
+import hashlib
+import http
+import json
+import logging
 import os
+import socket
+import ssl
+import subprocess
+import sys
+import threading
 import time
-import hashlib
-import collections
+import urllib.error
+import urllib.parse
+import urllib.request
 
-import sys
+from hls_segmenter import SegmentStore, TSSegmenter
+from http_client import urlopen
 
 LOG = logging.getLogger(__name__)
 
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
+)
+UPSTREAM_TIMEOUT = 15
+# How long an idle keep-alive client connection waits for its next request.
+KEEPALIVE_TIMEOUT = 30
+MAX_REQUEST_HEAD = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+# Unsent bytes per client above which writers wait for the client to catch up.
+WRITE_HIGH_WATER = 256 * 1024
+# Most bytes handed to one client socket per write on shared streams.
+WRITE_BATCH = 256 * 1024
+_MAX_REDIRECTS = 5
+_REDIRECT_STATUSES = frozenset((301, 302, 303, 307, 308))
+_CREATION_FLAGS = subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+
 def get_ffmpeg_path():
     """Resolve ffmpeg path, prioritizing bundled executable in frozen mode."""
     # PyInstaller onefile
@@ -45,7 +85,351 @@ def get_ffmpeg_path():
         
     return "ffmpeg"
 
+
+
+@functools.lru_cache(maxsize=1)
+def _system_proxies():
+    try:
+        return urllib.request.getproxies()
+    except Exception:
+        return {}
+
+
+def _needs_system_proxy(scheme, host):
+    if scheme not in _system_proxies():
+        return False
+    try:
+        return not urllib.request.proxy_bypass(host)
+    except Exception:
+        return True
+
+
+def _parse_head(head):
+    """Split a raw request/response head into its first line and lowercased headers."""
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+class _UpstreamProtocol(asyncio.BufferedProtocol):
+    """Receiving side of an upstream connection.
+
+    While a ``readinto`` is waiting, the transport receives straight into
+    the caller's buffer (the stream ring), so body bytes are not copied
+    through intermediate ``bytes`` objects. Anything that arrives with
+    no reader waiting (the response head, chunk-size lines, data received
+    while the ring is full) goes to a small spill buffer; reading pauses
+    once that holds ``CHUNK_SIZE`` bytes.
+    """
+
+    def __init__(self):
+        self.transport = None
+        self._scratch = bytearray(CHUNK_SIZE)
+        self._spill = bytearray()
+        self._target = None
+        self._into_target = False
+        self._waiter = None
+        self._paused = False
+        self._eof = False
+        self._exc = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self._eof = True
+        self._exc = exc
+        self._wake(None)
+
+    def eof_received(self):
+        self._eof = True
+        self._wake(None)
+        return False
+
+    def get_buffer(self, sizehint):
+        self._into_target = self._target is not None
+        return self._target if self._into_target else self._scratch
+
+    def buffer_updated(self, nbytes):
+        if self._into_target:
+            self._target = None
+            self._wake(nbytes)
+            return
+        self._spill += memoryview(self._scratch)[:nbytes]
+        if self._waiter is None and len(self._spill) >= CHUNK_SIZE and not self._paused:
+            self._paused = True
+            self.transport.pause_reading()
+        self._wake(None)
+
+    def _wake(self, result):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(result)
+
+    async def _wait(self, target=None):
+        """Wait for data (into ``target`` if given); returns the bytes put in ``target``, else None."""
+        if self._exc is not None:
+            raise self._exc
+        if self._eof:
+            return None
+        self._target = target
+        self._waiter = asyncio.get_running_loop().create_future()
+        if self._paused:
+            self._paused = False
+            self.transport.resume_reading()
+        try:
+            return await self._waiter
+        finally:
+            self._target = None
+            self._waiter = None
+
+    async def readinto(self, view):
+        """Up to ``len(view)`` bytes into ``view``; 0 at the end of the connection."""
+        while True:
+            if self._spill:
+                n = min(len(view), len(self._spill))
+                with memoryview(self._spill) as spill:
+                    view[:n] = spill[:n]
+                del self._spill[:n]
+                return n
+            if self._eof:
+                if self._exc is not None:
+                    raise self._exc
+                return 0
+            n = await self._wait(view)
+            if n:
+                return n
+
+    async def readuntil(self, separator, limit=MAX_REQUEST_HEAD):
+        start = 0
+        while True:
+            idx = self._spill.find(separator, start)
+            if idx >= 0:
+                end = idx + len(separator)
+                data = bytes(self._spill[:end])
+                del self._spill[:end]
+                return data
+            if len(self._spill) > limit:
+                raise ConnectionError("upstream sent an oversized line")
+            if self._eof:
+                raise ConnectionError("upstream closed the connection early")
+            start = max(0, len(self._spill) - len(separator) + 1)
+            await self._wait()
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+
+class UpstreamResponse:
+    """Body of an upstream GET, read on the proxy loop without blocking it."""
+
+    def __init__(self, proto, url, status, reason, headers, timeout):
+        self._proto = proto
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.timeout = timeout
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        length = headers.get("content-length", "").strip()
+        self._remaining = int(length) if length.isdigit() and not self._chunked else None
+        self._chunk_left = 0
+        self._eof = False
+
+    async def readinto(self, view):
+        """Fill up to ``len(view)`` bytes of ``view`` as soon as any arrive; 0 at the end."""
+        if self._eof or not len(view):
+            return 0
+        try:
+            n = await asyncio.wait_for(self._readinto(view), self.timeout)
+        except asyncio.TimeoutError:
+            raise socket.timeout(f"no data from {self.url} for {self.timeout}s") from None
+        if not n:
+            self._eof = True
+        return n
+
+    async def read(self, n=CHUNK_SIZE):
+        buf = bytearray(n)
+        return bytes(buf[:await self.readinto(memoryview(buf))])
+
+    async def _readinto(self, view):
+        proto = self._proto
+        if self._chunked:
+            if not self._chunk_left:
+                line = await proto.readuntil(b"\n")
+                try:
+                    size = int(line.split(b";", 1)[0].strip(), 16)
+                except ValueError:
+                    raise ConnectionError(f"malformed chunked body from {self.url}") from None
+                if not size:
+                    while (await proto.readuntil(b"\n")) not in (b"\r\n", b"\n"):
+                        pass
+                    return 0
+                self._chunk_left = size
+            n = await proto.readinto(view[:self._chunk_left])
+            if not n:
+                raise ConnectionError(f"{self.url} closed mid-chunk")
+            self._chunk_left -= n
+            if not self._chunk_left:
+                await proto.readuntil(b"\n")
+            return n
+        if self._remaining is not None:
+            if not self._remaining:
+                return 0
+            n = await proto.readinto(view[:self._remaining])
+            self._remaining -= n
+            return n
+        return await proto.readinto(view)
+
+    def close(self):
+        self._eof = True
+        self._proto.close()
+
+
+class _ThreadedUpstream:
+    """``UpstreamResponse`` stand-in over the blocking client, for URLs behind a system proxy."""
+
+    def __init__(self, resp):
+        self._resp = resp
+        self._read = getattr(resp, "read1", resp.read)
+        self.url = resp.geturl()
+        self.status = resp.status
+        self.reason = getattr(resp, "reason", "")
+        self.headers = {k.lower(): v for k, v in resp.headers.items()}
+
+    @classmethod
+    async def open(cls, url, headers, timeout):
+        req = urllib.request.Request(url, headers=headers)
+        loop = asyncio.get_running_loop()
+        return cls(await loop.run_in_executor(None, functools.partial(urlopen, req, timeout=timeout)))
+
+    async def read(self, n=CHUNK_SIZE):
+        return await asyncio.get_running_loop().run_in_executor(None, self._read, n)
+
+    async def readinto(self, view):
+        data = await self.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        try:
+            self._resp.close()
+        except Exception:
+            pass
+
+
+class _PipeSource:
+    """``readinto`` over an asyncio ``StreamReader`` (ffmpeg's stdout)."""
+
+    def __init__(self, reader):
+        self._reader = reader
+
+    async def readinto(self, view):
+        data = await self._reader.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+
+async def _send_request(url, parts, headers, timeout):
+    scheme = parts.scheme.lower()
+    host = parts.hostname
+    port = parts.port or (443 if scheme == "https" else 80)
+    ctx = ssl.create_default_context() if scheme == "https" else None
+    _transport, proto = await asyncio.get_running_loop().create_connection(
+        _UpstreamProtocol, host, port, ssl=ctx, server_hostname=host if ctx else None
+    )
+    try:
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        lines = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc.rpartition('@')[2]}"]
+        for key, value in headers.items():
+            if key.lower() not in ("host", "connection", "accept-encoding"):
+                lines.append(f"{key}: {value}")
+        # Streams are one-shot and relayed as-is: no compression, no reuse.
+        lines += ["Accept-Encoding: identity", "Connection: close", "", ""]
+        proto.transport.write("\r\n".join(lines).encode("latin-1", "replace"))
+        first, resp_headers = _parse_head(await proto.readuntil(b"\r\n\r\n"))
+        # "ICY 200 OK" from SHOUTcast servers is an HTTP/1.0 response in all but name.
+        fields = first.split(" ", 2)
+        if len(fields) < 2 or not fields[1].isdigit() or not fields[0].startswith(("HTTP/", "ICY")):
+            raise ConnectionError(f"bad status line from {url}: {first!r}")
+    except BaseException:
+        proto.close()
+        raise
+    reason = fields[2] if len(fields) > 2 else ""
+    return UpstreamResponse(proto, url, int(fields[1]), reason, resp_headers, timeout)
+
+
+async def open_upstream(url, headers=None, timeout=UPSTREAM_TIMEOUT):
+    """GET ``url`` on the running loop, following redirects.
+
+    Returns an ``UpstreamResponse`` (``await resp.readinto(view)`` or
+    ``await resp.read(n)``, then ``resp.close()``) and raises
+    ``urllib.error.HTTPError`` for non-2xx answers. URLs that go through a
+    system proxy, or are not http/https, are read through the shared
+    blocking client on the loop's executor instead.
+    """
+    headers = dict(headers or {})
+    resp = None
+    for _hop in range(_MAX_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https") or _needs_system_proxy(scheme, parts.hostname or ""):
+            return await _ThreadedUpstream.open(url, headers, timeout)
+        resp = await asyncio.wait_for(_send_request(url, parts, headers, timeout), timeout)
+        location = resp.headers.get("location")
+        if resp.status in _REDIRECT_STATUSES and location:
+            resp.close()
+            url = urllib.parse.urljoin(url, location)
+            continue
+        if not 200 <= resp.status < 300:
+            resp.close()
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        return resp
+    raise urllib.error.HTTPError(url, resp.status, "Too many redirects", resp.headers, None)
+
+
+async def _pipe_to_process(upstream, proc):
+    """Copy ``upstream`` into ``proc``'s stdin until either side ends, then close stdin."""
+    try:
+        while proc.returncode is None:
+            chunk = await upstream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            proc.stdin.write(chunk)
+            await proc.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        try:
+            proc.stdin.close()
+        except Exception:
+            pass
+
+
+def _stop_process(proc):
+    if proc is not None and proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+
+
 class HLSConverter:
+    """ffmpeg remux of one source, served as a rolling in-memory HLS playlist.
+
+    ``start()`` runs on the proxy loop: it launches ffmpeg writing MPEG-TS
+    to stdout, a pump task feeding it the upstream body, and a reader task
+    that cuts ffmpeg's output into segments (``TSSegmenter``) held in
+    ``store``.
+    """
+
     def __init__(self, source_url, headers=None, transcode_profile: str = "auto"):
         self.source_url = source_url
         self.headers = headers or {}
@@ -55,14 +439,14 @@ class HLSConverter:
             or self.headers.get("user-agent")
             or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         )
-        self.temp_dir = tempfile.mkdtemp(prefix="iptv_remux_")
+        self.store = SegmentStore()
         self.process = None
-        self.playlist_path = os.path.join(self.temp_dir, "stream.m3u8")
         self.last_access = time.time()
-        self.start()
+        self._tasks = []
+        self._stopped = False
 
-    def start(self):
-        # Video HLS engine (piped)
+    async def start(self):
+        # Video remux engine (piped in and out)
         cmd = [
             get_ffmpeg_path(), "-hide_banner", "-loglevel", "error",
             "-analyzeduration", "5000000", "-probesize", "5000000",
@@ -71,342 +455,576 @@ class HLSConverter:
             "-i", "pipe:0",
             "-map", "0:v?", "-map", "0:a?",
             "-c:v", "copy",
-            "-c:a", "aac", "-profile:a", "aac_low", "-b:a", "320k", "-ac", "2", "-ar", "44100"
+            "-c:a", "aac", "-profile:a", "aac_low", "-b:a", "320k", "-ac", "2", "-ar", "44100",
+            "-f", "mpegts", "-flush_packets", "1", "pipe:1"
         ]
 
-        hls_flags = "delete_segments+split_by_time+independent_segments+append_list+discont_start"
-        cmd.extend([
-            "-f", "hls", "-hls_time", "2", "-hls_list_size", "5",
-            "-hls_flags", hls_flags, "-hls_segment_type", "mpegts",
-            "-hls_version", "3", "-hls_init_time", "0", "-flush_packets", "1",
-            "-start_number", "1", "-hls_segment_filename", os.path.join(self.temp_dir, "seg_%d.ts"),
-            "-mpegts_flags", "pat_pmt_at_beginning",
-            self.playlist_path
-        ])
-
         LOG.info(f"Starting HLS engine for Video ({self.profile})")
-        
-        creation_flags = subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
         try:
-            self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, creationflags=creation_flags)
-            def _pump():
-                try:
-                    req = urllib.request.Request(self.source_url, headers=self.headers)
-                    with urllib.request.urlopen(req, timeout=15) as resp:
-                        while self.process and self.process.poll() is None:
-                            chunk = resp.read(32768)
-                            if not chunk: break
-                            try:
-                                self.process.stdin.write(chunk)
-                                self.process.stdin.flush()
-                            except: break
-                except Exception as e: LOG.error(f"HLS pump error: {e}")
-                finally:
-                    if self.process and self.process.stdin:
-                        try: self.process.stdin.close()
-                        except: pass
-            threading.Thread(target=_pump, daemon=True).start()
-        except Exception as e: LOG.error(f"FFmpeg HLS start failed: {e}")
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, creationflags=_CREATION_FLAGS
+            )
+        except Exception as e:
+            LOG.error(f"FFmpeg HLS start failed: {e}")
+            self._stopped = True
+            self.store.end()
+            return
+        if self._stopped:
+            _stop_process(process)
+            return
+        self.process = process
+        self._tasks = [
+            asyncio.ensure_future(self._pump(process)),
+            asyncio.ensure_future(self._segment(process)),
+        ]
+
+    async def _pump(self, process):
+        try:
+            upstream = await open_upstream(self.source_url, self.headers)
+            try:
+                await _pipe_to_process(upstream, process)
+            finally:
+                upstream.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOG.error(f"HLS pump error: {e}")
+            try:
+                process.stdin.close()
+            except Exception:
+                pass
+
+    async def _segment(self, process):
+        segmenter = TSSegmenter(self.store)
+        try:
+            while True:
+                data = await process.stdout.read(CHUNK_SIZE)
+                if not data: break
+                segmenter.feed(data)
+            segmenter.flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOG.error(f"HLS segmenter error: {e}")
+        finally:
+            self.store.end()
 
     def stop(self):
+        """Stop ffmpeg and its tasks; call on the proxy loop."""
+        self._stopped = True
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
         if self.process:
             try: self.process.terminate()
-            except: pass
+            except ProcessLookupError: pass
             self.process = None
-        if os.path.exists(self.temp_dir):
-            try: shutil.rmtree(self.temp_dir)
-            except: pass
+        self.store.end()
 
-    def is_alive(self): return self.process and self.process.poll() is None
+    def is_alive(self): return self.process is not None and self.process.returncode is None
     def touch(self): self.last_access = time.time()
 
-    def wait_for_playlist(self, timeout=10):
-        start = time.time()
-        while time.time() - start < timeout:
-            if os.path.exists(self.playlist_path) and os.path.getsize(self.playlist_path) > 100: return True
-            if not self.is_alive(): return False
-            time.sleep(0.2)
-        return False
+    async def wait_for_playlist(self, timeout=10):
+        """True once the first segment is ready; woken by the segmenter, not polled."""
+        return await self.store.wait_ready(timeout)
+
+
+class SlowClientError(ConnectionError):
+    """A client kept falling behind a shared stream and was dropped."""
 
 
 class StreamBuffer:
-    def __init__(self, max_size=16 * 1024 * 1024, initial_fill=128 * 1024):
+    """Preallocated ring buffer shared by every client of one upstream.
+
+    The producer reserves space at the end of the stream (``reserve``),
+    fills it in place and ``commit``s it; ``fill_from`` does that with a
+    source's ``readinto``, so upstream bytes land in the ring directly.
+    Each client reads through its own ``StreamCursor`` (an absolute byte
+    offset), which hands out memoryviews of the ring rather than copies.
+    The first read waits for ``initial_fill`` bytes so playback starts
+    with a cushion; clients joining a running stream start
+    ``initial_fill`` bytes behind the live edge.
+
+    The ring holds ``max_size`` bytes. When the producer needs room that a
+    cursor has not consumed yet, it waits (backpressure onto the upstream
+    read), unless another client is keeping up: then the laggards get
+    ``stall_grace`` seconds before their data is overwritten. A cursor that
+    lost data skips ahead to the live edge on its next read; after
+    ``max_skips`` skips it raises ``SlowClientError``.
+    """
+
+    def __init__(self, max_size=16 * 1024 * 1024, initial_fill=128 * 1024, stall_grace=2.0, max_skips=3):
         self.max_size = max_size
         self.initial_fill = initial_fill
-        self.buffer = collections.deque()
-        self.current_size = 0
-        self.lock = threading.Lock()
-        self.not_empty = threading.Condition(self.lock)
-        self.not_full = threading.Condition(self.lock)
+        self.stall_grace = stall_grace
+        self.max_skips = max_skips
+        self._view = memoryview(bytearray(max_size))
+        # Absolute offsets of the oldest kept byte and of the end of the stream so far.
+        self.start = 0
+        self.end = 0
+        self.cursors = set()
         self.closed = False
         self.error = None
-        self.has_filled = False
+        # Replaced on every signal, so one set() wakes every waiter.
+        self._more = asyncio.Event()
+        self._space = asyncio.Event()
+        self._producer_waiting = False
 
-    def write(self, chunk):
-        with self.lock:
-            while self.current_size + len(chunk) > self.max_size:
-                if self.closed: return
-                self.not_full.wait()
-            self.buffer.append(chunk)
-            self.current_size += len(chunk)
-            
-            if not self.has_filled:
-                if self.current_size >= self.initial_fill:
-                    self.has_filled = True
-                    self.not_empty.notify_all()
+    @property
+    def current_size(self):
+        return self.end - self.start
+
+    def cursor(self):
+        cursor = StreamCursor(self, max(self.start, self.end - self.initial_fill))
+        self.cursors.add(cursor)
+        return cursor
+
+    def remove(self, cursor):
+        self.cursors.discard(cursor)
+        self._signal_space()
+
+    def _signal_more(self):
+        self._more.set()
+        self._more = asyncio.Event()
+
+    def _signal_space(self):
+        if self._producer_waiting:
+            self._space.set()
+            self._space = asyncio.Event()
+
+    async def reserve(self, size=CHUNK_SIZE):
+        """Writable view of up to ``size`` bytes at the end of the stream (empty once closed).
+
+        Fill a prefix of it, then ``commit`` that many bytes. The view may
+        be shorter than ``size`` where the ring wraps.
+        """
+        size = min(size, self.max_size)
+        if self.end + size - self.start > self.max_size:
+            await self._make_room(size)
+        if self.closed:
+            return self._view[:0]
+        pos = self.end % self.max_size
+        free = self.max_size - (self.end - self.start)
+        return self._view[pos:pos + min(size, free, self.max_size - pos)]
+
+    def commit(self, nbytes):
+        if nbytes and not self.closed:
+            self.end += nbytes
+            self._signal_more()
+
+    async def fill_from(self, source, size=CHUNK_SIZE):
+        """Read ``source.readinto`` into the ring until the source ends or the buffer closes."""
+        while True:
+            view = await self.reserve(size)
+            if not view:
+                return
+            nbytes = await source.readinto(view)
+            if not nbytes:
+                return
+            self.commit(nbytes)
+
+    async def write(self, data):
+        data = memoryview(data)
+        while data:
+            view = await self.reserve(len(data))
+            if not view:
+                return
+            nbytes = len(view)
+            view[:] = data[:nbytes]
+            self.commit(nbytes)
+            data = data[nbytes:]
+
+    async def _make_room(self, size):
+        loop = asyncio.get_running_loop()
+        deadline = None
+        while not self.closed:
+            limit = self.end + size - self.max_size
+            lagging = sum(1 for c in self.cursors if c.offset < limit)
+            if not lagging:
+                self.start = max(self.start, limit)
+                return
+            if lagging < len(self.cursors):
+                # Someone keeps up: laggards get a grace period, then lose data.
+                if deadline is None:
+                    deadline = loop.time() + self.stall_grace
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    self.start = max(self.start, limit)
+                    return
             else:
-                self.not_empty.notify()
+                deadline = timeout = None
+            self._producer_waiting = True
+            try:
+                await asyncio.wait_for(self._space.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._producer_waiting = False
 
-    def read(self):
-        with self.lock:
-            while not self.buffer or (not self.has_filled and not self.closed):
-                if self.closed:
-                    if self.buffer: break
-                    if self.error: raise self.error
-                    return None
-                
-                # Check fill again in case it changed while we waited
-                if not self.has_filled and self.current_size >= self.initial_fill:
-                    self.has_filled = True
-                    break
-                    
-                self.not_empty.wait()
-            
-            chunk = self.buffer.popleft()
-            self.current_size -= len(chunk)
-            self.not_full.notify()
-            return chunk
+    def _views(self, offset, max_bytes):
+        nbytes = min(self.end - offset, max_bytes)
+        pos = offset % self.max_size
+        first = min(nbytes, self.max_size - pos)
+        views = [self._view[pos:pos + first]]
+        if nbytes > first:
+            views.append(self._view[:nbytes - first])
+        return views
 
     def close(self, error=None):
-        with self.lock:
-            self.closed = True
-            self.error = error
-            self.not_empty.notify_all()
-            self.not_full.notify_all()
-
-class StreamProxyHandler(http.server.BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', '*')
-        self.end_headers()
-
-    def do_GET(self):
+        self.closed = True
+        self.error = error
+        self._more.set()
+        self._space.set()
+
+
+class StreamCursor:
+    """One client's read position in a shared ``StreamBuffer``."""
+
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        self.offset = offset
+        self.skips = 0
+        self.started = False
+
+    async def peek(self, max_bytes=CHUNK_SIZE):
+        """Views of up to ``max_bytes`` unread bytes (two where the ring wraps); ``[]`` at the end.
+
+        The bytes stay reserved for this cursor until ``consume``; hand the
+        views to the socket before awaiting anything else.
+        """
+        buf = self.buffer
+        while True:
+            if self.offset < buf.start:
+                self.skips += 1
+                if self.skips > buf.max_skips:
+                    raise SlowClientError(f"client fell behind {self.skips} times")
+                self.offset = max(buf.start, buf.end - buf.initial_fill)
+            available = buf.end - self.offset
+            if available and (self.started or buf.closed or available >= buf.initial_fill):
+                break
+            if buf.closed:
+                if buf.error: raise buf.error
+                return []
+            await buf._more.wait()
+        self.started = True
+        return buf._views(self.offset, max_bytes)
+
+    def consume(self, nbytes):
+        self.offset += nbytes
+        self.buffer._signal_space()
+
+    async def read(self, max_bytes=CHUNK_SIZE):
+        """Copy of the next bytes (see ``peek``); ``b""`` at the end."""
+        data = b"".join(await self.peek(max_bytes))
+        self.consume(len(data))
+        return data
+
+
+class SharedStream:
+    """One upstream fetch (and ffmpeg encode) broadcast to every client of the same stream."""
+
+    # How long a stream with no clients keeps running, for players that reconnect.
+    IDLE_LINGER = 5.0
+
+    def __init__(self, proxy, key, target_url, req_headers, needs_transcode):
+        self.proxy = proxy
+        self.key = key
+        self.target_url = target_url
+        # 128KB fill ≈ 3s at 320kbps output, absorbs FFmpeg startup latency
+        self.buffer = StreamBuffer(max_size=16 * 1024 * 1024, initial_fill=128 * 1024)
+        self._linger = None
+        self.producer = asyncio.ensure_future(
+            _radio_producer(self.buffer, target_url, req_headers, needs_transcode)
+        )
+        self.producer.add_done_callback(lambda _task: self.proxy._forget_shared(self))
+
+    @property
+    def clients(self):
+        return len(self.buffer.cursors)
+
+    def attach(self):
+        if self._linger is not None:
+            self._linger.cancel()
+            self._linger = None
+        return self.buffer.cursor()
+
+    def detach(self, cursor):
+        self.buffer.remove(cursor)
+        if not self.buffer.cursors and not self.producer.done():
+            self._linger = asyncio.get_running_loop().call_later(self.IDLE_LINGER, self._expire)
+
+    def _expire(self):
+        self._linger = None
+        if not self.buffer.cursors:
+            self.close()
+
+    def close(self):
+        if self._linger is not None:
+            self._linger.cancel()
+            self._linger = None
+        self.buffer.close()
+        self.producer.cancel()
+        self.proxy._forget_shared(self)
+
+
+def _status_phrase(status):
+    try:
+        return http.HTTPStatus(status).phrase
+    except ValueError:
+        return ""
+
+
+def _audio_transcode_cmd():
+    return [
+        get_ffmpeg_path(), "-hide_banner", "-loglevel", "error",
+        "-probesize", "32k", "-analyzeduration", "500000",
+        "-i", "pipe:0", "-vn",
+        "-c:a", "libmp3lame", "-b:a", "320k", "-ar", "44100",
+        "-f", "mp3", "pipe:1"
+    ]
+
+
+class StreamProxyHandler:
+    """One client connection: reads keep-alive HTTP/1.x requests and routes them."""
+
+    def __init__(self, proxy, reader, writer):
+        self.proxy = proxy
+        self.reader = reader
+        self.writer = writer
+        self.command = ""
+        self.path = ""
+        self.headers = {}
+        self.close_connection = True
+
+    async def handle(self):
+        self.writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        sock = self.writer.get_extra_info("socket")
+        if sock is not None:
+            try: sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError: pass
+        try:
+            while await self._read_request():
+                handler = getattr(self, f"do_{self.command}", None)
+                if handler is None:
+                    await self.send_error(501)
+                else:
+                    await handler()
+                if self.close_connection:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # client went away
+        except Exception as e:
+            LOG.error(f"Proxy request {self.path!r} failed: {e}")
+        finally:
+            self.writer.close()
+
+    async def _read_request(self):
+        try:
+            head = await asyncio.wait_for(self.reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return False
+        except asyncio.LimitOverrunError:
+            self.close_connection = True
+            await self.send_error(431)
+            return False
+        first, self.headers = _parse_head(head)
+        fields = first.split()
+        if len(fields) != 3 or not fields[2].startswith("HTTP/"):
+            self.close_connection = True
+            await self.send_error(400)
+            return False
+        self.command, self.path, version = fields
+        connection = self.headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            self.close_connection = connection != "keep-alive"
+        else:
+            self.close_connection = connection == "close"
+        return True
+
+    def send_head(self, status, headers=(), length=None):
+        """Write the status line and headers; without ``length`` the body runs to connection close."""
+        if length is None:
+            self.close_connection = True
+        lines = [f"HTTP/1.1 {status} {_status_phrase(status)}"]
+        lines.extend(f"{key}: {value}" for key, value in headers)
+        if length is not None:
+            lines.append(f"Content-Length: {length}")
+        lines.append("Connection: close" if self.close_connection else "Connection: keep-alive")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def send_body(self, status, body, content_type, headers=()):
+        self.send_head(status, [("Content-Type", content_type), ("Access-Control-Allow-Origin", "*"), *headers],
+                       len(body))
+        self.writer.write(body)
+        await self.writer.drain()
+
+    async def send_error(self, status):
+        await self.send_body(status, f"{status} {_status_phrase(status)}\n".encode(), "text/plain; charset=utf-8")
+
+    async def do_OPTIONS(self):
+        self.send_head(200, [
+            ('Access-Control-Allow-Origin', '*'),
+            ('Access-Control-Allow-Methods', 'GET, OPTIONS'),
+            ('Access-Control-Allow-Headers', '*'),
+        ], 0)
+        await self.writer.drain()
+
+    async def do_GET(self):
         parsed = urllib.parse.urlparse(self.path)
 
         # 1. --- Route: /audio or /stream (High-Speed Buffered Proxy) ---
         if parsed.path in ('/audio', '/stream', '/proxy'):
-            query = urllib.parse.parse_qs(parsed.query)
-            target_url = query.get('url', [None])[0]
-            if not target_url: return self.send_error(400)
-            mode = (query.get('mode', [None])[0] or '').strip().lower()
-            
-            headers_json = query.get('headers', [None])[0]
-            req_headers = {}
-            if headers_json:
-                try: req_headers = json.loads(base64.b64decode(headers_json).decode())
-                except: pass
-            
-            # Default UA for radio compatibility
-            if 'User-Agent' not in req_headers and 'user-agent' not in req_headers:
-                req_headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36'
-
-            # --- RADIO Path ---
-            target_lower = target_url.lower()
-            force_audio = mode == "audio"
-            if force_audio or "radio" in target_lower or "streamon.fm" in target_lower or parsed.path == '/audio':
-                self.send_response(200)
-                self.send_header('Content-Type', 'audio/mpeg')
-                self.send_header('Icy-MetaData', '1')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-
-                # Determine if we need transcoding — only skip for plain MP3 streams
-                is_mp3 = target_lower.endswith(".mp3")
-                needs_transcode = not is_mp3
-
-                # Shared buffer for decoupling download from client write
-                # 128KB fill ≈ 3s at 320kbps output, absorbs FFmpeg startup latency
-                stream_buffer = StreamBuffer(max_size=16 * 1024 * 1024, initial_fill=128 * 1024)
-
-                def _upstream_worker():
-                    try:
-                        if needs_transcode:
-                            cmd = [
-                                get_ffmpeg_path(), "-hide_banner", "-loglevel", "error",
-                                "-probesize", "32k", "-analyzeduration", "500000",
-                                "-i", "pipe:0", "-vn",
-                                "-c:a", "libmp3lame", "-b:a", "320k", "-ar", "44100",
-                                "-f", "mp3", "pipe:1"
-                            ]
-                            creation_flags = subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
-                            proc = subprocess.Popen(
-                                cmd,
-                                stdin=subprocess.PIPE,
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.DEVNULL,
-                                creationflags=creation_flags
-                            )
-                            
-                            # Feed ffmpeg in a sub-thread so we can read stdout in this thread
-                            def _feeder():
-                                try:
-                                    req = urllib.request.Request(target_url, headers=req_headers)
-                                    with urllib.request.urlopen(req, timeout=15) as resp:
-                                        while proc and proc.poll() is None:
-                                            # Use smaller chunks (8KB) for smoother flow
-                                            chunk = resp.read(8192)
-                                            if not chunk: break
-                                            try:
-                                                proc.stdin.write(chunk)
-                                                proc.stdin.flush()
-                                            except: break
-                                except Exception: pass
-                                finally:
-                                    if proc and proc.stdin:
-                                        try: proc.stdin.close()
-                                        except: pass
-
-                            threading.Thread(target=_feeder, daemon=True).start()
-
-                            # Read ffmpeg stdout -> buffer
-                            while True:
-                                chunk = proc.stdout.read(8192)
-                                if not chunk: break
-                                stream_buffer.write(chunk)
-                            
-                            proc.wait()
-                        else:
-                            # Direct download -> buffer
-                            req = urllib.request.Request(target_url, headers=req_headers)
-                            with urllib.request.urlopen(req, timeout=15) as resp:
-                                while True:
-                                    chunk = resp.read(8192)
-                                    if not chunk: break
-                                    stream_buffer.write(chunk)
-                        
-                        stream_buffer.close()
-                    except Exception as e:
-                        LOG.error(f"Upstream worker error: {e}")
-                        stream_buffer.close(error=e)
-
-                # Start the producer thread
-                threading.Thread(target=_upstream_worker, daemon=True).start()
-
-                # Consumer: Serve to client
-                try:
-                    while True:
-                        chunk = stream_buffer.read()
-                        if chunk is None: break
-                        self.wfile.write(chunk)
-                except Exception:
-                    # Client disconnected
-                    stream_buffer.close() # Signal stop to producer if blocked
-                    pass
-                return
-
-            # --- VIDEO Path (HLS Redirect) ---
-            hls_url = get_proxy().get_transcoded_url(target_url, headers=req_headers, transcode_profile="auto")
-            self.send_response(302)
-            self.send_header('Location', hls_url)
-            self.end_headers()
-            return
+            return await self._route_stream(parsed)
 
-        # 3. --- Route: /transcode/<session_id>/... ---
+        # 2. --- Route: /transcode/<session_id>/... ---
         if parsed.path.startswith('/transcode/'):
             parts = parsed.path.split('/')
             if len(parts) >= 4:
-                session_id, filename = parts[2], parts[3]
-                converter = get_proxy().get_converter(session_id)
-                if not converter: return self.send_error(404)
-                converter.touch()
-
-                if filename == "stream.m3u8":
-                    # Instant response with bootstrap if real segments aren't ready
-                    if not converter.wait_for_playlist(timeout=3):
-                        data = (
-                            "#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:2\n"
-                            "#EXT-X-MEDIA-SEQUENCE:0\n#EXT-X-DISCONTINUITY\n"
-                            "#EXTINF:1.0,\n"
-                            f"http://{get_proxy().host}:{get_proxy().port}/bootstrap.ts\n"
-                        ).encode('utf-8')
-                        self.send_response(200)
-                        self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        self.wfile.write(data)
-                        return
-
-                    # Real playlist rewrite
-                    try:
-                        with open(converter.playlist_path, 'r', encoding='utf-8') as f:
-                            lines = f.readlines()
-                        base = f"http://{get_proxy().host}:{get_proxy().port}/transcode/{session_id}/"
-                        rewritten = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:2", "#EXT-X-DISCONTINUITY"]
-                        for line in lines:
-                            line = line.strip()
-                            if not line or line.startswith("#EXTM3U") or line.startswith("#EXT-X-VERSION"): continue
-                            if not line.startswith("#"): rewritten.append(base + line)
-                            else: rewritten.append(line)
-                        data = "\n".join(rewritten).encode("utf-8")
-                        self.send_response(200)
-                        self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        self.wfile.write(data)
-                    except: self.send_error(500)
-                    return
-                
-                # Serve segments
-                file_path = os.path.join(converter.temp_dir, filename)
-                if not os.path.exists(file_path): return self.send_error(404)
-                self.send_response(200)
-                self.send_header('Content-Type', 'video/mp2t')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                try:
-                    with open(file_path, 'rb') as f: shutil.copyfileobj(f, self.wfile)
-                except: pass
-                return
+                return await self._route_transcode(parts[2], parts[3])
 
-        # 4. --- Route: /bootstrap.ts (1s black segment) ---
+        # 3. --- Route: /bootstrap.ts (1s black segment) ---
         if parsed.path == '/bootstrap.ts':
-            self.send_response(200)
-            self.send_header('Content-Type', 'video/mp2t')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            cmd = [
-                get_ffmpeg_path(), "-hide_banner", "-loglevel", "error",
-                "-f", "lavfi", "-i", "color=c=black:s=640x360:r=10:d=1",
-                "-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo",
-                "-t", "1", "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-b:v", "1M",
-                "-c:a", "aac", "-b:a", "64k", "-f", "mpegts", "-muxrate", "2M", "pipe:1"
-            ]
-            creation_flags = subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
-            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, creationflags=creation_flags)
-            try:
-                data = proc.stdout.read()
-                if data: self.wfile.write(data)
-            except: pass
-            finally:
-                try: proc.terminate()
-                except: pass
-            return
+            data = await self.proxy.bootstrap_segment()
+            if not data: return await self.send_error(500)
+            return await self.send_body(200, data, 'video/mp2t')
+
+        await self.send_error(404)
+
+    async def _route_stream(self, parsed):
+        query = urllib.parse.parse_qs(parsed.query)
+        target_url = query.get('url', [None])[0]
+        if not target_url: return await self.send_error(400)
+        mode = (query.get('mode', [None])[0] or '').strip().lower()
+
+        headers_json = query.get('headers', [None])[0]
+        req_headers = {}
+        if headers_json:
+            try: req_headers = json.loads(base64.b64decode(headers_json).decode())
+            except Exception: pass
+
+        # Default UA for radio compatibility
+        if 'User-Agent' not in req_headers and 'user-agent' not in req_headers:
+            req_headers['User-Agent'] = DEFAULT_USER_AGENT
+
+        # --- RADIO Path ---
+        target_lower = target_url.lower()
+        force_audio = mode == "audio"
+        if force_audio or "radio" in target_lower or "streamon.fm" in target_lower or parsed.path == '/audio':
+            # Only plain MP3 streams skip transcoding
+            needs_transcode = not target_lower.endswith(".mp3")
+            return await self._serve_radio(target_url, req_headers, needs_transcode)
+
+        # --- VIDEO Path (HLS Redirect) ---
+        hls_url = self.proxy.get_transcoded_url(target_url, headers=req_headers, transcode_profile="auto")
+        self.send_head(302, [('Location', hls_url)], 0)
+        await self.writer.drain()
+
+    async def _serve_radio(self, target_url, req_headers, needs_transcode):
+        self.send_head(200, [
+            ('Content-Type', 'audio/mpeg'),
+            ('Icy-MetaData', '1'),
+            ('Access-Control-Allow-Origin', '*'),
+        ])
+        shared = self.proxy.shared_stream(target_url, req_headers, needs_transcode)
+        cursor = shared.attach()
+        # The views point into the shared ring and the transport may keep
+        # them rather than copy: drain only returns once all of it reached
+        # the socket, and only then is the cursor advanced.
+        self.writer.transport.set_write_buffer_limits(high=0)
+        try:
+            while True:
+                views = await cursor.peek(WRITE_BATCH)
+                if not views: break
+                if len(views) == 1:
+                    self.writer.write(views[0])
+                else:
+                    self.writer.writelines(views)  # sendmsg/writev where the loop supports it
+                await self.writer.drain()
+                cursor.consume(sum(len(v) for v in views))
+        except SlowClientError as e:
+            LOG.info(f"Dropping slow client of {target_url}: {e}")
+        except (ConnectionError, OSError):
+            pass  # client disconnected, or upstream failed after the headers went out
+        finally:
+            shared.detach(cursor)
+
+    async def _route_transcode(self, session_id, filename):
+        proxy = self.proxy
+        converter = proxy.get_converter(session_id)
+        if not converter: return await self.send_error(404)
+        converter.touch()
+
+        if filename == "stream.m3u8":
+            # Instant response with bootstrap if real segments aren't ready
+            if not await converter.wait_for_playlist(timeout=3):
+                data = (
+                    "#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:2\n"
+                    "#EXT-X-MEDIA-SEQUENCE:0\n#EXT-X-DISCONTINUITY\n"
+                    "#EXTINF:1.0,\n"
+                    f"http://{proxy.host}:{proxy.port}/bootstrap.ts\n"
+                ).encode('utf-8')
+                return await self.send_body(200, data, 'application/vnd.apple.mpegurl')
 
-        self.send_error(404)
+            base = f"http://{proxy.host}:{proxy.port}/transcode/{session_id}/"
+            return await self.send_body(200, converter.store.playlist(base).encode("utf-8"), 'application/vnd.apple.mpegurl')
+
+        # Serve segments
+        segment = None
+        if filename.startswith("seg_") and filename.endswith(".ts") and filename[4:-3].isdigit():
+            segment = converter.store.get(int(filename[4:-3]))
+        if segment is None: return await self.send_error(404)
+        await self.send_body(200, segment.data, 'video/mp2t')
+
+
+async def _radio_producer(stream_buffer, target_url, req_headers, needs_transcode):
+    """Fill ``stream_buffer`` from the upstream body, through ffmpeg's MP3 encoder if needed."""
+    proc = None
+    feeder = None
+    try:
+        upstream = await open_upstream(target_url, req_headers)
+        try:
+            if needs_transcode:
+                proc = await asyncio.create_subprocess_exec(
+                    *_audio_transcode_cmd(),
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                    creationflags=_CREATION_FLAGS,
+                )
+                feeder = asyncio.ensure_future(_pipe_to_process(upstream, proc))
+                await stream_buffer.fill_from(_PipeSource(proc.stdout))
+                if stream_buffer.closed: return
+                await proc.wait()
+            else:
+                await stream_buffer.fill_from(upstream)
+        finally:
+            upstream.close()
+        stream_buffer.close()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        LOG.error(f"Upstream worker error: {e}")
+        stream_buffer.close(error=e)
+    finally:
+        if feeder is not None:
+            feeder.cancel()
+        _stop_process(proc)
 
 
 class StreamProxy:
     def __init__(self):
         self.server = None
         self.thread = None
+        self.loop = None
         self.port = 0
         self.host = self._get_local_ip()
         self.converters = {}
+        # (url, headers, mode) -> SharedStream; only touched on the loop thread.
+        self.shared = {}
         self.lock = threading.Lock()
-        self._cleanup_thread = None
-        self._running = False
+        self._start_lock = threading.Lock()
+        self._connections = set()
+        self._cleanup_task = None
+        self._bootstrap = None
+        self._bootstrap_lock = None
 
     def _get_local_ip(self):
         """Robust primary IP detection for Chromecast compatibility."""
@@ -436,23 +1054,105 @@ class StreamProxy:
         return '127.0.0.1'
 
     def start(self):
-        if self.server: return
-        self.server = socketserver.ThreadingTCPServer((self.host, 0), StreamProxyHandler)
-        self.port = self.server.server_address[1]
-        self._running = True
+        with self._start_lock:
+            if self.server: return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            failure = []
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                try:
+                    self.server = loop.run_until_complete(
+                        asyncio.start_server(self._on_connection, self.host, 0, limit=MAX_REQUEST_HEAD)
+                    )
+                except Exception as e:
+                    failure.append(e)
+                    ready.set()
+                    loop.close()
+                    return
+                self.port = self.server.sockets[0].getsockname()[1]
+                self._bootstrap_lock = asyncio.Lock()
+                self._cleanup_task = loop.create_task(self._cleanup_loop())
+                ready.set()
+                try:
+                    loop.run_forever()
+                finally:
+                    loop.run_until_complete(loop.shutdown_asyncgens())
+                    loop.close()
+
+            self.loop = loop
+            self.thread = threading.Thread(target=_run, name="StreamProxy", daemon=True)
+            self.thread.start()
+            ready.wait()
+            if failure:
+                self.loop = self.thread = None
+                raise failure[0]
         self._ensure_firewall_rule()
-        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
-        self.thread.start()
-        self._cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
-        self._cleanup_thread.start()
         LOG.info(f"Proxy started at http://{self.host}:{self.port}")
 
     def stop(self):
-        self._running = False
-        if self.server: self.server.shutdown()
+        with self._start_lock:
+            loop, thread = self.loop, self.thread
+            if loop is None or self.server is None: return
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=5)
+            except Exception as e:
+                LOG.debug(f"Proxy shutdown: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            if thread is not threading.current_thread():
+                thread.join(timeout=5)
+            self.server = self.loop = self.thread = None
+
+    async def _shutdown(self):
+        self.server.close()
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
         with self.lock:
-            for c in self.converters.values(): c.stop()
+            converters = list(self.converters.values())
             self.converters.clear()
+        for c in converters: c.stop()
+        for shared in list(self.shared.values()): shared.close()
+        tasks = list(self._connections)
+        for task in tasks: task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def _on_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            await StreamProxyHandler(self, reader, writer).handle()
+        finally:
+            self._connections.discard(task)
+
+    def shared_stream(self, target_url, req_headers, needs_transcode):
+        """The running ``SharedStream`` for this stream, started on first use (loop thread only)."""
+        key = (
+            target_url,
+            tuple(sorted((str(k), str(v)) for k, v in req_headers.items())),
+            "mp3" if needs_transcode else "copy",
+        )
+        shared = self.shared.get(key)
+        if shared is None:
+            shared = self.shared[key] = SharedStream(self, key, target_url, req_headers, needs_transcode)
+        return shared
+
+    def _forget_shared(self, shared):
+        # Finished streams leave the hub at once so the next client starts a fresh fetch.
+        if self.shared.get(shared.key) is shared:
+            del self.shared[shared.key]
+
+    def _submit(self, coro):
+        """Run ``coro`` on the proxy loop from any thread."""
+        loop = self.loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return loop.create_task(coro)
+        return asyncio.run_coroutine_threadsafe(coro, loop)
 
     def get_stream_url(self, target_url, headers=None, mode="auto"):
         params = {'url': target_url, 'mode': mode}
@@ -467,26 +1167,51 @@ class StreamProxy:
         return self.get_stream_url(target_url, headers, mode="audio")
 
     def get_transcoded_url(self, target_url, headers=None, transcode_profile="auto"):
+        if not self.server: self.start()
         tag = transcode_profile
         session_id = hashlib.md5(f"{target_url}|{tag}".encode()).hexdigest()
+        created = None
         with self.lock:
             if session_id not in self.converters:
-                self.converters[session_id] = HLSConverter(target_url, headers, transcode_profile)
+                created = self.converters[session_id] = HLSConverter(target_url, headers, transcode_profile)
             else: self.converters[session_id].touch()
+        if created is not None:
+            self._submit(created.start())
         return f"http://{self.host}:{self.port}/transcode/{session_id}/stream.m3u8"
 
     def get_converter(self, session_id):
         with self.lock: return self.converters.get(session_id)
 
-    def _cleanup_loop(self):
-        while self._running:
-            time.sleep(10)
+    async def bootstrap_segment(self):
+        """The 1s black filler segment served while a session starts; rendered once."""
+        async with self._bootstrap_lock:
+            if self._bootstrap is None:
+                cmd = [
+                    get_ffmpeg_path(), "-hide_banner", "-loglevel", "error",
+                    "-f", "lavfi", "-i", "color=c=black:s=640x360:r=10:d=1",
+                    "-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo",
+                    "-t", "1", "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-b:v", "1M",
+                    "-c:a", "aac", "-b:a", "64k", "-f", "mpegts", "-muxrate", "2M", "pipe:1"
+                ]
+                try:
+                    proc = await asyncio.create_subprocess_exec(
+                        *cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, creationflags=_CREATION_FLAGS
+                    )
+                    data, _ = await proc.communicate()
+                except Exception as e:
+                    LOG.error(f"Bootstrap segment failed: {e}")
+                    return b""
+                if data: self._bootstrap = data
+            return self._bootstrap or b""
+
+    async def _cleanup_loop(self):
+        while True:
+            await asyncio.sleep(10)
             now = time.time()
             with self.lock:
                 dead = [sid for sid, c in self.converters.items() if now - c.last_access > 60]
-                for sid in dead:
-                    self.converters[sid].stop()
-                    del self.converters[sid]
+                stopped = [self.converters.pop(sid) for sid in dead]
+            for c in stopped: c.stop()
 
     def _ensure_firewall_rule(self):
         if os.name != "nt" or not self.port: return
@@ -0,0 +1,105 @@
+"""
+Tests for the EPG -> playlist channel reverse indexes.
+"""
+import os
+import random
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channel_lookup import ChannelLookup, base_name
+from channel_table import ChannelTable
+from options import canonicalize_name
+from playlist import strip_noise_words
+
+
+def _linear_best(channels, channel_name, channel_id):
+    """The scan What's on Now used before the indexes existed."""
+    best, best_score = None, 0
+    q = channel_name.lower()
+    q_norm = canonicalize_name(strip_noise_words(channel_name)) if channel_name else ""
+    q_base = base_name(q)
+    for ch in channels:
+        name, tvg_name, tvg_id = ch.get("name", ""), ch.get("tvg-name", ""), ch.get("tvg-id", "")
+        score = 0
+        if channel_id and tvg_id:
+            if channel_id.lower() == tvg_id.lower():
+                score = 100
+            elif channel_id.lower() in tvg_id.lower() or tvg_id.lower() in channel_id.lower():
+                score = 80
+        if q and (name.lower() == q or (tvg_name and tvg_name.lower() == q)):
+            score = max(score, 90)
+        norm = canonicalize_name(strip_noise_words(name))
+        tvg_norm = canonicalize_name(strip_noise_words(tvg_name)) if tvg_name else ""
+        if q_norm and (norm == q_norm or tvg_norm == q_norm):
+            score = max(score, 70)
+        if q_base and base_name(name.lower()) == q_base:
+            score = max(score, 60)
+        if q and name and (q in name.lower() or name.lower() in q):
+            score = max(score, 40)
+        if q and tvg_name and (q in tvg_name.lower() or tvg_name.lower() in q):
+            score = max(score, 40)
+        if q_norm and norm:
+            a, b = set(q_norm.split()), set(norm.split())
+            if a and b and a & b:
+                score = max(score, int(30 * len(a & b) / max(len(a), len(b))))
+        if score > best_score:
+            best, best_score = ch, score
+    return best, best_score
+
+
+CHANNELS = [
+    {"name": "BBC One HD", "tvg-id": "bbc1.uk", "url": "u1"},
+    {"name": "BBC One", "tvg-name": "BBC 1", "url": "u2"},
+    {"name": "CNN International", "tvg-id": "cnn.us", "url": "u3"},
+    {"name": "Sky Sports Main Event", "tvg-id": "skysports.uk", "url": "u4"},
+    {"name": "Discovery [HD]", "url": "u5"},
+]
+
+
+class TestChannelLookup:
+    """Test index lookups against the old scan."""
+
+    def test_tiers(self):
+        records = ChannelTable(CHANNELS).records
+        lookup = ChannelLookup(records)
+        assert lookup.best_match("Whatever", "BBC1.UK") == (records[0], 100)
+        assert lookup.best_match("BBC 1") == (records[1], 90)
+        assert lookup.best_match("Sky Sports", "skysports.uk.hd")[1] == 80
+        assert lookup.best_match("discovery") == (records[4], 60)
+        assert lookup.best_match("CNN") == (records[2], 40)
+        assert lookup.best_match("Nothing Alike") == (None, 0)
+
+    def test_find_by_canonical_name(self):
+        records = ChannelTable(CHANNELS).records
+        lookup = ChannelLookup(records)
+        assert lookup.find_by_canonical_name("bbc one") is records[0]
+        assert lookup.find_by_canonical_name("Unknown") is None
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(3)
+        words = ["bbc", "one", "two", "sky", "sports", "news", "hd", "fhd", "cnn", "main", "uk", "kids"]
+        channels = []
+        for i in range(400):
+            name = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+            ch = {"name": name, "url": str(i)}
+            if rng.random() < 0.5:
+                ch["tvg-id"] = rng.choice(words) + "." + rng.choice(["uk", "us"])
+            if rng.random() < 0.3:
+                ch["tvg-name"] = " ".join(rng.choice(words) for _ in range(2))
+            channels.append(ch)
+        records = ChannelTable(channels).records
+        lookup = ChannelLookup(records)
+        for _ in range(150):
+            name = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+            cid = rng.choice(["", rng.choice(words) + ".uk", "uk"])
+            expected = _linear_best(records, name, cid)
+            assert lookup.best_match(name, cid) == expected, (name, cid)
+
+    def test_rebuild_reuses_canonical_names(self):
+        first = ChannelLookup(ChannelTable(CHANNELS).records)
+        refreshed = ChannelTable(CHANNELS + [{"name": "New Channel", "url": "u9"}]).records
+        second = ChannelLookup(refreshed, previous=first)
+        assert second.reused == 6
+        assert second.find_by_canonical_name("new channel") is refreshed[-1]
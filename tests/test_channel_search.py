@@ -0,0 +1,140 @@
+"""
+Tests for the channel name search index.
+"""
+import os
+import random
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channel_search import ChannelSearchIndex, SearchCancelled, fold_text, key_tokens
+from channel_table import ChannelTable
+
+
+CHANNELS = [
+    {"name": "BBC One HD", "url": "u1", "group": "UK"},
+    {"name": "BBC News", "url": "u2", "group": "UK"},
+    {"name": "CNN International", "url": "u3", "group": "News"},
+    {"name": "Sky News", "url": "u4", "group": "News"},
+    {"name": "Télé-Québec", "url": "u5", "group": "CA"},
+    {"name": "", "url": "u6"},
+]
+
+
+def _linear(records, query, group=None):
+    query = fold_text(query.strip())
+    return [
+        i for i, rec in enumerate(records)
+        if query in fold_text(rec.get("name") or "")
+        and (group is None or (rec.get("group") or "Uncategorized") == group)
+    ]
+
+
+def _substring(index, query, group=None):
+    return sorted(index.search(query, group=group))
+
+
+class TestChannelSearchIndex:
+    """Test substring hits against a linear scan."""
+
+    def test_matches_linear_scan(self):
+        records = ChannelTable(CHANNELS).records
+        index = ChannelSearchIndex(records, fuzzy=False)
+        for query in ("b", "bb", "bbc", "news", "s n", "-", "é", "québec", "xyz", " ", ""):
+            assert _substring(index, query) == _linear(records, query), query
+
+    def test_group_filter(self):
+        records = ChannelTable(CHANNELS).records
+        index = ChannelSearchIndex(records, fuzzy=False)
+        assert index.search("news", group="UK") == [1]
+        assert index.search("news", group="News") == [3]
+        assert index.search("", group="Uncategorized") == [5]
+
+    def test_narrowing_and_widening(self):
+        """Typing more narrows the previous results; deleting characters starts over."""
+        records = ChannelTable(CHANNELS).records
+        index = ChannelSearchIndex(records, fuzzy=False)
+        for query in ("n", "ne", "new", "news", "new", "ne", "e", "ews", "bbc n"):
+            assert _substring(index, query) == _linear(records, query), query
+
+    def test_random_queries(self):
+        rng = random.Random(7)
+        words = ["sport", "news", "bbc", "hd", "fhd", "uk", "de", "kids", "movie", "1", "2"]
+        records = ChannelTable([
+            {"name": " ".join(rng.choice(words) for _ in range(rng.randint(1, 4))), "url": str(i),
+             "group": rng.choice(["A", "B"])}
+            for i in range(300)
+        ]).records
+        index = ChannelSearchIndex(records, fuzzy=False)
+        for _ in range(200):
+            name = records[rng.randrange(len(records))]["name"]
+            start = rng.randrange(len(name))
+            query = name[start:start + rng.randint(1, 6)]
+            group = rng.choice([None, "A", "B"])
+            assert _substring(index, query, group) == _linear(records, query, group), query
+
+    def test_cancel(self):
+        records = ChannelTable(
+            [{"name": f"Channel {i}", "url": str(i)} for i in range(10000)]
+        ).records
+        index = ChannelSearchIndex(records)
+        with pytest.raises(SearchCancelled):
+            index.search("chan", cancel=lambda: True)
+        assert index.records_for(index.search("channel 999"))[0]["name"] == "Channel 999"
+
+
+class TestFuzzySearch:
+    """Test folding, typo tolerance and ranking."""
+
+    def test_fold_and_key_tokens(self):
+        assert fold_text("España Télé-Québec") == "espana tele-quebec"
+        assert fold_text("Øresund STRAẞE") == "oresund strasse"
+        assert key_tokens("bbc1 hd") == ["bbc", "1", "hd"]
+        assert key_tokens("bbc one") == ["bbc", "1"]
+
+    def test_accent_insensitive(self):
+        records = ChannelTable([
+            {"name": "España TV", "url": "u1"},
+            {"name": "Canal Sur", "url": "u2"},
+        ]).records
+        index = ChannelSearchIndex(records)
+        assert index.search("espana") == [0]
+        assert index.search("ESPAÑA") == [0]
+
+    def test_numbers_and_typos(self):
+        records = ChannelTable([
+            {"name": "BBC One HD", "url": "u1"},
+            {"name": "BBC Two", "url": "u2"},
+            {"name": "Discovery Channel", "url": "u3"},
+            {"name": "Eurosport 1", "url": "u4"},
+        ]).records
+        index = ChannelSearchIndex(records)
+        assert index.search("bbc1") == [0]
+        assert index.search("bbc one") == [0]
+        assert index.search("discovry") == [2]
+        assert index.search("dicsovery") == [2]
+        assert index.search("eurosprot 1") == [3]
+        assert index.search("zzzz") == []
+
+    def test_ranking(self):
+        """Name prefixes beat word prefixes beat inner substrings beat fuzzy hits."""
+        records = ChannelTable([
+            {"name": "Sky Sports News", "url": "u1"},
+            {"name": "ESPN Sports", "url": "u2"},
+            {"name": "Sports Center", "url": "u3"},
+            {"name": "Sporst Extra", "url": "u4"},
+        ]).records
+        index = ChannelSearchIndex(records)
+        assert index.search("sports") == [2, 0, 1, 3]
+        assert index.search("news sky") == [0]
+
+    def test_fuzzy_deferred(self):
+        """Without fuzzy keys only substring hits come back."""
+        records = ChannelTable([{"name": "BBC One", "url": "u1"}]).records
+        index = ChannelSearchIndex(records, fuzzy=False)
+        assert index.search("bbc1") == []
+        index.build_fuzzy()
+        assert index.search("bbc1") == [0]
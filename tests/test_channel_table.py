@@ -0,0 +1,133 @@
+"""
+Tests for the compact channel record store.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channel_table import ChannelRecord, ChannelTable, channel_key, diff_tables
+from http_headers import channel_http_headers
+
+
+SAMPLE = {
+    "name": "HBO",
+    "group": "Movies",
+    "url": "http://example.com/hbo",
+    "tvg-id": "hbo.us",
+    "tvg-name": "HBO",
+    "provider-id": "p1",
+    "provider-type": "xtream",
+    "catchup": "default",
+    "http-user-agent": "UA/1.0",
+    "http-headers": ["X-Token: abc"],
+}
+
+
+class TestChannelRecord:
+    """Test the dict-compatible record interface."""
+
+    def test_round_trip_matches_dict(self):
+        """A record compares equal to, and iterates like, its source dict."""
+        rec = ChannelRecord.from_mapping(SAMPLE)
+        assert rec == SAMPLE
+        assert list(rec) == list(SAMPLE)
+        assert dict(rec) == SAMPLE
+        assert len(rec) == len(SAMPLE)
+
+    def test_get_and_missing_keys(self):
+        """Missing keys behave like a dict."""
+        rec = ChannelRecord.from_mapping({"name": "A", "url": "u"})
+        assert rec.get("provider-id") is None
+        assert rec.get("catchup-days", "0") == "0"
+        assert "provider-id" not in rec
+        assert rec["tvg-id"] == ""
+        with pytest.raises(KeyError):
+            rec["tvg-logo"]
+
+    def test_mutation(self):
+        """Existing setdefault/assignment call sites keep working."""
+        rec = ChannelRecord.from_mapping({"name": "A", "url": "u"})
+        rec.setdefault("provider-id", "p9")
+        rec.setdefault("provider-id", "other")
+        rec["tvg-logo"] = "logo.png"
+        assert rec["provider-id"] == "p9"
+        assert rec["tvg-logo"] == "logo.png"
+        del rec["tvg-logo"]
+        assert "tvg-logo" not in rec
+
+    def test_group_strings_are_interned(self):
+        """Repeated group names share one string object."""
+        a = ChannelRecord.from_mapping({"name": "A", "group": "".join(["Spo", "rts"])})
+        b = ChannelRecord.from_mapping({"name": "B", "group": "".join(["Sp", "orts"])})
+        assert a["group"] is b["group"]
+
+    def test_json_and_headers(self):
+        """Records serialise as dicts and feed the header helper unchanged."""
+        rec = ChannelRecord.from_mapping(SAMPLE)
+        assert json.loads(json.dumps([rec], default=dict)) == [SAMPLE]
+        assert channel_http_headers(rec) == channel_http_headers(SAMPLE)
+
+
+class TestChannelTable:
+    """Test de-duplication and grouping."""
+
+    def test_dedupe_and_groups(self):
+        """Duplicate (name, url, provider-id) entries are dropped."""
+        table = ChannelTable([
+            {"name": "A", "url": "u1", "group": "News"},
+            {"name": "A", "url": "u1", "group": "News"},
+            {"name": "A", "url": "u1", "group": "News", "provider-id": "p"},
+            {"name": "B", "url": "u2"},
+        ])
+        assert len(table) == 3
+        assert sorted(table.by_group) == ["News", "Uncategorized"]
+        assert table.by_group["News"][0] is table.records[0]
+        assert {"name": "B", "url": "u2"} in table
+
+    def test_copy_is_independent(self):
+        """Copies share records but not indexes."""
+        table = ChannelTable([{"name": "A", "url": "u1", "group": "G"}])
+        clone = table.copy()
+        clone.add({"name": "B", "url": "u2", "group": "G"})
+        assert len(table) == 1
+        assert len(table.group("G")) == 1
+        assert len(clone.group("G")) == 2
+        assert clone.records[0] is table.records[0]
+
+
+class TestDiffTables:
+    """Test keyed diffs between refreshed tables."""
+
+    def test_added_removed_changed(self):
+        old = ChannelTable([
+            {"name": "A", "url": "u1", "group": "G"},
+            {"name": "B", "url": "u2", "group": "G"},
+            {"name": "C", "url": "u3", "group": "G"},
+        ])
+        new = ChannelTable([
+            {"name": "A", "url": "u1", "group": "G"},
+            {"name": "C", "url": "u3", "group": "H"},
+            {"name": "D", "url": "u4", "group": "G"},
+        ])
+        diff = diff_tables(old, new)
+        assert diff.base is old
+        assert [channel_key(rec) for rec in diff.added] == [("D", "u4", "")]
+        assert [channel_key(rec) for rec in diff.removed] == [("B", "u2", "")]
+        assert [(a["group"], b["group"]) for a, b in diff.changed] == [("G", "H")]
+        assert diff.unchanged == 1
+        assert not diff.is_empty
+
+    def test_equal_records_are_adopted(self):
+        """Unchanged channels keep the old record objects in every index."""
+        old = ChannelTable([{"name": "A", "url": "u1", "group": "G", "tvg-logo": "l"}])
+        new = ChannelTable([{"name": "A", "url": "u1", "group": "G", "tvg-logo": "l"}])
+        assert new.records[0] is not old.records[0]
+        diff = diff_tables(old, new)
+        assert diff.is_empty
+        assert new.records[0] is old.records[0]
+        assert new.by_group["G"][0] is old.records[0]
@@ -0,0 +1,313 @@
+"""
+Tests for EPG database schedule queries.
+"""
+import datetime
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playlist import EPGDatabase, ProgrammeRow
+
+
+UTC = datetime.timezone.utc
+BASE = datetime.datetime(2026, 3, 2, 12, 0, tzinfo=UTC)
+
+
+def _ts(minutes: int) -> str:
+    return (BASE + datetime.timedelta(minutes=minutes)).strftime("%Y%m%d%H%M%S")
+
+
+@pytest.fixture
+def epg_db(tmp_path):
+    db = EPGDatabase(str(tmp_path / "epg.db"))
+    db.insert_channel("bbc1.uk", "BBC One")
+    db.insert_channel("itv1.uk", "ITV1")
+    # Half-hour slots from 24h before BASE to 24h after BASE.
+    for slot in range(-48, 48):
+        db.insert_programme("bbc1.uk", f"BBC {slot}", _ts(slot * 30), _ts(slot * 30 + 30))
+        db.insert_programme("itv1.uk", f"ITV {slot}", _ts(slot * 30), _ts(slot * 30 + 30))
+    db.commit()
+    yield db
+    db.close()
+
+
+class TestSchedulePaging:
+    """Test keyset paging of a single channel's schedule."""
+
+    def test_page_rows_are_compact_tuples(self, epg_db):
+        """Pages contain (start, end, title) rows, not dicts."""
+        rows = epg_db.get_schedule_page("bbc1.uk", limit=3)
+        assert len(rows) == 3
+        assert isinstance(rows[0], ProgrammeRow)
+        assert rows[0] == (_ts(-48 * 30), _ts(-47 * 30), "BBC -48")
+
+    def test_forward_pages_continue_without_gaps(self, epg_db):
+        """Passing the last row as `after` continues exactly where it stopped."""
+        first = epg_db.get_schedule_page("bbc1.uk", limit=10)
+        second = epg_db.get_schedule_page("bbc1.uk", after=(first[-1].start, first[-1].end), limit=10)
+        titles = [r.title for r in first + second]
+        assert titles == [f"BBC {i}" for i in range(-48, -28)]
+
+    def test_backward_page_is_chronological(self, epg_db):
+        """Backward pages are returned oldest first."""
+        rows = epg_db.get_schedule_page("bbc1.uk", before=(_ts(0), ""), limit=3)
+        assert [r.title for r in rows] == ["BBC -3", "BBC -2", "BBC -1"]
+
+    def test_cursor_starts_at_airing_programme(self, epg_db):
+        """The first forward page begins with the show airing at the anchor."""
+        cursor = epg_db.schedule_cursor("bbc1.uk", anchor=BASE + datetime.timedelta(minutes=10), page_size=4)
+        assert [r.title for r in cursor.next_page()] == ["BBC 0", "BBC 1", "BBC 2", "BBC 3"]
+        assert [r.title for r in cursor.prev_page()] == ["BBC -4", "BBC -3", "BBC -2", "BBC -1"]
+        assert [r.title for r in cursor.next_page()] == ["BBC 4", "BBC 5", "BBC 6", "BBC 7"]
+
+    def test_cursor_reaches_both_ends(self, epg_db):
+        """Paging the whole schedule visits every row once and flags both ends."""
+        cursor = epg_db.schedule_cursor("bbc1.uk", anchor=BASE, page_size=25)
+        forward, backward = [], []
+        while not cursor.at_end:
+            forward.extend(cursor.next_page())
+        while not cursor.at_start:
+            backward[:0] = cursor.prev_page()
+        assert len(forward) == 48
+        assert len(backward) == 48
+        assert backward[-1].title == "BBC -1"
+        assert forward[0].title == "BBC 0"
+
+    def test_cursor_respects_not_before(self, epg_db):
+        """Backward paging stops at the lower bound."""
+        cursor = epg_db.schedule_cursor(
+            "bbc1.uk",
+            anchor=BASE,
+            page_size=50,
+            not_before=BASE - datetime.timedelta(hours=2),
+        )
+        rows = cursor.prev_page()
+        # "BBC -5" ends exactly on the bound and is still offered.
+        assert [r.title for r in rows] == ["BBC -5", "BBC -4", "BBC -3", "BBC -2", "BBC -1"]
+        assert cursor.at_start
+
+    def test_cursor_in_gap_uses_next_programme(self, epg_db):
+        """An anchor past the last programme yields an empty forward page."""
+        cursor = epg_db.schedule_cursor("bbc1.uk", anchor=BASE + datetime.timedelta(days=3), page_size=5)
+        assert cursor.next_page() == []
+        assert cursor.at_end
+        assert cursor.prev_page()[-1].title == "BBC 47"
+
+    def test_unknown_channel_is_empty(self, epg_db):
+        """Unknown ids return no rows."""
+        assert epg_db.get_schedule_page("nope", limit=5) == []
+
+
+class TestGuideGrid:
+    """Test the multi-channel guide grid query."""
+
+    def test_groups_rows_per_channel(self, epg_db):
+        """Each channel's overlapping programmes arrive as one group."""
+        start = BASE + datetime.timedelta(minutes=10)
+        end = BASE + datetime.timedelta(hours=1)
+        groups = dict(epg_db.iter_guide_grid(["itv1.uk", "bbc1.uk"], start, end))
+        assert set(groups) == {"bbc1.uk", "itv1.uk"}
+        assert [r.title for r in groups["bbc1.uk"]] == ["BBC 0", "BBC 1"]
+        assert all(isinstance(r, ProgrammeRow) for r in groups["itv1.uk"])
+
+    def test_window_is_half_open(self, epg_db):
+        """Programmes ending at `from` or starting at `to` are excluded."""
+        groups = dict(epg_db.iter_guide_grid(["bbc1.uk"], BASE, BASE + datetime.timedelta(minutes=30)))
+        assert [r.title for r in groups["bbc1.uk"]] == ["BBC 0"]
+
+    def test_is_a_generator_and_skips_empty(self, epg_db):
+        """Results stream lazily; unknown ids produce no group."""
+        gen = epg_db.iter_guide_grid(["missing", "bbc1.uk"], BASE, BASE + datetime.timedelta(hours=6))
+        first = next(gen)
+        assert first[0] == "bbc1.uk"
+        assert len(first[1]) == 12
+        assert list(gen) == []
+
+    def test_small_fetch_batches_keep_groups_whole(self, epg_db):
+        """Groups spanning several fetchmany batches are not split."""
+        groups = list(epg_db.iter_guide_grid(
+            ["bbc1.uk", "itv1.uk"], BASE, BASE + datetime.timedelta(hours=6), batch_rows=5
+        ))
+        assert [cid for cid, _ in groups] == ["bbc1.uk", "itv1.uk"]
+        assert [len(rows) for _, rows in groups] == [12, 12]
+
+    def test_empty_id_list(self, epg_db):
+        """No ids means no query and no output."""
+        assert list(epg_db.iter_guide_grid([], BASE, BASE + datetime.timedelta(hours=1))) == []
+
+
+SAMPLE_XMLTV = """<?xml version="1.0" encoding="UTF-8"?>
+<tv>
+  <channel id="news.uk"><display-name>News UK</display-name></channel>
+  <programme channel="news.uk" start="{s0} +0000" stop="{s1} +0000">
+    <title>Midday News</title>
+    <sub-title>Lunchtime Edition</sub-title>
+    <desc lang="en">The latest headlines from around the world.</desc>
+    <category>News</category>
+    <category>Current Affairs</category>
+    <episode-num system="xmltv_ns">1.4.0/1</episode-num>
+  </programme>
+  <programme channel="news.uk" start="{s1} +0000" stop="{s2} +0000">
+    <title>Plain Show</title>
+  </programme>
+</tv>
+"""
+
+
+# The importer prunes old rows, so the sample airs relative to today.
+_TODAY = datetime.datetime.now(UTC).replace(hour=12, minute=0, second=0, microsecond=0)
+S0, S1, S2 = ((_TODAY + datetime.timedelta(hours=h)).strftime("%Y%m%d%H%M%S") for h in range(3))
+
+
+class TestProgrammeDetails:
+    """Test compact storage of desc/category/episode metadata."""
+
+    def _import(self, tmp_path, xml=SAMPLE_XMLTV):
+        src = tmp_path / "guide.xml"
+        src.write_text(xml.replace("{s0}", S0).replace("{s1}", S1).replace("{s2}", S2), encoding="utf-8")
+        db = EPGDatabase(str(tmp_path / "details.db"))
+        db.import_epg_xml([str(src)])
+        return db
+
+    def test_import_stores_details_separately(self, tmp_path):
+        """Metadata lands in programme_details, not in the programmes table."""
+        db = self._import(tmp_path)
+        try:
+            details = db.get_programme_details("news.uk", S0, S1)
+            assert details.description == "The latest headlines from around the world."
+            assert details.sub_title == "Lunchtime Edition"
+            assert details.categories == ("News", "Current Affairs")
+            assert details.episode == "S2 E5"
+            cols = [r[1] for r in db.conn.execute("PRAGMA table_info(programmes)")]
+            assert "desc" not in cols
+        finally:
+            db.close()
+
+    def test_programmes_without_metadata_have_no_row(self, tmp_path):
+        """Title-only programmes add nothing to the details table."""
+        db = self._import(tmp_path)
+        try:
+            assert db.get_programme_details("news.uk", S1, S2) is None
+            count = db.conn.execute("SELECT COUNT(*) FROM programme_details").fetchone()[0]
+            assert count == 1
+        finally:
+            db.close()
+
+    def test_onscreen_episode_preferred(self):
+        """The provider's on-screen label wins over xmltv_ns."""
+        import xml.etree.ElementTree as ET
+        from playlist import _programme_details_from_elem
+        elem = ET.fromstring(
+            '<programme><episode-num system="xmltv_ns">0.1.</episode-num>'
+            '<episode-num system="onscreen">Part Two</episode-num></programme>'
+        )
+        assert _programme_details_from_elem(elem).episode == "Part Two"
+
+    def test_encoding_round_trip_and_compression(self):
+        """Long descriptions are stored zlib-compressed and decode losslessly."""
+        from playlist import ProgrammeDetails, _encode_programme_details, _decode_programme_details
+        details = ProgrammeDetails("A long documentary about documentary making. " * 6, "", ("Documentary",), "S1 E1")
+        blob = _encode_programme_details(details)
+        assert blob[:1] == b"z"
+        assert len(blob) < len(details.description)
+        assert _decode_programme_details(blob) == details
+
+    def test_prune_removes_orphaned_details(self, tmp_path):
+        """Pruning old programmes drops their details too."""
+        db = self._import(tmp_path)
+        try:
+            db.conn.execute("UPDATE programmes SET end = '20000101000000'")
+            db.prune_old_programmes(days=0)
+            assert db.conn.execute("SELECT COUNT(*) FROM programme_details").fetchone()[0] == 0
+        finally:
+            db.close()
+
+    def test_readonly_open_of_database_without_details_table(self, epg_db):
+        """A database from before programme details opens read-only and has none."""
+        epg_db.conn.execute("DROP TABLE programme_details")
+        epg_db.commit()
+        db = EPGDatabase(epg_db.db_path, readonly=True)
+        try:
+            assert db.get_programme_details("bbc1.uk", _ts(0), _ts(30)) is None
+            assert db.get_programme_details_by_id(1) is None
+            assert len(db.get_schedule_page("bbc1.uk", limit=2)) == 2
+        finally:
+            db.close()
+
+
+class TestMaintenance:
+    """Test idle-time storage maintenance."""
+
+    def test_new_databases_use_incremental_auto_vacuum(self, epg_db):
+        """Fresh databases are created with auto_vacuum=INCREMENTAL."""
+        assert epg_db.storage_stats()["auto_vacuum"] == 2
+
+    def test_legacy_database_is_converted(self, tmp_path):
+        """A database without auto_vacuum is only converted when a full VACUUM is allowed."""
+        path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE legacy (x)")
+        conn.commit()
+        conn.close()
+        db = EPGDatabase(path)
+        try:
+            assert db.storage_stats()["auto_vacuum"] == 0
+            db.run_maintenance(budget_secs=2)
+            assert db.storage_stats()["auto_vacuum"] == 0
+            db.run_maintenance(budget_secs=2, allow_vacuum=True)
+            assert db.storage_stats()["auto_vacuum"] == 2
+        finally:
+            db.close()
+
+    def test_failed_conversion_raises(self, tmp_path):
+        """A conversion VACUUM that cannot run is reported, not swallowed."""
+        path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE legacy (x)")
+        conn.executemany("INSERT INTO legacy VALUES (?)", [(i,) for i in range(10)])
+        conn.commit()
+        conn.close()
+        db = EPGDatabase(path)
+        try:
+            pending = db.conn.execute("SELECT x FROM legacy")
+            pending.fetchone()
+            with pytest.raises(sqlite3.OperationalError):
+                db.run_maintenance(budget_secs=2, allow_vacuum=True)
+            assert db.storage_stats()["auto_vacuum"] == 0
+        finally:
+            db.close()
+
+    def test_freelist_is_reclaimed_and_wal_truncated(self, epg_db):
+        """Deleted rows are returned to the OS and the WAL is checkpointed."""
+        epg_db.conn.execute("UPDATE programmes SET title = title || ?", ("x" * 400,))
+        epg_db.commit()
+        epg_db.conn.execute("DELETE FROM programmes")
+        epg_db.commit()
+        assert epg_db.storage_stats()["freelist_pages"] > 0
+        more = True
+        for _ in range(20):
+            more = epg_db.run_maintenance(budget_secs=1)
+            if not more:
+                break
+        stats = epg_db.storage_stats()
+        assert not more
+        assert stats["freelist_pages"] == 0
+        assert stats["wal_bytes"] == 0
+
+    def test_run_epg_maintenance_skips_locked_db(self, epg_db):
+        """A held import lock defers maintenance instead of waiting."""
+        from playlist import run_epg_maintenance, _try_acquire_import_lock, _release_import_lock
+        assert _try_acquire_import_lock(epg_db.db_path, max_wait_sec=0)
+        try:
+            assert run_epg_maintenance(epg_db.db_path) is True
+            # An explicit compaction reports that it could not run.
+            with pytest.raises(sqlite3.OperationalError):
+                run_epg_maintenance(epg_db.db_path, allow_vacuum=True)
+        finally:
+            _release_import_lock(epg_db.db_path)
+        assert run_epg_maintenance(epg_db.db_path) is False
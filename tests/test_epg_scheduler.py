@@ -0,0 +1,96 @@
+"""
+Tests for programme-boundary scheduling of the now/next EPG display.
+"""
+import datetime
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from epg_scheduler import ProgrammeBoundaryScheduler
+
+
+UTC = datetime.timezone.utc
+BASE = datetime.datetime(2026, 1, 1, 12, 0, tzinfo=UTC)
+
+
+def _show(start_min, end_min, title="Show"):
+    return {
+        "title": title,
+        "start": BASE + datetime.timedelta(minutes=start_min),
+        "end": BASE + datetime.timedelta(minutes=end_min),
+    }
+
+
+class _Clock:
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+
+class TestProgrammeBoundaryScheduler:
+    """Test boundary tracking and due-key collection."""
+
+    def test_boundary_is_end_of_current_show(self):
+        """Deadline follows the end of the airing programme."""
+        sched = ProgrammeBoundaryScheduler(lead_secs=0)
+        sched.update("bbcone", _show(-10, 20), _show(20, 50))
+        assert sched.next_deadline() == (BASE + datetime.timedelta(minutes=20)).timestamp()
+
+    def test_boundary_uses_next_start_when_nothing_airing(self):
+        """A gap before the next show uses its start time."""
+        sched = ProgrammeBoundaryScheduler(lead_secs=0)
+        sched.update("gap", None, _show(5, 30))
+        assert sched.next_deadline() == (BASE + datetime.timedelta(minutes=5)).timestamp()
+
+    def test_no_data_is_not_scheduled(self):
+        """Channels without guide data never wake the timer."""
+        sched = ProgrammeBoundaryScheduler()
+        sched.update("empty", None, None)
+        assert sched.next_deadline() is None
+        assert len(sched) == 0
+
+    def test_earliest_deadline_wins(self):
+        """The scheduler reports the earliest boundary across channels."""
+        sched = ProgrammeBoundaryScheduler(lead_secs=0)
+        sched.update("a", _show(-5, 40), None)
+        sched.update("b", _show(-5, 10), None)
+        assert sched.next_deadline() == (BASE + datetime.timedelta(minutes=10)).timestamp()
+
+    def test_update_supersedes_previous_deadline(self):
+        """Re-caching a channel replaces its old boundary."""
+        sched = ProgrammeBoundaryScheduler(lead_secs=0)
+        sched.update("a", _show(-5, 10), None)
+        sched.update("a", _show(10, 45), None)
+        assert sched.next_deadline() == (BASE + datetime.timedelta(minutes=45)).timestamp()
+        assert len(sched) == 1
+
+    def test_discard_and_clear(self):
+        """Discarded keys no longer produce deadlines."""
+        sched = ProgrammeBoundaryScheduler()
+        sched.update("a", _show(-5, 10), None)
+        sched.update("b", _show(-5, 20), None)
+        sched.discard("a")
+        assert sched.next_deadline() == (BASE + datetime.timedelta(minutes=20)).timestamp() + 1.0
+        sched.clear()
+        assert sched.next_deadline() is None
+
+    def test_pop_due_returns_only_passed_boundaries(self):
+        """Only keys whose boundary has passed are returned and removed."""
+        clock = _Clock((BASE + datetime.timedelta(minutes=15)).timestamp())
+        sched = ProgrammeBoundaryScheduler(clock=clock, lead_secs=0)
+        sched.update("early", _show(-5, 10), None)
+        sched.update("late", _show(-5, 30), None)
+        assert sched.pop_due() == ["early"]
+        assert sched.pop_due() == []
+        assert sched.seconds_until_next() == 15 * 60
+
+    def test_naive_datetimes_are_treated_as_utc(self):
+        """Legacy naive datetimes are interpreted as UTC."""
+        sched = ProgrammeBoundaryScheduler(lead_secs=0)
+        end = datetime.datetime(2026, 1, 1, 13, 0)
+        sched.update("naive", {"title": "x", "start": end, "end": end}, None)
+        assert sched.next_deadline() == end.replace(tzinfo=UTC).timestamp()
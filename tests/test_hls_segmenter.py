@@ -0,0 +1,178 @@
+"""
+Tests for in-memory HLS segmenting of MPEG-TS.
+"""
+import asyncio
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hls_segmenter import TS_PACKET_SIZE, SegmentStore, TSSegmenter
+
+PMT_PID = 0x1000
+VIDEO_PID = 0x100
+AUDIO_PID = 0x101
+
+
+def _packet(pid, payload, unit_start=False, random_access=False):
+    """One TS packet; the payload is padded with adaptation-field stuffing."""
+    header = bytes([0x47, (0x40 if unit_start else 0) | (pid >> 8), pid & 0xFF])
+    room = TS_PACKET_SIZE - 4 - len(payload)
+    if room == 0 and not random_access:
+        return header + b"\x10" + payload
+    # Adaptation field: length byte, flags byte, then 0xFF stuffing.
+    room = max(room, 2)
+    field = bytes([room - 1, 0x40 if random_access else 0x00]) + b"\xff" * (room - 2)
+    return (header + b"\x30" + field + payload)[:TS_PACKET_SIZE]
+
+
+def _psi(pid, section):
+    return _packet(pid, b"\x00" + section + b"\xff" * (TS_PACKET_SIZE - 5 - len(section)), unit_start=True)[:TS_PACKET_SIZE]
+
+
+def _pat():
+    body = bytes([0x00, 0xB0, 13, 0x00, 0x01, 0xC1, 0x00, 0x00,
+                  0x00, 0x01, 0xE0 | (PMT_PID >> 8), PMT_PID & 0xFF]) + b"\x00" * 4
+    return _psi(0, body)
+
+
+def _pmt(video=True):
+    streams = b""
+    if video:
+        streams += bytes([0x1B, 0xE0 | (VIDEO_PID >> 8), VIDEO_PID & 0xFF, 0xF0, 0x00])
+    streams += bytes([0x0F, 0xE0 | (AUDIO_PID >> 8), AUDIO_PID & 0xFF, 0xF0, 0x00])
+    length = 9 + len(streams) + 4
+    body = bytes([0x02, 0xB0, length, 0x00, 0x01, 0xC1, 0x00, 0x00,
+                  0xE0 | (VIDEO_PID >> 8), VIDEO_PID & 0xFF, 0xF0, 0x00]) + streams + b"\x00" * 4
+    return _psi(PMT_PID, body)
+
+
+def _pes(pid, seconds, keyframe=False):
+    pts = int(seconds * 90000)
+    pts_bytes = bytes([
+        0x21 | ((pts >> 29) & 0x0E), (pts >> 22) & 0xFF, 0x01 | ((pts >> 14) & 0xFE),
+        (pts >> 7) & 0xFF, 0x01 | ((pts << 1) & 0xFE),
+    ])
+    payload = b"\x00\x00\x01\xe0\x00\x00\x80\x80\x05" + pts_bytes + b"\x00" * 20
+    return _packet(pid, payload, unit_start=True, random_access=keyframe)
+
+
+def _video_stream(seconds, fps=10, gop=10):
+    """PAT/PMT, then one video frame per 1/fps s with a keyframe every ``gop`` frames."""
+    out = [_pat(), _pmt()]
+    for frame in range(int(seconds * fps)):
+        out.append(_pes(VIDEO_PID, 1 + frame / fps, keyframe=frame % gop == 0))
+        out.append(_packet(VIDEO_PID, b"\xaa" * 184))
+    return b"".join(out)
+
+
+class TestTSSegmenter:
+    """Test cutting a TS stream into segments."""
+
+    def test_cuts_at_keyframes_after_target(self):
+        store = SegmentStore(window=10, keep=10)
+        segmenter = TSSegmenter(store, target=2.0)
+        segmenter.feed(_video_stream(7))
+        segmenter.flush()
+        assert [s.sequence for s in store.segments] == [1, 2, 3, 4]
+        assert [round(s.duration, 3) for s in store.segments] == [2.0, 2.0, 2.0, 0.9]
+        for segment in store.segments:
+            assert len(segment.data) % TS_PACKET_SIZE == 0
+            # Each segment decodes alone: PAT, PMT, then a keyframe.
+            assert segment.data[:TS_PACKET_SIZE] == _pat()
+            assert segment.data[TS_PACKET_SIZE:2 * TS_PACKET_SIZE] == _pmt()
+            first = segment.data[2 * TS_PACKET_SIZE:3 * TS_PACKET_SIZE]
+            assert first[5] & 0x40
+
+    def test_out_of_order_pts(self):
+        """B-frames presented before their keyframe do not read as a PTS wrap."""
+        store = SegmentStore(window=10, keep=10)
+        segmenter = TSSegmenter(store, target=2.0)
+        out = [_pat(), _pmt()]
+        for gop in range(4):
+            start = 1 + gop * 2.0
+            # Decode order of an open GOP: I, then B-frames shown before it, then P.
+            out.append(_pes(VIDEO_PID, start + 0.2, keyframe=True))
+            out.append(_pes(VIDEO_PID, start))
+            out.append(_pes(VIDEO_PID, start + 0.1))
+            for n in range(3, 20):
+                out.append(_pes(VIDEO_PID, start + n / 10))
+        segmenter.feed(b"".join(out))
+        segmenter.flush()
+        assert [round(s.duration, 3) for s in store.segments] == [2.0, 2.0, 2.0, 1.7]
+        assert store.target_duration == 2
+
+    def test_split_feeds_match_single_feed(self):
+        data = _video_stream(5)
+        whole = SegmentStore(window=10, keep=10)
+        TSSegmenter(whole).feed(data)
+        pieces = SegmentStore(window=10, keep=10)
+        segmenter = TSSegmenter(pieces)
+        for i in range(0, len(data), 1000):
+            segmenter.feed(data[i:i + 1000])
+        assert [s.data for s in pieces.segments] == [s.data for s in whole.segments]
+
+    def test_audio_only_cuts_on_pes(self):
+        store = SegmentStore(window=10, keep=10)
+        segmenter = TSSegmenter(store, target=2.0)
+        data = [_pat(), _pmt(video=False)]
+        data += [_pes(AUDIO_PID, 1 + n * 0.5) for n in range(10)]
+        segmenter.feed(b"".join(data))
+        assert [round(s.duration, 3) for s in store.segments] == [2.0, 2.0]
+
+    def test_resyncs_after_garbage(self):
+        store = SegmentStore(window=10, keep=10)
+        segmenter = TSSegmenter(store)
+        data = _video_stream(5)
+        half = len(data) // 2 // TS_PACKET_SIZE * TS_PACKET_SIZE
+        segmenter.feed(data[:half] + b"\x00\x01\x02" + data[half:])
+        segmenter.flush()
+        assert len(store.segments) == 3
+        assert all(len(s.data) % TS_PACKET_SIZE == 0 for s in store.segments)
+
+    def test_nothing_before_psi_and_keyframe(self):
+        store = SegmentStore()
+        segmenter = TSSegmenter(store)
+        segmenter.feed(_pes(VIDEO_PID, 1, keyframe=True) * 3)
+        segmenter.flush()
+        assert not store.segments
+
+
+class TestSegmentStore:
+    """Test the segment window and the playlist built from it."""
+
+    def test_playlist_window_and_discontinuity(self):
+        store = SegmentStore(window=2, keep=3)
+        for n in range(4):
+            store.add(bytes([n]), 2.0)
+        assert store.get(1) is None
+        assert store.get(2).data == b"\x01"
+        lines = store.playlist("http://h/").splitlines()
+        assert "#EXT-X-MEDIA-SEQUENCE:3" in lines
+        assert "#EXT-X-DISCONTINUITY-SEQUENCE:1" in lines
+        assert [line for line in lines if line.startswith("http")] == ["http://h/seg_3.ts", "http://h/seg_4.ts"]
+        assert "#EXT-X-ENDLIST" not in lines
+        store.end()
+        assert store.playlist("http://h/").splitlines()[-1] == "#EXT-X-ENDLIST"
+
+    def test_first_segment_marks_discontinuity(self):
+        store = SegmentStore()
+        store.add(b"x", 2.4)
+        lines = store.playlist("").splitlines()
+        assert lines[lines.index("#EXT-X-DISCONTINUITY") + 1] == "#EXTINF:2.400000,"
+        assert "#EXT-X-DISCONTINUITY-SEQUENCE:1" not in lines
+
+    def test_wait_ready(self):
+        async def run():
+            store = SegmentStore()
+            assert not await store.wait_ready(0.01)
+            waiter = asyncio.ensure_future(store.wait_ready(5))
+            await asyncio.sleep(0)
+            store.add(b"x", 2.0)
+            ready = await waiter
+            ended = SegmentStore()
+            ended.end()
+            return ready, await ended.wait_ready(5)
+
+        assert asyncio.run(run()) == (True, False)
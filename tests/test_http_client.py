@@ -0,0 +1,271 @@
+"""
+Tests for shared HTTP helpers.
+"""
+import gzip
+import http.cookiejar
+import http.server
+import io
+import os
+import socket
+import sys
+import threading
+import urllib.error
+import urllib.request
+import zlib
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import DNSCache, HTTPClient, RequestTimings, decoded_body
+
+
+BODY = b"#EXTM3U\n" + b"".join(b"#EXTINF:-1,Chan %d\nhttp://h/%d\n" % (i, i) for i in range(2000))
+
+
+class _Response(io.BytesIO):
+    def __init__(self, data, encoding=None):
+        super().__init__(data)
+        self.headers = {"Content-Encoding": encoding} if encoding else {}
+
+
+def _read_all(body, size):
+    out = []
+    while True:
+        chunk = body.read(size)
+        if not chunk:
+            return b"".join(out)
+        assert len(chunk) <= size
+        out.append(chunk)
+
+
+class TestDecodedBody:
+    """Test transparent content decoding."""
+
+    def test_identity_is_passed_through(self):
+        resp = _Response(BODY)
+        assert decoded_body(resp) is resp
+
+    def test_gzip(self):
+        body = decoded_body(_Response(gzip.compress(BODY), "gzip"))
+        assert _read_all(body, 1000) == BODY
+
+    def test_zlib_deflate(self):
+        body = decoded_body(_Response(zlib.compress(BODY), "deflate"))
+        assert _read_all(body, 333) == BODY
+
+    def test_raw_deflate(self):
+        """Header-less deflate bodies are detected and decoded."""
+        comp = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        data = comp.compress(BODY) + comp.flush()
+        body = decoded_body(_Response(data, "deflate"))
+        assert body.read() == BODY
+
+
+class TestCacheValidators:
+    """Test ETag/Last-Modified storage next to cached downloads."""
+
+    def test_round_trip(self, tmp_path):
+        from options import load_cache_validators, save_cache_validators
+
+        cache_path = str(tmp_path / "abc.m3u")
+        assert load_cache_validators(cache_path) == {}
+        save_cache_validators(cache_path, etag='"v1"', last_modified="Mon, 02 Mar 2026 12:00:00 GMT", body_hash="f00")
+        assert load_cache_validators(cache_path) == {
+            "etag": '"v1"', "last_modified": "Mon, 02 Mar 2026 12:00:00 GMT", "hash": "f00",
+        }
+        save_cache_validators(cache_path)
+        assert load_cache_validators(cache_path) == {}
+        assert not os.path.exists(cache_path + ".meta")
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fail_next = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=()):
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self.server.ports.add(self.client_address[1])
+        if self.path == "/gzip":
+            if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                self._send(200, gzip.compress(BODY), [("Content-Encoding", "gzip")])
+            else:
+                self._send(200, BODY)
+        elif self.path == "/redirect":
+            self._send(302, b"moved", [("Location", "/plain")])
+        elif self.path == "/missing":
+            self._send(404, b"nope")
+        elif self.path == "/flaky":
+            if self.server.failures:
+                self.server.failures -= 1
+                self._send(503, b"busy", [("Retry-After", "0")])
+            else:
+                self._send(200, b"ok")
+        elif self.path.startswith("/cookie"):
+            value = self.path[len("/cookie/"):] or "abc"
+            self._send(200, b"", [("Set-Cookie", f"sid={value}; Path=/")])
+        elif self.path == "/echo-cookie":
+            self._send(200, (self.headers.get("Cookie") or "").encode())
+        elif self.path == "/echo-auth":
+            text = f"{self.headers.get('Cookie') or ''}|{self.headers.get('Authorization') or ''}"
+            self._send(200, text.encode())
+        elif self.path == "/to-localhost":
+            self._send(302, b"", [("Location", f"http://localhost:{self.server.server_address[1]}/echo-auth")])
+        else:
+            self._send(200, b"hello")
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # dropped connections are part of the tests
+
+
+@pytest.fixture
+def server():
+    srv = _Server(("127.0.0.1", 0), _Handler)
+    srv.ports = set()
+    srv.failures = 0
+    thread = threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield srv, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+class TestHTTPClient:
+    """Test the pooled client against a local keep-alive server."""
+
+    def test_connections_are_reused(self, server):
+        srv, base = server
+        client = HTTPClient()
+        for _ in range(5):
+            with client.open(base + "/plain") as resp:
+                assert resp.read() == b"hello"
+        assert len(srv.ports) == 1
+        client.close_idle()
+
+    def test_head_and_redirect(self, server):
+        srv, base = server
+        client = HTTPClient()
+        with client.open(urllib.request.Request(base + "/plain", method="HEAD")) as resp:
+            assert resp.status == 200
+        with client.open(base + "/redirect") as resp:
+            assert resp.read() == b"hello"
+            assert resp.geturl() == base + "/plain"
+        assert len(srv.ports) == 1
+
+    def test_gzip_decoding(self, server):
+        _srv, base = server
+        client = HTTPClient()
+        with client.open(base + "/gzip", decode=True) as body:
+            assert body.read() == BODY
+            assert body.headers.get("Content-Encoding") == "gzip"
+        with client.open(base + "/gzip") as resp:
+            assert resp.read() == BODY
+
+    def test_errors_raise_http_error(self, server):
+        _srv, base = server
+        client = HTTPClient()
+        with pytest.raises(urllib.error.HTTPError) as info:
+            client.open(base + "/missing")
+        assert info.value.code == 404
+        assert info.value.read() == b"nope"
+        with pytest.raises(urllib.error.HTTPError) as info:
+            client.open(base + "/redirect", follow_redirects=False)
+        assert info.value.code == 302
+
+    def test_gateway_errors_are_retried(self, server):
+        srv, base = server
+        srv.failures = 1
+        with HTTPClient(retries=1).open(base + "/flaky") as resp:
+            assert resp.read() == b"ok"
+        srv.failures = 1
+        with pytest.raises(urllib.error.HTTPError):
+            HTTPClient(retries=0).open(base + "/flaky")
+
+    def test_stale_pooled_connection(self, server):
+        """A keep-alive connection the server dropped is replaced transparently."""
+        _srv, base = server
+        client = HTTPClient()
+        with client.open(base + "/plain") as resp:
+            resp.read()
+        for idle in client._idle.values():
+            for _stamp, conn in idle:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+        with client.open(base + "/plain") as resp:
+            assert resp.read() == b"hello"
+
+    def test_cookiejar(self, server):
+        _srv, base = server
+        client = HTTPClient()
+        jar = http.cookiejar.CookieJar()
+        client.open(base + "/cookie", cookiejar=jar).close()
+        with client.open(base + "/echo-cookie", cookiejar=jar) as resp:
+            assert resp.read() == b"sid=abc"
+
+    def test_credentials_stay_with_their_host(self, server):
+        """A redirect to another host gets that host's cookies and no Authorization."""
+        _srv, base = server
+        other = base.replace("127.0.0.1", "localhost")
+        client = HTTPClient()
+        jar = http.cookiejar.CookieJar()
+        client.open(base + "/cookie/secret", cookiejar=jar).close()
+        client.open(other + "/cookie/local", cookiejar=jar).close()
+        req = urllib.request.Request(base + "/to-localhost", headers={"Authorization": "Bearer t"})
+        with client.open(req, cookiejar=jar) as resp:
+            assert resp.read() == b"sid=local|"
+        req = urllib.request.Request(base + "/echo-auth", headers={"Authorization": "Bearer t"})
+        with client.open(req, cookiejar=jar) as resp:
+            assert resp.read() == b"sid=secret|Bearer t"
+
+    def test_request_timings(self, server):
+        """Phase timings are filled for new connections; reused ones skip DNS/connect."""
+        _srv, base = server
+        client = HTTPClient()
+        first = RequestTimings()
+        with client.open(base + "/plain", timings=first) as resp:
+            assert resp.read() == b"hello"
+        assert first.status == 200 and first.bytes == 5 and not first.reused
+        assert first.dns is not None and first.connect is not None
+        # ttfb starts once the request is sent, after the connect phase.
+        assert first.ttfb > 0 and first.connect >= 0
+        assert first.transfer is not None and first.total >= first.ttfb
+        second = RequestTimings()
+        with client.open(base + "/plain", timings=second) as resp:
+            resp.read()
+        assert second.reused and second.dns is None and second.connect is None
+        assert second.ttfb is not None
+        assert set(second.as_dict()) >= {"dns", "connect", "ttfb", "transfer", "total", "bytes"}
+
+    def test_request_timings_follow_redirect(self, server):
+        """Timings describe the hop that was returned, not the redirect before it."""
+        _srv, base = server
+        timings = RequestTimings()
+        with HTTPClient().open(base + "/redirect", timings=timings) as resp:
+            assert resp.read() == b"hello"
+        assert timings.status == 200 and timings.bytes == 5
+        assert timings.reused and timings.dns is None
+        assert timings.transfer is not None and timings.transfer < timings.total
+        assert timings.total >= timings.ttfb + timings.transfer
+
+    def test_dns_cache(self):
+        cache = DNSCache(ttl=60)
+        first = cache.resolve("127.0.0.1", 80)
+        assert cache.resolve("127.0.0.1", 80) is first
+        cache.forget("127.0.0.1", 80)
+        assert cache.resolve("127.0.0.1", 80) is not first
@@ -0,0 +1,162 @@
+"""
+Tests for the incremental (streaming) M3U parser.
+"""
+import hashlib
+import io
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from m3u_parser import M3UStreamParser, extract_stream_id, parse_m3u_text, stream_m3u
+
+
+SAMPLE = '''#EXTM3U
+#EXTINF:-1 tvg-id="abc.us" tvg-name="ABC East" tvg-logo="http://logo.com/abc.png" group-title="USA News",ABC East HD
+http://stream.example.com/abc
+#EXTINF:-1 tvg-id="hbo.us" catchup="default" catchup-days="7" catchup-source="http://catch.com/?s={utc}",HBO
+#EXTVLCOPT:http-user-agent=TestUA/1.0
+#EXTVLCOPT:http-header=X-Token: abc
+#EXTVLCOPT:http-header=x-token: dup
+#KODIPROP:inputstream.adaptive.referer=ignored
+#KODIPROP:referer=http://ref.example.com/
+http://stream.example.com/live/user/pass/1234.ts
+#EXTINF:-1,Café TV
+http://stream.example.com/cafe
+'''
+
+
+class TestStreamParser:
+    """Test line assembly and field extraction."""
+
+    def test_whole_text(self):
+        """Attributes, options and headers are mapped like the old parser."""
+        channels = parse_m3u_text(SAMPLE)
+        assert [c["name"] for c in channels] == ["ABC East HD", "HBO", "Café TV"]
+        abc, hbo, cafe = channels
+        assert abc["group"] == "USA News"
+        assert abc["tvg-logo"] == "http://logo.com/abc.png"
+        assert hbo["catchup-days"] == "7"
+        assert hbo["http-user-agent"] == "TestUA/1.0"
+        assert hbo["http-referrer"] == "http://ref.example.com/"
+        assert hbo["http-headers"] == ["X-Token: abc"]
+        assert hbo["stream-id"] == "1234"
+        assert "stream-id" not in cafe
+        assert list(abc)[:5] == ["name", "group", "url", "tvg-id", "tvg-name"]
+
+    def test_byte_chunks_at_every_boundary(self):
+        """Splitting the input anywhere, even mid UTF-8 sequence, changes nothing."""
+        data = SAMPLE.replace("\n", "\r\n").encode("utf-8")
+        expected = parse_m3u_text(SAMPLE)
+        for size in (1, 2, 3, 7, 64):
+            parser = M3UStreamParser()
+            out = []
+            for i in range(0, len(data), size):
+                out.extend(parser.feed(data[i:i + size]))
+            out.extend(parser.close())
+            assert out == expected
+
+    def test_channels_emitted_as_lines_complete(self):
+        """A channel is available as soon as its URL line ends."""
+        parser = M3UStreamParser()
+        assert parser.feed(b"#EXTM3U\n#EXTINF:-1,One\nhttp://a/1") == []
+        assert [c["name"] for c in parser.feed(b"\n#EXTINF:-1,Two\n")] == ["One"]
+        assert [c["name"] for c in parser.feed(b"http://a/2")] == []
+        assert [c["name"] for c in parser.close()] == ["Two"]
+
+    def test_provider_info_and_stream_id(self):
+        """Provider metadata is stamped on each channel."""
+        meta = {"provider-id": "p1", "provider-type": "xtream"}
+        channels = parse_m3u_text("#EXTINF:-1,X\nhttp://h/live/u/p/77.ts\n", provider_info=meta)
+        assert channels[0]["provider-id"] == "p1"
+        assert channels[0]["provider-type"] == "xtream"
+        assert channels[0]["stream-id"] == "77"
+
+    def test_latin1_fallback(self):
+        """A line that is not valid UTF-8 is read as Latin-1 instead of failing."""
+        parser = M3UStreamParser()
+        out = parser.feed(b"#EXTINF:-1,Caf\xe9\nhttp://a/1\n")
+        out.extend(parser.close())
+        assert out[0]["name"] == "Café"
+
+    def test_mixed_encodings(self):
+        """One stray byte only affects its own line, in any chunking."""
+        data = ("#EXTINF:-1,España TV\nhttp://a/1\n").encode("utf-8") + b"#EXTINF:-1,Caf\xe9\nhttp://a/2\n" + (
+            "#EXTINF:-1,Ελληνικά\nhttp://a/3").encode("utf-8")
+        for size in (1, 5, len(data)):
+            parser = M3UStreamParser()
+            out = []
+            for i in range(0, len(data), size):
+                out.extend(parser.feed(data[i:i + size]))
+            out.extend(parser.close())
+            assert [c["name"] for c in out] == ["España TV", "Café", "Ελληνικά"]
+
+    def test_extract_stream_id(self):
+        assert extract_stream_id("http://h/live/u/p/1234.m3u8") == "1234"
+        assert extract_stream_id("http://h/timeshift/u/p/60/2024/5678.ts") == "5678"
+        assert extract_stream_id("http://h/") == ""
+
+
+class TestStreamM3U:
+    """Test the one-pass download helper."""
+
+    def test_hash_cache_and_callback(self, tmp_path):
+        """Hash, raw cache and incremental callbacks come from the same pass."""
+        data = SAMPLE.encode("utf-8")
+        cache_path = str(tmp_path / "playlist.m3u")
+        batches = []
+        channels, digest = stream_m3u(
+            io.BytesIO(data), cache_path=cache_path, on_channels=batches.append, chunk_size=16
+        )
+        assert digest == hashlib.sha1(data).hexdigest()
+        with open(cache_path, "rb") as f:
+            assert f.read() == data
+        assert not os.path.exists(cache_path + ".tmp")
+        assert len(batches) > 1
+        assert [c for batch in batches for c in batch] == channels
+        assert len(channels) == 3
+
+    def test_failed_read_leaves_no_cache(self, tmp_path):
+        """A broken download neither replaces the cache nor leaves a temp file."""
+
+        class _Broken(io.BytesIO):
+            def read(self, size=-1):
+                raise OSError("connection reset")
+
+        cache_path = str(tmp_path / "playlist.m3u")
+        try:
+            stream_m3u(_Broken(b""), cache_path=cache_path)
+        except OSError:
+            pass
+        assert not os.path.exists(cache_path)
+        assert not os.path.exists(cache_path + ".tmp")
+
+
+class TestEntryReuse:
+    """Test digest-based reuse of unchanged entries."""
+
+    def test_digests_identify_entries(self):
+        """Unchanged entries keep their digest; edited ones do not."""
+        a = M3UStreamParser()
+        a.feed_text(SAMPLE)
+        a.close()
+        b = M3UStreamParser()
+        b.feed_text(SAMPLE.replace("Café TV", "Cafe TV"))
+        b.close()
+        assert len(a.digests) == 3 * 8
+        assert a.digests[:16] == b.digests[:16]
+        assert a.digests[16:] != b.digests[16:]
+
+    def test_previous_records_are_reused(self):
+        """Entries found in the previous parse are returned as-is."""
+        first = M3UStreamParser()
+        old = first.feed_text(SAMPLE) + first.close()
+        lookup = {bytes(first.digests[i * 8:(i + 1) * 8]): rec for i, rec in enumerate(old)}
+        edited = SAMPLE.replace("Café TV", "Cafe TV")
+        second = M3UStreamParser(previous=lookup.get)
+        new = second.feed_text(edited) + second.close()
+        assert new[0] is old[0] and new[1] is old[1]
+        assert new[2]["name"] == "Cafe TV"
+        assert second.reused_count == 2
+        assert new == parse_m3u_text(edited)
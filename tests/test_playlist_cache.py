@@ -0,0 +1,119 @@
+"""
+Tests for the binary parsed-playlist cache.
+"""
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channel_table import ChannelTable
+from m3u_parser import M3UStreamParser, parse_m3u_text
+from playlist_cache import PlaylistCache, write_playlist_cache
+
+
+SAMPLE = '''#EXTM3U
+#EXTINF:-1 tvg-id="abc.us" tvg-name="ABC" tvg-logo="http://logo/abc.png" group-title="News",ABC
+http://h/live/u/p/1.ts
+#EXTINF:-1 tvg-id="hbo.us" catchup="default" catchup-days="7" group-title="Movies",HBO
+#EXTVLCOPT:http-header=X-Token: abc
+http://h/live/u/p/2.ts
+#EXTINF:-1 group-title="News",Télé Info
+http://h/live/u/p/3.ts
+#EXTINF:-1,No Group
+http://h/other
+'''
+
+META = {"provider-id": "p1", "provider-type": "xtream"}
+
+
+def _write(tmp_path, channels, text_hash="abc123"):
+    path = str(tmp_path / "parsed.plc")
+    write_playlist_cache(path, text_hash, channels)
+    return path
+
+
+class TestPlaylistCache:
+    """Test writing and lazily reading cached playlists."""
+
+    def test_round_trip(self, tmp_path):
+        """Every record reads back equal to what was written."""
+        channels = parse_m3u_text(SAMPLE, provider_info=META)
+        cache = PlaylistCache.open(_write(tmp_path, channels))
+        assert cache.text_hash == "abc123"
+        assert list(cache.records) == channels
+        assert cache.records[-1]["name"] == "No Group"
+        assert cache.records[1]["http-headers"] == ["X-Token: abc"]
+
+    def test_groups_without_decoding(self, tmp_path):
+        """Group names and counts come from the index alone."""
+        channels = parse_m3u_text(SAMPLE)
+        cache = PlaylistCache.open(_write(tmp_path, channels))
+        groups = cache.groups()
+        assert list(groups) == ["News", "Movies", channels[3]["group"]]
+        assert [len(view) for view in groups.values()] == [2, 1, 1]
+        assert cache._records == [None] * 4
+        assert groups["News"][1]["name"] == "Télé Info"
+        assert sum(rec is not None for rec in cache._records) == 1
+
+    def test_records_are_decoded_once(self, tmp_path):
+        cache = PlaylistCache.open(_write(tmp_path, parse_m3u_text(SAMPLE)))
+        assert cache.records[0] is cache.groups()["News"][0]
+
+    def test_provider_meta_override(self, tmp_path):
+        """Provider metadata passed at open time is stamped on decoded rows."""
+        cache = PlaylistCache.open(_write(tmp_path, parse_m3u_text(SAMPLE)), META)
+        assert cache.records[0]["provider-id"] == "p1"
+        assert cache.dedupe_key(0) == ("ABC", "http://h/live/u/p/1.ts", "p1")
+
+    def test_read_hash_and_bad_files(self, tmp_path):
+        path = _write(tmp_path, parse_m3u_text(SAMPLE), text_hash="f00d")
+        assert PlaylistCache.read_hash(path) == "f00d"
+        bad = tmp_path / "bad.plc"
+        bad.write_bytes(b'{"hash": "x", "channels": []}')
+        assert PlaylistCache.open(str(bad)) is None
+        assert PlaylistCache.read_hash(str(bad)) is None
+        assert PlaylistCache.open(str(tmp_path / "missing.plc")) is None
+
+    def test_empty_playlist(self, tmp_path):
+        cache = PlaylistCache.open(_write(tmp_path, []))
+        assert len(cache.records) == 0
+        assert cache.groups() == {}
+
+
+class TestLazyChannelTable:
+    """Test tables wrapping cache views."""
+
+    def test_views_stay_lazy_until_modified(self, tmp_path):
+        a = PlaylistCache.open(_write(tmp_path, parse_m3u_text(SAMPLE)))
+        other = tmp_path / "other"
+        other.mkdir()
+        b = PlaylistCache.open(_write(other, parse_m3u_text(SAMPLE, provider_info=META)))
+        table = ChannelTable.from_views([(a.records, a.groups()), (b.records, b.groups())])
+        assert table.is_lazy
+        assert len(table) == 8
+        assert len(table.by_group["News"]) == 4
+        assert table.records[5]["name"] == "HBO"
+        assert table.by_group["News"][2:4] == [b.records[0], b.records[2]]
+        assert sum(rec is not None for rec in a._records) == 0
+
+        table.add({"name": "ABC", "url": "http://h/live/u/p/1.ts"})
+        assert not table.is_lazy
+        assert len(table) == 8
+
+
+class TestEntryDigests:
+    """Test digest lookups used to skip re-parsing unchanged entries."""
+
+    def test_record_for_digest(self, tmp_path):
+        parser = M3UStreamParser()
+        channels = parser.feed_text(SAMPLE) + parser.close()
+        path = str(tmp_path / "parsed.plc")
+        write_playlist_cache(path, "h", channels, bytes(parser.digests))
+        cache = PlaylistCache.open(path)
+        assert cache.record_for_digest(bytes(parser.digests[8:16])) == channels[1]
+        assert cache.record_for_digest(b"\0" * 8) is None
+
+    def test_missing_digests_never_match(self, tmp_path):
+        cache = PlaylistCache.open(_write(tmp_path, parse_m3u_text(SAMPLE)))
+        assert cache.record_for_digest(bytes(8)) is None
@@ -0,0 +1,147 @@
+"""
+Tests for per-source playlist keys, refresh intervals, timers and merging.
+"""
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playlist_sources import (
+    MIN_REFRESH_DELAY_MS,
+    SourceRefreshTimers,
+    merge_source_parts,
+    playlist_source_key,
+    playlist_source_label,
+    source_refresh_hours,
+)
+
+HOUR_MS = 60 * 60 * 1000
+
+
+class _Timer:
+    """wx.CallLater stand-in: records the call and can be fired by hand."""
+
+    def __init__(self, log, delay_ms, callback, *args):
+        self.delay_ms = delay_ms
+        self.callback = callback
+        self.args = args
+        self.stopped = False
+        log.append(self)
+
+    def Stop(self):
+        self.stopped = True
+
+    def fire(self):
+        assert not self.stopped
+        self.callback(*self.args)
+
+
+def _channels(prefix, n):
+    return [{"name": f"{prefix}{i}", "url": f"http://{prefix}/{i}", "group": prefix} for i in range(n)]
+
+
+class TestSourceKeysAndIntervals:
+    """Test source identity and refresh intervals."""
+
+    def test_keys(self, tmp_path):
+        assert playlist_source_key({"type": "xtream", "id": "p1"}) == "provider:p1"
+        assert playlist_source_key({"type": "stalker", "provider_id": "p2"}) == "provider:p2"
+        assert playlist_source_key({"type": "xtream"}) is None
+        assert playlist_source_key("http://h/list.m3u") == "http://h/list.m3u"
+        path = str(tmp_path / "list.m3u")
+        assert playlist_source_key(path) == f"file:{os.path.abspath(path)}"
+        assert playlist_source_key("") is None
+        assert playlist_source_key(None) is None
+
+    def test_labels(self):
+        assert playlist_source_label({"name": "Home", "type": "xtream"}) == "Home"
+        assert playlist_source_label({"type": "stalker"}) == "stalker"
+        assert playlist_source_label("https://example.com/a.m3u") == "example.com"
+        assert playlist_source_label("/lists/local.m3u") == "local.m3u"
+
+    def test_intervals(self):
+        assert source_refresh_hours({"type": "xtream"}) == 1.0
+        assert source_refresh_hours({"type": "Stalker"}) == 1.0
+        assert source_refresh_hours({"type": "xtream", "refresh_hours": "6"}) == 6.0
+        assert source_refresh_hours({"type": "xtream", "refresh_hours": "soon"}) == 1.0
+        assert source_refresh_hours({"type": "xtream", "refresh_hours": -2}) == 1.0
+        assert source_refresh_hours({"type": "other"}) == 24.0
+        assert source_refresh_hours("http://h/list.m3u") == 24.0
+        assert source_refresh_hours("/lists/local.m3u") == 24.0
+
+
+class TestSourceRefreshTimers:
+    """Test one timer per source, re-armed from the current configuration."""
+
+    def _timers(self, sources):
+        log, due = [], []
+        timers = SourceRefreshTimers(
+            lambda *args: _Timer(log, *args), lambda: sources, due.append
+        )
+        return timers, log, due
+
+    def test_one_timer_per_source(self):
+        sources = [{"type": "xtream", "id": "a"}, "http://h/list.m3u", {"type": "xtream"}]
+        timers, log, _due = self._timers(sources)
+        timers.reset()
+        assert sorted(timers.keys()) == ["http://h/list.m3u", "provider:a"]
+        assert sorted(t.delay_ms for t in log) == [1 * HOUR_MS, 24 * HOUR_MS]
+
+    def test_fire_rearms_and_refreshes_only_that_source(self):
+        sources = [{"type": "xtream", "id": "a"}, {"type": "xtream", "id": "b"}]
+        timers, log, due = self._timers(sources)
+        timers.reset()
+        first_a = log[0]
+        sources[0]["refresh_hours"] = 3
+        first_a.fire()
+        assert due == ["provider:a"]
+        rearmed = log[-1]
+        assert rearmed.args == ("provider:a",) and rearmed.delay_ms == 3 * HOUR_MS
+        # Source b's timer was left alone.
+        assert not log[1].stopped and len(log) == 3
+
+    def test_removed_source_lapses(self):
+        sources = [{"type": "xtream", "id": "a"}]
+        timers, log, due = self._timers(sources)
+        timers.reset()
+        sources.clear()
+        log[0].fire()
+        assert due == [] and "provider:a" not in timers
+        assert len(log) == 1
+
+    def test_reset_and_stop_all_stop_old_timers(self):
+        sources = [{"type": "xtream", "id": "a", "refresh_hours": 0.001}]
+        timers, log, _due = self._timers(sources)
+        timers.reset()
+        assert log[0].delay_ms == MIN_REFRESH_DELAY_MS
+        timers.reset()
+        assert log[0].stopped and not log[1].stopped
+        timers.stop_all()
+        assert log[1].stopped and timers.keys() == []
+
+
+class TestMergeSourceParts:
+    """Test merging per-source channels in configuration order."""
+
+    def test_order_with_one_failed_source(self):
+        """A failed source keeps its last good channels, in its configured place."""
+        order = ["a", "b", "c"]
+        parts = {"a": _channels("a", 2), "b": _channels("b-old", 2), "c": _channels("c", 1)}
+        # Refresh: c finishes first, b fails (its entry is left alone), a finishes last.
+        parts["c"] = _channels("c-new", 2)
+        parts["a"] = _channels("a-new", 1)
+        merged = merge_source_parts(order, parts)
+        assert [r["name"] for r in merged.records] == [
+            "a-new0", "b-old0", "b-old1", "c-new0", "c-new1",
+        ]
+        assert sorted(merged.by_group) == ["a-new", "b-old", "c-new"]
+
+    def test_failed_source_without_cache_is_left_out(self):
+        merged = merge_source_parts(["a", "b", "c"], {"a": _channels("a", 1), "c": _channels("c", 1)})
+        assert [r["name"] for r in merged.records] == ["a0", "c0"]
+
+    def test_streaming_channels_take_their_source_slot(self):
+        parts = {"a": _channels("a", 1), "c": _channels("c", 1)}
+        merged = merge_source_parts(["a", "b", "c"], parts, {"b": _channels("b", 2), "c": []})
+        assert [r["name"] for r in merged.records] == ["a0", "b0", "b1", "c0"]
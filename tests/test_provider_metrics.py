@@ -0,0 +1,86 @@
+"""
+Tests for per-provider request telemetry.
+"""
+import json
+import os
+import socket
+import sys
+import urllib.error
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import RequestTimings
+from provider_metrics import ProviderMetrics, RequestSample, error_class
+
+
+def _timings(ttfb, total, nbytes=100):
+    timings = RequestTimings()
+    timings.ttfb = ttfb
+    timings.transfer = total - ttfb
+    timings.bytes = nbytes
+    timings.status = 200
+    timings.started = 0.0
+    timings._ended = total
+    return timings
+
+
+class TestProviderMetrics:
+    """Test recording and summarising provider samples."""
+
+    def test_measure_records_success_and_error(self):
+        metrics = ProviderMetrics()
+        with metrics.measure("Xtream: host", "api:get_live_streams", "host") as timings:
+            assert isinstance(timings, RequestTimings)
+        with pytest.raises(ValueError):
+            with metrics.measure("Xtream: host", "api:get_live_streams", "host"):
+                raise ValueError("bad json")
+        ok, failed = metrics.samples("Xtream: host")
+        assert ok.ok and ok.host == "host"
+        assert not failed.ok and failed.error == "ValueError"
+
+    def test_error_classes(self):
+        assert error_class(urllib.error.HTTPError("u", 503, "busy", {}, None)) == "HTTPError 503"
+        assert error_class(urllib.error.URLError(socket.timeout("timed out"))) == "timeout"
+        assert error_class(urllib.error.URLError(ConnectionRefusedError())) == "ConnectionRefusedError"
+
+    def test_summary(self):
+        metrics = ProviderMetrics()
+        for i in range(1, 11):
+            metrics.record(RequestSample("p", "api", "h", _timings(i / 100, i / 10)))
+        metrics.record(RequestSample("p", "api", "h", error=TimeoutError()))
+        metrics.record_load("p", 2.5, channels=1200)
+        metrics.record_load("p", 1.0, error=OSError())
+        info = metrics.summary("p")
+        assert info["requests"] == 11 and info["errors"] == 1
+        assert info["total_p50"] == pytest.approx(0.5)
+        assert info["total_p95"] == pytest.approx(1.0)
+        assert info["ttfb_avg"] == pytest.approx(0.055)
+        assert info["bytes"] == 1000
+        assert info["channels"] == 1200 and info["load_seconds"] == 2.5
+        assert info["last_load_ok"] is False
+        assert info["error_classes"] == {"timeout": 1, "OSError": 1}
+        assert info["last_error"] == "OSError"
+
+    def test_samples_are_bounded(self):
+        metrics = ProviderMetrics(max_samples=3)
+        for _ in range(5):
+            metrics.record(RequestSample("p", "api"))
+        assert len(metrics.samples("p")) == 3
+        metrics.clear()
+        assert metrics.providers() == []
+
+    def test_export_json(self, tmp_path):
+        metrics = ProviderMetrics()
+        metrics.record(RequestSample("a", "api", "h", _timings(0.1, 0.2)))
+        metrics.record_load("b", 3.0, channels=5)
+        path = str(tmp_path / "health.json")
+        metrics.export_json(path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        assert sorted(data["providers"]) == ["a", "b"]
+        assert data["providers"]["a"]["samples"][0]["ttfb"] == 0.1
+        assert data["providers"]["b"]["summary"]["channels"] == 5
+        assert not os.path.exists(path + ".tmp")
@@ -1,6 +1,8 @@
 """
 Tests for Stalker Portal provider functionality.
 """
+import threading
+import time
 import pytest
 import json
 import urllib.parse
@@ -14,6 +16,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from providers import (
     StalkerPortalConfig,
     StalkerPortalClient,
+    PortalAuthError,
     ProviderError,
     _normalize_base_url,
 )
@@ -455,5 +458,189 @@ class TestStalkerPortalGenres:
         assert len(channels_by_genre["Sports"]) == 1
 
 
+
+def _portal(**kwargs):
+    cfg = StalkerPortalConfig(base_url="http://portal.example.com", username="u", password="p",
+                              mac="00:1A:79:00:00:01", provider_id="s1", **kwargs)
+    client = StalkerPortalClient(cfg)
+    client._token = "t"
+    client._token_issued = time.time()
+    return client
+
+
+def _row(n, genre="1"):
+    return {"id": str(n), "name": f"Ch {n}", "number": str(n), "cmd": f"ffrt http://localhost/ch/{n}",
+            "tv_genre_id": genre, "epg_id": f"ch{n}"}
+
+
+class TestStalkerPagedFetch:
+    """Test paged get_ordered_list fetching."""
+
+    def _router(self, total, per_page, calls):
+        def portal_call(params, include_token=True, timeout=30):
+            calls.append(params["action"])
+            if params["action"] == "get_genres":
+                return {"js": [{"id": "1", "title": "News"}, {"id": "2", "title": "Sports"}]}
+            if params["action"] == "get_ordered_list":
+                page = int(params["p"])
+                start = (page - 1) * per_page + 1
+                rows = [_row(n, "2" if n % 2 else "1") for n in range(start, min(total, start + per_page - 1) + 1)]
+                return {"js": {"total_items": total, "max_page_items": per_page, "data": rows}}
+            raise AssertionError(params)
+        return portal_call
+
+    def test_pages_in_order(self):
+        calls = []
+        client = _portal()
+        with patch.object(StalkerPortalClient, "_portal_call", side_effect=self._router(35, 10, calls)):
+            channels, epgs = client.fetch_channels()
+        assert [c["name"] for c in channels] == [f"Ch {n}" for n in range(1, 36)]
+        assert calls.count("get_ordered_list") == 4
+        assert "get_all_channels" not in calls
+        assert channels[0]["group"] == "Sports" and channels[1]["group"] == "News"
+        assert channels[0]["provider-data"]["cmd"] == "ffrt http://localhost/ch/1"
+        assert channels[0]["provider-id"] == "s1"
+        assert epgs == ["http://portal.example.com/xmltv.php"]
+
+    def test_falls_back_to_get_all_channels(self):
+        def portal_call(params, include_token=True, timeout=30):
+            if params["action"] == "get_all_channels":
+                return {"js": {"data": [dict(_row(1), tv_genre_title="Movies")]}}
+            raise ProviderError("unsupported")
+        with patch.object(StalkerPortalClient, "_portal_call", side_effect=portal_call):
+            channels, _epgs = _portal().fetch_channels()
+        assert [(c["name"], c["group"]) for c in channels] == [("Ch 1", "Movies")]
+
+
+class TestStalkerLinkCache:
+    """Test pre-resolved links."""
+
+    def _client_counting(self):
+        calls = []
+
+        def portal_call(params, include_token=True, timeout=30):
+            calls.append(params["cmd"])
+            return {"js": {"cmd": f"ffmpeg http://cdn/{len(calls)}"}}
+        return calls, portal_call
+
+    def test_prefetched_link_is_reused(self):
+        calls, portal_call = self._client_counting()
+        client = _portal()
+        with patch.object(StalkerPortalClient, "_portal_call", side_effect=portal_call):
+            client._prefetch_link({"cmd": "a"}, "a")
+            assert client.resolve_stream({"cmd": "a"}) == "http://cdn/1"
+            assert client.resolve_stream({"cmd": "a"}) == "http://cdn/1"
+            assert calls == ["a"]
+
+    def test_temporary_links_are_single_use(self):
+        calls, portal_call = self._client_counting()
+        client = _portal()
+        pdata = {"cmd": "a", "use_http_tmp_link": 1}
+        with patch.object(StalkerPortalClient, "_portal_call", side_effect=portal_call):
+            client._prefetch_link(pdata, "a")
+            assert client.resolve_stream(pdata) == "http://cdn/1"
+            assert client.resolve_stream(pdata) == "http://cdn/2"
+
+    def test_expired_links_are_resolved_again(self):
+        calls, portal_call = self._client_counting()
+        client = _portal()
+        with patch.object(StalkerPortalClient, "_portal_call", side_effect=portal_call):
+            client._prefetch_link({"cmd": "a"}, "a")
+            client._link_cache["a"] = ("http://cdn/1", time.monotonic() - 1)
+            assert client.resolve_stream({"cmd": "a"}) == "http://cdn/2"
+
+    def test_prefetch_runs_in_background(self):
+        calls, portal_call = self._client_counting()
+        client = _portal()
+        client._base = "http://prefetch.example.com"
+        with patch.object(StalkerPortalClient, "_portal_call", side_effect=portal_call):
+            client.prefetch_links([{"cmd": "far"}, {"cmd": "near"}])
+            deadline = time.monotonic() + 5
+            while len(client._link_cache) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        assert calls == ["near", "far"]
+        assert set(client._link_cache) == {"near", "far"}
+
+
+class TestStalkerTokenManager:
+    """Test session token renewal."""
+
+    def _handshaking_client(self, delay=0.0):
+        client = _portal()
+        client._token = None
+        calls = []
+
+        def portal_request(params, include_token=True, timeout=30, token=None):
+            calls.append((params["action"], token or client._token))
+            if params["action"] == "handshake":
+                time.sleep(delay)
+                return {"js": {"token": f"hs{len(calls)}"}}
+            if params["action"] == "login":
+                return {"js": {"token": f"session{len(calls)}"}}
+            return {"js": {"ok": True}}
+
+        return client, calls, portal_request
+
+    def test_concurrent_callers_share_one_handshake(self):
+        client, calls, portal_request = self._handshaking_client(delay=0.1)
+        with patch.object(StalkerPortalClient, "_portal_request", side_effect=portal_request):
+            threads = [threading.Thread(target=client._ensure_token) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        client.close()
+        assert [action for action, _tok in calls] == ["handshake", "login"]
+        # Login carries the handshake token; the session token replaces it.
+        assert calls[1] == ("login", "hs1")
+        assert client._token == "session2"
+
+    def test_auth_error_retries_once_with_new_token(self):
+        client, calls, portal_request = self._handshaking_client()
+        client._token, client._token_issued = "old", time.time()
+        rejected = []
+
+        def request(params, include_token=True, timeout=30, token=None):
+            if params["action"] == "get_genres" and not rejected:
+                rejected.append(client._token)
+                raise PortalAuthError("Authorization failed.")
+            return portal_request(params, include_token, timeout, token)
+
+        with patch.object(StalkerPortalClient, "_portal_request", side_effect=request):
+            assert client._portal_call({"type": "itv", "action": "get_genres"}) == {"js": {"ok": True}}
+        client.close()
+        assert rejected == ["old"]
+        assert [action for action, _tok in calls] == ["handshake", "login", "get_genres"]
+        assert calls[-1][1] == client._token != "old"
+
+    def test_second_auth_error_is_raised(self):
+        client = _portal()
+        with patch.object(StalkerPortalClient, "_portal_request", side_effect=PortalAuthError("no")), \
+                patch.object(StalkerPortalClient, "_handshake") as handshake:
+            with pytest.raises(PortalAuthError):
+                client._portal_call({"type": "itv", "action": "get_genres"})
+        assert handshake.call_count == 1
+
+    def test_renewed_in_background_before_expiry(self):
+        client, calls, portal_request = self._handshaking_client()
+        client.TOKEN_LIFETIME = 1.2
+        client.TOKEN_REFRESH_MARGIN = 1.0
+        with patch.object(StalkerPortalClient, "_portal_request", side_effect=portal_request):
+            client._ensure_token()
+            first = client._token
+            deadline = time.monotonic() + 5
+            while client._token == first and time.monotonic() < deadline:
+                time.sleep(0.02)
+        client.close()
+        assert client._token != first
+        assert [action for action, _tok in calls] == ["handshake", "login", "handshake", "login"]
+
+    def test_stale_renewal_is_skipped(self):
+        """A renewal for a token someone already replaced does nothing."""
+        client = _portal()
+        with patch.object(StalkerPortalClient, "_handshake") as handshake:
+            client._ensure_token(force=True, stale_token="not-current")
+        assert handshake.call_count == 0
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
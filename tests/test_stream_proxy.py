@@ -0,0 +1,297 @@
+"""
+Tests for the asyncio stream proxy.
+"""
+import asyncio
+import http.client
+import http.server
+import os
+import sys
+import collections
+import threading
+import time
+import urllib.error
+import urllib.parse
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_proxy import HLSConverter, SlowClientError, StreamBuffer, StreamProxy, open_upstream
+
+
+AUDIO = bytes(range(256)) * 1200  # ~300KB, past the initial fill
+
+
+class _Upstream(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = collections.Counter()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.hits[self.path] += 1
+        if self.path == "/live.mp3":
+            # A paced stream, so a second client joins while it is still running.
+            self.send_response(200)
+            self.end_headers()
+            try:
+                for i in range(0, len(AUDIO), 16384):
+                    self.wfile.write(AUDIO[i:i + 16384])
+                    self.wfile.flush()
+                    time.sleep(0.02)
+            except OSError:
+                pass
+            self.close_connection = True
+        elif self.path == "/radio.mp3":
+            self._send(200, AUDIO)
+        elif self.path == "/chunked.mp3":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(AUDIO), 50000):
+                piece = AUDIO[i:i + 50000]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+            self.wfile.write(b"0\r\n\r\n")
+        elif self.path == "/redirect.mp3":
+            self._send(302, b"", [("Location", "/radio.mp3")])
+        elif self.path == "/token.mp3":
+            self._send(200, (self.headers.get("X-Token") or "").encode() + b"|" + self.headers.get("User-Agent").encode())
+        else:
+            self._send(404, b"nope")
+
+    def _send(self, status, body, headers=()):
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def upstream():
+    _Upstream.hits.clear()
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    thread = threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def proxy():
+    p = StreamProxy()
+    p.host = "127.0.0.1"
+    p.start()
+    yield p
+    p.stop()
+
+
+def _get(proxy, url, conn=None):
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path + ("?" + parts.query if parts.query else "")
+    conn = conn or http.client.HTTPConnection(proxy.host, proxy.port, timeout=10)
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    return resp, resp.read()
+
+
+class TestRadioPassThrough:
+    """Test the /stream audio path for streams that need no transcoding."""
+
+    def test_plain_body(self, proxy, upstream):
+        resp, body = _get(proxy, proxy.get_audio_url(upstream + "/radio.mp3"))
+        assert resp.status == 200
+        assert resp.getheader("Content-Type") == "audio/mpeg"
+        assert body == AUDIO
+
+    def test_chunked_and_redirected_upstreams(self, proxy, upstream):
+        for name in ("/chunked.mp3", "/redirect.mp3"):
+            assert _get(proxy, proxy.get_audio_url(upstream + name))[1] == AUDIO
+
+    def test_headers_are_forwarded(self, proxy, upstream):
+        url = proxy.get_audio_url(upstream + "/token.mp3", headers={"X-Token": "abc", "_extra": "x"})
+        body = _get(proxy, url)[1]
+        token, agent = body.split(b"|")
+        assert token == b"abc" and agent.startswith(b"Mozilla/5.0")
+
+    def test_clients_share_one_upstream(self, proxy, upstream):
+        url = proxy.get_audio_url(upstream + "/live.mp3")
+        results = []
+
+        def client(delay):
+            time.sleep(delay)
+            results.append(_get(proxy, url)[1])
+
+        threads = [threading.Thread(target=client, args=(delay,)) for delay in (0, 0.15)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert _Upstream.hits["/live.mp3"] == 1
+        assert sorted(len(body) for body in results)[-1] == len(AUDIO)
+        # The late joiner starts behind the live edge and reads on to the end.
+        assert all(body and AUDIO.endswith(body) for body in results)
+
+    def test_upstream_error_ends_the_stream(self, proxy, upstream):
+        url = proxy.get_audio_url(upstream + "/gone.mp3")
+        resp, body = _get(proxy, url)
+        assert resp.status == 200 and body == b""
+
+
+class TestProxyHttp:
+    """Test keep-alive routing on one client connection."""
+
+    def test_keep_alive(self, proxy):
+        conn = http.client.HTTPConnection(proxy.host, proxy.port, timeout=10)
+        conn.request("OPTIONS", "/stream")
+        resp = conn.getresponse()
+        resp.read()
+        assert resp.getheader("Access-Control-Allow-Methods") == "GET, OPTIONS"
+        sock = conn.sock
+        assert _get(proxy, "/nowhere", conn)[0].status == 404
+        assert _get(proxy, "/stream", conn)[0].status == 400
+        assert _get(proxy, "/transcode/unknown/stream.m3u8", conn)[0].status == 404
+        assert conn.sock is sock
+
+    def test_unsupported_method(self, proxy):
+        conn = http.client.HTTPConnection(proxy.host, proxy.port, timeout=10)
+        conn.request("POST", "/stream", body=b"")
+        assert conn.getresponse().status == 501
+
+    def test_video_redirects_to_hls_session(self, proxy, monkeypatch):
+        monkeypatch.setattr("stream_proxy.get_ffmpeg_path", lambda: "/nonexistent/ffmpeg")
+        resp, _body = _get(proxy, proxy.get_stream_url("http://example.invalid/live.ts"))
+        assert resp.status == 302
+        location = resp.getheader("Location")
+        assert location == proxy.get_transcoded_url("http://example.invalid/live.ts")
+        # ffmpeg could not start: the bootstrap playlist is served straight away.
+        body = _get(proxy, location)[1].decode()
+        assert body.startswith("#EXTM3U") and body.rstrip().endswith("/bootstrap.ts")
+
+    def test_transcode_playlist_and_segments(self, proxy):
+        converter = HLSConverter("http://example.invalid/live.ts")
+        converter.store.add(b"G" * 188, 2.0)
+        converter.store.add(b"H" * 188, 2.0)
+        proxy.converters["sid"] = converter
+        resp, body = _get(proxy, "/transcode/sid/stream.m3u8")
+        assert resp.getheader("Content-Type") == "application/vnd.apple.mpegurl"
+        lines = body.decode().splitlines()
+        assert f"http://{proxy.host}:{proxy.port}/transcode/sid/seg_1.ts" in lines
+        assert "#EXT-X-MEDIA-SEQUENCE:1" in lines
+        assert _get(proxy, "/transcode/sid/seg_1.ts")[1] == b"G" * 188
+        assert _get(proxy, "/transcode/sid/seg_2.ts")[1] == b"H" * 188
+        assert _get(proxy, "/transcode/sid/seg_9.ts")[0].status == 404
+
+
+class TestUpstreamAndBuffer:
+    """Test the async upstream reader and the stream buffer on their own."""
+
+    def test_open_upstream_errors(self, upstream):
+        async def run():
+            with pytest.raises(urllib.error.HTTPError) as info:
+                await open_upstream(upstream + "/missing")
+            return info.value.code
+
+        assert asyncio.run(run()) == 404
+
+    def test_initial_fill_and_backpressure(self):
+        """A lone client holds the producer back instead of losing data."""
+        async def run():
+            buf = StreamBuffer(max_size=30, initial_fill=20)
+            cursor = buf.cursor()
+            await buf.write(b"a" * 10)
+            reader = asyncio.ensure_future(cursor.read(10))
+            await asyncio.sleep(0.01)
+            assert not reader.done()
+            await buf.write(b"b" * 10)
+            assert await reader == b"a" * 10
+            await buf.write(b"c" * 10)
+            await buf.write(b"d" * 10)
+            blocked = asyncio.ensure_future(buf.write(b"e" * 10))
+            await asyncio.sleep(0.01)
+            assert not blocked.done()
+            assert await cursor.read(10) == b"b" * 10
+            await blocked
+            buf.close()
+            return [await cursor.read() for _ in range(2)]
+
+        assert asyncio.run(run()) == [b"c" * 10 + b"d" * 10 + b"e" * 10, b""]
+
+    def test_late_joiner_starts_near_live_edge(self):
+        async def run():
+            buf = StreamBuffer(max_size=100, initial_fill=15)
+            for piece in (b"a" * 10, b"b" * 10, b"c" * 10):
+                await buf.write(piece)
+            return await buf.cursor().read(100)
+
+        assert asyncio.run(run()) == b"b" * 5 + b"c" * 10
+
+    def test_ring_wraps_without_copies(self):
+        """Reads across the end of the ring come back as two views of the same memory."""
+        async def run():
+            buf = StreamBuffer(max_size=16, initial_fill=1)
+            cursor = buf.cursor()
+            await buf.write(b"0123456789")
+            assert await cursor.read(10) == b"0123456789"
+            view = await buf.reserve(16)
+            assert len(view) == 6  # up to the end of the ring
+            view[:6] = b"abcdef"
+            buf.commit(6)
+            await buf.write(b"ghij")
+            views = await cursor.peek(100)
+            assert [v.obj for v in views] == [buf._view.obj] * 2
+            return b"".join(views)
+
+        assert asyncio.run(run()) == b"abcdefghij"
+
+    def test_fill_from_readinto_source(self):
+        class Source:
+            def __init__(self):
+                self.data = memoryview(bytes(range(256)) * 10)
+
+            async def readinto(self, view):
+                n = min(len(view), len(self.data), 100)
+                view[:n] = self.data[:n]
+                self.data = self.data[n:]
+                return n
+
+        async def run():
+            buf = StreamBuffer(max_size=300, initial_fill=1)
+            cursor = buf.cursor()
+            async def produce():
+                await buf.fill_from(Source(), size=128)
+                buf.close()
+
+            producer = asyncio.ensure_future(produce())
+            out = bytearray()
+            while True:
+                data = await cursor.read(64)
+                if not data:
+                    break
+                out += data
+            await producer
+            return bytes(out)
+
+        assert asyncio.run(run()) == bytes(range(256)) * 10
+
+    def test_slow_client_is_skipped_then_dropped(self):
+        """With another client keeping up, a laggard loses data instead of stalling the stream."""
+        async def run():
+            buf = StreamBuffer(max_size=20, initial_fill=10, stall_grace=0.01, max_skips=1)
+            fast, slow = buf.cursor(), buf.cursor()
+            for i in range(4):
+                await buf.write(bytes([65 + i]) * 10)
+                await fast.read()
+            skipped = await slow.read(100)
+            for i in range(4, 8):
+                await buf.write(bytes([65 + i]) * 10)
+                await fast.read()
+            with pytest.raises(SlowClientError):
+                await slow.read()
+            return skipped
+
+        assert asyncio.run(run()) == b"D" * 10
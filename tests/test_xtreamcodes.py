@@ -1,6 +1,10 @@
 """
 Tests for XtreamCodes provider functionality.
 """
+import base64
+import datetime
+import threading
+import time
 import pytest
 import json
 import urllib.parse
@@ -16,6 +20,7 @@ from providers import (
     XtreamCodesConfig,
     XtreamCodesClient,
     ProviderError,
+    RateLimitedQueue,
     _normalize_base_url,
 )
 
@@ -154,7 +159,7 @@ class TestXtreamCodesClient:
         desc = client.describe()
         assert "myprovider.com" in desc
 
-    @patch('urllib.request.urlopen')
+    @patch('providers.urlopen')
     def test_fetch_playlist_success(self, mock_urlopen):
         """Test successful playlist fetch."""
         mock_response = Mock()
@@ -175,7 +180,7 @@ class TestXtreamCodesClient:
         assert "#EXTM3U" in playlist
         assert "Test Channel" in playlist
 
-    @patch('urllib.request.urlopen')
+    @patch('providers.urlopen')
     def test_fetch_playlist_latin1_encoding(self, mock_urlopen):
         """Test playlist fetch with Latin-1 encoded content."""
         # Content that's not valid UTF-8
@@ -412,5 +417,200 @@ class TestXtreamAuthentication:
         assert query["password"][0] == "p@ss!word#123"
 
 
+
+def _json_response(payload):
+    """A urlopen() stand-in returning ``payload`` as JSON."""
+    resp = Mock()
+    resp.read.return_value = json.dumps(payload).encode("utf-8")
+    resp.__enter__ = Mock(return_value=resp)
+    resp.__exit__ = Mock(return_value=False)
+    return resp
+
+
+def _api_router(routes):
+    """Serve player_api.php responses keyed by (action, category_id)."""
+
+    def fake_urlopen(req, timeout=None, **kwargs):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(req.full_url).query)
+        key = (query["action"][0], query.get("category_id", [None])[0])
+        return _json_response(routes[key])
+
+    return fake_urlopen
+
+
+class TestXtreamPlayerApi:
+    """Test building channel records from player_api.php JSON."""
+
+    CATEGORIES = [
+        {"category_id": "1", "category_name": "News", "parent_id": 0},
+        {"category_id": "2", "category_name": "Sports", "parent_id": 0},
+    ]
+    NEWS = [
+        {"num": 1, "name": "CNN", "stream_id": 101, "stream_icon": "http://logo/cnn.png",
+         "epg_channel_id": "cnn.us", "category_id": "1", "tv_archive": 1, "tv_archive_duration": 7},
+        {"num": 2, "name": "BBC News", "stream_id": 102, "stream_icon": "",
+         "epg_channel_id": None, "category_id": "1", "tv_archive": 0},
+    ]
+    SPORTS = [
+        {"num": 3, "name": "ESPN", "stream_id": 201, "category_id": "2"},
+        {"num": 4, "name": "", "stream_id": 202, "category_id": "2"},
+    ]
+
+    def _client(self, **kwargs):
+        cfg = XtreamCodesConfig(base_url="http://provider.com:8080", username="u", password="p",
+                                provider_id="x1", **kwargs)
+        return XtreamCodesClient(cfg)
+
+    def test_api_url(self):
+        url = self._client().api_url("get_live_streams", category_id="5")
+        assert url.startswith("http://provider.com:8080/player_api.php?")
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+        assert query == {"username": ["u"], "password": ["p"],
+                         "action": ["get_live_streams"], "category_id": ["5"]}
+
+    @patch('providers.urlopen')
+    def test_channels_per_category(self, mock_urlopen):
+        """Records match the m3u_plus shape and keep the panel's category order."""
+        mock_urlopen.side_effect = _api_router({
+            ("get_live_categories", None): self.CATEGORIES,
+            ("get_live_streams", "1"): self.NEWS,
+            ("get_live_streams", "2"): self.SPORTS,
+        })
+        categories, batches = [], []
+        channels, digest = self._client().fetch_channels_api(
+            on_categories=categories.append, on_channels=batches.append
+        )
+        assert categories == [["News", "Sports"]]
+        assert [c["name"] for c in channels] == ["CNN", "BBC News", "ESPN"]
+        assert sorted(len(b) for b in batches) == [1, 2]
+        cnn = channels[0]
+        assert cnn["group"] == "News"
+        assert cnn["url"] == "http://provider.com:8080/live/u/p/101.ts"
+        assert cnn["stream-id"] == "101"
+        assert cnn["tvg-id"] == "cnn.us"
+        assert cnn["tvg-logo"] == "http://logo/cnn.png"
+        assert cnn["provider-id"] == "x1"
+        assert cnn["provider-type"] == "xtream"
+        assert cnn["catchup-days"] == "7"
+        assert "catchup-days" not in channels[1]
+        assert channels[1]["tvg-id"] == ""
+        assert len(digest) == 40
+
+    @patch('providers.urlopen')
+    def test_unfiltered_listing_keeps_uncategorised_streams(self, mock_urlopen):
+        """Without a streaming callback one call lists every stream, uncategorised ones last."""
+        stray = [{"name": "Stray", "stream_id": 301, "category_id": None},
+                 {"name": "Orphan", "stream_id": 302, "category_id": "99"}]
+        mock_urlopen.side_effect = _api_router({
+            ("get_live_categories", None): self.CATEGORIES,
+            ("get_live_streams", None): stray[:1] + self.SPORTS + self.NEWS + stray[1:],
+        })
+        channels, _digest = self._client().fetch_channels_api()
+        assert [c["name"] for c in channels] == ["CNN", "BBC News", "ESPN", "Stray", "Orphan"]
+        assert [c["group"] for c in channels[3:]] == ["Uncategorized", "Uncategorized"]
+
+    @patch('providers.urlopen')
+    def test_hls_output_and_no_categories(self, mock_urlopen):
+        """Without categories all streams come from one call."""
+        mock_urlopen.side_effect = _api_router({
+            ("get_live_categories", None): [],
+            ("get_live_streams", None): self.SPORTS,
+        })
+        channels, _digest = self._client(output="hls").fetch_channels_api()
+        assert [c["url"] for c in channels] == ["http://provider.com:8080/live/u/p/201.m3u8"]
+        assert channels[0]["group"] == "Uncategorized"
+
+    @patch('providers.urlopen')
+    def test_auth_failure(self, mock_urlopen):
+        mock_urlopen.return_value = _json_response({"user_info": {"auth": 0}})
+        with pytest.raises(ProviderError):
+            self._client().fetch_channels_api()
+
+    @patch('providers.urlopen')
+    def test_not_json(self, mock_urlopen):
+        """A panel without the API (HTML error page) raises so callers can fall back."""
+        resp = _json_response(None)
+        resp.read.return_value = b"<html>404</html>"
+        mock_urlopen.return_value = resp
+        with pytest.raises(ProviderError):
+            self._client().fetch_live_categories()
+
+
+class TestXtreamShortEpg:
+    """Test the get_short_epg now/next fallback."""
+
+    NOW = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc)
+
+    def _listing(self, title, start_hour, end_hour):
+        start = datetime.datetime(2024, 5, 1, start_hour, tzinfo=datetime.timezone.utc)
+        end = datetime.datetime(2024, 5, 1, end_hour, tzinfo=datetime.timezone.utc)
+        return {
+            "epg_id": "cnn.us",
+            "title": base64.b64encode(title.encode("utf-8")).decode("ascii"),
+            "start_timestamp": str(int(start.timestamp())),
+            "stop_timestamp": str(int(end.timestamp())),
+        }
+
+    @patch('providers.urlopen')
+    def test_now_next(self, mock_urlopen):
+        mock_urlopen.side_effect = _api_router({("get_short_epg", None): {"epg_listings": [
+            self._listing("Later", 14, 15),
+            self._listing("Earlier", 10, 11),
+            self._listing("Café Live", 12, 13),
+            self._listing("Next Up", 13, 14),
+        ]}})
+        client = XtreamCodesClient(XtreamCodesConfig(base_url="http://provider.com", username="u", password="p"))
+        now, nxt = client.fetch_now_next(101, now=self.NOW)
+        assert now["title"] == "Café Live"
+        assert now["start"].hour == 12 and now["start"].tzinfo is not None
+        assert nxt["title"] == "Next Up"
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(mock_urlopen.call_args[0][0].full_url).query)
+        assert query["stream_id"] == ["101"]
+
+    @patch('providers.urlopen')
+    def test_no_listings(self, mock_urlopen):
+        mock_urlopen.side_effect = _api_router({("get_short_epg", None): {"epg_listings": []}})
+        client = XtreamCodesClient(XtreamCodesConfig(base_url="http://provider.com", username="u", password="p"))
+        assert client.fetch_now_next(1, now=self.NOW) is None
+
+
+class TestRateLimitedQueue:
+    """Test the provider request queue."""
+
+    def test_newest_first_dedupe_and_spacing(self):
+        queue = RateLimitedQueue(min_interval=0.05)
+        gate = threading.Event()
+        ran = []
+
+        def job(name):
+            def run():
+                gate.wait(2)
+                ran.append((name, time.monotonic()))
+                return name
+            return run
+
+        first = queue.submit("a", job("a"))
+        time.sleep(0.02)  # "a" is now running and blocked on the gate
+        b = queue.submit("b", job("b"))
+        c = queue.submit("c", job("c"))
+        assert queue.submit("b", job("b2")) is b
+        gate.set()
+        assert first.result(2) == "a"
+        assert b.result(2) == "b" and c.result(2) == "c"
+        assert [name for name, _t in ran] == ["a", "b", "c"]
+        # "b" and "c" were both waiting, so only the interval separates them.
+        assert ran[2][1] - ran[1][1] >= 0.04
+
+    def test_overflow_cancels_oldest(self):
+        queue = RateLimitedQueue(min_interval=0.0, max_pending=2)
+        gate = threading.Event()
+        running = queue.submit("busy", lambda: gate.wait(2))
+        time.sleep(0.02)
+        futures = [queue.submit(i, lambda i=i: i) for i in range(3)]
+        assert futures[0].cancelled()
+        gate.set()
+        assert running.result(2) is True
+        assert [f.result(2) for f in futures[1:]] == [1, 2]
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,180 @@
+"""Throughput benchmark for the stream proxy's shared-stream path.
+
+Two measurements:
+
+* ``ring``: the ``StreamBuffer`` ring on its own, one producer filling it
+  through ``readinto`` and N cursors consuming it, no sockets involved.
+* ``proxy``: end to end over loopback. A local upstream serves a body as
+  fast as the socket allows, the proxy relays it through
+  ``/stream?mode=audio`` (an ``.mp3`` URL, so no ffmpeg), and N clients
+  read it concurrently. Every client attaches before the first byte, so
+  each one receives the whole body.
+
+    python tools/bench_stream_proxy.py --megabytes 256 --clients 1 2 4
+"""
+
+import argparse
+import asyncio
+import http.server
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.parse
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+from stream_proxy import CHUNK_SIZE, WRITE_BATCH, StreamBuffer, StreamProxy  # noqa: E402
+
+PATTERN = bytes(range(256)) * 4096  # 1MB
+
+
+def _rate(nbytes, seconds):
+    return f"{nbytes / seconds / (1024 * 1024):8.1f} MB/s"
+
+
+class _PatternSource:
+    """``readinto`` source producing ``total`` bytes of ``PATTERN``."""
+
+    def __init__(self, total):
+        self.left = total
+        self.pattern = memoryview(PATTERN)
+
+    async def readinto(self, view):
+        n = min(len(view), self.left, len(self.pattern))
+        view[:n] = self.pattern[:n]
+        self.left -= n
+        return n
+
+
+async def _ring_run(total, clients):
+    buf = StreamBuffer(initial_fill=0)
+    cursors = [buf.cursor() for _ in range(clients)]
+
+    async def produce():
+        await buf.fill_from(_PatternSource(total))
+        buf.close()
+
+    async def consume(cursor):
+        got = 0
+        while True:
+            views = await cursor.peek(WRITE_BATCH)
+            if not views:
+                return got
+            n = sum(len(v) for v in views)
+            cursor.consume(n)
+            got += n
+
+    started = time.perf_counter()
+    results = await asyncio.gather(produce(), *(consume(c) for c in cursors))
+    return sum(results[1:]), time.perf_counter() - started
+
+
+def bench_ring(megabytes, client_counts):
+    total = megabytes * 1024 * 1024
+    for clients in client_counts:
+        delivered, seconds = asyncio.run(_ring_run(total, clients))
+        assert delivered == total * clients, (delivered, total * clients)
+        print(f"ring   clients={clients:<3} {_rate(delivered, seconds)}  ({seconds:.2f}s)")
+
+
+def _upstream(total):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(total))
+            self.end_headers()
+            # Let every benchmark client attach before the first byte.
+            time.sleep(0.5)
+            left = total
+            view = memoryview(PATTERN)
+            try:
+                while left:
+                    n = min(left, len(view))
+                    self.wfile.write(view[:n])
+                    left -= n
+            except OSError:
+                pass
+
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def _client(host, port, path, results, index):
+    sock = socket.create_connection((host, port))
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    buf = bytearray(CHUNK_SIZE * 4)
+    view = memoryview(buf)
+    got = 0
+    head = b""
+    while b"\r\n\r\n" not in head:
+        n = sock.recv_into(view)
+        if not n:
+            break
+        head += bytes(view[:n])
+    got = len(head) - head.index(b"\r\n\r\n") - 4
+    while True:
+        n = sock.recv_into(view)
+        if not n:
+            break
+        got += n
+    sock.close()
+    results[index] = got
+
+
+def bench_proxy(megabytes, client_counts):
+    total = megabytes * 1024 * 1024
+    upstream = _upstream(total)
+    proxy = StreamProxy()
+    proxy.host = "127.0.0.1"
+    proxy.start()
+    try:
+        for run, clients in enumerate(client_counts):
+            # A fresh URL per run so each run starts its own shared stream.
+            target = f"http://127.0.0.1:{upstream.server_address[1]}/run{run}.mp3"
+            parts = urllib.parse.urlsplit(proxy.get_audio_url(target))
+            path = f"{parts.path}?{parts.query}"
+            results = [0] * clients
+            threads = [
+                threading.Thread(target=_client, args=(proxy.host, proxy.port, path, results, i))
+                for i in range(clients)
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # The upstream holds the body back for 0.5s so every client can attach.
+            seconds = time.perf_counter() - started - 0.5
+            short = [n for n in results if n != total]
+            note = f"  {len(short)} client(s) short" if short else ""
+            print(f"proxy  clients={clients:<3} {_rate(sum(results), seconds)}  ({seconds:.2f}s){note}")
+    finally:
+        proxy.stop()
+        upstream.shutdown()
+        upstream.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--megabytes", type=int, default=128, help="stream length per run")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4], help="concurrent clients per run")
+    parser.add_argument("--only", choices=("ring", "proxy"), help="run one benchmark")
+    args = parser.parse_args()
+    if args.only in (None, "ring"):
+        bench_ring(args.megabytes, args.clients)
+    if args.only in (None, "proxy"):
+        bench_proxy(args.megabytes, args.clients)
+
+
+if __name__ == "__main__":
+    main()